@@ -1,10 +1,13 @@
-from typing import Generator
-from fastapi import Depends, HTTPException, status
+import hashlib
+from typing import Generator, Optional
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
 from app.core.security import decode_token
-from app.models.user import User, Role
+from app.models.user import User
+from app.services import refcache, sites
+from app.services.idempotency import IDEMPOTENCY_HEADER, Idempotency, begin_idempotent
 
 security = HTTPBearer()
 
@@ -58,10 +61,10 @@ def get_current_user(
 
 
 def _get_role_name(user: User, db: Session) -> str:
-    """Query role name directly from DB to avoid lazy-loading issues"""
+    """Role name from the reference cache (no lazy-loading, no query per request)"""
     if user.role_id is None:
         return ""
-    role = db.query(Role).filter(Role.id == user.role_id).first()
+    role = refcache.lookup(db, "roles", user.role_id)
     return role.name if role else ""
 
 
@@ -115,3 +118,65 @@ def get_current_report_reader(
             detail="Not enough permissions."
         )
     return current_user
+
+
+def get_site_scope(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Optional[int]:
+    """Майданчик запиту (X-Site або майданчик користувача); None — усі майданчики"""
+    return sites.resolve_scope(db, current_user, request.headers.get(sites.SITE_HEADER))
+
+
+def site_document(model, id_param: str, detail: str):
+    """
+    Залежність для маршрутів /{id_param} документа model: документ поза
+    майданчиком запиту — 404 з тим самим detail, що й неіснуючий.
+    """
+    def dependency(
+        request: Request,
+        db: Session = Depends(get_db),
+        site_id: Optional[int] = Depends(get_site_scope)
+    ) -> None:
+        if site_id is None:
+            return
+        try:
+            document_id = int(request.path_params[id_param])
+        except ValueError:
+            return  # некоректний id відхилить валідація самого маршруту
+        found = db.query(model.id).filter(model.id == document_id, *sites.document_scope(model, site_id)).first()
+        if found is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+    return dependency
+
+
+def get_all_sites_report_reader(
+    current_user: User = Depends(get_current_report_reader)
+) -> User:
+    """Читач звітів по всіх майданчиках: користувачу майданчика — 403"""
+    if current_user.site_id is not None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Звіт рахується по всіх майданчиках і недоступний користувачу майданчика"
+        )
+    return current_user
+
+
+async def _request_fingerprint(request: Request) -> str:
+    """sha256 від методу, шляху і тіла запиту (тіло FastAPI вже прочитав і кешував)"""
+    body = await request.body()
+    return hashlib.sha256(f"{request.method} {request.url.path}\n".encode() + body).hexdigest()
+
+
+def get_idempotency(
+    request: Request,
+    fingerprint: str = Depends(_request_fingerprint),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Idempotency:
+    """Idempotency-Key для create/confirm: повтор повертає збережену відповідь"""
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key:
+        return Idempotency()
+    return begin_idempotent(db, current_user.id, key, f"{request.method} {request.url.path}", fingerprint)
@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import desc
+from sqlalchemy.orm import Session
+from sqlalchemy import desc, func
 from typing import Optional
-from datetime import date
+from datetime import date, timedelta
 from pydantic import BaseModel
 from app.api.deps import get_db, get_current_admin_user
-from app.models.audit import AuditLog
+from app.models.audit import AuditLog, AuditArchive
 from app.models.user import User
+from app.services.audit import serialize_audit, archive_old_months, audit_meta, search_archive
 
 router = APIRouter()
 
@@ -51,6 +52,16 @@ class AuditOut(BaseModel):
         from_attributes = True
 
 
+def _out(r: dict) -> AuditOut:
+    return AuditOut(
+        **{k: r[k] for k in ("id", "user_id", "action", "entity_type", "entity_id", "changes", "ip_address")},
+        username=r["username"] or "—",
+        action_label=ACTION_LABELS.get(r["action"], r["action"]),
+        entity_label=ENTITY_LABELS.get(r["entity_type"], r["entity_type"]),
+        created_at=r["created_at"] or "",
+    )
+
+
 @router.get("/", response_model=list[AuditOut])
 def get_audit_log(
     user_id: Optional[int] = Query(None),
@@ -58,13 +69,20 @@ def get_audit_log(
     entity_type: Optional[str] = Query(None),
     date_from: Optional[date] = Query(None),
     date_to: Optional[date] = Query(None),
+    before_id: Optional[int] = Query(None, description="Keyset-пагінація: записи з id < before_id"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
     db: Session = Depends(get_db),
     _: User = Depends(get_current_admin_user),
 ):
-    """Журнал дій — тільки для адміна."""
-    q = db.query(AuditLog).options(joinedload(AuditLog.user))
+    """
+    Журнал дій — тільки для адміна.
+
+    Новіші першими; після живих записів видача продовжується архівом
+    (місяці старші за AUDIT_ARCHIVE_AFTER_MONTHS). Для глибокої пагінації
+    передавайте before_id = id останнього запису попередньої сторінки замість skip.
+    """
+    q = db.query(AuditLog, User.username).outerjoin(User, AuditLog.user_id == User.id)
 
     if user_id:
         q = q.filter(AuditLog.user_id == user_id)
@@ -74,28 +92,27 @@ def get_audit_log(
         q = q.filter(AuditLog.entity_type == entity_type)
     if date_from:
         q = q.filter(AuditLog.created_at >= date_from)
+        # month індексований — відсікаємо старі місяці без сканування created_at
+        q = q.filter(AuditLog.month >= date_from.strftime("%Y-%m"))
     if date_to:
-        from datetime import timedelta
         q = q.filter(AuditLog.created_at < date_to + timedelta(days=1))
+        q = q.filter(AuditLog.month <= date_to.strftime("%Y-%m"))
+    if before_id:
+        q = q.filter(AuditLog.id < before_id)
 
-    records = q.order_by(desc(AuditLog.created_at)).offset(skip).limit(limit).all()
+    rows = q.order_by(desc(AuditLog.id)).offset(skip).limit(limit).all()
+    records = [serialize_audit(row, username) for row, username in rows]
 
-    return [
-        AuditOut(
-            id=r.id,
-            user_id=r.user_id,
-            username=r.user.username if r.user else "—",
-            action=r.action,
-            action_label=ACTION_LABELS.get(r.action, r.action),
-            entity_type=r.entity_type,
-            entity_label=ENTITY_LABELS.get(r.entity_type, r.entity_type),
-            entity_id=r.entity_id,
-            changes=r.changes,
-            ip_address=r.ip_address,
-            created_at=r.created_at.isoformat() if r.created_at else "",
+    if len(records) < limit:
+        # Живі записи закінчились — продовжуємо архівом
+        archive_skip = max(0, skip - q.count()) if skip and not records else 0
+        records += search_archive(
+            db, user_id=user_id, action=action, entity_type=entity_type,
+            date_from=date_from, date_to=date_to, before_id=before_id,
+            skip=archive_skip, limit=limit - len(records),
         )
-        for r in records
-    ]
+
+    return [_out(r) for r in records]
 
 
 @router.get("/meta")
@@ -103,25 +120,41 @@ def get_audit_meta(
     db: Session = Depends(get_db),
     _: User = Depends(get_current_admin_user),
 ):
-    """Список доступних фільтрів: users, actions, entity_types."""
-    from sqlalchemy import distinct
-    users = (
-        db.query(User.id, User.username)
-        .join(AuditLog, AuditLog.user_id == User.id)
-        .distinct()
-        .all()
-    )
-    actions = db.query(distinct(AuditLog.action)).all()
-    entity_types = db.query(distinct(AuditLog.entity_type)).all()
-
+    """Список доступних фільтрів: users, actions, entity_types (з кешем, включно з архівом)."""
+    meta = audit_meta(db)
     return {
-        "users": [{"id": u.id, "username": u.username} for u in users],
+        "users": meta["users"],
         "actions": [
-            {"value": a[0], "label": ACTION_LABELS.get(a[0], a[0])}
-            for a in actions
+            {"value": a, "label": ACTION_LABELS.get(a, a)}
+            for a in meta["actions"]
         ],
         "entity_types": [
-            {"value": e[0], "label": ENTITY_LABELS.get(e[0], e[0])}
-            for e in entity_types
+            {"value": e, "label": ENTITY_LABELS.get(e, e)}
+            for e in meta["entity_types"]
         ],
     }
+
+
+@router.get("/archives")
+def get_audit_archives(
+    db: Session = Depends(get_db),
+    _: User = Depends(get_current_admin_user),
+):
+    """Архівовані місяці журналу: кількість записів і розмір архіву."""
+    archives = db.query(
+        AuditArchive.month, AuditArchive.row_count, func.length(AuditArchive.data), AuditArchive.created_at
+    ).order_by(AuditArchive.month.desc()).all()
+    return [
+        {"month": month, "row_count": count, "size_bytes": size, "archived_at": archived_at}
+        for month, count, size, archived_at in archives
+    ]
+
+
+@router.post("/archive")
+def archive_audit_log(
+    db: Session = Depends(get_db),
+    _: User = Depends(get_current_admin_user),
+):
+    """Архівувати місяці старші за AUDIT_ARCHIVE_AFTER_MONTHS зараз (те саме робить нічна задача)."""
+    archived = archive_old_months(db)
+    return {"archived": archived, "rows": sum(archived.values())}
@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
-from app.api.deps import get_db, get_current_user
-from app.models.department import Department
+from typing import List, Optional
+from app.api.deps import get_db, get_current_user, get_site_scope
 from app.models.user import User
+from app.services import refcache
 from pydantic import BaseModel, ConfigDict
 
 router = APIRouter()
@@ -15,15 +15,25 @@ class DepartmentResponse(BaseModel):
     type: str
     is_main_warehouse: bool
     is_active: bool
+    site_id: int
 
     model_config = ConfigDict(from_attributes=True)
 
 
 @router.get("/", response_model=List[DepartmentResponse])
 def list_departments(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
-    """Список підрозділів"""
-    departments = db.query(Department).filter(Department.is_active == True).all()
-    return departments
+    """Список підрозділів (з кешу довідників, ETag); з майданчиком — лише його підрозділи"""
+    cached = refcache.not_modified(request, response, db, "departments",
+                                   variant=f"site{site_id}" if site_id else None)
+    if cached:
+        return cached
+    return [
+        d for d in refcache.get_all(db, "departments").values()
+        if d.is_active and (site_id is None or d.site_id == site_id)
+    ]
@@ -2,18 +2,15 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional
-from decimal import Decimal
 from app.api.deps import get_db, get_current_user, get_current_admin_user
 from app.models.electricity import ElectricityRecord
 from app.models.user import User
+from app.schemas.utility import UtilityAnalyticsResponse
+from app.services import utility_analytics
+from app.services.utility_analytics import electricity_row
 
 router = APIRouter()
 
-COEFF_MLYN_1  = Decimal("100")
-COEFF_MLYN_2  = Decimal("1")
-COEFF_PALETKA = Decimal("1000")
-
-
 class ElectricityIn(BaseModel):
     month: str          # "2026-02"
     ktp_old: float = 0
@@ -55,49 +52,13 @@ class ElectricityOut(BaseModel):
         from_attributes = True
 
 
-def _calc(rec: ElectricityRecord) -> dict:
-    ktp_old   = float(rec.ktp_old or 0)
-    ktp_new   = float(rec.ktp_new or 0)
-    mlyn1_s   = float(rec.mlyn1_start or 0)
-    mlyn1_e   = float(rec.mlyn1_end or 0)
-    mlyn2_s   = float(rec.mlyn2_start or 0)
-    mlyn2_e   = float(rec.mlyn2_end or 0)
-    palet_s   = float(rec.palet_start or 0)
-    palet_e   = float(rec.palet_end or 0)
-    gen_s     = float(rec.gen_start) if rec.gen_start is not None else None
-    gen_e     = float(rec.gen_end) if rec.gen_end is not None else None
-
-    ktp_total  = ktp_old + ktp_new
-    gen_kwh    = (gen_e - gen_s) if (gen_s is not None and gen_e is not None) else 0.0
-    total_kwh  = ktp_total + gen_kwh
-    mlyn1_kwh  = (mlyn1_e - mlyn1_s) * 100
-    mlyn2_kwh  = (mlyn2_e - mlyn2_s) * 1
-    mlyn_total = mlyn1_kwh + mlyn2_kwh
-    palet_kwh  = (palet_e - palet_s) * 1000
-    elevator   = total_kwh - mlyn_total - palet_kwh
-
-    return {
-        "id": rec.id,
-        "month": rec.month,
-        "ktp_old": ktp_old,
-        "ktp_new": ktp_new,
-        "mlyn1_start": mlyn1_s,
-        "mlyn1_end": mlyn1_e,
-        "mlyn2_start": mlyn2_s,
-        "mlyn2_end": mlyn2_e,
-        "palet_start": palet_s,
-        "palet_end": palet_e,
-        "gen_start": gen_s,
-        "gen_end": gen_e,
-        "ktp_total": ktp_total,
-        "gen_kwh": gen_kwh,
-        "total_kwh": total_kwh,
-        "mlyn1_kwh": mlyn1_kwh,
-        "mlyn2_kwh": mlyn2_kwh,
-        "mlyn_total": mlyn_total,
-        "palet_kwh": palet_kwh,
-        "elevator_kwh": elevator,
-    }
+@router.get("/analytics", response_model=UtilityAnalyticsResponse)
+def get_analytics(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Підсумки по роках і сезонах, частки споживачів, рік до року, ковзні середні — по всій історії."""
+    return utility_analytics.get_analytics(db, "electricity")
 
 
 @router.get("/{month}", response_model=ElectricityOut)
@@ -110,7 +71,7 @@ def get_month(
     rec = db.query(ElectricityRecord).filter(ElectricityRecord.month == month).first()
     if not rec:
         raise HTTPException(status_code=404, detail="Даних за цей місяць немає")
-    return _calc(rec)
+    return electricity_row(rec)
 
 
 @router.post("/save", response_model=ElectricityOut)
@@ -150,7 +111,7 @@ def save_month(
         db.add(rec)
     db.commit()
     db.refresh(rec)
-    return _calc(rec)
+    return electricity_row(rec)
 
 
 @router.get("/", response_model=list[ElectricityOut])
@@ -160,4 +121,4 @@ def list_months(
 ):
     """Список всіх збережених місяців."""
     records = db.query(ElectricityRecord).order_by(ElectricityRecord.month.desc()).all()
-    return [_calc(r) for r in records]
+    return [electricity_row(r) for r in records]
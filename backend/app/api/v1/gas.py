@@ -5,6 +5,9 @@ from typing import Optional
 from app.api.deps import get_db, get_current_user, get_current_admin_user
 from app.models.gas import GasRecord
 from app.models.user import User
+from app.schemas.utility import UtilityAnalyticsResponse
+from app.services import utility_analytics
+from app.services.utility_analytics import gas_row
 
 router = APIRouter()
 
@@ -26,29 +29,22 @@ class GasOut(BaseModel):
         from_attributes = True
 
 
-def _calc(rec: GasRecord) -> dict:
-    consumption = float(rec.consumption) if rec.consumption is not None else None
-    vtv         = float(rec.vtv)         if rec.vtv         is not None else None
-    if consumption is not None or vtv is not None:
-        total = (consumption or 0) + (vtv or 0)
-    else:
-        total = None
-    return {
-        "id":          rec.id,
-        "month":       rec.month,
-        "consumption": consumption,
-        "vtv":         vtv,
-        "total":       total,
-    }
-
-
 @router.get("/", response_model=list[GasOut])
 def list_months(
     db: Session = Depends(get_db),
     _: User = Depends(get_current_user),
 ):
     records = db.query(GasRecord).order_by(GasRecord.month.desc()).all()
-    return [_calc(r) for r in records]
+    return [gas_row(r) for r in records]
+
+
+@router.get("/analytics", response_model=UtilityAnalyticsResponse)
+def get_analytics(
+    db: Session = Depends(get_db),
+    _: User = Depends(get_current_user),
+):
+    """Підсумки по роках і сезонах, частка ВТВ, рік до року, сезонність, ковзні середні."""
+    return utility_analytics.get_analytics(db, "gas")
 
 
 @router.get("/{month}", response_model=GasOut)
@@ -60,7 +56,7 @@ def get_month(
     rec = db.query(GasRecord).filter(GasRecord.month == month).first()
     if not rec:
         raise HTTPException(status_code=404, detail="Даних за цей місяць немає")
-    return _calc(rec)
+    return gas_row(rec)
 
 
 @router.post("/save", response_model=GasOut)
@@ -83,7 +79,7 @@ def save_month(
         db.add(rec)
     db.commit()
     db.refresh(rec)
-    return _calc(rec)
+    return gas_row(rec)
 
 
 @router.delete("/{month}", status_code=204)
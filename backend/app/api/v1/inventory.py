@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import func, desc
 from typing import List, Optional
 from datetime import date as date_type
 from decimal import Decimal
-from app.api.deps import get_db, get_current_user
-from app.models.user import User, Role
+from app.api.deps import get_db, get_current_user, get_current_admin_user, get_site_scope
+from app.models.user import User
 from app.schemas.inventory import (
     InventoryResponse,
     InventoryTransactionResponse,
@@ -16,6 +16,10 @@ from app.schemas.inventory import (
 from app.models.inventory import Inventory, InventoryTransaction
 from app.models.product import Product
 from app.models.department import Department
+from app.services import refcache, sites
+from app.services.low_stock import low_stock_rows, rebuild_low_stock
+from app.services.posting import run_with_retry
+from app.services.reservations import rebuild_reservations
 
 router = APIRouter()
 
@@ -28,16 +32,23 @@ def list_inventory(
     product_id: Optional[int] = None,
     show_zero: bool = False,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
     """Список залишків по складах"""
-    query = db.query(Inventory)
+    query = db.query(Inventory).options(
+        selectinload(Inventory.product),
+        selectinload(Inventory.department),
+    )
 
     # department_head бачить тільки свій підрозділ
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
+    role = refcache.lookup(db, "roles", current_user.role_id)
     if role and role.name == "department_head":
         department_id = current_user.department_id
 
+    if site_id:
+        query = query.filter(Inventory.site_id == site_id)
+
     if department_id:
         query = query.filter(Inventory.department_id == department_id)
 
@@ -60,7 +71,8 @@ def list_inventory(
 def get_department_summary(
     department_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
     """Підсумок залишків по підрозділу"""
     department = db.query(Department).filter(Department.id == department_id).first()
@@ -69,6 +81,7 @@ def get_department_summary(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Department not found"
         )
+    sites.require_departments(db, site_id, department_id)
 
     # Count items
     total_items = db.query(func.count(Inventory.id)).filter(
@@ -107,11 +120,15 @@ def get_department_summary(
 def get_inventory_values(
     department_id: Optional[int] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
     """Отримати вартість залишків (КРИТИЧНО для аналітики)"""
     query = db.query(Inventory).filter(Inventory.quantity > 0)
 
+    if site_id:
+        query = query.filter(Inventory.site_id == site_id)
+
     if department_id:
         query = query.filter(Inventory.department_id == department_id)
 
@@ -120,7 +137,7 @@ def get_inventory_values(
     result = []
     for item in inventory_items:
         product = db.query(Product).filter(Product.id == item.product_id).first()
-        department = db.query(Department).filter(Department.id == item.department_id).first()
+        department = refcache.lookup(db, "departments", item.department_id)
 
         # Розрахувати середню собівартість
         avg_cost = db.query(func.avg(InventoryTransaction.unit_cost)).filter(
@@ -160,10 +177,17 @@ def list_transactions(
     date_from: Optional[date_type] = None,
     date_to: Optional[date_type] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
     """Історія руху товарів (КРИТИЧНО: з датою та вартістю)"""
-    query = db.query(InventoryTransaction)
+    query = db.query(InventoryTransaction).options(
+        selectinload(InventoryTransaction.product),
+        selectinload(InventoryTransaction.from_department),
+        selectinload(InventoryTransaction.to_department),
+    )
+
+    query = query.filter(*sites.ledger_scope(site_id))
 
     if product_id:
         query = query.filter(InventoryTransaction.product_id == product_id)
@@ -190,28 +214,38 @@ def list_transactions(
 @router.get("/low-stock", response_model=List[LowStockItemResponse])
 def get_low_stock_items(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
-    """Товари з низькими залишками (< min_stock_level)"""
-    # Join with products to check min_stock_level
-    low_stock_items = db.query(Inventory).join(Product).filter(
-        Inventory.quantity < Product.min_stock_level,
-        Product.min_stock_level > 0,
-        Inventory.quantity > 0
-    ).all()
-
-    result = []
-    for item in low_stock_items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
-        department = db.query(Department).filter(Department.id == item.department_id).first()
+    """Товари з низькими залишками (< min_stock_level) — з індексу low_stock_items"""
+    return [
+        {
+            "product_id": entry.product_id,
+            "product_name": product.name,
+            "department_id": entry.department_id,
+            "department_name": department.name,
+            "quantity": entry.quantity,
+            "min_stock_level": entry.min_stock_level,
+        }
+        for entry, product, department in low_stock_rows(db, positive_only=True, site_id=site_id)
+    ]
+
+
+@router.post("/reservations/rebuild")
+def rebuild_inventory_reservations(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Перерахувати резерви з відкритих чернеток (те саме робить нічна звірка) - тільки адмін"""
+    fixed = run_with_retry(db, lambda: rebuild_reservations(db))
+    return {"message": f"Резерви перераховано. Виправлено рядків: {fixed}", "fixed": fixed}
 
-        result.append({
-            "product_id": item.product_id,
-            "product_name": product.name if product else "Unknown",
-            "department_id": item.department_id,
-            "department_name": department.name if department else "Unknown",
-            "quantity": item.quantity,
-            "min_stock_level": product.min_stock_level if product else 0
-        })
 
-    return result
+@router.post("/low-stock/rebuild")
+def rebuild_low_stock_index(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Перерахувати індекс низьких залишків з нуля (те саме робить нічна звірка) - тільки адмін"""
+    fixed = rebuild_low_stock(db)
+    return {"message": f"Індекс низьких залишків перераховано. Виправлено записів: {fixed}", "fixed": fixed}
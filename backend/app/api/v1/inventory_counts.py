@@ -1,21 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import and_, case, func, insert, literal, select, update
 from typing import List, Optional
 from decimal import Decimal
-from datetime import date
-from pydantic import BaseModel, ConfigDict
+from datetime import date, datetime, timezone
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
-from app.api.deps import get_db, get_current_user, get_current_admin_user
-from app.models.inventory_count import InventoryCount, InventoryCountItem
+from app.api.deps import get_db, get_current_user, get_current_admin_user, get_idempotency, get_site_scope, site_document
+from app.models.inventory_count import InventoryCount, InventoryCountItem, InventoryCountSession, InventoryCountEntry
 from app.models.inventory import Inventory, InventoryTransaction
 from app.models.department import Department
+from app.models.site import department_site
 from app.models.product import Product, Unit
+from app.models.transfer import Transfer, TransferItem
+from app.models.writeoff import WriteOff, WriteOffItem
 from app.models.user import User
+from app.services import count_sessions, refcache, sites
 from app.services.audit import write_audit
+from app.services.count_sheet import SHEET_FORMATS, apply_quantities, apply_sheet, index_items
+from app.services.idempotency import Idempotency
+from app.services.low_stock import refresh_low_stock
+from app.services.outbox import emit
+from app.services.posting import claim_status, run_with_retry
 
 router = APIRouter()
 
+# Маршрути /{count_id}: акт іншого майданчика — як неіснуючий
+in_site = [Depends(site_document(InventoryCount, "count_id", "Акт не знайдено"))]
+
 
 # ──────────────────────────── Schemas ────────────────────────────
 
@@ -26,12 +38,36 @@ class InventoryCountCreate(BaseModel):
 
 
 class InventoryCountItemUpdate(BaseModel):
-    actual_quantity: Decimal
+    """Позиція акту за id або за кодом товару; notes змінюються лише якщо передані"""
+    id: Optional[int] = None
+    product_code: Optional[str] = None
+    actual_quantity: Decimal = Field(..., ge=0)
     notes: Optional[str] = None
 
+    @model_validator(mode="after")
+    def _has_key(self):
+        if self.id is None and not self.product_code:
+            raise ValueError("Вкажіть id позиції або product_code")
+        return self
+
 
 class InventoryCountItemsUpdate(BaseModel):
-    items: List[dict]   # [{id, actual_quantity, notes?}]
+    items: List[InventoryCountItemUpdate] = Field(..., max_length=50000)
+
+
+class CountSheetError(BaseModel):
+    line: int
+    error: str
+
+
+class CountSheetReport(BaseModel):
+    lines: int
+    applied: int
+    unknown_codes: List[str] = []
+    errors: List[CountSheetError] = []
+    error_count: int = 0
+
+    model_config = ConfigDict(from_attributes=True)
 
 
 class InventoryCountItemResponse(BaseModel):
@@ -68,6 +104,76 @@ class InventoryCountDetailResponse(InventoryCountResponse):
     items: List[InventoryCountItemResponse] = []
 
 
+class CountSessionCreate(BaseModel):
+    zone: str = Field(..., min_length=1, max_length=100)
+
+
+class CountSessionResponse(BaseModel):
+    id: int
+    zone: str
+    counted_by: int
+    counted_by_name: Optional[str] = None
+    status: str
+    lines: int = 0
+    created_at: Optional[datetime] = None
+    submitted_at: Optional[datetime] = None
+    last_entry_at: Optional[datetime] = None
+
+
+class CountEntryLine(BaseModel):
+    """Рядок зони за id або кодом товару"""
+    product_id: Optional[int] = None
+    product_code: Optional[str] = None
+    quantity: Decimal = Field(..., ge=0)
+    notes: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _has_key(self):
+        if self.product_id is None and not self.product_code:
+            raise ValueError("Вкажіть product_id або product_code")
+        return self
+
+
+class CountEntriesUpdate(BaseModel):
+    items: List[CountEntryLine] = Field(..., max_length=50000)
+
+
+class CountEntriesResult(BaseModel):
+    applied: int
+    unknown_products: List[str] = []
+    conflicts: List[int] = []   # товари з цих рядків, які нарахувала ще й інша зона
+
+
+class CountConflictReport(BaseModel):
+    session_id: int
+    zone: str
+    counted_by_name: Optional[str] = None
+    quantity: Decimal
+
+
+class CountConflict(BaseModel):
+    product_id: int
+    product_code: str
+    product_name: str
+    system_quantity: Decimal
+    reports: List[CountConflictReport]
+
+
+class CountConflictResolve(BaseModel):
+    actual_quantity: Optional[Decimal] = Field(None, ge=0, description="Без значення — сума всіх зон")
+    notes: Optional[str] = None
+
+
+class CountProgressResponse(BaseModel):
+    count_id: int
+    items_count: int
+    counted_items: int
+    progress_percent: float
+    discrepancy_count: int
+    sessions: List[CountSessionResponse]
+    conflicts: List[CountConflict]
+
+
 # ──────────────────────────── Helpers ────────────────────────────
 
 def _generate_count_number(db: Session) -> str:
@@ -79,40 +185,277 @@ def _generate_count_number(db: Session) -> str:
     return f"{prefix}-{last + 1:03d}"
 
 
-def _build_response(count: InventoryCount, db: Session) -> dict:
-    dept = db.query(Department).filter(Department.id == count.department_id).first()
-    creator = db.query(User).filter(User.id == count.created_by).first() if count.created_by else None
-    approver = db.query(User).filter(User.id == count.approved_by).first() if count.approved_by else None
-    discrepancy = sum(1 for i in count.items if abs(float(i.difference)) > 0.001)
-    return {
-        "id": count.id,
-        "number": count.number,
-        "date": count.date,
-        "department_id": count.department_id,
-        "department_name": dept.name if dept else "",
-        "status": count.status,
-        "created_by_name": creator.username if creator else None,
-        "approved_by_name": approver.username if approver else None,
-        "notes": count.notes,
-        "items_count": len(count.items),
-        "discrepancy_count": discrepancy,
-    }
+# Позиція вважається розбіжною, якщо |difference| більше за цей поріг
+DISCREPANCY_THRESHOLD = Decimal("0.001")
 
 
-def _build_item_response(item: InventoryCountItem, db: Session) -> dict:
-    product = db.query(Product).filter(Product.id == item.product_id).first()
-    unit = db.query(Unit).filter(Unit.id == product.unit_id).first() if product else None
-    return {
-        "id": item.id,
-        "product_id": item.product_id,
-        "product_name": product.name if product else "",
-        "product_code": product.code if product else "",
-        "unit_name": unit.short_name if unit else "од",
-        "system_quantity": item.system_quantity,
-        "actual_quantity": item.actual_quantity,
-        "difference": item.difference,
-        "notes": item.notes,
-    }
+def _summaries(db: Session, *criteria) -> List[dict]:
+    """
+    Шапки актів одним запитом: підрозділ і користувачі — join'ами,
+    items_count і discrepancy_count — корельованими підзапитами по позиціях
+    лише відібраних актів (індекс по inventory_count_id), а не агрегатом усієї таблиці.
+    """
+    item = InventoryCountItem
+
+    def per_count(aggregate):
+        return (
+            select(aggregate).where(item.inventory_count_id == InventoryCount.id)
+            .correlate_except(item).scalar_subquery()
+        )
+
+    items_total = per_count(func.count(item.id))
+    discrepancies = per_count(func.sum(case((func.abs(item.difference) > DISCREPANCY_THRESHOLD, 1), else_=0)))
+
+    creator, approver = aliased(User), aliased(User)
+    rows = (
+        db.query(
+            InventoryCount,
+            Department.name,
+            creator.username,
+            approver.username,
+            items_total,
+            discrepancies,
+        )
+        .outerjoin(Department, Department.id == InventoryCount.department_id)
+        .outerjoin(creator, creator.id == InventoryCount.created_by)
+        .outerjoin(approver, approver.id == InventoryCount.approved_by)
+        .filter(*criteria)
+        .order_by(InventoryCount.date.desc(), InventoryCount.id.desc())
+        .all()
+    )
+    return [
+        {
+            "id": count.id,
+            "number": count.number,
+            "date": count.date,
+            "department_id": count.department_id,
+            "department_name": department_name or "",
+            "status": count.status,
+            "created_by_name": created_by_name,
+            "approved_by_name": approved_by_name,
+            "notes": count.notes,
+            "items_count": items_count or 0,
+            "discrepancy_count": discrepancy_count or 0,
+        }
+        for count, department_name, created_by_name, approved_by_name, items_count, discrepancy_count in rows
+    ]
+
+
+def _items(db: Session, count_id: int, skip: int = 0, limit: Optional[int] = None,
+           product_id: Optional[int] = None) -> List[dict]:
+    """Позиції акту з товаром і одиницею одним join-запитом, сторінкою skip/limit (або одного товару)."""
+    query = (
+        db.query(InventoryCountItem, Product.name, Product.code, Unit.short_name)
+        .outerjoin(Product, Product.id == InventoryCountItem.product_id)
+        .outerjoin(Unit, Unit.id == Product.unit_id)
+        .filter(InventoryCountItem.inventory_count_id == count_id)
+        .order_by(InventoryCountItem.id)
+    )
+    if product_id is not None:
+        query = query.filter(InventoryCountItem.product_id == product_id)
+    query = query.offset(skip)
+    if limit is not None:
+        query = query.limit(limit)
+    return [
+        {
+            "id": item.id,
+            "product_id": item.product_id,
+            "product_name": product_name or "",
+            "product_code": product_code or "",
+            "unit_name": unit_name or "од",
+            "system_quantity": item.system_quantity,
+            "actual_quantity": item.actual_quantity,
+            "difference": item.difference,
+            "notes": item.notes,
+        }
+        for item, product_name, product_code, unit_name in query.all()
+    ]
+
+
+def _fill_items(db: Session, count: InventoryCount) -> int:
+    """Позиції акту з поточних залишків підрозділу одним INSERT ... SELECT. Повертає кількість позицій."""
+    source = select(
+        literal(count.id),
+        Inventory.product_id,
+        Inventory.quantity,
+        Inventory.quantity,     # Фактична за замовчуванням = системна
+        literal(0),
+    ).where(Inventory.department_id == count.department_id, Inventory.quantity > 0)
+    result = db.execute(
+        insert(InventoryCountItem).from_select(
+            ["inventory_count_id", "product_id", "system_quantity", "actual_quantity", "difference"],
+            source,
+        )
+    )
+    return result.rowcount
+
+
+# Позиція коригує залишок, якщо |actual - system| не менше за цей поріг
+ADJUSTMENT_THRESHOLD = Decimal("0.001")
+
+
+def _reservation_shortfalls(db: Session, count: InventoryCount) -> List[str]:
+    """
+    Розбіжні позиції, фактична кількість яких менша за резерв чернеток:
+    після quantity := actual_quantity резерв перевищив би залишок.
+    Повертає опис по товару з номерами чернеток, що тримають резерв.
+    """
+    item = InventoryCountItem
+    rows = db.query(Product.id, Product.code, item.actual_quantity, Inventory.reserved_quantity).join(
+        Inventory, and_(Inventory.product_id == item.product_id, Inventory.department_id == count.department_id)
+    ).join(Product, Product.id == item.product_id).filter(
+        item.inventory_count_id == count.id,
+        func.abs(item.actual_quantity - item.system_quantity) >= ADJUSTMENT_THRESHOLD,
+        item.actual_quantity < Inventory.reserved_quantity,
+    ).order_by(Product.code).all()
+    if not rows:
+        return []
+
+    product_ids = [pid for pid, *_ in rows]
+    holders: dict[int, List[str]] = {}
+    queries = (
+        db.query(TransferItem.product_id, Transfer.number)
+        .join(Transfer, TransferItem.transfer_id == Transfer.id)
+        .filter(Transfer.status == "draft", Transfer.from_department_id == count.department_id,
+                TransferItem.product_id.in_(product_ids)),
+        db.query(WriteOffItem.product_id, WriteOff.number)
+        .join(WriteOff, WriteOffItem.writeoff_id == WriteOff.id)
+        .filter(WriteOff.status == "draft", WriteOff.department_id == count.department_id,
+                WriteOffItem.product_id.in_(product_ids)),
+    )
+    for query in queries:
+        for product_id, number in query.all():
+            holders.setdefault(product_id, []).append(number)
+
+    return [
+        f"{code}: факт {actual:f}, резерв {reserved:f} ({', '.join(sorted(holders.get(pid, []))) or 'без чернеток'})"
+        for pid, code, actual, reserved in rows
+    ]
+
+
+def _post_adjustments(db: Session, count: InventoryCount, performed_by: int) -> int:
+    """
+    Провести розбіжності акту фіксованою кількістю запитів незалежно від розміру:
+    вибірка розбіжних товарів, INSERT відсутніх рядків inventory, один UPDATE
+    залишків (quantity := actual_quantity), один INSERT ... SELECT журналу,
+    оновлення індексу низьких залишків. Повертає кількість скоригованих позицій.
+    """
+    item = InventoryCountItem
+    diff = item.actual_quantity - item.system_quantity
+    discrepant = and_(item.inventory_count_id == count.id, func.abs(diff) >= ADJUSTMENT_THRESHOLD)
+    product_ids = [pid for (pid,) in db.query(item.product_id).filter(discrepant)]
+    if not product_ids:
+        return 0
+
+    # INSERT ... SELECT не обчислює Python-default site_id — майданчик підрозділу явно
+    site_id = department_site(db.connection(), count.department_id)
+
+    # Некорельований підзапит: SQLite/PostgreSQL будують по ньому хеш один раз
+    stocked = select(Inventory.product_id).where(Inventory.department_id == count.department_id)
+    db.execute(
+        insert(Inventory).from_select(
+            ["product_id", "department_id", "site_id", "quantity", "reserved_quantity", "version"],
+            select(item.product_id, literal(count.department_id), literal(site_id), literal(0), literal(0), literal(1))
+            .where(discrepant, item.product_id.not_in(stocked)),
+        )
+    )
+
+    # version + 1 — паралельне ORM-проведення по цих рядках отримає StaleDataError і повториться
+    actual = (
+        select(item.actual_quantity)
+        .where(item.inventory_count_id == count.id, item.product_id == Inventory.product_id)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(Inventory)
+        .where(
+            Inventory.department_id == count.department_id,
+            Inventory.product_id.in_(select(item.product_id).where(discrepant)),
+        )
+        .values(quantity=actual, version=Inventory.version + 1, last_updated=func.now())
+        .execution_options(synchronize_session=False)
+    )
+
+    db.execute(
+        insert(InventoryTransaction).from_select(
+            ["transaction_type", "product_id", "from_department_id", "to_department_id", "site_id",
+             "quantity", "reference_id", "reference_type", "performed_by", "notes"],
+            select(
+                literal("adjustment"),
+                item.product_id,
+                case((diff < 0, count.department_id), else_=None),
+                case((diff > 0, count.department_id), else_=None),
+                literal(site_id),
+                func.abs(diff),
+                literal(count.id),
+                literal("inventory_count"),
+                literal(performed_by),
+                literal(f"Коригування по інвентаризації {count.number}"),
+            ).where(discrepant),
+        )
+    )
+    refresh_low_stock(db, {(pid, count.department_id) for pid in product_ids})
+    return len(product_ids)
+
+
+def _editable_count(db: Session, count_id: int) -> InventoryCount:
+    count = db.query(InventoryCount).filter(InventoryCount.id == count_id).first()
+    if not count:
+        raise HTTPException(status_code=404, detail="Акт не знайдено")
+    if count.status != "in_progress":
+        raise HTTPException(status_code=400, detail="Редагувати можна тільки акти зі статусом 'В процесі'")
+    return count
+
+
+def _unzoned_count(db: Session, count_id: int) -> InventoryCount:
+    """
+    Акт, який ще не рахують зонами. Після відкриття першої зони позиції
+    зводяться лише з рядків зон (merge_products) — пряме внесення фактичних
+    кількостей перезаписало б зони і розв'язані конфлікти.
+    """
+    count = _editable_count(db, count_id)
+    zoned = db.query(InventoryCountSession.id).filter(InventoryCountSession.inventory_count_id == count_id).first()
+    if zoned:
+        raise HTTPException(
+            status_code=400,
+            detail="Акт рахують зонами — вносьте кількості через зони (/sessions/{id}/entries)"
+        )
+    return count
+
+
+def _own_session(db: Session, count_id: int, session_id: int, user: User) -> InventoryCountSession:
+    """Відкрита зона акту, яку веде user (або admin)."""
+    _editable_count(db, count_id)
+    session = db.query(InventoryCountSession).filter(
+        InventoryCountSession.id == session_id,
+        InventoryCountSession.inventory_count_id == count_id,
+    ).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Зону не знайдено")
+    role = refcache.lookup(db, "roles", user.role_id)
+    if session.counted_by != user.id and not (role and role.name == "admin"):
+        raise HTTPException(status_code=403, detail="Зону веде інший лічильник")
+    if session.status != "open":
+        raise HTTPException(status_code=400, detail="Зону вже здано")
+    return session
+
+
+def _sheet_format(file: UploadFile, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    name = (file.filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in (file.content_type or ""):
+        return "ndjson"
+    return "csv"
+
+
+def _detail(db: Session, count_id: int, skip: int = 0, limit: Optional[int] = None) -> dict:
+    summaries = _summaries(db, InventoryCount.id == count_id)
+    if not summaries:
+        raise HTTPException(status_code=404, detail="Акт не знайдено")
+    resp = summaries[0]
+    resp["items"] = _items(db, count_id, skip, limit)
+    return resp
 
 
 # ──────────────────────────── Endpoints ────────────────────────────
@@ -122,51 +465,41 @@ def list_inventory_counts(
     department_id: Optional[int] = None,
     status: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
-    q = db.query(InventoryCount)
+    criteria = sites.document_scope(InventoryCount, site_id)
     if department_id:
-        q = q.filter(InventoryCount.department_id == department_id)
+        criteria.append(InventoryCount.department_id == department_id)
     if status:
-        q = q.filter(InventoryCount.status == status)
-    counts = q.order_by(InventoryCount.date.desc(), InventoryCount.id.desc()).all()
-    return [_build_response(c, db) for c in counts]
+        criteria.append(InventoryCount.status == status)
+    return _summaries(db, *criteria)
 
 
-@router.get("/{count_id}", response_model=InventoryCountDetailResponse)
+@router.get("/{count_id}", response_model=InventoryCountDetailResponse, dependencies=in_site)
 def get_inventory_count(
     count_id: int,
+    skip: int = Query(0, ge=0, description="Пропустити позицій (для великих актів)"),
+    limit: Optional[int] = Query(None, ge=1, description="Позицій на сторінку; без limit — усі"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    count = db.query(InventoryCount).filter(InventoryCount.id == count_id).first()
-    if not count:
-        raise HTTPException(status_code=404, detail="Акт не знайдено")
-    resp = _build_response(count, db)
-    resp["items"] = [_build_item_response(i, db) for i in count.items]
-    return resp
+    return _detail(db, count_id, skip, limit)
 
 
 @router.post("/", response_model=InventoryCountDetailResponse)
 def create_inventory_count(
     data: InventoryCountCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    idem: Idempotency = Depends(get_idempotency),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
     dept = db.query(Department).filter(Department.id == data.department_id).first()
     if not dept:
         raise HTTPException(status_code=404, detail="Підрозділ не знайдено")
+    sites.require_departments(db, site_id, data.department_id)
 
-    # Отримуємо поточні залишки цього підрозділу
-    inv_records = db.query(Inventory).filter(
-        Inventory.department_id == data.department_id,
-        Inventory.quantity > 0
-    ).all()
-
-    if not inv_records:
-        raise HTTPException(status_code=400, detail="На цьому підрозділі немає залишків для інвентаризації")
-
-    # Середня собівартість по продукту (з усіх підрозділів, для довідки)
     count = InventoryCount(
         number=_generate_count_number(db),
         date=data.date,
@@ -178,107 +511,255 @@ def create_inventory_count(
     db.add(count)
     db.flush()
 
-    for inv in inv_records:
-        item = InventoryCountItem(
-            inventory_count_id=count.id,
-            product_id=inv.product_id,
-            system_quantity=inv.quantity,
-            actual_quantity=inv.quantity,   # За замовчуванням = системна
-            difference=Decimal("0"),
-        )
-        db.add(item)
+    # Позиції — з поточних залишків підрозділу, без завантаження в Python
+    if not _fill_items(db, count):
+        db.rollback()
+        raise HTTPException(status_code=400, detail="На цьому підрозділі немає залишків для інвентаризації")
 
+    resp = _detail(db, count.id)
+    idem.save(db, resp, schema=InventoryCountDetailResponse)
     db.commit()
-    db.refresh(count)
-
-    resp = _build_response(count, db)
-    resp["items"] = [_build_item_response(i, db) for i in count.items]
     return resp
 
 
-@router.put("/{count_id}/items")
+@router.put("/{count_id}/items", response_model=InventoryCountDetailResponse, dependencies=in_site)
 def update_count_items(
     count_id: int,
     data: InventoryCountItemsUpdate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    count = db.query(InventoryCount).filter(InventoryCount.id == count_id).first()
-    if not count:
-        raise HTTPException(status_code=404, detail="Акт не знайдено")
-    if count.status != "in_progress":
-        raise HTTPException(status_code=400, detail="Редагувати можна тільки акти зі статусом 'В процесі'")
+    """Внести фактичні кількості: позиції за id або кодом товару, одним bulk UPDATE"""
+    _unzoned_count(db, count_id)
 
+    refs = index_items(db, count_id)
+    by_code = {ref.product_code: ref for ref in refs.values()}
+    updates, unknown = {}, []
     for upd in data.items:
-        item = db.query(InventoryCountItem).filter(
-            InventoryCountItem.id == upd["id"],
-            InventoryCountItem.inventory_count_id == count_id
-        ).first()
-        if item:
-            item.actual_quantity = Decimal(str(upd["actual_quantity"]))
-            item.difference = item.actual_quantity - item.system_quantity
-            if "notes" in upd:
-                item.notes = upd.get("notes")
+        ref = refs.get(upd.id) if upd.id is not None else by_code.get(upd.product_code)
+        if ref is None:
+            unknown.append(str(upd.id if upd.id is not None else upd.product_code))
+            continue
+        updates[ref.id] = (upd.actual_quantity, "notes" in upd.model_fields_set, upd.notes)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Позиції не знайдено в акті: {', '.join(unknown[:20])}"
+                   + (f" (і ще {len(unknown) - 20})" if len(unknown) > 20 else "")
+        )
 
+    apply_quantities(db, refs, updates)
     db.commit()
-    db.refresh(count)
-    resp = _build_response(count, db)
-    resp["items"] = [_build_item_response(i, db) for i in count.items]
-    return resp
+    return _detail(db, count_id)
 
 
-@router.post("/{count_id}/approve")
-def approve_inventory_count(
+@router.post("/{count_id}/sheet", response_model=CountSheetReport, dependencies=in_site)
+def upload_count_sheet(
+    count_id: int,
+    file: UploadFile = File(..., description="Відомість: CSV (product_code;actual_quantity;notes) або NDJSON"),
+    format: Optional[str] = Query(None, regex=f"^({'|'.join(SHEET_FORMATS)})$",
+                                  description="Формат файлу; за замовчуванням — за розширенням"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Завантажити відомість фактичних кількостей (зі сканера/Excel).
+    Рядки зіставляються з позиціями акту за кодом товару; невідомі коди
+    і некоректні рядки повертаються у звіті, решта вноситься.
+    """
+    count = _unzoned_count(db, count_id)
+    report = apply_sheet(db, count_id, file.file, _sheet_format(file, format))
+    write_audit(db, current_user.id, "inventory_count_sheet", "inventory_count", entity_id=count.id,
+                changes={"lines": report.lines, "applied": report.applied,
+                         "unknown_codes": len(report.unknown_codes), "errors": report.error_count})
+    db.commit()
+    return report
+
+
+# ─────────────── Паралельний підрахунок: зони лічильників ───────────────
+
+@router.post("/{count_id}/sessions", response_model=CountSessionResponse, dependencies=in_site)
+def create_count_session(
     count_id: int,
+    data: CountSessionCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: User = Depends(get_current_user)
 ):
-    """Підтвердити інвентаризацію — коригує залишки по різниці"""
-    count = db.query(InventoryCount).filter(InventoryCount.id == count_id).first()
-    if not count:
+    """Відкрити зону підрахунку для поточного користувача"""
+    _editable_count(db, count_id)
+    session = InventoryCountSession(
+        inventory_count_id=count_id,
+        zone=data.zone.strip(),
+        counted_by=current_user.id,
+        status="open",
+    )
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+    return count_sessions.session_view(session, current_user.username, 0)
+
+
+@router.get("/{count_id}/progress", response_model=CountProgressResponse, dependencies=in_site)
+def get_count_progress(
+    count_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Живий прогрес акту: зони, охоплення позицій, розбіжності і конфлікти зон"""
+    if not db.query(InventoryCount.id).filter(InventoryCount.id == count_id).first():
         raise HTTPException(status_code=404, detail="Акт не знайдено")
-    if count.status != "in_progress":
-        raise HTTPException(status_code=400, detail="Акт вже підтверджено або скасовано")
-
-    adjusted = 0
-    for item in count.items:
-        diff = item.actual_quantity - item.system_quantity
-        if abs(float(diff)) < 0.001:
-            continue  # Різниці немає — нічого не робимо
-
-        # Оновлюємо залишок
-        inv = db.query(Inventory).filter(
-            Inventory.product_id == item.product_id,
-            Inventory.department_id == count.department_id
-        ).first()
-        if inv:
-            inv.quantity = item.actual_quantity
-
-        # Запис транзакції
-        tx = InventoryTransaction(
-            transaction_type="adjustment",
-            product_id=item.product_id,
-            to_department_id=count.department_id if diff > 0 else None,
-            from_department_id=count.department_id if diff < 0 else None,
-            quantity=abs(diff),
-            reference_id=count.id,
-            reference_type="inventory_count",
-            performed_by=current_user.id,
-            notes=f"Коригування по інвентаризації {count.number}"
-        )
-        db.add(tx)
-        adjusted += 1
+    return count_sessions.progress(db, count_id)
+
+
+@router.put("/{count_id}/sessions/{session_id}/entries", response_model=CountEntriesResult, dependencies=in_site)
+def update_session_entries(
+    count_id: int,
+    session_id: int,
+    data: CountEntriesUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Внести рядки своєї зони. Змінюються лише передані товари цієї зони
+    і відповідні позиції акту — паралельні лічильники один одного не перезаписують.
+    """
+    session = _own_session(db, count_id, session_id, current_user)
+
+    products = {
+        product_id: code
+        for product_id, code in db.query(InventoryCountItem.product_id, Product.code)
+        .join(Product, Product.id == InventoryCountItem.product_id)
+        .filter(InventoryCountItem.inventory_count_id == count_id)
+    }
+    by_code = {code: product_id for product_id, code in products.items()}
+    lines, unknown = {}, []
+    for line in data.items:
+        product_id = line.product_id if line.product_id is not None else by_code.get(line.product_code)
+        if product_id not in products:
+            unknown.append(str(line.product_id if line.product_id is not None else line.product_code))
+            continue
+        lines[product_id] = (product_id, line.quantity, "notes" in line.model_fields_set, line.notes)
+
+    count_sessions.upsert_entries(db, session, list(lines.values()))
+    conflicted = count_sessions.merge_products(db, count_id, set(lines))
+    db.commit()
+    return {"applied": len(lines), "unknown_products": unknown, "conflicts": conflicted}
+
+
+@router.delete("/{count_id}/sessions/{session_id}/entries/{product_id}", dependencies=in_site)
+def delete_session_entry(
+    count_id: int,
+    session_id: int,
+    product_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Прибрати рядок товару зі своєї зони (помилково нараховано не в тій зоні)"""
+    session = _own_session(db, count_id, session_id, current_user)
+    deleted = db.query(InventoryCountEntry).filter(
+        InventoryCountEntry.session_id == session.id,
+        InventoryCountEntry.product_id == product_id,
+    ).delete(synchronize_session=False)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Рядок не знайдено")
+    count_sessions.merge_products(db, count_id, {product_id})
+    db.commit()
+    return {"message": "Видалено"}
+
 
-    count.status = "approved"
-    count.approved_by = current_user.id
-    write_audit(db, current_user.id, "inventory_approve", "inventory_count", entity_id=count.id,
-                changes={"status": {"old": "draft", "new": "approved"}, "adjusted_items": adjusted})
+@router.post("/{count_id}/sessions/{session_id}/submit", response_model=CountSessionResponse, dependencies=in_site)
+def submit_count_session(
+    count_id: int,
+    session_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Здати зону: її рядки більше не змінюються"""
+    session = _own_session(db, count_id, session_id, current_user)
+    claim_status(db, session, "open", "submitted")
+    session.submitted_at = datetime.now(timezone.utc)
+    lines = db.query(func.count(InventoryCountEntry.id)).filter(InventoryCountEntry.session_id == session.id).scalar()
     db.commit()
+    db.refresh(session)
+    username = db.query(User.username).filter(User.id == session.counted_by).scalar()
+    return count_sessions.session_view(session, username, lines)
+
 
-    return {"message": f"Інвентаризацію підтверджено. Скориговано позицій: {adjusted}"}
+@router.post("/{count_id}/conflicts/{product_id}/resolve", response_model=InventoryCountItemResponse, dependencies=in_site)
+def resolve_count_conflict(
+    count_id: int,
+    product_id: int,
+    data: CountConflictResolve,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Розв'язати конфлікт зон: вказана фактична кількість або сума зон"""
+    _editable_count(db, count_id)
+    count_sessions.resolve_conflict(db, count_id, product_id, current_user.id,
+                                    data.actual_quantity, data.notes)
+    write_audit(db, current_user.id, "inventory_count_resolve", "inventory_count", entity_id=count_id,
+                changes={"product_id": product_id, "actual_quantity": str(data.actual_quantity)
+                         if data.actual_quantity is not None else "sum"})
+    db.commit()
+    return _items(db, count_id, product_id=product_id)[0]
 
 
-@router.delete("/{count_id}")
+@router.post("/{count_id}/approve", dependencies=in_site)
+def approve_inventory_count(
+    count_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+    idem: Idempotency = Depends(get_idempotency)
+):
+    """Підтвердити інвентаризацію — коригує залишки по різниці"""
+    def _approve():
+        count = db.query(InventoryCount).filter(InventoryCount.id == count_id).first()
+        if not count:
+            raise HTTPException(status_code=404, detail="Акт не знайдено")
+        if count.status != "in_progress":
+            raise HTTPException(status_code=400, detail="Акт вже підтверджено або скасовано")
+        open_zones = db.query(InventoryCountSession.zone).filter(
+            InventoryCountSession.inventory_count_id == count_id,
+            InventoryCountSession.status == "open",
+        ).all()
+        if open_zones:
+            raise HTTPException(status_code=400, detail=f"Не здано зони: {', '.join(z for (z,) in open_zones)}")
+        conflicted = count_sessions.conflicts(db, count_id)
+        if conflicted:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Нерозв'язані конфлікти зон: {', '.join(c['product_code'] for c in conflicted[:20])}"
+            )
+        # Резерви чернеток не зменшуються разом із залишком — спершу скасуйте або змініть чернетки
+        shortfalls = _reservation_shortfalls(db, count)
+        if shortfalls:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Фактичний залишок менший за резерв чернеток: {'; '.join(shortfalls[:20])}"
+            )
+        claim_status(db, count, "in_progress", "approved")
+
+        # Розбіжні позиції проводяться в SQL: залишки і журнал — по одному запиту на весь акт
+        adjusted = _post_adjustments(db, count, current_user.id)
+
+        count.approved_by = current_user.id
+        write_audit(db, current_user.id, "inventory_approve", "inventory_count", entity_id=count.id,
+                    changes={"status": {"old": "draft", "new": "approved"}, "adjusted_items": adjusted})
+        emit(db, "inventory_count.approved", "inventory_count", count.id, {
+            "number": count.number,
+            "department_id": count.department_id,
+            "adjusted_items": adjusted,
+            "performed_by": current_user.id,
+        })
+        resp = {"message": f"Інвентаризацію підтверджено. Скориговано позицій: {adjusted}"}
+        idem.save(db, resp)
+        db.commit()
+        return resp
+
+    return run_with_retry(db, _approve)
+
+
+@router.delete("/{count_id}", dependencies=in_site)
 def delete_inventory_count(
     count_id: int,
     db: Session = Depends(get_db),
@@ -289,6 +770,10 @@ def delete_inventory_count(
         raise HTTPException(status_code=404, detail="Акт не знайдено")
     if count.status == "approved":
         raise HTTPException(status_code=400, detail="Неможливо видалити підтверджений акт")
+    emit(db, "inventory_count.deleted", "inventory_count", count.id, {
+        "number": count.number,
+        "performed_by": current_user.id,
+    })
     db.delete(count)
     db.commit()
     return {"message": "Видалено"}
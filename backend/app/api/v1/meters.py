@@ -0,0 +1,154 @@
+from datetime import date, datetime
+from types import SimpleNamespace
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, Path, Query, UploadFile
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_db, get_current_user, get_current_admin_user
+from app.models.electricity import ElectricityRecord
+from app.models.gas import GasRecord
+from app.models.user import User
+from app.schemas.utility import (
+    MeterInfo,
+    MeterIngestReport,
+    MeterMonthlyResponse,
+    MeterSeriesPoint,
+)
+from app.services import meters
+from app.services.audit import write_audit
+from app.services.utility_analytics import electricity_row, gas_row
+
+router = APIRouter()
+
+_MONTH = Path(..., regex=r"^\d{4}-(0[1-9]|1[0-2])$", description="Місяць: 2026-02")
+
+# Поля ElectricityRecord і значення для нового місяця, якщо лічильника немає
+_ELECTRICITY_DEFAULTS = {
+    "ktp_old": 0, "ktp_new": 0,
+    "mlyn1_start": 0, "mlyn1_end": 0,
+    "mlyn2_start": 0, "mlyn2_end": 0,
+    "palet_start": 0, "palet_end": 0,
+    "gen_start": None, "gen_end": None,
+}
+
+
+def _monthly(db: Session, month: str) -> dict:
+    readings = meters.month_readings(db, month)
+    result = {
+        "month": month,
+        "readings": [
+            {"meter": meter, "label": meters.METERS[meter][0], **values}
+            for meter, values in sorted(readings.items())
+        ],
+        "electricity": None,
+        "gas": None,
+    }
+
+    values = meters.electricity_values(readings)
+    if values:
+        rec = db.query(ElectricityRecord).filter(ElectricityRecord.month == month).first()
+        # Лічильник без показників за місяць — значення зі збереженого місяця
+        base = {key: getattr(rec, key) for key in _ELECTRICITY_DEFAULTS} if rec else _ELECTRICITY_DEFAULTS
+        result["electricity"] = electricity_row(SimpleNamespace(
+            id=rec.id if rec else None, month=month, **{**base, **values}
+        ))
+    if "gas" in readings:
+        rec = db.query(GasRecord).filter(GasRecord.month == month).first()
+        result["gas"] = gas_row(SimpleNamespace(
+            id=rec.id if rec else None, month=month,
+            consumption=readings["gas"]["consumption"], vtv=rec.vtv if rec else None,
+        ))
+    return result
+
+
+@router.get("/", response_model=List[MeterInfo])
+def list_meters(_: User = Depends(get_current_user)):
+    """Лічильники, показники яких приймаються з логерів."""
+    return [{"meter": key, "label": label, "unit": unit} for key, (label, unit) in meters.METERS.items()]
+
+
+@router.post("/readings", response_model=MeterIngestReport)
+def upload_readings(
+    file: UploadFile = File(..., description="CSV логера: timestamp;meter;value або timestamp;ktp_old;mlyn1;..."),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """
+    Завантажити показники з логера. Показник на вже наявний час замінюється;
+    згортки година/доба/місяць перераховуються лише для зачеплених періодів.
+    """
+    report = meters.ingest(db, file.file)
+    write_audit(db, current_user.id, "meter_readings_upload", "meter_readings",
+                changes={"lines": report.lines, "readings": report.readings,
+                         "meters": report.meters, "errors": report.error_count})
+    db.commit()
+    return report
+
+
+@router.get("/monthly/{month}", response_model=MeterMonthlyResponse)
+def get_monthly(
+    month: str = _MONTH,
+    db: Session = Depends(get_db),
+    _: User = Depends(get_current_user),
+):
+    """Місяць з показників логерів у тому ж вигляді, що /electricity і /gas (без збереження)."""
+    result = _monthly(db, month)
+    if not result["readings"]:
+        raise HTTPException(status_code=404, detail="Показників лічильників за цей місяць немає")
+    return result
+
+
+@router.post("/monthly/{month}/apply", response_model=MeterMonthlyResponse)
+def apply_monthly(
+    month: str = _MONTH,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """
+    Зберегти місяць з показників логерів у облік електроенергії і газу.
+    Поля лічильників без показників за місяць (і ВТВ газу) не змінюються.
+    """
+    readings = meters.month_readings(db, month)
+    if not readings:
+        raise HTTPException(status_code=404, detail="Показників лічильників за цей місяць немає")
+
+    values = meters.electricity_values(readings)
+    if values:
+        rec = db.query(ElectricityRecord).filter(ElectricityRecord.month == month).first()
+        if rec is None:
+            rec = ElectricityRecord(month=month, created_by=current_user.id, **_ELECTRICITY_DEFAULTS)
+            db.add(rec)
+        for key, value in values.items():
+            setattr(rec, key, value)
+    if "gas" in readings:
+        rec = db.query(GasRecord).filter(GasRecord.month == month).first()
+        if rec is None:
+            rec = GasRecord(month=month, created_by=current_user.id)
+            db.add(rec)
+        rec.consumption = readings["gas"]["consumption"]
+    write_audit(db, current_user.id, "meter_month_apply", "meter_readings",
+                changes={"month": month, "meters": sorted(readings)})
+    db.commit()
+    return _monthly(db, month)
+
+
+@router.get("/{meter}/series", response_model=List[MeterSeriesPoint])
+def get_series(
+    meter: str,
+    period: str = Query("day", regex=f"^({'|'.join(meters.PERIODS)})$"),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None, description="Не включно"),
+    limit: int = Query(1000, ge=1, le=20000),
+    db: Session = Depends(get_db),
+    _: User = Depends(get_current_user),
+):
+    """Згортки лічильника по годинах/добах/місяцях зі споживанням за кожен період."""
+    if meter not in meters.METERS:
+        raise HTTPException(status_code=404, detail="Невідомий лічильник")
+    return meters.series(
+        db, meter, period,
+        date_from=datetime.combine(date_from, datetime.min.time()) if date_from else None,
+        date_to=datetime.combine(date_to, datetime.min.time()) if date_to else None,
+        limit=limit,
+    )
@@ -1,11 +1,10 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from app.api.deps import get_db, get_current_user
-from app.models.inventory import Inventory
-from app.models.product import Product
-from app.models.department import Department
+from typing import Optional
+from app.api.deps import get_db, get_current_user, get_site_scope
 from app.models.user import User
-from app.services.notifications import send_telegram, notify_low_stock
+from app.services.low_stock import low_stock_rows
+from app.services.notifications import send_telegram_now, notify_low_stock
 from app.services.scheduler import build_low_stock_report
 
 router = APIRouter()
@@ -15,28 +14,17 @@ router = APIRouter()
 def check_low_stock(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    site_id: Optional[int] = Depends(get_site_scope),
 ):
-    """Перевірити низькі залишки і надіслати сповіщення в Telegram."""
-    rows = (
-        db.query(Inventory, Product, Department)
-        .join(Product, Inventory.product_id == Product.id)
-        .join(Department, Inventory.department_id == Department.id)
-        .filter(
-            Product.min_stock_level > 0,
-            Inventory.quantity < Product.min_stock_level,
-        )
-        .order_by(Inventory.quantity)
-        .all()
-    )
-
+    """Перевірити низькі залишки (майданчика запиту) і надіслати сповіщення в Telegram."""
     items = [
         {
             "product_name": product.name,
             "department_name": department.name,
-            "quantity": float(inventory.quantity),
-            "min_stock_level": float(product.min_stock_level),
+            "quantity": float(entry.quantity),
+            "min_stock_level": float(entry.min_stock_level),
         }
-        for inventory, product, department in rows
+        for entry, product, department in low_stock_rows(db, site_id=site_id)
     ]
 
     notified = notify_low_stock(items)
@@ -52,7 +40,7 @@ def test_notification(
     current_user: User = Depends(get_current_user),
 ):
     """Тестове повідомлення — перевірити що Telegram налаштований."""
-    success = send_telegram(
+    success = send_telegram_now(
         "<b>Telegram підключено!</b>\n"
         "ERP система агробізнесу працює."
     )
@@ -63,14 +51,15 @@ def test_notification(
 def send_stock_report_now(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    site_id: Optional[int] = Depends(get_site_scope),
 ):
-    """Надіслати low-stock звіт зараз (ручний тест scheduler)."""
+    """Надіслати low-stock звіт зараз (ручний тест scheduler) — синхронно, success означає доставку."""
     from datetime import date
-    report = build_low_stock_report(db)
+    report = build_low_stock_report(db, site_id=site_id)
     today_str = date.today().strftime("%d.%m.%Y")
     if report:
         text = f"Low-stock звіт (ручний запуск)\n{today_str}\n\n{report}"
     else:
         text = f"Залишки в нормі (ручний запуск)\n{today_str}"
-    success = send_telegram(text)
+    success = send_telegram_now(text)
     return {"success": success}
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.api.deps import get_db, get_current_user
-from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse, ProductCategoryResponse, UnitResponse
+from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse, ProductCategoryResponse, UnitResponse, ProductSearchResult
 from app.models.product import Product, ProductCategory, Unit
 from app.models.user import User
+from app.services import refcache
+from app.services.low_stock import refresh_product
+from app.services.search import search_products
 
 router = APIRouter()
 
@@ -28,11 +31,16 @@ def generate_product_code(db: Session) -> str:
 
 @router.get("/categories", response_model=List[ProductCategoryResponse])
 def list_categories(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all product categories"""
-    return db.query(ProductCategory).all()
+    """Get all product categories (з кешу довідників, ETag)"""
+    cached = refcache.not_modified(request, response, db, "categories")
+    if cached:
+        return cached
+    return list(refcache.get_all(db, "categories").values())
 
 
 @router.post("/categories", response_model=ProductCategoryResponse, status_code=status.HTTP_201_CREATED)
@@ -60,11 +68,16 @@ def create_category(
 
 @router.get("/units", response_model=List[UnitResponse])
 def list_units(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all units"""
-    return db.query(Unit).all()
+    """Get all units (з кешу довідників, ETag)"""
+    cached = refcache.not_modified(request, response, db, "units")
+    if cached:
+        return cached
+    return list(refcache.get_all(db, "units").values())
 
 
 @router.post("/units", response_model=UnitResponse, status_code=status.HTTP_201_CREATED)
@@ -116,6 +129,23 @@ def list_products(
     return products
 
 
+@router.get("/search", response_model=List[ProductSearchResult])
+def search_product_catalog(
+    q: str = Query(..., min_length=1, max_length=100, description="Частина назви або коду, допускає одруківки"),
+    limit: int = Query(20, ge=1, le=100),
+    active_only: bool = True,
+    product_type: Optional[str] = Query(None, description="Filter by product_type: consumable or spare_part"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Пошук товарів для автодоповнення: за назвою і кодом, найкращі збіги першими"""
+    results = search_products(db, q, limit=limit, active_only=active_only, product_type=product_type)
+    return [
+        ProductSearchResult(**ProductResponse.model_validate(product).model_dump(), score=score)
+        for product, score in results
+    ]
+
+
 @router.get("/{product_id}", response_model=ProductResponse)
 def get_product(
     product_id: int,
@@ -183,9 +213,14 @@ def update_product(
         )
 
     # Update fields (код автоматично виключається, оскільки його немає в ProductUpdate)
-    for field, value in product.model_dump(exclude_unset=True).items():
+    changes = product.model_dump(exclude_unset=True)
+    min_level_changed = "min_stock_level" in changes and changes["min_stock_level"] != db_product.min_stock_level
+    for field, value in changes.items():
         setattr(db_product, field, value)
 
+    if min_level_changed:
+        refresh_product(db, product_id)
+
     db.commit()
     db.refresh(db_product)
     return db_product
@@ -1,20 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.orm import Session, contains_eager, selectinload
+from typing import List, Optional, Union
 from datetime import date as date_type, datetime
 from decimal import Decimal
-from app.api.deps import get_db, get_current_user, get_current_admin_user, get_current_manager_or_admin
-from app.schemas.purchase import PurchaseCreate, PurchaseUpdate, PurchaseResponse
+from app.api.deps import (
+    get_db, get_current_user, get_current_admin_user, get_current_manager_or_admin, get_idempotency,
+    get_site_scope, site_document,
+)
+from app.schemas.purchase import PurchaseCreate, PurchaseUpdate, PurchaseResponse, PurchaseSummary
+from app.schemas.batch import BatchConfirmRequest, BatchConfirmResponse
 from app.models.purchase import Purchase, PurchaseItem
-from app.models.inventory import Inventory, InventoryTransaction
 from app.models.user import User
 from app.models.supplier import Supplier
 from app.models.department import Department
 from app.models.product import Product
+from app.services import refcache, sites
 from app.services.audit import write_audit
+from app.services.documents import DOCUMENT_VIEWS, summary_rows, with_item_totals
+from app.services.idempotency import Idempotency
+from app.services.outbox import emit
+from app.services.posting import StockPosting, claim_status, load_documents, run_batch, run_with_retry
 
 router = APIRouter()
 
+# Маршрути /{purchase_id}: закупівля іншого майданчика — як неіснуюча
+in_site = [Depends(site_document(Purchase, "purchase_id", "Purchase not found"))]
+
 
 def generate_purchase_number(db: Session) -> str:
     """Генерувати номер закупівлі"""
@@ -36,7 +47,39 @@ def generate_purchase_number(db: Session) -> str:
     return f"{prefix}-{new_num:03d}"
 
 
-@router.get("/", response_model=List[PurchaseResponse])
+def _post_purchase(posting: StockPosting, purchase: Purchase) -> None:
+    """Оприбуткувати закупівлю через StockPosting (без commit)"""
+    if purchase.status != "draft":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Purchase is already {purchase.status}"
+        )
+    claim_status(posting.db, purchase, "draft", "confirmed")
+
+    for item in purchase.items:
+        posting.receive(item.product_id, purchase.department_id, item.quantity)
+        posting.add_transaction(
+            transaction_type="receipt",  # Прихід
+            product_id=item.product_id,
+            to_department_id=purchase.department_id,
+            quantity=item.quantity,
+            unit_cost=item.unit_price,  # КРИТИЧНО: Собівартість = ціна закупівлі
+            reference_id=purchase.id,
+            reference_type="purchase",
+        )
+
+    write_audit(posting.db, posting.performed_by, "purchase_confirm", "purchase", entity_id=purchase.id,
+                changes={"status": {"old": "draft", "new": "confirmed"}})
+    emit(posting.db, "purchase.confirmed", "purchase", purchase.id, {
+        "number": purchase.number,
+        "department_id": purchase.department_id,
+        "supplier_id": purchase.supplier_id,
+        "total_amount": str(purchase.total_amount),
+        "performed_by": posting.performed_by,
+    })
+
+
+@router.get("/", response_model=List[Union[PurchaseSummary, PurchaseResponse]])
 def list_purchases(
     skip: int = 0,
     limit: int = 100,
@@ -44,11 +87,28 @@ def list_purchases(
     supplier_id: Optional[int] = None,
     date_from: Optional[date_type] = None,
     date_to: Optional[date_type] = None,
+    view: str = Query("summary", regex=DOCUMENT_VIEWS, description="summary — шапки з підсумками позицій, full — з позиціями"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_manager_or_admin)
+    current_user: User = Depends(get_current_manager_or_admin),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
     """Список закупівель з фільтрами"""
-    query = db.query(Purchase)
+    if view == "full":
+        query = db.query(Purchase).options(
+            selectinload(Purchase.items).selectinload(PurchaseItem.product),
+            selectinload(Purchase.supplier),
+            selectinload(Purchase.department),
+        )
+    else:
+        query = (
+            db.query(Purchase)
+            .outerjoin(Purchase.supplier)
+            .outerjoin(Purchase.department)
+            .options(contains_eager(Purchase.supplier), contains_eager(Purchase.department))
+        )
+        query = with_item_totals(query, PurchaseItem, PurchaseItem.purchase_id, Purchase.id)
+
+    query = query.filter(*sites.document_scope(Purchase, site_id))
 
     if status:
         query = query.filter(Purchase.status == status)
@@ -62,11 +122,13 @@ def list_purchases(
     if date_to:
         query = query.filter(Purchase.date <= date_to)
 
-    purchases = query.order_by(Purchase.date.desc()).offset(skip).limit(limit).all()
-    return purchases
+    query = query.order_by(Purchase.date.desc()).offset(skip).limit(limit)
+    if view == "full":
+        return [PurchaseResponse.model_validate(p) for p in query.all()]
+    return summary_rows(query, PurchaseSummary)
 
 
-@router.get("/{purchase_id}", response_model=PurchaseResponse)
+@router.get("/{purchase_id}", response_model=PurchaseResponse, dependencies=in_site)
 def get_purchase(
     purchase_id: int,
     db: Session = Depends(get_db),
@@ -86,7 +148,9 @@ def get_purchase(
 def create_purchase(
     purchase: PurchaseCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_manager_or_admin)
+    current_user: User = Depends(get_current_manager_or_admin),
+    idem: Idempotency = Depends(get_idempotency),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
     """Створити нову закупівлю (draft)"""
     # Validate supplier exists
@@ -104,6 +168,7 @@ def create_purchase(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Department not found"
         )
+    sites.require_departments(db, site_id, purchase.department_id)
 
     # Calculate total amount
     total_amount = Decimal(0)
@@ -147,81 +212,73 @@ def create_purchase(
         )
         db.add(db_item)
 
+    idem.save(db, db_purchase, status.HTTP_201_CREATED, schema=PurchaseResponse)
     db.commit()
     db.refresh(db_purchase)
     return db_purchase
 
 
-@router.post("/{purchase_id}/confirm", response_model=PurchaseResponse)
+@router.post("/confirm-batch", response_model=BatchConfirmResponse)
+def confirm_purchases_batch(
+    data: BatchConfirmRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+    idem: Idempotency = Depends(get_idempotency),
+    site_id: Optional[int] = Depends(get_site_scope)
+):
+    """Підтвердити кілька закупівель однією транзакцією (залишки — одним запитом)"""
+    def _confirm():
+        purchases = load_documents(db, Purchase, data.ids, *sites.document_scope(Purchase, site_id))
+        posting = StockPosting(db, current_user.id)
+        posting.load({
+            (item.product_id, p.department_id)
+            for p in purchases.values() for item in p.items
+        })
+        return run_batch(db, purchases, data.ids, data.mode,
+                         lambda p: _post_purchase(posting, p), posting, idem)
+
+    return run_with_retry(db, _confirm)
+
+
+@router.post("/{purchase_id}/confirm", response_model=PurchaseResponse, dependencies=in_site)
 def confirm_purchase(
     purchase_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: User = Depends(get_current_admin_user),
+    idem: Idempotency = Depends(get_idempotency)
 ):
     """Підтвердити закупівлю та оприбуткувати на склад (Основний склад)"""
-    purchase = db.query(Purchase).filter(Purchase.id == purchase_id).first()
-    if not purchase:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Purchase not found"
-        )
-
-    if purchase.status != "draft":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Purchase is already {purchase.status}"
-        )
-
-    # Оприбуткувати кожен товар на склад
-    for item in purchase.items:
-        # Знайти або створити запис inventory
-        inventory = db.query(Inventory).filter(
-            Inventory.product_id == item.product_id,
-            Inventory.department_id == purchase.department_id
+    def _confirm():
+        purchase = db.query(Purchase).options(selectinload(Purchase.items)).filter(
+            Purchase.id == purchase_id
         ).first()
-
-        if not inventory:
-            inventory = Inventory(
-                product_id=item.product_id,
-                department_id=purchase.department_id,
-                quantity=Decimal(0),
-                reserved_quantity=Decimal(0)
+        if not purchase:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Purchase not found"
             )
-            db.add(inventory)
-            db.flush()
 
-        # Збільшити кількість
-        inventory.quantity += item.quantity
+        # Всі рядки inventory документа — одним запитом, журнал — одним executemany
+        posting = StockPosting(db, current_user.id)
+        posting.load({(item.product_id, purchase.department_id) for item in purchase.items})
+        _post_purchase(posting, purchase)
+        posting.flush()
+        idem.save(db, purchase, schema=PurchaseResponse)
+        db.commit()
+        return purchase
 
-        # Створити транзакцію (КРИТИЧНО: з датою та вартістю)
-        transaction = InventoryTransaction(
-            transaction_type="receipt",  # Прихід
-            product_id=item.product_id,
-            to_department_id=purchase.department_id,
-            quantity=item.quantity,
-            unit_cost=item.unit_price,  # КРИТИЧНО: Собівартість = ціна закупівлі
-            reference_id=purchase.id,
-            reference_type="purchase",
-            performed_by=current_user.id
-        )
-        db.add(transaction)
-
-    # Змінити статус
-    purchase.status = "confirmed"
-
-    write_audit(db, current_user.id, "purchase_confirm", "purchase", entity_id=purchase.id,
-                changes={"status": {"old": "draft", "new": "confirmed"}})
-    db.commit()
+    purchase = run_with_retry(db, _confirm)
     db.refresh(purchase)
     return purchase
 
 
-@router.put("/{purchase_id}", response_model=PurchaseResponse)
+@router.put("/{purchase_id}", response_model=PurchaseResponse, dependencies=in_site)
 def update_purchase(
     purchase_id: int,
     purchase: PurchaseUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_manager_or_admin)
+    current_user: User = Depends(get_current_manager_or_admin),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
     """Оновити закупівлю (тільки draft) — включно з позиціями"""
     db_purchase = db.query(Purchase).filter(Purchase.id == purchase_id).first()
@@ -235,8 +292,7 @@ def update_purchase(
     if db_purchase.status == "confirmed":
         from app.api.deps import get_current_admin_user
         # перевіряємо роль вручну
-        from app.models.user import Role
-        role = db.query(Role).filter(Role.id == current_user.role_id).first()
+        role = refcache.lookup(db, "roles", current_user.role_id)
         if not role or role.name != "admin":
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -247,11 +303,18 @@ def update_purchase(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Cannot change items in a confirmed purchase"
             )
+        # Залишки вже оприбутковані на цей підрозділ
+        if purchase.department_id is not None and purchase.department_id != db_purchase.department_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cannot change department of a confirmed purchase"
+            )
     elif db_purchase.status != "draft":
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Can only update draft or confirmed purchases"
         )
+    sites.require_departments(db, site_id, purchase.department_id)
 
     # Update header fields (exclude date — handle manually to avoid Pydantic Optional[date] coercion issues)
     header_fields = purchase.model_dump(exclude_unset=True, exclude={'items', 'date'})
@@ -304,7 +367,7 @@ def update_purchase(
     return db_purchase
 
 
-@router.delete("/{purchase_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{purchase_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=in_site)
 def cancel_purchase(
     purchase_id: int,
     db: Session = Depends(get_db),
@@ -324,6 +387,10 @@ def cancel_purchase(
             detail="Can only cancel draft purchases"
         )
 
-    db_purchase.status = "cancelled"
+    claim_status(db, db_purchase, "draft", "cancelled")
+    emit(db, "purchase.cancelled", "purchase", db_purchase.id, {
+        "number": db_purchase.number,
+        "performed_by": current_user.id,
+    })
     db.commit()
     return None
@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, and_, or_
+from sqlalchemy import func, extract, and_, or_, select
 from typing import Optional
 from datetime import date as date_type, datetime, timedelta
 from decimal import Decimal
-from app.api.deps import get_db, get_current_user, get_current_warehouse_or_above, get_current_report_reader
+from app.api.deps import (
+    get_db, get_current_user, get_current_warehouse_or_above, get_current_report_reader, get_all_sites_report_reader,
+    get_site_scope,
+)
 from app.schemas.report import (
     DashboardResponse,
     DashboardKPIs,
@@ -47,6 +50,9 @@ from app.models.supplier import Supplier
 from app.models.product import Product, ProductCategory, Unit
 from app.models.department import Department
 from app.models.writeoff import WriteOff, WriteOffItem
+from app.services import refcache, sites
+from app.services.catalog import get_catalog
+from app.services.low_stock import count_low_stock
 
 router = APIRouter()
 
@@ -62,10 +68,18 @@ def get_month_name_uk(month_num: int) -> str:
 @router.get("/dashboard", response_model=DashboardResponse)
 def get_dashboard(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_report_reader)
+    current_user: User = Depends(get_current_report_reader),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
+    # Майданчик: залишки і журнал — по site_id, документи — по підрозділах майданчика
+    site_departments = select(Department.id).where(Department.site_id == site_id)
+    purchase_scope = [Purchase.department_id.in_(site_departments)] if site_id else []
+
     # === KPIs ===
-    inventory_items = db.query(Inventory).filter(Inventory.quantity > 0).all()
+    inventory_q = db.query(Inventory).filter(Inventory.quantity > 0)
+    if site_id:
+        inventory_q = inventory_q.filter(Inventory.site_id == site_id)
+    inventory_items = inventory_q.all()
     total_inventory_value = Decimal(0)
     for item in inventory_items:
         avg_cost = db.query(func.avg(InventoryTransaction.unit_cost)).filter(
@@ -82,24 +96,23 @@ def get_dashboard(
     purchases_this_month = db.query(func.sum(Purchase.total_amount)).filter(
         Purchase.date >= first_day_of_month,
         Purchase.date <= today,
-        Purchase.status == "confirmed"
+        Purchase.status == "confirmed",
+        *purchase_scope
     ).scalar() or Decimal(0)
 
     purchases_count_this_month = db.query(func.count(Purchase.id)).filter(
         Purchase.date >= first_day_of_month,
         Purchase.date <= today,
-        Purchase.status == "confirmed"
+        Purchase.status == "confirmed",
+        *purchase_scope
     ).scalar() or 0
 
-    low_stock_count = db.query(func.count(Inventory.id)).join(Product).filter(
-        Inventory.quantity < Product.min_stock_level,
-        Product.min_stock_level > 0,
-        Inventory.quantity > 0
-    ).scalar() or 0
+    low_stock_count = count_low_stock(db, positive_only=True, site_id=site_id)
 
-    departments_count = db.query(func.count(Department.id)).filter(
-        Department.is_active == True
-    ).scalar() or 0
+    departments_q = db.query(func.count(Department.id)).filter(Department.is_active == True)
+    if site_id:
+        departments_q = departments_q.filter(Department.site_id == site_id)
+    departments_count = departments_q.scalar() or 0
 
     products_count = db.query(func.count(Product.id)).filter(
         Product.is_active == True
@@ -131,13 +144,15 @@ def get_dashboard(
         total = db.query(func.sum(Purchase.total_amount)).filter(
             Purchase.date >= first_day,
             Purchase.date <= last_day,
-            Purchase.status == "confirmed"
+            Purchase.status == "confirmed",
+            *purchase_scope
         ).scalar() or Decimal(0)
 
         count = db.query(func.count(Purchase.id)).filter(
             Purchase.date >= first_day,
             Purchase.date <= last_day,
-            Purchase.status == "confirmed"
+            Purchase.status == "confirmed",
+            *purchase_scope
         ).scalar() or 0
 
         monthly_purchases.append(MonthlyPurchaseData(
@@ -154,7 +169,8 @@ def get_dashboard(
         func.sum(Purchase.total_amount).label("total"),
         func.count(Purchase.id).label("count")
     ).join(Purchase).filter(
-        Purchase.status == "confirmed"
+        Purchase.status == "confirmed",
+        *purchase_scope
     ).group_by(Supplier.id, Supplier.name).order_by(
         func.sum(Purchase.total_amount).desc()
     ).limit(5).all()
@@ -179,7 +195,8 @@ def get_dashboard(
     ).join(PurchaseItem, PurchaseItem.product_id == Product.id
     ).join(Purchase, PurchaseItem.purchase_id == Purchase.id
     ).filter(
-        Purchase.status == "confirmed"
+        Purchase.status == "confirmed",
+        *purchase_scope
     ).group_by(Product.id, Product.name, Product.code).order_by(
         func.sum(PurchaseItem.total_price).desc()
     ).limit(5).all()
@@ -196,7 +213,8 @@ def get_dashboard(
     ]
 
     # === Recent Transactions ===
-    recent_trans = db.query(InventoryTransaction).order_by(
+    recent_q = db.query(InventoryTransaction).filter(*sites.ledger_scope(site_id))
+    recent_trans = recent_q.order_by(
         InventoryTransaction.created_at.desc()
     ).limit(10).all()
 
@@ -205,9 +223,9 @@ def get_dashboard(
         product = db.query(Product).filter(Product.id == trans.product_id).first()
         department = None
         if trans.to_department_id:
-            department = db.query(Department).filter(Department.id == trans.to_department_id).first()
+            department = refcache.lookup(db, "departments", trans.to_department_id)
         elif trans.from_department_id:
-            department = db.query(Department).filter(Department.id == trans.from_department_id).first()
+            department = refcache.lookup(db, "departments", trans.from_department_id)
 
         recent_transactions.append(RecentTransaction(
             id=trans.id,
@@ -236,7 +254,8 @@ def get_purchase_report(
     category_id: Optional[int] = None,
     product_id: Optional[int] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_report_reader)
+    current_user: User = Depends(get_current_report_reader),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
     query = db.query(
         Purchase.number,
@@ -268,6 +287,8 @@ def get_purchase_report(
         query = query.filter(Product.category_id == category_id)
     if product_id:
         query = query.filter(PurchaseItem.product_id == product_id)
+    if site_id:
+        query = query.filter(Purchase.department_id.in_(select(Department.id).where(Department.site_id == site_id)))
 
     results = query.order_by(Purchase.date.desc(), Purchase.number).all()
 
@@ -307,12 +328,13 @@ def get_cost_analysis(
     department_id: Optional[int] = None,
     category_id: Optional[int] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_report_reader)
+    current_user: User = Depends(get_all_sites_report_reader)
 ):
     if not date_to:
         date_to = datetime.now().date()
     if not date_from:
         date_from = date_to - timedelta(days=180)
+    catalog = get_catalog(db)
 
     # Total purchases in period
     purchase_total_q = db.query(func.sum(PurchaseItem.total_price)).join(
@@ -478,13 +500,11 @@ def get_cost_analysis(
         if pr:
             name, code, cat_name, unit_name = pr.name, pr.code, pr.category_name, pr.unit_name
         else:
-            p = db.query(Product).filter(Product.id == pid).first()
-            cat = db.query(ProductCategory).filter(ProductCategory.id == p.category_id).first() if p else None
-            u = db.query(Unit).filter(Unit.id == p.unit_id).first() if p else None
+            p = catalog.get(pid)
             name = p.name if p else ''
             code = p.code if p else ''
-            cat_name = cat.name if cat else None
-            unit_name = u.short_name if u else None
+            cat_name = p.category_name if p else None
+            unit_name = p.unit_name if p else None
 
         product_breakdown.append(ProductCostRow(
             product_id=pid,
@@ -592,13 +612,11 @@ def get_cost_analysis(
             if pr:
                 pname, pcode, cat_name, unit_name = pr.name, pr.code, pr.category_name, pr.unit_name
             else:
-                p_obj = db.query(Product).filter(Product.id == pid).first()
-                cat_obj = db.query(ProductCategory).filter(ProductCategory.id == p_obj.category_id).first() if p_obj else None
-                u_obj = db.query(Unit).filter(Unit.id == p_obj.unit_id).first() if p_obj else None
+                p_obj = catalog.get(pid)
                 pname = p_obj.name if p_obj else ''
                 pcode = p_obj.code if p_obj else ''
-                cat_name = cat_obj.name if cat_obj else None
-                unit_name = u_obj.short_name if u_obj else None
+                cat_name = p_obj.category_name if p_obj else None
+                unit_name = p_obj.unit_name if p_obj else None
             dept_materials.append(ProductCostRow(
                 product_id=pid,
                 product_name=pname,
@@ -641,7 +659,7 @@ def get_supplier_report(
     date_to: Optional[date_type] = None,
     supplier_id: Optional[int] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_report_reader)
+    current_user: User = Depends(get_all_sites_report_reader)
 ):
     """
     По постачальнику — всі товари за період.
@@ -750,22 +768,23 @@ def get_department_report(
     date_to: Optional[date_type] = None,
     department_id: Optional[int] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_report_reader)
+    current_user: User = Depends(get_current_report_reader),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
     """
     По підрозділу — всі матеріали за період.
     Показує: отримано (закупівлі + переміщення), списано, поточний залишок.
-    Фільтри: дата, підрозділ.
+    Фільтри: дата, підрозділ, майданчик (X-Site).
     """
     dept_q = db.query(Department).filter(Department.is_active == True)
+    if site_id:
+        dept_q = dept_q.filter(Department.site_id == site_id)
     if department_id:
         dept_q = dept_q.filter(Department.id == department_id)
     departments = dept_q.all()
 
-    # Preload product/category/unit info
-    all_products = {p.id: p for p in db.query(Product).all()}
-    all_categories = {c.id: c for c in db.query(ProductCategory).all()}
-    all_units = {u.id: u for u in db.query(Unit).all()}
+    # Товари з категорією й одиницею — зі знімка каталогу
+    catalog = get_catalog(db)
 
     department_data = []
 
@@ -874,7 +893,7 @@ def get_department_report(
         total_stock_value = Decimal(0)
 
         for pid in all_pids:
-            product = all_products.get(pid)
+            product = catalog.get(pid)
             if not product:
                 continue
 
@@ -905,15 +924,12 @@ def get_department_report(
             total_transferred_value += trout_val
             total_stock_value += current_val
 
-            category = all_categories.get(product.category_id)
-            unit = all_units.get(product.unit_id)
-
             materials.append(DepartmentMaterialRow(
                 product_id=pid,
                 product_name=product.name,
                 product_code=product.code,
-                category_name=category.name if category else None,
-                unit_name=unit.short_name if unit else "од",
+                category_name=product.category_name,
+                unit_name=product.unit_name or "од",
                 received_quantity=recv_qty,
                 received_value=recv_val,
                 writeoff_quantity=wo_qty,
@@ -947,7 +963,7 @@ def get_material_report(
     category_id: Optional[int] = None,
     department_id: Optional[int] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_report_reader)
+    current_user: User = Depends(get_all_sites_report_reader)
 ):
     """
     По матеріалу — всі підрозділи за період.
@@ -963,8 +979,8 @@ def get_material_report(
     materials_data = []
 
     for product in products:
-        category = db.query(ProductCategory).filter(ProductCategory.id == product.category_id).first()
-        unit = db.query(Unit).filter(Unit.id == product.unit_id).first()
+        category = refcache.lookup(db, "categories", product.category_id)
+        unit = refcache.lookup(db, "units", product.unit_id)
 
         # Purchases in period
         purchase_q = db.query(
@@ -1018,7 +1034,7 @@ def get_material_report(
         locations = []
 
         for inv in inventory_items:
-            dept = db.query(Department).filter(Department.id == inv.department_id).first()
+            dept = refcache.lookup(db, "departments", inv.department_id)
             avg_cost = db.query(func.avg(InventoryTransaction.unit_cost)).filter(
                 InventoryTransaction.product_id == product.id,
                 InventoryTransaction.to_department_id == inv.department_id,
@@ -1065,7 +1081,7 @@ def get_price_dynamics(
     date_from: Optional[date_type] = Query(None),
     date_to: Optional[date_type] = Query(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_report_reader)
+    current_user: User = Depends(get_all_sites_report_reader)
 ):
     """Динаміка цін на конкретний товар по постачальниках"""
     product = db.query(Product).filter(Product.id == product_id).first()
@@ -1112,7 +1128,7 @@ def get_supplier_monthly(
     date_from: date_type = Query(...),
     date_to: date_type = Query(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_report_reader)
+    current_user: User = Depends(get_all_sites_report_reader)
 ):
     """Витрати по постачальниках за вказаний період"""
     purchases = (
@@ -1175,7 +1191,7 @@ def get_abc_analysis(
     date_from: Optional[date_type] = Query(None),
     date_to: Optional[date_type] = Query(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_report_reader)
+    current_user: User = Depends(get_all_sites_report_reader)
 ):
     """ABC-аналіз товарів за сумою закупівель"""
     query = (
@@ -1256,6 +1272,7 @@ def get_writeoff_report(
     department_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_report_reader),
+    site_id: Optional[int] = Depends(get_site_scope),
 ):
     """
     Звіт по списаннях за підрозділами і матеріалами за обраний період.
@@ -1288,6 +1305,9 @@ def get_writeoff_report(
         rows = rows.filter(WriteOff.date <= date_to)
     if department_id:
         rows = rows.filter(WriteOff.department_id == department_id)
+    site_scope = WriteOff.department_id.in_(select(Department.id).where(Department.site_id == site_id))
+    if site_id:
+        rows = rows.filter(site_scope)
 
     rows = rows.group_by(
         WriteOff.department_id, Department.name,
@@ -1303,6 +1323,8 @@ def get_writeoff_report(
         doc_count_q = doc_count_q.filter(WriteOff.date <= date_to)
     if department_id:
         doc_count_q = doc_count_q.filter(WriteOff.department_id == department_id)
+    if site_id:
+        doc_count_q = doc_count_q.filter(site_scope)
     total_documents = doc_count_q.scalar() or 0
 
     # Групуємо в Python по підрозділу
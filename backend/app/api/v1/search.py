@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app.api.deps import get_db, get_current_user, get_site_scope
+from app.models.user import User
+from app.schemas.search import GlobalSearchResponse
+from app.services import refcache
+from app.services.search import SEARCH_GROUPS, global_search
+
+router = APIRouter()
+
+# Хто бачить групу — ті самі ролі, що й у відповідного списку (None — будь-який користувач)
+GROUP_ROLES = {
+    "purchase": ("admin", "manager"),                              # GET /purchases
+    "transfer": ("admin", "manager", "warehouse_manager"),         # GET /transfers
+    "writeoff": None,                                              # GET /writeoffs (department_head — свій підрозділ)
+    "inventory_count": None,                                       # GET /inventory-counts
+    "supplier": None,                                              # GET /suppliers
+    "product": None,                                               # GET /products
+}
+
+
+@router.get("/", response_model=GlobalSearchResponse)
+def search_everything(
+    q: str = Query(..., min_length=2, max_length=100, description="Номер документа, назва, код або ЄДРПОУ"),
+    types: Optional[List[str]] = Query(None, description=f"Обмежити групи: {', '.join(SEARCH_GROUPS)}"),
+    limit: int = Query(5, ge=1, le=50, description="Результатів на групу"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    site_id: Optional[int] = Depends(get_site_scope)
+):
+    """Глобальний пошук: документи за номером, постачальники, товари — згруповано за типом (документи — майданчика)"""
+    if types:
+        unknown = sorted(set(types) - set(SEARCH_GROUPS))
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown search types: {', '.join(unknown)}"
+            )
+
+    role = refcache.lookup(db, "roles", current_user.role_id)
+    role_name = role.name if role else ""
+    allowed = [g for g in SEARCH_GROUPS if GROUP_ROLES[g] is None or role_name in GROUP_ROLES[g]]
+    departments = {}
+    # department_head бачить тільки списання свого підрозділу (без підрозділу — жодних)
+    if role_name == "department_head":
+        if current_user.department_id is None:
+            allowed.remove("writeoff")
+        else:
+            departments["writeoff"] = current_user.department_id
+
+    if types:
+        forbidden = sorted(set(types) - set(allowed))
+        if forbidden:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Not enough permissions for search types: {', '.join(forbidden)}"
+            )
+        allowed = [g for g in allowed if g in types]
+    return global_search(q, groups=allowed, limit=limit, departments=departments, site_id=site_id)
@@ -0,0 +1,112 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from app.api.deps import get_db, get_current_user, get_current_admin_user
+from app.models.site import Site
+from app.models.user import User
+from app.services import refcache, sites
+from app.services.audit import write_audit
+
+router = APIRouter()
+
+
+class SiteCreate(BaseModel):
+    code: str = Field(..., min_length=1, max_length=20)
+    name: str = Field(..., min_length=1, max_length=100)
+    api_url: Optional[str] = None
+
+
+class SiteUpdate(BaseModel):
+    name: Optional[str] = Field(None, min_length=1, max_length=100)
+    api_url: Optional[str] = None
+    is_active: Optional[bool] = None
+
+
+class SiteResponse(BaseModel):
+    id: int
+    code: str
+    name: str
+    api_url: Optional[str] = None   # окреме розгортання майданчика
+    is_active: bool
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SiteDepartmentsMove(BaseModel):
+    department_ids: List[int] = Field(..., min_length=1)
+
+
+class SiteDepartmentsMoveResult(BaseModel):
+    departments: int
+    inventory: int
+    transactions: int
+
+
+@router.get("/", response_model=List[SiteResponse])
+def list_sites(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Майданчики (з кешу довідників, ETag); код — значення заголовка X-Site"""
+    cached = refcache.not_modified(request, response, db, "sites")
+    if cached:
+        return cached
+    return [s for s in refcache.get_all(db, "sites").values() if s.is_active]
+
+
+@router.post("/", response_model=SiteResponse, status_code=201)
+def create_site(
+    data: SiteCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Створити майданчик - тільки адмін"""
+    if sites.by_code(db, data.code) or db.query(Site.id).filter(Site.code == data.code).first():
+        raise HTTPException(status_code=400, detail=f"Майданчик з кодом '{data.code}' вже існує")
+    site = Site(**data.model_dump(), is_active=True)
+    db.add(site)
+    db.flush()
+    write_audit(db, current_user.id, "site_create", "site", entity_id=site.id, changes=data.model_dump())
+    db.commit()
+    db.refresh(site)
+    return site
+
+
+@router.put("/{site_id}", response_model=SiteResponse)
+def update_site(
+    site_id: int,
+    data: SiteUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Змінити майданчик (назва, адреса окремого розгортання, активність) - тільки адмін"""
+    site = db.query(Site).filter(Site.id == site_id).first()
+    if not site:
+        raise HTTPException(status_code=404, detail="Майданчик не знайдено")
+    changes = data.model_dump(exclude_unset=True)
+    for field, value in changes.items():
+        setattr(site, field, value)
+    write_audit(db, current_user.id, "site_update", "site", entity_id=site.id, changes=changes)
+    db.commit()
+    db.refresh(site)
+    return site
+
+
+@router.post("/{site_id}/departments", response_model=SiteDepartmentsMoveResult)
+def move_departments_to_site(
+    site_id: int,
+    data: SiteDepartmentsMove,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Перенести підрозділи на майданчик разом з їхніми залишками і журналом руху - тільки адмін"""
+    if not db.query(Site.id).filter(Site.id == site_id).first():
+        raise HTTPException(status_code=404, detail="Майданчик не знайдено")
+    result = sites.move_departments(db, site_id, data.department_ids)
+    write_audit(db, current_user.id, "site_move_departments", "site", entity_id=site_id,
+                changes={"department_ids": data.department_ids, **result})
+    db.commit()
+    return result
@@ -0,0 +1,101 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+from datetime import datetime
+from pydantic import BaseModel
+from app.api.deps import get_db, get_current_admin_user
+from app.models.scheduler import SchedulerJobRun
+from app.models.user import User
+from app.services.outbox import dispatch_all, outbox_stats
+from app.services.scheduler import jobs_overview
+import app.services.event_handlers  # noqa: F401 — реєстрація обробників outbox
+
+router = APIRouter()
+
+
+class OutboxStatsOut(BaseModel):
+    pending: int
+    pending_by_type: Dict[str, int]
+    lag_seconds: float  # вік найстарішої недоставленої події
+    oldest_pending_at: Optional[datetime] = None
+    last_processed_at: Optional[datetime] = None
+    dead_letter: int
+
+
+class JobRunOut(BaseModel):
+    id: int
+    job_id: str
+    worker: str
+    status: str
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    duration_ms: Optional[int] = None
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class LeaderOut(BaseModel):
+    holder: str
+    acquired_at: datetime
+    expires_at: datetime
+    alive: bool
+
+
+class JobOut(BaseModel):
+    id: str
+    next_run_time: Optional[datetime] = None
+    last_run: Optional[JobRunOut] = None
+    runs: int
+    errors: int
+    avg_duration_ms: float
+
+
+class JobsOverviewOut(BaseModel):
+    worker: str  # процес, що відповів
+    is_leader: bool
+    lock_mode: str  # advisory | lease
+    leader: Optional[LeaderOut] = None
+    jobs: List[JobOut]
+
+
+@router.get("/outbox", response_model=OutboxStatsOut)
+def get_outbox_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Стан черги подій outbox: кількість, lag, відкладені — тільки admin"""
+    return outbox_stats(db)
+
+
+@router.post("/outbox/dispatch")
+def dispatch_outbox_now(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Доставити накопичені події зараз (не чекаючи планувальника) — тільки admin"""
+    delivered = dispatch_all(db)
+    return {"delivered": delivered}
+
+
+@router.get("/jobs", response_model=JobsOverviewOut)
+def get_jobs(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Лідер планувальника, розклад задач і останні запуски (статус, тривалість) — тільки admin"""
+    return jobs_overview(db)
+
+
+@router.get("/jobs/{job_id}/runs", response_model=List[JobRunOut])
+def get_job_runs(
+    job_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Історія запусків задачі, новіші першими — тільки admin"""
+    return db.query(SchedulerJobRun).filter(
+        SchedulerJobRun.job_id == job_id
+    ).order_by(SchedulerJobRun.id.desc()).limit(limit).all()
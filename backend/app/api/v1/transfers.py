@@ -1,20 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
+from sqlalchemy.orm import Session, aliased, contains_eager, selectinload
+from typing import List, Optional, Union
 from datetime import date as date_type, datetime
 from decimal import Decimal
-from app.api.deps import get_db, get_current_user, get_current_admin_user, get_current_warehouse_or_above
-from app.schemas.transfer import TransferCreate, TransferUpdate, TransferResponse
+from app.api.deps import (
+    get_db, get_current_user, get_current_admin_user, get_current_warehouse_or_above, get_idempotency,
+    get_site_scope, site_document,
+)
+from app.schemas.transfer import TransferCreate, TransferUpdate, TransferResponse, TransferSummary
+from app.schemas.batch import BatchConfirmRequest, BatchConfirmResponse
 from app.models.transfer import Transfer, TransferItem
-from app.models.inventory import Inventory, InventoryTransaction
 from app.models.user import User
 from app.models.department import Department
 from app.models.product import Product
+from app.services import sites
 from app.services.audit import write_audit
+from app.services.documents import DOCUMENT_VIEWS, summary_rows, with_item_totals
+from app.services.idempotency import Idempotency
+from app.services.outbox import emit
+from app.services.posting import (
+    StockPosting, aggregate_items, claim_status, load_documents, run_batch, run_with_retry,
+)
 
 router = APIRouter()
 
+# Маршрути /{transfer_id}: переміщення, що не торкається майданчика, — як неіснуюче
+in_site = [Depends(site_document(Transfer, "transfer_id", "Transfer not found"))]
+
 
 def generate_transfer_number(db: Session) -> str:
     """Генерувати номер переміщення"""
@@ -36,7 +48,103 @@ def generate_transfer_number(db: Session) -> str:
     return f"{prefix}-{new_num:03d}"
 
 
-@router.get("/", response_model=List[TransferResponse])
+def _post_transfer(posting: StockPosting, transfer: Transfer) -> None:
+    """Провести переміщення через StockPosting (без commit).
+
+    Спочатку перевіряє залишки по всіх позиціях, тому при помилці
+    нічого не змінюється.
+    """
+    if transfer.status != "draft":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Transfer is already {transfer.status}"
+        )
+
+    # Check if source department has enough stock (резерв цієї чернетки входить у quantity)
+    needed = aggregate_items(transfer.items)
+    for product_id, quantity in needed.items():
+        available = posting.quantity(product_id, transfer.from_department_id)
+        if available < quantity:
+            product = posting.db.query(Product).filter(Product.id == product_id).first()
+            from_dept = transfer.from_department
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Недостатньо запасів: '{product.name}' — потрібно {float(quantity)}, є {float(available)} в '{from_dept.name if from_dept else 'підрозділі'}'"
+            )
+    claim_status(posting.db, transfer, "draft", "confirmed")
+
+    total_cost = Decimal(0)
+    for item in transfer.items:
+        # Calculate average cost from source department (КРИТИЧНО для аналітики)
+        avg_cost = posting.avg_cost(item.product_id, transfer.from_department_id)
+
+        item.unit_cost = avg_cost
+        item.total_cost = item.quantity * avg_cost
+        total_cost += item.total_cost
+
+        posting.consume(item.product_id, transfer.from_department_id, item.quantity)
+        posting.receive(item.product_id, transfer.to_department_id, item.quantity)
+
+        # Issue from source + receipt to destination (КРИТИЧНО: з вартістю)
+        posting.add_transaction(
+            transaction_type="issue",  # Видача (списання)
+            product_id=item.product_id,
+            from_department_id=transfer.from_department_id,
+            quantity=item.quantity,
+            unit_cost=avg_cost,
+            reference_id=transfer.id,
+            reference_type="transfer",
+            notes=f"Transfer to {transfer.to_department.name}"
+        )
+        posting.add_transaction(
+            transaction_type="transfer",  # Переміщення (прихід)
+            product_id=item.product_id,
+            to_department_id=transfer.to_department_id,
+            from_department_id=transfer.from_department_id,
+            quantity=item.quantity,
+            unit_cost=avg_cost,  # КРИТИЧНО: Собівартість зберігається
+            reference_id=transfer.id,
+            reference_type="transfer",
+            notes=f"Transfer from {transfer.from_department.name}"
+        )
+
+    transfer.total_cost = total_cost
+    write_audit(posting.db, posting.performed_by, "transfer_confirm", "transfer", entity_id=transfer.id,
+                changes={"status": {"old": "draft", "new": "confirmed"}})
+    emit(posting.db, "transfer.confirmed", "transfer", transfer.id, {
+        "number": transfer.number,
+        "from_department_id": transfer.from_department_id,
+        "to_department_id": transfer.to_department_id,
+        "total_cost": str(total_cost),
+        "performed_by": posting.performed_by,
+    })
+
+
+def _reserve_transfer(posting: StockPosting, from_department_id: int, items, from_dept_name: str) -> None:
+    """Зарезервувати залишки джерела під чернетку переміщення (400 без змін, якщо не вистачає)."""
+    needed = aggregate_items(items)
+    posting.load({(product_id, from_department_id) for product_id in needed})
+    for product_id, quantity in needed.items():
+        available = posting.available(product_id, from_department_id)
+        if available < quantity:
+            product = posting.db.query(Product).filter(Product.id == product_id).first()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Недостатньо запасів: '{product.name}' — потрібно {float(quantity)}, доступно {float(available)} в '{from_dept_name}'"
+            )
+    for product_id, quantity in needed.items():
+        posting.reserve(product_id, from_department_id, quantity)
+
+
+def _release_transfer(posting: StockPosting, transfer: Transfer) -> None:
+    """Зняти резерв чернетки переміщення."""
+    needed = aggregate_items(transfer.items)
+    posting.load({(product_id, transfer.from_department_id) for product_id in needed})
+    for product_id, quantity in needed.items():
+        posting.release(product_id, transfer.from_department_id, quantity)
+
+
+@router.get("/", response_model=List[Union[TransferSummary, TransferResponse]])
 def list_transfers(
     skip: int = 0,
     limit: int = 100,
@@ -45,11 +153,32 @@ def list_transfers(
     to_department_id: Optional[int] = None,
     date_from: Optional[date_type] = None,
     date_to: Optional[date_type] = None,
+    view: str = Query("summary", regex=DOCUMENT_VIEWS, description="summary — шапки з підсумками позицій, full — з позиціями"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_warehouse_or_above)
+    current_user: User = Depends(get_current_warehouse_or_above),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
     """Список переміщень з фільтрами"""
-    query = db.query(Transfer)
+    if view == "full":
+        query = db.query(Transfer).options(
+            selectinload(Transfer.items).selectinload(TransferItem.product),
+            selectinload(Transfer.from_department),
+            selectinload(Transfer.to_department),
+        )
+    else:
+        from_dept, to_dept = aliased(Department), aliased(Department)
+        query = (
+            db.query(Transfer)
+            .outerjoin(from_dept, Transfer.from_department)
+            .outerjoin(to_dept, Transfer.to_department)
+            .options(
+                contains_eager(Transfer.from_department.of_type(from_dept)),
+                contains_eager(Transfer.to_department.of_type(to_dept)),
+            )
+        )
+        query = with_item_totals(query, TransferItem, TransferItem.transfer_id, Transfer.id)
+
+    query = query.filter(*sites.document_scope(Transfer, site_id))
 
     if status:
         query = query.filter(Transfer.status == status)
@@ -66,11 +195,13 @@ def list_transfers(
     if date_to:
         query = query.filter(Transfer.date <= date_to)
 
-    transfers = query.order_by(Transfer.date.desc()).offset(skip).limit(limit).all()
-    return transfers
+    query = query.order_by(Transfer.date.desc()).offset(skip).limit(limit)
+    if view == "full":
+        return [TransferResponse.model_validate(t) for t in query.all()]
+    return summary_rows(query, TransferSummary)
 
 
-@router.get("/{transfer_id}", response_model=TransferResponse)
+@router.get("/{transfer_id}", response_model=TransferResponse, dependencies=in_site)
 def get_transfer(
     transfer_id: int,
     db: Session = Depends(get_db),
@@ -90,9 +221,11 @@ def get_transfer(
 def create_transfer(
     transfer: TransferCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_warehouse_or_above)
+    current_user: User = Depends(get_current_warehouse_or_above),
+    idem: Idempotency = Depends(get_idempotency),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
-    """Створити нове переміщення (draft)"""
+    """Створити нове переміщення (draft); отримувач може бути на іншому майданчику"""
     # Validate departments exist
     from_dept = db.query(Department).filter(Department.id == transfer.from_department_id).first()
     if not from_dept:
@@ -114,6 +247,8 @@ def create_transfer(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot transfer to the same department"
         )
+    # Відправляти можна лише зі свого майданчика
+    sites.require_departments(db, site_id, transfer.from_department_id)
 
     # Validate products exist and calculate total (will calculate cost on confirm)
     for item in transfer.items:
@@ -124,207 +259,197 @@ def create_transfer(
                 detail=f"Product with ID {item.product_id} not found"
             )
 
-    # Generate transfer number
-    transfer_number = generate_transfer_number(db)
-
-    # Create transfer
-    db_transfer = Transfer(
-        number=transfer_number,
-        date=transfer.date,
-        from_department_id=transfer.from_department_id,
-        to_department_id=transfer.to_department_id,
-        total_cost=Decimal(0),  # Will be calculated on confirm
-        status="draft",
-        created_by=current_user.id,
-        notes=transfer.notes
-    )
-    db.add(db_transfer)
-    db.flush()  # Get transfer ID
-
-    # Create transfer items
-    for item in transfer.items:
-        db_item = TransferItem(
-            transfer_id=db_transfer.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            unit_cost=None,  # Will be set on confirm
-            total_cost=None,  # Will be set on confirm
-            notes=item.notes
+    def _create():
+        # Резерв залишків джерела: нестача видна одразу, а не при підтвердженні
+        posting = StockPosting(db, current_user.id)
+        _reserve_transfer(posting, transfer.from_department_id, transfer.items, from_dept.name)
+
+        # Generate transfer number
+        transfer_number = generate_transfer_number(db)
+
+        # Create transfer
+        db_transfer = Transfer(
+            number=transfer_number,
+            date=transfer.date,
+            from_department_id=transfer.from_department_id,
+            to_department_id=transfer.to_department_id,
+            total_cost=Decimal(0),  # Will be calculated on confirm
+            status="draft",
+            created_by=current_user.id,
+            notes=transfer.notes
         )
-        db.add(db_item)
+        db.add(db_transfer)
+        db.flush()  # Get transfer ID
+
+        # Create transfer items
+        for item in transfer.items:
+            db_item = TransferItem(
+                transfer_id=db_transfer.id,
+                product_id=item.product_id,
+                quantity=item.quantity,
+                unit_cost=None,  # Will be set on confirm
+                total_cost=None,  # Will be set on confirm
+                notes=item.notes
+            )
+            db.add(db_item)
+
+        posting.flush()
+        idem.save(db, db_transfer, status.HTTP_201_CREATED, schema=TransferResponse)
+        db.commit()
+        return db_transfer
 
-    db.commit()
+    db_transfer = run_with_retry(db, _create)
     db.refresh(db_transfer)
     return db_transfer
 
 
-@router.post("/{transfer_id}/confirm", response_model=TransferResponse)
-def confirm_transfer(
-    transfer_id: int,
+@router.post("/confirm-batch", response_model=BatchConfirmResponse)
+def confirm_transfers_batch(
+    data: BatchConfirmRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: User = Depends(get_current_admin_user),
+    idem: Idempotency = Depends(get_idempotency),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
-    """Підтвердити переміщення та оновити залишки (КРИТИЧНО: з вартістю) - тільки адмін"""
-    transfer = db.query(Transfer).filter(Transfer.id == transfer_id).first()
-    if not transfer:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Transfer not found"
-        )
-
-    if transfer.status != "draft":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Transfer is already {transfer.status}"
-        )
-
-    total_cost = Decimal(0)
+    """Підтвердити кілька переміщень однією транзакцією - тільки адмін"""
+    def _confirm():
+        transfers = load_documents(db, Transfer, data.ids, *sites.document_scope(Transfer, site_id))
 
-    # Process each item
-    for item in transfer.items:
-        # Check if source department has enough stock
-        inventory = db.query(Inventory).filter(
-            Inventory.product_id == item.product_id,
-            Inventory.department_id == transfer.from_department_id
-        ).first()
+        # Залишки і собівартість по обох підрозділах усіх документів — одним запитом кожне
+        keys = set()
+        for t in transfers.values():
+            for item in t.items:
+                keys.add((item.product_id, t.from_department_id))
+                keys.add((item.product_id, t.to_department_id))
+        posting = StockPosting(db, current_user.id)
+        posting.load(keys, costs=True)
 
-        if not inventory or inventory.quantity < item.quantity:
-            product = db.query(Product).filter(Product.id == item.product_id).first()
-            available = float(inventory.quantity) if inventory else 0
-            from_dept = db.query(Department).filter(Department.id == transfer.from_department_id).first()
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Недостатньо запасів: '{product.name}' — потрібно {float(item.quantity)}, є {available} в '{from_dept.name if from_dept else 'підрозділі'}'"
-            )
+        return run_batch(db, transfers, data.ids, data.mode,
+                         lambda t: _post_transfer(posting, t), posting, idem)
 
-        # Calculate average cost from source department (КРИТИЧНО для аналітики)
-        avg_cost = db.query(func.avg(InventoryTransaction.unit_cost)).filter(
-            InventoryTransaction.product_id == item.product_id,
-            InventoryTransaction.to_department_id == transfer.from_department_id,
-            InventoryTransaction.unit_cost.isnot(None)
-        ).scalar()
-
-        if not avg_cost:
-            avg_cost = Decimal(0)
-        else:
-            avg_cost = Decimal(str(avg_cost))
-
-        # Calculate item cost
-        item.unit_cost = avg_cost
-        item.total_cost = item.quantity * avg_cost
-        total_cost += item.total_cost
+    return run_with_retry(db, _confirm)
 
-        # Decrease source inventory
-        inventory.quantity -= item.quantity
 
-        # Increase destination inventory (or create if doesn't exist)
-        dest_inventory = db.query(Inventory).filter(
-            Inventory.product_id == item.product_id,
-            Inventory.department_id == transfer.to_department_id
+@router.post("/{transfer_id}/confirm", response_model=TransferResponse, dependencies=in_site)
+def confirm_transfer(
+    transfer_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+    idem: Idempotency = Depends(get_idempotency)
+):
+    """Підтвердити переміщення та оновити залишки (КРИТИЧНО: з вартістю) - тільки адмін"""
+    def _confirm():
+        transfer = db.query(Transfer).options(selectinload(Transfer.items)).filter(
+            Transfer.id == transfer_id
         ).first()
-
-        if not dest_inventory:
-            dest_inventory = Inventory(
-                product_id=item.product_id,
-                department_id=transfer.to_department_id,
-                quantity=Decimal(0),
-                reserved_quantity=Decimal(0)
+        if not transfer:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Transfer not found"
             )
-            db.add(dest_inventory)
-            db.flush()
-
-        dest_inventory.quantity += item.quantity
-
-        # Create transaction for issue from source (КРИТИЧНО: з вартістю)
-        issue_transaction = InventoryTransaction(
-            transaction_type="issue",  # Видача (списання)
-            product_id=item.product_id,
-            from_department_id=transfer.from_department_id,
-            quantity=item.quantity,
-            unit_cost=avg_cost,  # КРИТИЧНО: Собівартість
-            reference_id=transfer.id,
-            reference_type="transfer",
-            performed_by=current_user.id,
-            notes=f"Transfer to {transfer.to_department.name}"
-        )
-        db.add(issue_transaction)
-
-        # Create transaction for receipt to destination (КРИТИЧНО: з вартістю)
-        receipt_transaction = InventoryTransaction(
-            transaction_type="transfer",  # Переміщення (прихід)
-            product_id=item.product_id,
-            to_department_id=transfer.to_department_id,
-            from_department_id=transfer.from_department_id,
-            quantity=item.quantity,
-            unit_cost=avg_cost,  # КРИТИЧНО: Собівартість зберігається
-            reference_id=transfer.id,
-            reference_type="transfer",
-            performed_by=current_user.id,
-            notes=f"Transfer from {transfer.from_department.name}"
-        )
-        db.add(receipt_transaction)
-
-    # Update transfer status and total cost
-    transfer.status = "confirmed"
-    transfer.total_cost = total_cost
 
-    write_audit(db, current_user.id, "transfer_confirm", "transfer", entity_id=transfer.id,
-                changes={"status": {"old": "draft", "new": "confirmed"}})
-    db.commit()
+        # Залишки обох підрозділів і собівартість — по одному запиту на весь документ
+        keys = set()
+        for item in transfer.items:
+            keys.add((item.product_id, transfer.from_department_id))
+            keys.add((item.product_id, transfer.to_department_id))
+        posting = StockPosting(db, current_user.id)
+        posting.load(keys, costs=True)
+        _post_transfer(posting, transfer)
+        posting.flush()
+        idem.save(db, transfer, schema=TransferResponse)
+        db.commit()
+        return transfer
+
+    transfer = run_with_retry(db, _confirm)
     db.refresh(transfer)
     return transfer
 
 
-@router.put("/{transfer_id}", response_model=TransferResponse)
+@router.put("/{transfer_id}", response_model=TransferResponse, dependencies=in_site)
 def update_transfer(
     transfer_id: int,
     transfer: TransferUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_warehouse_or_above)
+    current_user: User = Depends(get_current_warehouse_or_above),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
     """Оновити переміщення (тільки draft)"""
-    db_transfer = db.query(Transfer).filter(Transfer.id == transfer_id).first()
-    if not db_transfer:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Transfer not found"
-        )
-
-    if db_transfer.status != "draft":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Can only update draft transfers"
-        )
+    def _update():
+        db_transfer = db.query(Transfer).filter(Transfer.id == transfer_id).first()
+        if not db_transfer:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Transfer not found"
+            )
 
-    # Update fields
-    for field, value in transfer.model_dump(exclude_unset=True).items():
-        setattr(db_transfer, field, value)
+        if db_transfer.status != "draft":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Can only update draft transfers"
+            )
 
-    db.commit()
+        data = transfer.model_dump(exclude_unset=True)
+        # Отримувач бачить вхідне переміщення, але змінює чернетку лише майданчик-відправник
+        sites.require_departments(db, site_id, db_transfer.from_department_id, data.get("from_department_id"))
+        posting = StockPosting(db, current_user.id)
+        new_from_id = data.get("from_department_id")
+        if new_from_id is not None and new_from_id != db_transfer.from_department_id:
+            # Резерв переїжджає на новий підрозділ-джерело
+            new_from = db.query(Department).filter(Department.id == new_from_id).first()
+            if not new_from:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Source department not found"
+                )
+            _release_transfer(posting, db_transfer)
+            _reserve_transfer(posting, new_from_id, db_transfer.items, new_from.name)
+
+        # Update fields
+        for field, value in data.items():
+            setattr(db_transfer, field, value)
+
+        posting.flush()
+        db.commit()
+        return db_transfer
+
+    db_transfer = run_with_retry(db, _update)
     db.refresh(db_transfer)
     return db_transfer
 
 
-@router.delete("/{transfer_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{transfer_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=in_site)
 def cancel_transfer(
     transfer_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_warehouse_or_above)
+    current_user: User = Depends(get_current_warehouse_or_above),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
     """Скасувати переміщення (тільки draft)"""
-    db_transfer = db.query(Transfer).filter(Transfer.id == transfer_id).first()
-    if not db_transfer:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Transfer not found"
-        )
-
-    if db_transfer.status != "draft":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Can only cancel draft transfers"
-        )
+    def _cancel():
+        db_transfer = db.query(Transfer).filter(Transfer.id == transfer_id).first()
+        if not db_transfer:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Transfer not found"
+            )
 
-    db_transfer.status = "cancelled"
-    db.commit()
+        if db_transfer.status != "draft":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Can only cancel draft transfers"
+            )
+        sites.require_departments(db, site_id, db_transfer.from_department_id)
+        claim_status(db, db_transfer, "draft", "cancelled")
+
+        posting = StockPosting(db, current_user.id)
+        _release_transfer(posting, db_transfer)
+        emit(db, "transfer.cancelled", "transfer", db_transfer.id, {
+            "number": db_transfer.number,
+            "performed_by": current_user.id,
+        })
+        posting.flush()
+        db.commit()
+
+    run_with_retry(db, _cancel)
     return None
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from decimal import Decimal
 from pydantic import BaseModel, ConfigDict
-from app.api.deps import get_db, get_current_user
+from app.api.deps import get_db, get_current_user, get_current_admin_user, get_current_report_reader
 from app.models.transport import TransportUnit
 from app.models.department import Department
 from app.models.user import User
+from app.services import transport_costs
 
 router = APIRouter()
 
@@ -38,6 +40,41 @@ class TransportUnitResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class TransportCostRankingRow(BaseModel):
+    rank: int
+    department_id: int
+    department_name: str
+    transport_unit_id: Optional[int] = None     # None — ТЗ видалено, підрозділ лишився
+    name: str
+    unit_type: Optional[str] = None
+    plate_number: Optional[str] = None
+    received_cost: Decimal                      # переміщено в ТЗ
+    writeoff_cost: Decimal                      # списано з ТЗ
+    total_cost: Decimal
+    top_category_id: Optional[int] = None
+    top_category_name: Optional[str] = None
+
+
+class TransportCostCategory(BaseModel):
+    category_id: Optional[int] = None
+    category_name: Optional[str] = None
+    received_cost: Decimal
+    received_documents: int
+    writeoff_cost: Decimal
+    writeoff_documents: int
+
+
+class TransportCostMonth(BaseModel):
+    month: str
+    received_cost: Decimal
+    writeoff_cost: Decimal
+    total_cost: Decimal
+    categories: List[TransportCostCategory]
+
+
+_MONTH_REGEX = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+
 def _dept_name(name: str, plate_number: Optional[str]) -> str:
     """Генерує назву підрозділу для транспортного засобу."""
     if plate_number:
@@ -64,6 +101,47 @@ def get_transport_types():
     return TRANSPORT_TYPES
 
 
+@router.get("/costs", response_model=List[TransportCostRankingRow])
+def get_fleet_costs(
+    month_from: Optional[str] = Query(None, regex=_MONTH_REGEX),
+    month_to: Optional[str] = Query(None, regex=_MONTH_REGEX),
+    category_id: Optional[int] = None,
+    order_by: str = Query("total", regex=f"^({'|'.join(transport_costs.RANKING_ORDER)})$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_report_reader)
+):
+    """Рейтинг ТЗ за витратами (переміщено в ТЗ + списано з нього) — зі зведення transport_costs."""
+    return transport_costs.ranking(db, month_from, month_to, category_id, order_by)
+
+
+@router.post("/costs/rebuild")
+def rebuild_fleet_costs(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Перерахувати зведення витрат ТЗ з усіх проведених документів."""
+    rows = transport_costs.rebuild(db)
+    db.commit()
+    return {"rows": rows}
+
+
+@router.get("/{unit_id}/costs", response_model=List[TransportCostMonth])
+def get_unit_costs(
+    unit_id: int,
+    month_from: Optional[str] = Query(None, regex=_MONTH_REGEX),
+    month_to: Optional[str] = Query(None, regex=_MONTH_REGEX),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_report_reader)
+):
+    """Витрати ТЗ по місяцях і категоріях."""
+    unit = db.query(TransportUnit).filter(TransportUnit.id == unit_id).first()
+    if not unit:
+        raise HTTPException(status_code=404, detail="Одиницю транспорту не знайдено")
+    if not unit.department_id:
+        return []
+    return transport_costs.vehicle_costs(db, unit.department_id, month_from, month_to)
+
+
 @router.get("/", response_model=List[TransportUnitResponse])
 def list_transport_units(
     db: Session = Depends(get_db),
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.api.deps import get_db, get_current_admin_user
 from app.models.user import User, Role
 from app.models.department import Department
 from app.core.security import get_password_hash
+from app.services import refcache
 from pydantic import BaseModel, ConfigDict
 
 router = APIRouter()
@@ -32,6 +33,7 @@ class UserCreate(BaseModel):
     password: str
     role_id: int
     department_id: Optional[int] = None
+    site_id: Optional[int] = None       # None — усі майданчики
     is_active: bool = True
 
 
@@ -40,6 +42,7 @@ class UserUpdate(BaseModel):
     password: Optional[str] = None
     role_id: Optional[int] = None
     department_id: Optional[int] = None
+    site_id: Optional[int] = None
     is_active: Optional[bool] = None
 
 
@@ -48,6 +51,7 @@ class UserResponse(BaseModel):
     username: str
     role_id: int
     department_id: Optional[int] = None
+    site_id: Optional[int] = None
     is_active: bool
     role: Optional[RoleInfo] = None
     department: Optional[DepartmentInfo] = None
@@ -115,12 +119,20 @@ def create_user(
                 detail="Department not found"
             )
 
+    # Validate site if provided
+    if user.site_id is not None and refcache.lookup(db, "sites", user.site_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Site not found"
+        )
+
     # Create user
     db_user = User(
         username=user.username,
         password_hash=get_password_hash(user.password),
         role_id=user.role_id,
         department_id=user.department_id,
+        site_id=user.site_id,
         is_active=user.is_active
     )
     db.add(db_user)
@@ -196,9 +208,14 @@ def delete_user(
 
 @router.get("/roles/list", response_model=List[dict])
 def list_roles(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin_user)
 ):
-    """Список ролей - тільки адмін"""
-    roles = db.query(Role).all()
+    """Список ролей - тільки адмін (з кешу довідників, ETag)"""
+    cached = refcache.not_modified(request, response, db, "roles")
+    if cached:
+        return cached
+    roles = refcache.get_all(db, "roles").values()
     return [{"id": role.id, "name": role.name, "description": role.description} for role in roles]
@@ -1,20 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
+from sqlalchemy.orm import Session, contains_eager, selectinload
+from typing import List, Optional, Union
 from datetime import date as date_type, datetime
 from decimal import Decimal
-from app.api.deps import get_db, get_current_user, get_current_admin_user
-from app.schemas.writeoff import WriteOffCreate, WriteOffUpdate, WriteOffResponse
+from app.api.deps import get_db, get_current_user, get_current_admin_user, get_idempotency, get_site_scope, site_document
+from app.schemas.writeoff import WriteOffCreate, WriteOffUpdate, WriteOffResponse, WriteOffSummary
+from app.schemas.batch import BatchConfirmRequest, BatchConfirmResponse
 from app.models.writeoff import WriteOff, WriteOffItem
-from app.models.inventory import Inventory, InventoryTransaction
-from app.models.user import User, Role
+from app.models.user import User
 from app.models.department import Department
 from app.models.product import Product
+from app.services import refcache, sites
 from app.services.audit import write_audit
+from app.services.documents import DOCUMENT_VIEWS, summary_rows, with_item_totals
+from app.services.idempotency import Idempotency
+from app.services.outbox import emit
+from app.services.posting import (
+    StockPosting, aggregate_items, claim_status, load_documents, run_batch, run_with_retry,
+)
 
 router = APIRouter()
 
+# Маршрути /{writeoff_id}: списання іншого майданчика — як неіснуюче
+in_site = [Depends(site_document(WriteOff, "writeoff_id", "Write-off not found"))]
+
 
 def generate_writeoff_number(db: Session) -> str:
     """Генерувати номер списання"""
@@ -36,7 +45,92 @@ def generate_writeoff_number(db: Session) -> str:
     return f"{prefix}-{new_num:03d}"
 
 
-@router.get("/", response_model=List[WriteOffResponse])
+def _post_writeoff(posting: StockPosting, writeoff: WriteOff) -> None:
+    """Провести списання через StockPosting (без commit).
+
+    Спочатку перевіряє залишки по всіх позиціях, тому при помилці
+    нічого не змінюється.
+    """
+    if writeoff.status != "draft":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Write-off is already {writeoff.status}"
+        )
+
+    # Check if department has enough stock (резерв цієї чернетки входить у quantity)
+    needed = aggregate_items(writeoff.items)
+    for product_id, quantity in needed.items():
+        if posting.quantity(product_id, writeoff.department_id) < quantity:
+            product = posting.db.query(Product).filter(Product.id == product_id).first()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Insufficient stock for product '{product.name}' in department"
+            )
+    claim_status(posting.db, writeoff, "draft", "confirmed")
+
+    total_cost = Decimal(0)
+    for item in writeoff.items:
+        # Calculate average cost from department (КРИТИЧНО для аналітики)
+        avg_cost = posting.avg_cost(item.product_id, writeoff.department_id)
+
+        item.unit_cost = avg_cost
+        item.total_cost = item.quantity * avg_cost
+        total_cost += item.total_cost
+
+        posting.consume(item.product_id, writeoff.department_id, item.quantity)
+        posting.add_transaction(
+            transaction_type="writeoff",  # Списання
+            product_id=item.product_id,
+            from_department_id=writeoff.department_id,
+            quantity=item.quantity,
+            unit_cost=avg_cost,  # КРИТИЧНО: Собівартість
+            reference_id=writeoff.id,
+            reference_type="writeoff",
+            notes=f"Write-off: {writeoff.reason}"
+        )
+
+    writeoff.total_cost = total_cost
+    write_audit(posting.db, posting.performed_by, "writeoff_confirm", "writeoff", entity_id=writeoff.id,
+                changes={"status": {"old": "draft", "new": "confirmed"}})
+    emit(posting.db, "writeoff.confirmed", "writeoff", writeoff.id, {
+        "number": writeoff.number,
+        "department_id": writeoff.department_id,
+        "total_cost": str(total_cost),
+        "performed_by": posting.performed_by,
+    })
+
+
+def _reserve_writeoff(posting: StockPosting, department: Department, items) -> None:
+    """Зарезервувати залишки під чернетку списання (400 без змін, якщо не вистачає)."""
+    needed = aggregate_items(items)
+    posting.load({(product_id, department.id) for product_id in needed})
+    for product_id, quantity in needed.items():
+        if not posting.exists(product_id, department.id):
+            product = posting.db.query(Product).filter(Product.id == product_id).first()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Товар '{product.name}' відсутній на складі '{department.name}'"
+            )
+        available = posting.available(product_id, department.id)
+        if available < quantity:
+            product = posting.db.query(Product).filter(Product.id == product_id).first()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Недостатньо товару '{product.name}' на складі '{department.name}'. Доступно: {available}, запитано: {quantity}"
+            )
+    for product_id, quantity in needed.items():
+        posting.reserve(product_id, department.id, quantity)
+
+
+def _release_writeoff(posting: StockPosting, writeoff: WriteOff) -> None:
+    """Зняти резерв чернетки списання."""
+    needed = aggregate_items(writeoff.items)
+    posting.load({(product_id, writeoff.department_id) for product_id in needed})
+    for product_id, quantity in needed.items():
+        posting.release(product_id, writeoff.department_id, quantity)
+
+
+@router.get("/", response_model=List[Union[WriteOffSummary, WriteOffResponse]])
 def list_writeoffs(
     skip: int = 0,
     limit: int = 100,
@@ -44,14 +138,31 @@ def list_writeoffs(
     department_id: Optional[int] = None,
     date_from: Optional[date_type] = None,
     date_to: Optional[date_type] = None,
+    view: str = Query("summary", regex=DOCUMENT_VIEWS, description="summary — шапки з підсумками позицій, full — з позиціями"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
     """Список списань з фільтрами"""
-    query = db.query(WriteOff)
+    if view == "full":
+        query = db.query(WriteOff).options(
+            selectinload(WriteOff.items).selectinload(WriteOffItem.product),
+            selectinload(WriteOff.department),
+            selectinload(WriteOff.creator),
+        )
+    else:
+        query = (
+            db.query(WriteOff)
+            .outerjoin(WriteOff.department)
+            .outerjoin(WriteOff.creator)
+            .options(contains_eager(WriteOff.department), contains_eager(WriteOff.creator))
+        )
+        query = with_item_totals(query, WriteOffItem, WriteOffItem.writeoff_id, WriteOff.id)
+
+    query = query.filter(*sites.document_scope(WriteOff, site_id))
 
     # department_head бачить тільки списання свого підрозділу
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
+    role = refcache.lookup(db, "roles", current_user.role_id)
     if role and role.name == "department_head":
         department_id = current_user.department_id
 
@@ -67,11 +178,13 @@ def list_writeoffs(
     if date_to:
         query = query.filter(WriteOff.date <= date_to)
 
-    writeoffs = query.order_by(WriteOff.date.desc()).offset(skip).limit(limit).all()
-    return writeoffs
+    query = query.order_by(WriteOff.date.desc()).offset(skip).limit(limit)
+    if view == "full":
+        return [WriteOffResponse.model_validate(w) for w in query.all()]
+    return summary_rows(query, WriteOffSummary)
 
 
-@router.get("/{writeoff_id}", response_model=WriteOffResponse)
+@router.get("/{writeoff_id}", response_model=WriteOffResponse, dependencies=in_site)
 def get_writeoff(
     writeoff_id: int,
     db: Session = Depends(get_db),
@@ -91,11 +204,13 @@ def get_writeoff(
 def create_writeoff(
     writeoff: WriteOffCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    idem: Idempotency = Depends(get_idempotency),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
     """Створити нове списання (draft) - будь-який користувач"""
     # department_head може подавати тільки для свого підрозділу
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
+    role = refcache.lookup(db, "roles", current_user.role_id)
     if role and role.name == "department_head":
         if writeoff.department_id != current_user.department_id:
             raise HTTPException(
@@ -110,8 +225,9 @@ def create_writeoff(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Department not found"
         )
+    sites.require_departments(db, site_id, writeoff.department_id)
 
-    # Validate products exist and check inventory
+    # Validate products exist
     for item in writeoff.items:
         product = db.query(Product).filter(Product.id == item.product_id).first()
         if not product:
@@ -120,175 +236,104 @@ def create_writeoff(
                 detail=f"Товар з ID {item.product_id} не знайдено"
             )
 
-        # Check if department has enough stock
-        inventory = db.query(Inventory).filter(
-            Inventory.product_id == item.product_id,
-            Inventory.department_id == writeoff.department_id
-        ).first()
-
-        if not inventory:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Товар '{product.name}' відсутній на складі '{department.name}'"
-            )
+    def _create():
+        # Check inventory and reserve it (вільний залишок = quantity - reserved)
+        posting = StockPosting(db, current_user.id)
+        _reserve_writeoff(posting, department, writeoff.items)
+
+        # Generate writeoff number
+        writeoff_number = generate_writeoff_number(db)
+
+        # Create writeoff
+        db_writeoff = WriteOff(
+            number=writeoff_number,
+            date=writeoff.date,
+            department_id=writeoff.department_id,
+            reason=writeoff.reason,
+            total_cost=Decimal(0),  # Will be calculated on confirm
+            status="draft",
+            created_by=current_user.id,
+            notes=writeoff.notes
+        )
+        db.add(db_writeoff)
+        db.flush()  # Get writeoff ID
 
-        if inventory.quantity < item.quantity:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Недостатньо товару '{product.name}' на складі '{department.name}'. Доступно: {inventory.quantity}, запитано: {item.quantity}"
+        # Create writeoff items
+        for item in writeoff.items:
+            db_item = WriteOffItem(
+                writeoff_id=db_writeoff.id,
+                product_id=item.product_id,
+                quantity=item.quantity,
+                unit_cost=None,  # Will be set on confirm
+                total_cost=None,  # Will be set on confirm
+                notes=item.notes
             )
+            db.add(db_item)
 
-    # Generate writeoff number
-    writeoff_number = generate_writeoff_number(db)
-
-    # Create writeoff
-    db_writeoff = WriteOff(
-        number=writeoff_number,
-        date=writeoff.date,
-        department_id=writeoff.department_id,
-        reason=writeoff.reason,
-        total_cost=Decimal(0),  # Will be calculated on confirm
-        status="draft",
-        created_by=current_user.id,
-        notes=writeoff.notes
-    )
-    db.add(db_writeoff)
-    db.flush()  # Get writeoff ID
-
-    # Create writeoff items
-    for item in writeoff.items:
-        db_item = WriteOffItem(
-            writeoff_id=db_writeoff.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            unit_cost=None,  # Will be set on confirm
-            total_cost=None,  # Will be set on confirm
-            notes=item.notes
-        )
-        db.add(db_item)
+        posting.flush()
+        idem.save(db, db_writeoff, status.HTTP_201_CREATED, schema=WriteOffResponse)
+        db.commit()
+        return db_writeoff
 
-    db.commit()
+    db_writeoff = run_with_retry(db, _create)
     db.refresh(db_writeoff)
     return db_writeoff
 
 
-@router.post("/{writeoff_id}/confirm", response_model=WriteOffResponse)
-def confirm_writeoff(
-    writeoff_id: int,
+@router.post("/confirm-batch", response_model=BatchConfirmResponse)
+def confirm_writeoffs_batch(
+    data: BatchConfirmRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user)
+    current_user: User = Depends(get_current_admin_user),
+    idem: Idempotency = Depends(get_idempotency),
+    site_id: Optional[int] = Depends(get_site_scope)
 ):
-    """Підтвердити списання та оновити залишки (КРИТИЧНО: з вартістю) - тільки адмін"""
-    writeoff = db.query(WriteOff).filter(WriteOff.id == writeoff_id).first()
-    if not writeoff:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Write-off not found"
-        )
+    """Підтвердити кілька списань однією транзакцією - тільки адмін"""
+    def _confirm():
+        writeoffs = load_documents(db, WriteOff, data.ids, *sites.document_scope(WriteOff, site_id))
+        posting = StockPosting(db, current_user.id)
+        posting.load({
+            (item.product_id, w.department_id)
+            for w in writeoffs.values() for item in w.items
+        }, costs=True)
+        return run_batch(db, writeoffs, data.ids, data.mode,
+                         lambda w: _post_writeoff(posting, w), posting, idem)
 
-    if writeoff.status != "draft":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Write-off is already {writeoff.status}"
-        )
+    return run_with_retry(db, _confirm)
 
-    total_cost = Decimal(0)
 
-    # Process each item
-    for item in writeoff.items:
-        # Check if department has enough stock
-        inventory = db.query(Inventory).filter(
-            Inventory.product_id == item.product_id,
-            Inventory.department_id == writeoff.department_id
+@router.post("/{writeoff_id}/confirm", response_model=WriteOffResponse, dependencies=in_site)
+def confirm_writeoff(
+    writeoff_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+    idem: Idempotency = Depends(get_idempotency)
+):
+    """Підтвердити списання та оновити залишки (КРИТИЧНО: з вартістю) - тільки адмін"""
+    def _confirm():
+        writeoff = db.query(WriteOff).options(selectinload(WriteOff.items)).filter(
+            WriteOff.id == writeoff_id
         ).first()
-
-        if not inventory or inventory.quantity < item.quantity:
-            product = db.query(Product).filter(Product.id == item.product_id).first()
+        if not writeoff:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Insufficient stock for product '{product.name}' in department"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Write-off not found"
             )
 
-        # Calculate average cost from department (КРИТИЧНО для аналітики)
-        avg_cost = db.query(func.avg(InventoryTransaction.unit_cost)).filter(
-            InventoryTransaction.product_id == item.product_id,
-            InventoryTransaction.to_department_id == writeoff.department_id,
-            InventoryTransaction.unit_cost.isnot(None)
-        ).scalar()
-
-        if not avg_cost:
-            avg_cost = Decimal(0)
-        else:
-            avg_cost = Decimal(str(avg_cost))
-
-        # Calculate item cost
-        item.unit_cost = avg_cost
-        item.total_cost = item.quantity * avg_cost
-        total_cost += item.total_cost
-
-        # Decrease inventory
-        inventory.quantity -= item.quantity
+        posting = StockPosting(db, current_user.id)
+        posting.load({(item.product_id, writeoff.department_id) for item in writeoff.items}, costs=True)
+        _post_writeoff(posting, writeoff)
+        posting.flush()
+        idem.save(db, writeoff, schema=WriteOffResponse)
+        db.commit()
+        return writeoff
 
-        # Create transaction for write-off (КРИТИЧНО: з вартістю)
-        transaction = InventoryTransaction(
-            transaction_type="writeoff",  # Списання
-            product_id=item.product_id,
-            from_department_id=writeoff.department_id,
-            quantity=item.quantity,
-            unit_cost=avg_cost,  # КРИТИЧНО: Собівартість
-            reference_id=writeoff.id,
-            reference_type="writeoff",
-            performed_by=current_user.id,
-            notes=f"Write-off: {writeoff.reason}"
-        )
-        db.add(transaction)
-
-    # Update writeoff status and total cost
-    writeoff.status = "confirmed"
-    writeoff.total_cost = total_cost
-
-    write_audit(db, current_user.id, "writeoff_confirm", "writeoff", entity_id=writeoff.id,
-                changes={"status": {"old": "draft", "new": "confirmed"}})
-    db.commit()
+    writeoff = run_with_retry(db, _confirm)
     db.refresh(writeoff)
-
-    # Telegram сповіщення (не зупиняємо процес якщо Telegram недоступний)
-    try:
-        from app.services.notifications import notify_writeoff_confirmed, notify_low_stock
-        dept = db.query(Department).filter(Department.id == writeoff.department_id).first()
-        notify_writeoff_confirmed(
-            number=writeoff.number,
-            department=dept.name if dept else "—",
-            items_count=len(writeoff.items),
-            total=float(writeoff.total_cost),
-            date=str(writeoff.date),
-            confirmed_by=current_user.username,
-        )
-        # Перевіряємо чи якийсь товар тепер нижче мінімуму
-        low_items = []
-        for item in writeoff.items:
-            inv = db.query(Inventory).filter(
-                Inventory.product_id == item.product_id,
-                Inventory.department_id == writeoff.department_id,
-            ).first()
-            prod = db.query(Product).filter(Product.id == item.product_id).first()
-            if inv and prod and prod.min_stock_level > 0 and inv.quantity < prod.min_stock_level:
-                low_items.append({
-                    "product_name": prod.name,
-                    "department_name": dept.name if dept else "—",
-                    "quantity": float(inv.quantity),
-                    "min_stock_level": float(prod.min_stock_level),
-                })
-        if low_items:
-            notify_low_stock(low_items)
-    except Exception as e:
-        import logging
-        logging.getLogger(__name__).warning(f"Telegram notification error: {e}")
-
     return writeoff
 
 
-@router.put("/{writeoff_id}", response_model=WriteOffResponse)
+@router.put("/{writeoff_id}", response_model=WriteOffResponse, dependencies=in_site)
 def update_writeoff(
     writeoff_id: int,
     writeoff: WriteOffUpdate,
@@ -318,26 +363,36 @@ def update_writeoff(
     return db_writeoff
 
 
-@router.delete("/{writeoff_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{writeoff_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=in_site)
 def cancel_writeoff(
     writeoff_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Скасувати списання (тільки draft)"""
-    db_writeoff = db.query(WriteOff).filter(WriteOff.id == writeoff_id).first()
-    if not db_writeoff:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Write-off not found"
-        )
-
-    if db_writeoff.status != "draft":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Can only cancel draft write-offs"
-        )
+    def _cancel():
+        db_writeoff = db.query(WriteOff).filter(WriteOff.id == writeoff_id).first()
+        if not db_writeoff:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Write-off not found"
+            )
 
-    db_writeoff.status = "cancelled"
-    db.commit()
+        if db_writeoff.status != "draft":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Can only cancel draft write-offs"
+            )
+        claim_status(db, db_writeoff, "draft", "cancelled")
+
+        posting = StockPosting(db, current_user.id)
+        _release_writeoff(posting, db_writeoff)
+        emit(db, "writeoff.cancelled", "writeoff", db_writeoff.id, {
+            "number": db_writeoff.number,
+            "performed_by": current_user.id,
+        })
+        posting.flush()
+        db.commit()
+
+    run_with_retry(db, _cancel)
     return None
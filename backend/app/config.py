@@ -20,9 +20,49 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "Agro ERP System"
     VERSION: str = "1.0.0"
 
+    # Перевірка N+1: lazy-завантаження зв'язків, позначених RELATIONSHIP_LAZY, кидає помилку
+    # замість SQL-запиту (вмикати в тестах/CI; endpoints мають завантажувати зв'язки явно)
+    ORM_STRICT_LOADING: bool = False
+
+    # Idempotency-Key: скільки годин зберігати відповіді для повторів
+    IDEMPOTENCY_TTL_HOURS: int = 24
+
+    # Outbox: інтервал фонової доставки подій (секунди); після commit з подіями — одразу
+    OUTBOX_POLL_SECONDS: int = 60
+    # Як часто лідер перевіряє нові події, закомічені іншими процесами (їхній commit
+    # будить лише власний диспетчер, а доставку виконує лідер) — затримка не більша за це
+    OUTBOX_WAKE_POLL_SECONDS: int = 2
+
+    # Планувальник: лідер серед процесів (auto = advisory lock на PostgreSQL, lease-рядок на SQLite;
+    # "lease" — для PostgreSQL через pgbouncer), термін lease, скільки днів зберігати історію запусків
+    SCHEDULER_LEADER_LOCK: str = "auto"
+    SCHEDULER_LEASE_SECONDS: int = 30
+    SCHEDULER_HISTORY_DAYS: int = 14
+
+    # Кеш довідників (підрозділи, одиниці, категорії, ролі): межа застарілості
+    # для змін з інших процесів — свої зміни скидають кеш одразу після commit
+    REFCACHE_TTL_SECONDS: int = 300
+
+    # Глобальний пошук: бюджет часу на запит і скільки груп опитувати одночасно
+    # (кожна група — окреме з'єднання; пул PostgreSQL — 5)
+    SEARCH_BUDGET_MS: int = 300
+    SEARCH_WORKERS: int = 3
+
+    # Журнал дій: місяці старші за N переносяться в стиснений архів (audit_archives)
+    AUDIT_ARCHIVE_AFTER_MONTHS: int = 12
+
+    # Майданчик цього розгортання, якщо це окрема БД великого майданчика (код з sites);
+    # порожньо — спільна БД усіх майданчиків
+    SITE_CODE: str = ""
+
     # Telegram notifications (опціонально)
     TELEGRAM_BOT_TOKEN: str = ""
     TELEGRAM_CHAT_ID: str = ""
+    TELEGRAM_API_BASE: str = "https://api.telegram.org"
+    # Черга сповіщень: темп (Bot API — ~20 повідомлень/хв у групу), повтори, вікно дайджесту
+    TELEGRAM_RATE_PER_MINUTE: int = 20
+    TELEGRAM_MAX_RETRIES: int = 5
+    TELEGRAM_DIGEST_SECONDS: int = 30
 
     class Config:
         env_file = ".env"
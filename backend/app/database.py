@@ -18,6 +18,10 @@ engine = create_engine(
     echo=settings.DEBUG
 )
 
+# Стратегія lazy для зв'язків, які endpoints завантажують явно (selectinload тощо):
+# у режимі ORM_STRICT_LOADING забуте завантаження — помилка, а не N+1 запитів
+RELATIONSHIP_LAZY = "raise_on_sql" if settings.ORM_STRICT_LOADING else "select"
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
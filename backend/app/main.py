@@ -1,11 +1,14 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.config import settings
 from app.database import engine, Base
+from app.services.idempotency import IdempotentReplay
+from app.services.search import ensure_search_indexes
 
 # Import all models to register them with Base
-from app.models import user, supplier, product, purchase, inventory, transfer, writeoff, department, audit, transport, electricity, gas
+from app.models import site, user, supplier, product, purchase, inventory, transfer, writeoff, department, audit, transport, electricity, gas, meter, idempotency, outbox, scheduler
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -42,16 +45,153 @@ def _run_schema_migrations():
     except Exception:
         pass
 
+    # inventory — версія рядка для optimistic locking
+    try:
+        cols = [c['name'] for c in insp.get_columns('inventory')]
+        if 'version' not in cols:
+            with engine.begin() as conn:
+                conn.execute(text("ALTER TABLE inventory ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+    except Exception:
+        pass
+
+    # audit_log — місяць запису (ключ архівації) + заповнення для старих записів
+    try:
+        cols = [c['name'] for c in insp.get_columns('audit_log')]
+        if 'month' not in cols:
+            month_expr = (
+                "strftime('%Y-%m', created_at)" if engine.dialect.name == "sqlite"
+                else "to_char(created_at AT TIME ZONE 'UTC', 'YYYY-MM')"
+            )
+            with engine.begin() as conn:
+                conn.execute(text("ALTER TABLE audit_log ADD COLUMN month VARCHAR(7)"))
+                conn.execute(text(f"UPDATE audit_log SET month = {month_expr}"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_audit_log_month ON audit_log (month)"))
+    except Exception:
+        pass
+
+    # outbox_events — обробники, що вже виконались (повтор події їх пропускає)
+    try:
+        cols = [c['name'] for c in insp.get_columns('outbox_events')]
+        if 'handled' not in cols:
+            with engine.begin() as conn:
+                conn.execute(text("ALTER TABLE outbox_events ADD COLUMN handled JSON"))
+    except Exception:
+        pass
+
+    # inventory_count_items — індекс (акт, товар) для проведення інвентаризації в SQL
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_inventory_count_items_count_product "
+                "ON inventory_count_items (inventory_count_id, product_id)"
+            ))
+    except Exception:
+        pass
+
+    # inventory_count_items — хто розв'язав конфлікт зон лічильників
+    try:
+        cols = [c['name'] for c in insp.get_columns('inventory_count_items')]
+        if 'resolved_by' not in cols:
+            with engine.begin() as conn:
+                conn.execute(text("ALTER TABLE inventory_count_items ADD COLUMN resolved_by INTEGER REFERENCES users(id)"))
+    except Exception:
+        pass
+
+    # sites — майданчик за замовчуванням; site_id підрозділів, залишків і журналу + індекси майданчика
+    try:
+        with engine.begin() as conn:
+            if conn.execute(text("SELECT 1 FROM sites WHERE id = 1")).first() is None:
+                conn.execute(text(
+                    "INSERT INTO sites (id, code, name, is_active) VALUES (1, 'main', 'Основний', TRUE)"
+                ))
+                if engine.dialect.name == "postgresql":
+                    conn.execute(text("SELECT setval(pg_get_serial_sequence('sites', 'id'), (SELECT MAX(id) FROM sites))"))
+            for table in ("departments", "inventory", "inventory_transactions"):
+                if 'site_id' not in [c['name'] for c in insp.get_columns(table)]:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN site_id INTEGER NOT NULL DEFAULT 1"))
+            if 'site_id' not in [c['name'] for c in insp.get_columns('users')]:
+                conn.execute(text("ALTER TABLE users ADD COLUMN site_id INTEGER"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_departments_site_id ON departments (site_id)"))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_inventory_site_department_product "
+                "ON inventory (site_id, department_id, product_id)"
+            ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_inventory_transactions_site_created "
+                "ON inventory_transactions (site_id, created_at)"
+            ))
+    except Exception:
+        pass
+
+    # Композитні індекси гарячих запитів (звіти, собівартість, позиції документів, журнал).
+    # inventory (товар, підрозділ) — унікальний: спершу дублікати зливаються в рядок з меншим id
+    try:
+        from app.models.audit import AuditLog
+        from app.models.inventory import Inventory, InventoryTransaction
+        from app.models.purchase import Purchase, PurchaseItem
+        from app.models.transfer import Transfer
+        from app.models.writeoff import WriteOff, WriteOffItem
+        with engine.begin() as conn:
+            if 'uq_inventory_product_department' not in [ix['name'] for ix in insp.get_indexes('inventory')]:
+                duplicates = conn.execute(text(
+                    "SELECT product_id, department_id, MIN(id), SUM(quantity), SUM(reserved_quantity) "
+                    "FROM inventory GROUP BY product_id, department_id HAVING COUNT(*) > 1"
+                )).all()
+                for product_id, department_id, keep_id, quantity, reserved in duplicates:
+                    conn.execute(text(
+                        "UPDATE inventory SET quantity = :quantity, reserved_quantity = :reserved, "
+                        "version = version + 1 WHERE id = :id"
+                    ), {"quantity": quantity, "reserved": reserved, "id": keep_id})
+                    conn.execute(text(
+                        "DELETE FROM inventory WHERE product_id = :product_id "
+                        "AND department_id = :department_id AND id <> :id"
+                    ), {"product_id": product_id, "department_id": department_id, "id": keep_id})
+            # Index.create враховує діалект: на PostgreSQL (status, date) — часткові, WHERE status = 'confirmed'
+            for model, name in (
+                (Inventory, "uq_inventory_product_department"),
+                (InventoryTransaction, "ix_inventory_transactions_product_to_cost"),
+                (PurchaseItem, "ix_purchase_items_purchase_product"),
+                (WriteOffItem, "ix_writeoff_items_writeoff_product"),
+                (Purchase, "ix_purchases_status_date"),
+                (Transfer, "ix_transfers_status_date"),
+                (WriteOff, "ix_writeoffs_status_date"),
+                (AuditLog, "ix_audit_log_entity_type_created"),
+            ):
+                index = next(ix for ix in model.__table__.indexes if ix.name == name)
+                index.create(conn, checkfirst=True)
+    except Exception:
+        pass
+
+    # transport_costs — заповнити зведення витрат ТЗ з уже проведених документів
+    try:
+        with engine.connect() as conn:
+            empty = conn.execute(text("SELECT 1 FROM transport_costs LIMIT 1")).first() is None
+        if empty:
+            from app.database import SessionLocal
+            from app.services.transport_costs import rebuild
+            db = SessionLocal()
+            try:
+                rebuild(db)
+                db.commit()
+            finally:
+                db.close()
+    except Exception:
+        pass
+
 
 _run_schema_migrations()
+ensure_search_indexes()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     from app.services.scheduler import start_scheduler, stop_scheduler
+    from app.services.notifications import notifier
+    notifier.start()
     start_scheduler()
     yield
     stop_scheduler()
+    notifier.stop()
 
 
 # Create FastAPI app
@@ -72,6 +212,12 @@ app.add_middleware(
 )
 
 
+@app.exception_handler(IdempotentReplay)
+async def idempotent_replay_handler(request: Request, exc: IdempotentReplay):
+    """Повтор запиту з тим самим Idempotency-Key — збережена відповідь першого виконання"""
+    return JSONResponse(status_code=exc.status_code, content=exc.body, headers={"Idempotent-Replayed": "true"})
+
+
 @app.get("/")
 def root():
     return {
@@ -87,13 +233,14 @@ def health_check():
 
 
 # Include API routers
-from app.api.v1 import auth, suppliers, products, purchases, inventory, transfers, reports, departments, writeoffs, users, notifications, transport, inventory_counts, electricity, audit, gas
+from app.api.v1 import auth, suppliers, products, purchases, inventory, transfers, reports, departments, writeoffs, users, notifications, transport, inventory_counts, electricity, audit, gas, meters, sites, system, search
 
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
 app.include_router(users.router, prefix="/api/v1/users", tags=["Users"])
 app.include_router(suppliers.router, prefix="/api/v1/suppliers", tags=["Suppliers"])
 app.include_router(products.router, prefix="/api/v1/products", tags=["Products"])
 app.include_router(departments.router, prefix="/api/v1/departments", tags=["Departments"])
+app.include_router(sites.router, prefix="/api/v1/sites", tags=["Sites"])
 app.include_router(purchases.router, prefix="/api/v1/purchases", tags=["Purchases"])
 app.include_router(inventory.router, prefix="/api/v1/inventory", tags=["Inventory"])
 app.include_router(transfers.router, prefix="/api/v1/transfers", tags=["Transfers"])
@@ -105,6 +252,9 @@ app.include_router(inventory_counts.router, prefix="/api/v1/inventory-counts", t
 app.include_router(electricity.router, prefix="/api/v1/electricity", tags=["Electricity"])
 app.include_router(audit.router, prefix="/api/v1/audit", tags=["Audit"])
 app.include_router(gas.router,   prefix="/api/v1/gas",   tags=["Gas"])
+app.include_router(meters.router, prefix="/api/v1/meters", tags=["Meters"])
+app.include_router(system.router, prefix="/api/v1/system", tags=["System"])
+app.include_router(search.router, prefix="/api/v1/search", tags=["Search"])
 
 # TODO: Add more routers
 # from app.api.v1 import products, purchases, inventory, transfers, reports
@@ -1,20 +1,25 @@
 from app.database import Base
 from app.models.user import User, Role
+from app.models.site import Site
 from app.models.department import Department
 from app.models.product import Product, ProductCategory, Unit
 from app.models.supplier import Supplier
 from app.models.purchase import Purchase, PurchaseItem
-from app.models.inventory import Inventory, InventoryTransaction
+from app.models.inventory import Inventory, InventoryTransaction, LowStockItem
 from app.models.transfer import Transfer, TransferItem
-from app.models.inventory_count import InventoryCount, InventoryCountItem
+from app.models.inventory_count import InventoryCount, InventoryCountItem, InventoryCountSession, InventoryCountEntry
 from app.models.writeoff import WriteOff, WriteOffItem
-from app.models.audit import AuditLog
-from app.models.transport import TransportUnit
+from app.models.audit import AuditLog, AuditArchive
+from app.models.transport import TransportUnit, TransportCost
+from app.models.idempotency import IdempotencyKey
+from app.models.outbox import OutboxEvent
+from app.models.scheduler import SchedulerLease, SchedulerJobRun
 
 __all__ = [
     "Base",
     "User",
     "Role",
+    "Site",
     "Department",
     "Product",
     "ProductCategory",
@@ -24,12 +29,21 @@ __all__ = [
     "PurchaseItem",
     "Inventory",
     "InventoryTransaction",
+    "LowStockItem",
     "Transfer",
     "TransferItem",
     "InventoryCount",
     "InventoryCountItem",
+    "InventoryCountSession",
+    "InventoryCountEntry",
     "WriteOff",
     "WriteOffItem",
     "AuditLog",
+    "AuditArchive",
     "TransportUnit",
+    "TransportCost",
+    "IdempotencyKey",
+    "OutboxEvent",
+    "SchedulerLease",
+    "SchedulerJobRun",
 ]
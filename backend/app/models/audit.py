@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, LargeBinary, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -7,6 +7,10 @@ from app.database import Base
 class AuditLog(Base):
     """Журнал дій користувачів"""
     __tablename__ = "audit_log"
+    __table_args__ = (
+        # Фільтр журналу за типом об'єкта, новіші спочатку
+        Index("ix_audit_log_entity_type_created", "entity_type", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -16,6 +20,23 @@ class AuditLog(Base):
     changes = Column(JSON)  # {field: {old: value, new: value}}
     ip_address = Column(String(50))
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    month = Column(String(7), index=True)  # "YYYY-MM" (UTC) — ключ архівації по місяцях
 
     # Relationships
     user = relationship("User", back_populates="audit_logs")
+
+
+class AuditArchive(Base):
+    """Архів журналу дій за місяць: gzip JSONL + метадані для фільтрів"""
+    __tablename__ = "audit_archives"
+
+    id = Column(Integer, primary_key=True, index=True)
+    month = Column(String(7), nullable=False, unique=True)  # "YYYY-MM"
+    row_count = Column(Integer, nullable=False)
+    first_id = Column(Integer, nullable=False)
+    last_id = Column(Integer, nullable=False)
+    actions = Column(JSON)  # список action у місяці
+    entity_types = Column(JSON)  # список entity_type у місяці
+    users = Column(JSON)  # [{id, username}]
+    data = Column(LargeBinary, nullable=False)  # gzip JSONL, записи за зростанням id
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
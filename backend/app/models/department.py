@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.models.site import DEFAULT_SITE_ID
 
 
 class Department(Base):
@@ -11,6 +12,8 @@ class Department(Base):
     type = Column(String(50))  # warehouse, production, administration
     is_main_warehouse = Column(Boolean, default=False)  # True для Основного складу
     is_active = Column(Boolean, default=True)
+    site_id = Column(Integer, ForeignKey("sites.id"), nullable=False, index=True,
+                     default=DEFAULT_SITE_ID, server_default=str(DEFAULT_SITE_ID))
 
     # Relationships
     users = relationship("User", back_populates="department")
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class IdempotencyKey(Base):
+    """Збережені відповіді на запити з заголовком Idempotency-Key"""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_user_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    key = Column(String(255), nullable=False)
+    endpoint = Column(String(255), nullable=False)  # "POST /api/v1/purchases/"
+    request_hash = Column(String(64), nullable=False)  # sha256 методу, шляху і тіла
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(JSON)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -1,34 +1,58 @@
-from sqlalchemy import Column, Integer, ForeignKey, Numeric, DateTime, String, Text
+from sqlalchemy import Column, Integer, ForeignKey, Index, Numeric, DateTime, String, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from app.database import Base
+from app.database import Base, RELATIONSHIP_LAZY
+from app.models.site import DEFAULT_SITE_ID, site_from_department
 
 
 class Inventory(Base):
     """Поточні залишки товарів по підрозділах"""
     __tablename__ = "inventory"
+    __table_args__ = (
+        # Запити майданчика читають лише його рядки
+        Index("ix_inventory_site_department_product", "site_id", "department_id", "product_id"),
+        # Один рядок залишку на (товар, підрозділ): паралельне створення того самого
+        # рядка дає IntegrityError, і run_with_retry повторює проведення
+        Index("uq_inventory_product_department", "product_id", "department_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     department_id = Column(Integer, ForeignKey("departments.id"), nullable=False)
+    # Майданчик підрозділу (денормалізовано для запитів по майданчику)
+    site_id = Column(Integer, ForeignKey("sites.id"), nullable=False,
+                     default=site_from_department("department_id"), server_default=str(DEFAULT_SITE_ID))
     quantity = Column(Numeric(12, 3), default=0, nullable=False)
     reserved_quantity = Column(Numeric(12, 3), default=0, nullable=False)
     last_updated = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Optimistic locking: UPDATE ... WHERE version = :old, конфлікт → StaleDataError
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     # Relationships
-    product = relationship("Product", back_populates="inventory_records")
-    department = relationship("Department", back_populates="inventory")
+    product = relationship("Product", back_populates="inventory_records", lazy=RELATIONSHIP_LAZY)
+    department = relationship("Department", back_populates="inventory", lazy=RELATIONSHIP_LAZY)
+
+    __mapper_args__ = {"version_id_col": version}
 
 
 class InventoryTransaction(Base):
     """Історія всіх руху товарів з датами та вартістю"""
     __tablename__ = "inventory_transactions"
+    __table_args__ = (
+        Index("ix_inventory_transactions_site_created", "site_id", "created_at"),
+        # Середня собівартість (StockPosting._load_costs) — лише з індексу, без читання таблиці
+        Index("ix_inventory_transactions_product_to_cost", "product_id", "to_department_id", "unit_cost"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     transaction_type = Column(String(50), nullable=False, index=True)  # receipt, issue, transfer, adjustment
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     from_department_id = Column(Integer, ForeignKey("departments.id"), nullable=True)
     to_department_id = Column(Integer, ForeignKey("departments.id"), nullable=True)
+    # Майданчик підрозділу-отримувача (для видачі/списання — підрозділу-джерела)
+    site_id = Column(Integer, ForeignKey("sites.id"), nullable=False,
+                     default=site_from_department("to_department_id", "from_department_id"),
+                     server_default=str(DEFAULT_SITE_ID))
     quantity = Column(Numeric(12, 3), nullable=False)
     unit_cost = Column(Numeric(12, 2))  # КРИТИЧНО: Собівартість за одиницю
     reference_id = Column(Integer)  # ID пов'язаного документа (purchase_id, transfer_id тощо)
@@ -38,7 +62,26 @@ class InventoryTransaction(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)  # КРИТИЧНО: Дата транзакції
 
     # Relationships
-    product = relationship("Product", back_populates="inventory_transactions")
-    from_department = relationship("Department", foreign_keys=[from_department_id])
-    to_department = relationship("Department", foreign_keys=[to_department_id])
-    performed_by_user = relationship("User")
+    product = relationship("Product", back_populates="inventory_transactions", lazy=RELATIONSHIP_LAZY)
+    from_department = relationship("Department", foreign_keys=[from_department_id], lazy=RELATIONSHIP_LAZY)
+    to_department = relationship("Department", foreign_keys=[to_department_id], lazy=RELATIONSHIP_LAZY)
+    performed_by_user = relationship("User", lazy=RELATIONSHIP_LAZY)
+
+
+class LowStockItem(Base):
+    """Індекс низьких залишків: рядки inventory з quantity < min_stock_level (підтримується при проведенні)"""
+    __tablename__ = "low_stock_items"
+    __table_args__ = (
+        UniqueConstraint("product_id", "department_id", name="uq_low_stock_product_department"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    department_id = Column(Integer, ForeignKey("departments.id"), nullable=False)
+    quantity = Column(Numeric(12, 3), nullable=False)  # Залишок на момент останньої зміни
+    min_stock_level = Column(Integer, nullable=False)
+    since = Column(DateTime(timezone=True), server_default=func.now())  # Коли опустився нижче мінімуму
+
+    # Relationships
+    product = relationship("Product")
+    department = relationship("Department")
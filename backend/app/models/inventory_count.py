@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, Text, Numeric
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, Text, Numeric, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -24,11 +24,16 @@ class InventoryCount(Base):
     created_by_user = relationship("User", foreign_keys=[created_by])
     approved_by_user = relationship("User", foreign_keys=[approved_by])
     items = relationship("InventoryCountItem", back_populates="inventory_count", cascade="all, delete-orphan")
+    sessions = relationship("InventoryCountSession", back_populates="inventory_count", cascade="all, delete-orphan")
 
 
 class InventoryCountItem(Base):
     """Позиції інвентаризації"""
     __tablename__ = "inventory_count_items"
+    __table_args__ = (
+        # Позиції акту і пошук позиції товару в акті (проведення в SQL, відомості)
+        Index("ix_inventory_count_items_count_product", "inventory_count_id", "product_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     inventory_count_id = Column(Integer, ForeignKey("inventory_counts.id"), nullable=False)
@@ -37,7 +42,46 @@ class InventoryCountItem(Base):
     actual_quantity = Column(Numeric(12, 3), nullable=False)  # Фактично нараховано
     difference = Column(Numeric(12, 3), nullable=False)  # Різниця
     notes = Column(Text)
+    # Хто розв'язав конфлікт лічильників; після цього зони позицію не перезаписують
+    resolved_by = Column(Integer, ForeignKey("users.id"))
 
     # Relationships
     inventory_count = relationship("InventoryCount", back_populates="items")
     product = relationship("Product", back_populates="inventory_count_items")
+
+
+class InventoryCountSession(Base):
+    """Зона/сесія лічильника в акті: кожен лічильник вносить лише свої рядки"""
+    __tablename__ = "inventory_count_sessions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    inventory_count_id = Column(Integer, ForeignKey("inventory_counts.id"), nullable=False, index=True)
+    zone = Column(String(100), nullable=False)  # Силос 1, Склад ЗЧ — стелаж A, ...
+    counted_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String(20), default="open", nullable=False)  # open, submitted
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    submitted_at = Column(DateTime(timezone=True))
+
+    # Relationships
+    inventory_count = relationship("InventoryCount", back_populates="sessions")
+    entries = relationship("InventoryCountEntry", back_populates="session", cascade="all, delete-orphan")
+
+
+class InventoryCountEntry(Base):
+    """Рядок підрахунку в зоні: товар і нарахована лічильником кількість"""
+    __tablename__ = "inventory_count_entries"
+    __table_args__ = (
+        UniqueConstraint("session_id", "product_id", name="uq_count_entry_session_product"),
+        Index("ix_inventory_count_entries_count_product", "inventory_count_id", "product_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("inventory_count_sessions.id"), nullable=False)
+    inventory_count_id = Column(Integer, ForeignKey("inventory_counts.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    quantity = Column(Numeric(12, 3), nullable=False)
+    notes = Column(Text)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Relationships
+    session = relationship("InventoryCountSession", back_populates="entries")
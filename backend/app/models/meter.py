@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, UniqueConstraint
+from app.database import Base
+
+
+class MeterReading(Base):
+    """Показники лічильників з логерів (погодинні/щоденні): лише лічильник, час і показник"""
+    __tablename__ = "meter_readings"
+    __table_args__ = (
+        # Він же індекс для вибірки показників лічильника за період
+        UniqueConstraint("meter", "ts", name="uq_meter_reading_meter_ts"),
+    )
+
+    id    = Column(Integer, primary_key=True)
+    meter = Column(String(20), nullable=False)     # ktp_old, mlyn1, gas, ... (services/meters.py METERS)
+    ts    = Column(DateTime, nullable=False)       # Місцевий час показника
+    value = Column(Numeric(14, 4), nullable=False)  # Накопичений показник лічильника
+
+
+class MeterRollup(Base):
+    """Згортки показників: година → доба → місяць (перший/останній показник періоду)"""
+    __tablename__ = "meter_rollups"
+    __table_args__ = (
+        UniqueConstraint("meter", "period", "period_start", name="uq_meter_rollup_period"),
+    )
+
+    id           = Column(Integer, primary_key=True)
+    meter        = Column(String(20), nullable=False)
+    period       = Column(String(5), nullable=False)   # hour, day, month
+    period_start = Column(DateTime, nullable=False)
+    first_ts     = Column(DateTime, nullable=False)
+    first_value  = Column(Numeric(14, 4), nullable=False)
+    last_ts      = Column(DateTime, nullable=False)
+    last_value   = Column(Numeric(14, 4), nullable=False)
+    readings     = Column(Integer, nullable=False)
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Text
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class OutboxEvent(Base):
+    """Доменні події (transactional outbox): пишуться в транзакції документа, доставляються фоном"""
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String(100), nullable=False, index=True)  # writeoff.confirmed, transfer.cancelled, ...
+    aggregate_type = Column(String(50), nullable=False)  # purchase, transfer, writeoff, inventory_count
+    aggregate_id = Column(Integer)
+    payload = Column(JSON)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text)
+    # Обробники, що вже виконались успішно: повтор після збою іншого обробника їх пропускає
+    handled = Column(JSON)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    processed_at = Column(DateTime(timezone=True), index=True)  # NULL — ще не доставлена
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, Numeric, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, Numeric, DateTime, Text, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -6,6 +6,10 @@ from app.database import Base
 
 class Purchase(Base):
     __tablename__ = "purchases"
+    __table_args__ = (
+        # Звіти читають лише проведені документи за період; на PostgreSQL — частковий індекс
+        Index("ix_purchases_status_date", "status", "date", postgresql_where=text("status = 'confirmed'")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     number = Column(String(50), unique=True, nullable=False, index=True)
@@ -28,6 +32,9 @@ class Purchase(Base):
 
 class PurchaseItem(Base):
     __tablename__ = "purchase_items"
+    __table_args__ = (
+        Index("ix_purchase_items_purchase_product", "purchase_id", "product_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     purchase_id = Column(Integer, ForeignKey("purchases.id"), nullable=False)
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class SchedulerLease(Base):
+    """Лідер планувальника: який процес виконує задачі (lease з терміном дії)"""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String(50), primary_key=True)  # "scheduler"
+    holder = Column(String(255), nullable=False)  # host:pid:id процесу-лідера
+    acquired_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class SchedulerJobRun(Base):
+    """Історія запусків задач планувальника"""
+    __tablename__ = "scheduler_job_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String(100), nullable=False, index=True)
+    worker = Column(String(255), nullable=False)
+    status = Column(String(20), nullable=False)  # success, error
+    started_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    finished_at = Column(DateTime(timezone=True))
+    duration_ms = Column(Integer)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
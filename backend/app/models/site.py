@@ -0,0 +1,69 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, event, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import func
+from app.database import Base
+
+# Майданчик за замовчуванням: усі дані до появи майданчиків
+DEFAULT_SITE_ID = 1
+
+
+class Site(Base):
+    """Майданчик (підприємство): елеватор, млин. Підрозділи, залишки і журнал належать майданчику"""
+    __tablename__ = "sites"
+
+    id = Column(Integer, primary_key=True, index=True)
+    code = Column(String(20), unique=True, nullable=False)   # X-Site у запитах
+    name = Column(String(100), nullable=False)
+    # Великий майданчик на окремому розгортанні (своя БД): адреса його API; порожньо — ця БД
+    api_url = Column(String(255), nullable=True)
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# ─── site_id рядків inventory / inventory_transactions ─────────────
+# Майданчик рядка — майданчик його підрозділу. Значення ставиться за замовчуванням
+# при будь-якому INSERT (ORM і Core executemany), тож місця проведення не змінюються.
+# Кеш живе в межах однієї транзакції з'єднання: кожна нова транзакція читає
+# підрозділи заново, тож перенесення підрозділу іншим процесом видно одразу
+# після його commit, без спільного кешу між воркерами.
+
+_CACHE_KEY = "department_sites"
+
+
+@event.listens_for(Engine, "begin")
+def _fresh_transaction(connection) -> None:
+    forget_department_sites(connection)
+
+
+@event.listens_for(Engine, "rollback_savepoint")
+def _savepoint_rolled_back(connection, name, context) -> None:
+    forget_department_sites(connection)
+
+
+def department_site(connection, department_id) -> int:
+    """Майданчик підрозділу (кеш поточної транзакції з'єднання)."""
+    if department_id is None:
+        return DEFAULT_SITE_ID
+    cache = connection.info.setdefault(_CACHE_KEY, {})
+    site_id = cache.get(department_id)
+    if site_id is None:
+        from app.models.department import Department
+        site_id = connection.execute(
+            select(Department.site_id).where(Department.id == department_id)
+        ).scalar() or DEFAULT_SITE_ID
+        cache[department_id] = site_id
+    return site_id
+
+
+def forget_department_sites(connection) -> None:
+    """Скинути кеш з'єднання: підрозділи змінено в поточній транзакції."""
+    connection.info.pop(_CACHE_KEY, None)
+
+
+def site_from_department(*columns: str):
+    """Default для site_id: майданчик першого непорожнього з підрозділів columns."""
+    def default(context) -> int:
+        params = context.get_current_parameters()
+        department_id = next((params[c] for c in columns if params.get(c) is not None), None)
+        return department_site(context.connection, department_id)
+    return default
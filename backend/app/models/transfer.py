@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, Text, Numeric
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, Text, Numeric, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -7,6 +7,10 @@ from app.database import Base
 class Transfer(Base):
     """Переміщення товарів між підрозділами"""
     __tablename__ = "transfers"
+    __table_args__ = (
+        # Звіти читають лише проведені документи за період; на PostgreSQL — частковий індекс
+        Index("ix_transfers_status_date", "status", "date", postgresql_where=text("status = 'confirmed'")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     number = Column(String(50), unique=True, nullable=False, index=True)  # TRF-YYYYMMDD-XXX
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, Numeric
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -17,3 +17,25 @@ class TransportUnit(Base):
     department_id = Column(Integer, ForeignKey('departments.id'), nullable=True)
 
     department = relationship("Department")
+
+
+class TransportCost(Base):
+    """
+    Витрати на ТЗ: місяць × підрозділ ТЗ × категорія товару.
+    Зведення, яке оновлюється після проведення переміщень у підрозділ ТЗ
+    і списань з нього (services/transport_costs.py).
+    """
+    __tablename__ = "transport_costs"
+    __table_args__ = (
+        Index("ix_transport_costs_month_department", "month", "department_id"),
+        Index("ix_transport_costs_department_month", "department_id", "month"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    month = Column(String(7), nullable=False)               # "2026-02"
+    department_id = Column(Integer, ForeignKey('departments.id'), nullable=False)
+    category_id = Column(Integer, ForeignKey('product_categories.id'), nullable=True)  # None — без категорії
+    received_cost = Column(Numeric(15, 2), nullable=False, default=0)    # переміщено в ТЗ (запчастини, ПММ)
+    received_documents = Column(Integer, nullable=False, default=0)
+    writeoff_cost = Column(Numeric(15, 2), nullable=False, default=0)    # списано з ТЗ
+    writeoff_documents = Column(Integer, nullable=False, default=0)
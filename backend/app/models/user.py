@@ -24,6 +24,7 @@ class User(Base):
     password_hash = Column(String(255), nullable=False)
     role_id = Column(Integer, ForeignKey("roles.id"))
     department_id = Column(Integer, ForeignKey("departments.id"))
+    site_id = Column(Integer, ForeignKey("sites.id"), nullable=True)  # None — усі майданчики
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Numeric, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, Date, Numeric, ForeignKey, DateTime, Text, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -8,6 +8,10 @@ from decimal import Decimal
 class WriteOff(Base):
     """Списання товарів"""
     __tablename__ = "writeoffs"
+    __table_args__ = (
+        # Звіти читають лише проведені документи за період; на PostgreSQL — частковий індекс
+        Index("ix_writeoffs_status_date", "status", "date", postgresql_where=text("status = 'confirmed'")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     number = Column(String(50), unique=True, nullable=False, index=True)
@@ -30,6 +34,9 @@ class WriteOff(Base):
 class WriteOffItem(Base):
     """Позиції списання"""
     __tablename__ = "writeoff_items"
+    __table_args__ = (
+        Index("ix_writeoff_items_writeoff_product", "writeoff_id", "product_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     writeoff_id = Column(Integer, ForeignKey("writeoffs.id"), nullable=False)
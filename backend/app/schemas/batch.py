@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+
+
+class BatchConfirmRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=500)
+    # all_or_nothing — будь-яка помилка відкочує весь набір
+    # best_effort — проводяться всі документи, що пройшли перевірку
+    mode: Literal["all_or_nothing", "best_effort"] = "all_or_nothing"
+
+
+class BatchConfirmResult(BaseModel):
+    id: int
+    number: Optional[str] = None
+    status: str  # confirmed, failed, rolled_back
+    detail: Optional[str] = None
+
+
+class BatchConfirmResponse(BaseModel):
+    mode: str
+    confirmed_count: int
+    failed_count: int
+    results: List[BatchConfirmResult]
@@ -55,3 +55,7 @@ class ProductResponse(ProductBase):
 
     class Config:
         from_attributes = True
+
+
+class ProductSearchResult(ProductResponse):
+    score: float  # релевантність: схожість триграм + бонуси за префікс коду/назви
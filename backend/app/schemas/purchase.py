@@ -66,11 +66,13 @@ class PurchaseUpdate(BaseModel):
     supplier_id: Optional[int] = None
     department_id: Optional[int] = None
     notes: Optional[str] = None
-    status: Optional[str] = None
     items: Optional[List[PurchaseItemCreate]] = None
 
+    # Статус змінюють лише /confirm і DELETE (проведення залишків) — status тут відхиляється (422)
+    model_config = ConfigDict(extra="forbid")
 
-class PurchaseResponse(PurchaseBase):
+
+class PurchaseHeader(PurchaseBase):
     id: int
     number: str  # Автоматично згенерований номер
     total_amount: Decimal  # КРИТИЧНО: Загальна вартість
@@ -78,8 +80,17 @@ class PurchaseResponse(PurchaseBase):
     created_by: Optional[int] = None
     created_at: datetime
     updated_at: datetime
-    items: List[PurchaseItemWithProduct] = []
     supplier: Optional[SupplierSimple] = None
     department: Optional[DepartmentSimple] = None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class PurchaseResponse(PurchaseHeader):
+    items: List[PurchaseItemWithProduct] = []
+
+
+class PurchaseSummary(PurchaseHeader):
+    """Рядок списку (view=summary): шапка без позицій"""
+    items_count: int
+    total_quantity: Decimal
@@ -0,0 +1,27 @@
+from pydantic import BaseModel
+import datetime
+from typing import List, Optional
+
+
+class SearchHit(BaseModel):
+    type: str  # purchase, transfer, writeoff, inventory_count, supplier, product
+    id: int
+    title: str  # номер документа або назва
+    subtitle: Optional[str] = None
+    score: float
+    date: Optional[datetime.date] = None  # лише для документів
+    status: Optional[str] = None
+
+
+class SearchGroup(BaseModel):
+    type: str
+    label: str
+    complete: bool  # False — група не вклалась у бюджет часу або впала
+    items: List[SearchHit]
+
+
+class GlobalSearchResponse(BaseModel):
+    query: str
+    took_ms: float
+    complete: bool
+    groups: List[SearchGroup]
@@ -58,10 +58,12 @@ class TransferUpdate(BaseModel):
     from_department_id: Optional[int] = None
     to_department_id: Optional[int] = None
     notes: Optional[str] = None
-    status: Optional[str] = None
 
+    # Статус змінюють лише /confirm і DELETE (проведення, резерв) — status тут відхиляється (422)
+    model_config = ConfigDict(extra="forbid")
 
-class TransferResponse(TransferBase):
+
+class TransferHeader(TransferBase):
     id: int
     number: str  # Автоматично згенерований номер (TRF-YYYYMMDD-XXX)
     status: str  # draft, confirmed, cancelled
@@ -69,8 +71,17 @@ class TransferResponse(TransferBase):
     created_by: Optional[int] = None
     created_at: datetime
     updated_at: datetime
-    items: List[TransferItemWithProduct] = []
     from_department: Optional[DepartmentSimple] = None
     to_department: Optional[DepartmentSimple] = None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class TransferResponse(TransferHeader):
+    items: List[TransferItemWithProduct] = []
+
+
+class TransferSummary(TransferHeader):
+    """Рядок списку (view=summary): шапка без позицій"""
+    items_count: int
+    total_quantity: Decimal
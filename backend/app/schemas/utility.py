@@ -0,0 +1,140 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+
+class UtilityDelta(BaseModel):
+    previous: float
+    delta: float
+    delta_pct: Optional[float] = None
+
+
+class UtilityYear(BaseModel):
+    year: int
+    months: int
+    totals: Dict[str, Optional[float]]
+    shares: Dict[str, Optional[float]] = {}
+    yoy: Optional[Dict[str, Optional[UtilityDelta]]] = None   # None — попереднього року немає
+
+
+class UtilitySeason(BaseModel):
+    year: int
+    season: str         # winter, spring, summer, autumn
+    label: str
+    months: int
+    totals: Dict[str, Optional[float]]
+
+
+class UtilityMonthStats(BaseModel):
+    avg: float
+    min: float
+    max: float
+
+
+class UtilitySeasonalMonth(BaseModel):
+    month: int          # 1..12
+    years: int
+    stats: Dict[str, Optional[UtilityMonthStats]]
+
+
+class UtilityMovingAverage(BaseModel):
+    month: str
+    value: Optional[float] = None
+    avg_3m: Optional[float] = None
+    avg_12m: Optional[float] = None
+
+
+class UtilityAnalyticsResponse(BaseModel):
+    months: int
+    first_month: Optional[str] = None
+    last_month: Optional[str] = None
+    base_key: str       # показник, від якого рахуються частки і ковзні середні
+    totals: Dict[str, Optional[float]]
+    shares: Dict[str, Optional[float]] = {}
+    yearly: List[UtilityYear]
+    seasons: List[UtilitySeason]
+    seasonal: List[UtilitySeasonalMonth]
+    moving_average: List[UtilityMovingAverage]
+
+
+# ─── Лічильники (логери) ────────────────────────────────────────────
+
+class MeterInfo(BaseModel):
+    meter: str
+    label: str
+    unit: str
+
+
+class MeterIngestError(BaseModel):
+    line: int
+    error: str
+
+
+class MeterIngestReport(BaseModel):
+    lines: int
+    readings: int
+    meters: Dict[str, int]          # лічильник → скільки показників записано
+    unknown_meters: List[str] = []
+    errors: List[MeterIngestError] = []
+    error_count: int = 0
+
+
+class MeterSeriesPoint(BaseModel):
+    period_start: datetime
+    first_ts: datetime
+    first_value: float
+    last_ts: datetime
+    last_value: float
+    readings: int
+    consumption: float              # у одиницях показника лічильника
+
+
+class MeterMonthReading(BaseModel):
+    meter: str
+    label: str
+    start: float
+    end: float
+    consumption: float
+    readings: int
+    first_ts: datetime
+    last_ts: datetime
+    has_previous: bool              # False — початок місяця взято з першого показника
+
+
+class MeterElectricityMonth(BaseModel):
+    """Ті самі поля і розрахунок, що й у /electricity (id — якщо місяць уже збережено)."""
+    id: Optional[int] = None
+    month: str
+    ktp_old: float
+    ktp_new: float
+    mlyn1_start: float
+    mlyn1_end: float
+    mlyn2_start: float
+    mlyn2_end: float
+    palet_start: float
+    palet_end: float
+    gen_start: Optional[float] = None
+    gen_end: Optional[float] = None
+    ktp_total: float
+    gen_kwh: float
+    total_kwh: float
+    mlyn1_kwh: float
+    mlyn2_kwh: float
+    mlyn_total: float
+    palet_kwh: float
+    elevator_kwh: float
+
+
+class MeterGasMonth(BaseModel):
+    id: Optional[int] = None
+    month: str
+    consumption: Optional[float] = None
+    vtv: Optional[float] = None
+    total: Optional[float] = None
+
+
+class MeterMonthlyResponse(BaseModel):
+    month: str
+    readings: List[MeterMonthReading]
+    electricity: Optional[MeterElectricityMonth] = None   # None — немає жодного електролічильника
+    gas: Optional[MeterGasMonth] = None
@@ -63,15 +63,27 @@ class WriteOffUpdate(BaseModel):
     reason: Optional[str] = None
     notes: Optional[str] = None
 
+    # Статус змінюють лише /confirm і DELETE (проведення, резерв) — status тут відхиляється (422)
+    model_config = ConfigDict(extra="forbid")
 
-class WriteOffResponse(WriteOffBase):
+
+class WriteOffHeader(WriteOffBase):
     id: int
     number: str
     total_cost: Decimal
     status: str
     created_by: int
-    items: List[WriteOffItemResponse] = []
     department: Optional[DepartmentInfo] = None
     creator: Optional[UserInfo] = None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class WriteOffResponse(WriteOffHeader):
+    items: List[WriteOffItemResponse] = []
+
+
+class WriteOffSummary(WriteOffHeader):
+    """Рядок списку (view=summary): шапка без позицій"""
+    items_count: int
+    total_quantity: Decimal
@@ -1,5 +1,46 @@
+"""
+Журнал дій (audit_log).
+
+Запис: write_audit() не створює ORM-об'єкт, а додає запис у буфер сесії;
+перед commit увесь буфер транзакції вставляється одним executemany. Записи
+потрапляють у БД атомарно з дією, яку описують (rollback — буфер відкидається),
+а пакетне підтвердження N документів дає один INSERT замість N.
+
+Місяці: кожен запис має month ("YYYY-MM", UTC). Повні місяці, старші за
+AUDIT_ARCHIVE_AFTER_MONTHS, archive_old_months() переносить у audit_archives —
+gzip JSONL з метаданими (дії, типи, користувачі). Архів читається тим самим
+endpoint'ом журналу: після живих записів видача продовжується архівними.
+
+Метадані фільтрів (/audit/meta) кешуються і скидаються, коли в журнал
+потрапляє нова дія, тип сутності або користувач.
+"""
+import gzip
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import distinct, event as sa_event, insert
 from sqlalchemy.orm import Session
-from app.models.audit import AuditLog
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.audit import AuditArchive, AuditLog
+from app.models.user import User
+
+META_TTL_SECONDS = 300
+# Скільки розпакованих архівних місяців тримати в пам'яті
+ARCHIVE_CACHE_SIZE = 4
+
+_meta_cache: dict = {}
+_meta_lock = threading.Lock()
+_archive_cache: OrderedDict = OrderedDict()
+_archive_lock = threading.Lock()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
 
 
 def write_audit(
@@ -12,13 +53,238 @@ def write_audit(
     ip_address: str | None = None,
 ):
     """Записати подію в журнал аудиту."""
-    log = AuditLog(
-        user_id=user_id,
-        action=action,
-        entity_type=entity_type,
-        entity_id=entity_id,
-        changes=changes,
-        ip_address=ip_address,
+    if not db.in_transaction():
+        # Буфер живе в межах транзакції: rollback має бути подією, щоб його відкинути
+        db.begin()
+    now = _now()
+    db.info.setdefault("audit_buffer", []).append({
+        "user_id": user_id,
+        "action": action,
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "changes": changes,
+        "ip_address": ip_address,
+        "created_at": now,
+        "month": now.strftime("%Y-%m"),
+    })
+    # Не робимо commit тут — буфер вставляється перед commit викликача
+
+
+@sa_event.listens_for(SessionLocal, "before_commit")
+def _flush_audit_buffer(session: Session) -> None:
+    rows = session.info.pop("audit_buffer", None)
+    if rows:
+        session.execute(insert(AuditLog.__table__), rows)
+        _note_meta(rows)
+
+
+@sa_event.listens_for(SessionLocal, "after_soft_rollback")
+def _drop_audit_buffer(session: Session, previous_transaction) -> None:
+    session.info.pop("audit_buffer", None)
+
+
+# ─── Метадані фільтрів ──────────────────────────────────────────────
+
+def _note_meta(rows: list[dict]) -> None:
+    """Скинути кеш метаданих, якщо записано щось, чого в ньому ще немає."""
+    with _meta_lock:
+        cached = _meta_cache.get("sets")
+        if cached is None:
+            return
+        actions, entity_types, user_ids = cached
+        if any(
+            r["action"] not in actions or r["entity_type"] not in entity_types or r["user_id"] not in user_ids
+            for r in rows
+        ):
+            _meta_cache.clear()
+
+
+def audit_meta(db: Session) -> dict:
+    """Дії, типи сутностей і користувачі журналу (живі записи + архів), з кешем."""
+    with _meta_lock:
+        if _meta_cache.get("expires", 0) > time.monotonic():
+            return _meta_cache["data"]
+
+    actions = {a for (a,) in db.query(distinct(AuditLog.action)).all()}
+    entity_types = {e for (e,) in db.query(distinct(AuditLog.entity_type)).all()}
+    users = {
+        u.id: u.username
+        for u in db.query(User.id, User.username).filter(
+            User.id.in_(db.query(distinct(AuditLog.user_id)))
+        ).all()
+    }
+    for archive in db.query(AuditArchive.actions, AuditArchive.entity_types, AuditArchive.users).all():
+        actions.update(archive.actions or [])
+        entity_types.update(archive.entity_types or [])
+        for u in archive.users or []:
+            users.setdefault(u["id"], u["username"])
+
+    data = {
+        "users": [{"id": uid, "username": name} for uid, name in sorted(users.items())],
+        "actions": sorted(actions),
+        "entity_types": sorted(entity_types),
+    }
+    with _meta_lock:
+        _meta_cache.update(
+            data=data,
+            sets=(actions, entity_types, set(users)),
+            expires=time.monotonic() + META_TTL_SECONDS,
+        )
+    return data
+
+
+# ─── Архів ──────────────────────────────────────────────────────────
+
+def _month_start(month: str) -> date:
+    year, mon = month.split("-")
+    return date(int(year), int(mon), 1)
+
+
+def _archive_cutoff() -> str:
+    """Перший місяць, що залишається в живій таблиці."""
+    today = _now().date()
+    index = today.year * 12 + today.month - 1 - settings.AUDIT_ARCHIVE_AFTER_MONTHS
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def serialize_audit(row: AuditLog, username: str | None) -> dict:
+    created_at = row.created_at
+    if created_at is not None and created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)  # SQLite зберігає UTC без зони
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "username": username,
+        "action": row.action,
+        "entity_type": row.entity_type,
+        "entity_id": row.entity_id,
+        "changes": row.changes,
+        "ip_address": row.ip_address,
+        "created_at": created_at.isoformat() if created_at else None,
+    }
+
+
+def _decompress(data: bytes) -> list[dict]:
+    return [json.loads(line) for line in gzip.decompress(data).splitlines() if line]
+
+
+def archive_month(db: Session, month: str) -> int:
+    """Перенести записи місяця в audit_archives (з commit). Повертає кількість перенесених."""
+    rows = (
+        db.query(AuditLog, User.username)
+        .outerjoin(User, AuditLog.user_id == User.id)
+        .filter(AuditLog.month == month)
+        .order_by(AuditLog.id)
+        .all()
+    )
+    if not rows:
+        return 0
+    records = [serialize_audit(row, username) for row, username in rows]
+
+    archive = db.query(AuditArchive).filter(AuditArchive.month == month).first()
+    if archive is not None:
+        # Запізнілі записи за вже архівований місяць — дописуємо
+        records = sorted(_decompress(archive.data) + records, key=lambda r: r["id"])
+    else:
+        archive = AuditArchive(month=month)
+        db.add(archive)
+
+    users = {r["user_id"]: r["username"] for r in records}
+    archive.row_count = len(records)
+    archive.first_id = records[0]["id"]
+    archive.last_id = records[-1]["id"]
+    archive.actions = sorted({r["action"] for r in records})
+    archive.entity_types = sorted({r["entity_type"] for r in records})
+    archive.users = [{"id": uid, "username": name or "—"} for uid, name in sorted(users.items())]
+    archive.data = gzip.compress(
+        "\n".join(json.dumps(r, ensure_ascii=False) for r in records).encode("utf-8")
     )
-    db.add(log)
-    # Не робимо commit тут — commit робить викликач після своїх змін
+
+    db.query(AuditLog).filter(
+        AuditLog.month == month,
+        AuditLog.id <= records[-1]["id"],
+    ).delete(synchronize_session=False)
+    db.commit()
+    with _archive_lock:
+        _archive_cache.pop(month, None)
+    return len(rows)
+
+
+def archive_old_months(db: Session) -> dict[str, int]:
+    """Архівувати всі місяці, старші за AUDIT_ARCHIVE_AFTER_MONTHS. Повертає {month: кількість}."""
+    cutoff = _archive_cutoff()
+    months = [
+        m for (m,) in db.query(distinct(AuditLog.month)).filter(AuditLog.month < cutoff).all()
+    ]
+    return {month: archive_month(db, month) for month in sorted(months)}
+
+
+def _archived_records(db: Session, month: str) -> list[dict]:
+    """Розпаковані записи архівного місяця, новіші першими (LRU-кеш)."""
+    with _archive_lock:
+        if month in _archive_cache:
+            _archive_cache.move_to_end(month)
+            return _archive_cache[month]
+    archive = db.query(AuditArchive).filter(AuditArchive.month == month).first()
+    records = list(reversed(_decompress(archive.data))) if archive else []
+    with _archive_lock:
+        _archive_cache[month] = records
+        while len(_archive_cache) > ARCHIVE_CACHE_SIZE:
+            _archive_cache.popitem(last=False)
+    return records
+
+
+def search_archive(
+    db: Session,
+    user_id: int | None = None,
+    action: str | None = None,
+    entity_type: str | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    before_id: int | None = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> list[dict]:
+    """
+    Архівні записи за фільтрами, новіші першими.
+
+    Місяці без потрібної дії/типу/користувача (за метаданими) і поза діапазоном
+    дат не розпаковуються.
+    """
+    archives = db.query(
+        AuditArchive.month, AuditArchive.first_id, AuditArchive.actions,
+        AuditArchive.entity_types, AuditArchive.users,
+    ).order_by(AuditArchive.month.desc()).all()
+
+    result: list[dict] = []
+    for month, first_id, actions, entity_types, users in archives:
+        start = _month_start(month)
+        end = (start + timedelta(days=32)).replace(day=1)
+        if date_from and end <= date_from or date_to and start > date_to:
+            continue
+        if before_id is not None and first_id >= before_id:
+            continue
+        if action and action not in (actions or []) or entity_type and entity_type not in (entity_types or []):
+            continue
+        if user_id and user_id not in {u["id"] for u in users or []}:
+            continue
+
+        for r in _archived_records(db, month):
+            if before_id is not None and r["id"] >= before_id:
+                continue
+            if user_id and r["user_id"] != user_id or action and r["action"] != action:
+                continue
+            if entity_type and r["entity_type"] != entity_type:
+                continue
+            created = r["created_at"][:10] if r["created_at"] else None
+            if date_from and (created is None or created < date_from.isoformat()):
+                continue
+            if date_to and (created is None or created > date_to.isoformat()):
+                continue
+            if skip:
+                skip -= 1
+                continue
+            result.append(r)
+            if len(result) >= limit:
+                return result
+    return result
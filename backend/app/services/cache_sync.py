@@ -0,0 +1,75 @@
+"""
+Узгодження кешів процесу (довідники, каталог, аналітика) зі змінами в БД.
+
+track_commits — інвалідація після commit: сесія, що змінила відстежувані
+моделі, після commit передає ключі змінених об'єктів кешу; відкочені зміни
+відкидаються. Зміни, зроблені іншими процесами, такий слухач не бачить —
+для них межа застарілості REFCACHE_TTL_SECONDS.
+
+Generation — захист від гонки «збірка проти інвалідації»: збірка читає БД
+поза блокуванням, і якщо за цей час commit скинув кеш, її результат уже
+застарів. Кеш запам'ятовує покоління до читання і зберігає результат лише
+тоді, коли покоління не змінилося.
+"""
+import threading
+from typing import Callable, Hashable, Iterable, Optional
+
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+
+
+class Generation:
+    """Лічильник інвалідацій кешу; lock — блокування самого кешу."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._value = 0
+
+    def current(self) -> int:
+        with self.lock:
+            return self._value
+
+    def bump(self) -> None:
+        with self.lock:
+            self._value += 1
+
+    def is_current(self, seen: int) -> bool:
+        """Чи не було інвалідацій з моменту seen (перевіряти під lock разом із записом у кеш)."""
+        with self.lock:
+            return self._value == seen
+
+
+def track_commits(
+    name: str,
+    key_of: Callable[[object], Optional[Hashable]],
+    on_commit: Callable[[set], None],
+) -> None:
+    """
+    Після commit сесії викликати on_commit(ключі) — ключі key_of(obj) об'єктів,
+    доданих, змінених або видалених у транзакції (None — об'єкт не відстежується).
+    """
+    info_key = f"{name}_dirty"
+
+    @sa_event.listens_for(SessionLocal, "after_flush")
+    def _note_changes(session: Session, flush_context) -> None:
+        keys = _keys(key_of, (*session.new, *session.dirty, *session.deleted))
+        if keys:
+            session.info.setdefault(info_key, set()).update(keys)
+
+    @sa_event.listens_for(SessionLocal, "after_commit")
+    def _invalidate_committed(session: Session) -> None:
+        keys = session.info.pop(info_key, None)
+        if keys:
+            on_commit(keys)
+
+    @sa_event.listens_for(SessionLocal, "after_soft_rollback")
+    def _drop_changes(session: Session, previous_transaction) -> None:
+        session.info.pop(info_key, None)
+
+
+def _keys(key_of, objects: Iterable[object]) -> set:
+    keys = {key_of(obj) for obj in objects}
+    keys.discard(None)
+    return keys
@@ -0,0 +1,161 @@
+"""
+Компактний знімок каталогу товарів у пам'яті процесу — для збирання звітів.
+
+Звітам від товару потрібні лише назва, код, категорія, одиниця, тип і мінімум,
+а не ORM-об'єкти з усіма колонками і станом сесії. Знімок тримає для кожного
+товару CatalogProduct зі __slots__ (без __dict__), назви категорій/одиниць і
+типи — інтерновані рядки, спільні для всіх товарів.
+
+Актуальність:
+  - сесія, що змінила Product, після commit позначає ці id — при наступному
+    зверненні знімок копіюється і перечитуються лише вони;
+  - зміна категорії чи одиниці (назви) — повна перебудова;
+  - REFCACHE_TTL_SECONDS — межа застарілості для змін з інших процесів
+    (services/cache_sync.py).
+Знімок не змінюється на місці: звіт, що ітерує старий знімок, його й дочитає.
+version зростає з кожним оновленням.
+
+Пам'ять на 100k товарів — scripts/bench_catalog.py.
+"""
+import sys
+import time
+from typing import Iterator
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.product import Product, ProductCategory, Unit
+from app.services.cache_sync import Generation, track_commits
+
+
+class CatalogProduct:
+    """Товар у знімку каталогу (лише потрібні звітам поля)."""
+    __slots__ = (
+        "id", "name", "code", "category_id", "category_name",
+        "unit_id", "unit_name", "product_type", "min_stock_level", "is_active",
+    )
+
+    def __init__(self, id, name, code, category_id, category_name,
+                 unit_id, unit_name, product_type, min_stock_level, is_active):
+        self.id = id
+        self.name = name
+        self.code = code
+        self.category_id = category_id
+        self.category_name = sys.intern(category_name) if category_name else None
+        self.unit_id = unit_id
+        self.unit_name = sys.intern(unit_name) if unit_name else None
+        self.product_type = sys.intern(product_type) if product_type else None
+        self.min_stock_level = min_stock_level
+        self.is_active = is_active
+
+
+class CatalogSnapshot:
+    """Незмінний знімок каталогу: id → CatalogProduct."""
+    __slots__ = ("version", "built_at", "_items")
+
+    def __init__(self, items: dict[int, CatalogProduct], version: int):
+        self._items = items
+        self.version = version
+        self.built_at = time.monotonic()
+
+    def get(self, product_id: int) -> CatalogProduct | None:
+        return self._items.get(product_id)
+
+    def __contains__(self, product_id: int) -> bool:
+        return product_id in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[CatalogProduct]:
+        return iter(self._items.values())
+
+
+_generation = Generation()
+_lock = _generation.lock
+_snapshot: CatalogSnapshot | None = None
+_dirty_ids: set[int] = set()
+_full_reload = False
+
+
+def _rows(db: Session, product_ids: set[int] | None = None):
+    query = (
+        db.query(
+            Product.id, Product.name, Product.code,
+            Product.category_id, ProductCategory.name,
+            Product.unit_id, Unit.short_name,
+            Product.product_type, Product.min_stock_level, Product.is_active,
+        )
+        .outerjoin(ProductCategory, Product.category_id == ProductCategory.id)
+        .outerjoin(Unit, Product.unit_id == Unit.id)
+    )
+    if product_ids is not None:
+        query = query.filter(Product.id.in_(product_ids))
+    return query.yield_per(5000)
+
+
+def get_catalog(db: Session) -> CatalogSnapshot:
+    """
+    Актуальний знімок каталогу (будується при першому зверненні).
+
+    Позначки застарілості знімаються лише разом зі збереженням нового знімка:
+    збірка, що впала або яку застала нова інвалідація, їх не губить.
+    """
+    global _snapshot, _full_reload
+    with _lock:
+        snapshot, dirty, full = _snapshot, set(_dirty_ids), _full_reload
+        seen = _generation.current()
+    expired = snapshot is not None and time.monotonic() - snapshot.built_at > settings.REFCACHE_TTL_SECONDS
+    if snapshot is not None and not dirty and not full and not expired:
+        return snapshot
+
+    version = snapshot.version + 1 if snapshot else 1
+    if snapshot is None or full or expired:
+        items = {row[0]: CatalogProduct(*row) for row in _rows(db)}
+    else:
+        items = dict(snapshot._items)
+        for product_id in dirty:
+            items.pop(product_id, None)
+        items.update((row[0], CatalogProduct(*row)) for row in _rows(db, dirty))
+
+    fresh = CatalogSnapshot(items, version)
+    with _lock:
+        if _generation.is_current(seen):
+            _snapshot = fresh
+            _dirty_ids.clear()
+            _full_reload = False
+    return fresh
+
+
+def invalidate(product_ids: set[int] | None = None) -> None:
+    """Позначити товари (або, без аргументу, весь каталог) застарілими."""
+    global _full_reload
+    with _lock:
+        _generation.bump()
+        if product_ids is None:
+            _full_reload = True
+        else:
+            _dirty_ids.update(product_ids)
+
+
+# ─── Автоінвалідація ────────────────────────────────────────────────
+
+_FULL = "full"  # змінено категорію чи одиницю — перебудувати весь знімок
+
+
+def _changed(obj) -> int | str | None:
+    if isinstance(obj, Product):
+        return obj.id
+    if isinstance(obj, (ProductCategory, Unit)):
+        return _FULL
+    return None
+
+
+def _invalidate_committed(keys: set) -> None:
+    if _FULL in keys:
+        invalidate()
+    else:
+        invalidate(keys)
+
+
+track_commits("catalog", _changed, _invalidate_committed)
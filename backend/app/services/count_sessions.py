@@ -0,0 +1,249 @@
+"""
+Паралельна інвентаризація кількома лічильниками.
+
+Великі підрозділи (Елеватор) рахують кілька людей одночасно. Кожен лічильник
+відкриває в акті власну сесію — зону — і вносить лише її рядки
+(inventory_count_entries, унікальні по (зона, товар)). Чужі зони і весь акт
+не блокуються і не перезаписуються.
+
+Злиття рядкове: після зміни рядків зони перераховуються лише позиції акту
+тих самих товарів (merge_products):
+  - товар нарахувала одна зона — actual_quantity = її кількість;
+  - дві і більше — конфлікт: позиція не змінюється, доки його не розв'яже
+    resolve_conflict (сума зон або вказана кількість; позиція отримує
+    resolved_by і далі зонами не перезаписується);
+  - рядки товару видалено з усіх зон — позиція повертається до облікової кількості.
+Конфлікти обчислюються з рядків зон при читанні, а не зберігаються: два
+одночасні записи одного товару в різних зонах конфлікт не приховають.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, case, exists, func, insert, or_, update
+from sqlalchemy.orm import Session
+
+from app.models.inventory_count import (
+    InventoryCountEntry,
+    InventoryCountItem,
+    InventoryCountSession,
+)
+from app.models.product import Product
+from app.models.user import User
+from app.services.count_sheet import CountItemRef, apply_quantities
+
+# Рядок зони: (product_id, quantity, has_notes, notes)
+EntryLine = tuple[int, Decimal, bool, Optional[str]]
+
+
+def _reports(db: Session, count_id: int, product_ids=None) -> dict[int, list[tuple]]:
+    """Рядки зон по товарах: {product_id: [(session_id, zone, counted_by_name, quantity)]}."""
+    query = (
+        db.query(
+            InventoryCountEntry.product_id,
+            InventoryCountSession.id,
+            InventoryCountSession.zone,
+            User.username,
+            InventoryCountEntry.quantity,
+        )
+        .join(InventoryCountSession, InventoryCountSession.id == InventoryCountEntry.session_id)
+        .outerjoin(User, User.id == InventoryCountSession.counted_by)
+        .filter(InventoryCountEntry.inventory_count_id == count_id)
+        .order_by(InventoryCountEntry.product_id, InventoryCountSession.id)
+    )
+    if product_ids is not None:
+        query = query.filter(InventoryCountEntry.product_id.in_(product_ids))
+    reports: dict[int, list[tuple]] = defaultdict(list)
+    for product_id, session_id, zone, username, quantity in query:
+        reports[product_id].append((session_id, zone, username, quantity))
+    return reports
+
+
+def upsert_entries(db: Session, session: InventoryCountSession, lines: list[EntryLine]) -> None:
+    """Записати рядки зони: нові — одним INSERT, наявні — одним bulk UPDATE."""
+    if not lines:
+        return
+    existing = {
+        product_id: entry_id
+        for entry_id, product_id in db.query(InventoryCountEntry.id, InventoryCountEntry.product_id).filter(
+            InventoryCountEntry.session_id == session.id,
+            InventoryCountEntry.product_id.in_({line[0] for line in lines}),
+        )
+    }
+    new_rows, changed = [], []
+    for product_id, quantity, has_notes, notes in lines:
+        if product_id in existing:
+            row = {"id": existing[product_id], "quantity": quantity}
+            if has_notes:
+                row["notes"] = notes
+            changed.append(row)
+        else:
+            new_rows.append({
+                "session_id": session.id,
+                "inventory_count_id": session.inventory_count_id,
+                "product_id": product_id,
+                "quantity": quantity,
+                "notes": notes,
+            })
+    if new_rows:
+        db.execute(insert(InventoryCountEntry.__table__), new_rows)
+    if changed:
+        db.execute(update(InventoryCountEntry), changed)
+
+
+def merge_products(db: Session, count_id: int, product_ids: set[int]) -> list[int]:
+    """
+    Перерахувати позиції акту для товарів product_ids з рядків усіх зон.
+    Повертає товари з них, що зараз у конфлікті.
+    """
+    if not product_ids:
+        return []
+    reports = _reports(db, count_id, product_ids)
+    items = db.query(
+        InventoryCountItem.id, InventoryCountItem.product_id, InventoryCountItem.system_quantity,
+    ).filter(
+        InventoryCountItem.inventory_count_id == count_id,
+        InventoryCountItem.product_id.in_(product_ids),
+        InventoryCountItem.resolved_by.is_(None),
+    )
+    refs, updates, conflicted = {}, {}, []
+    for item_id, product_id, system_quantity in items:
+        zone_reports = reports.get(product_id, [])
+        if len(zone_reports) > 1:
+            conflicted.append(product_id)
+            continue
+        refs[item_id] = CountItemRef(item_id, "", system_quantity)
+        quantity = zone_reports[0][3] if zone_reports else system_quantity
+        updates[item_id] = (quantity, False, None)
+    apply_quantities(db, refs, updates)
+    return conflicted
+
+
+def conflicts(db: Session, count_id: int) -> list[dict]:
+    """Нерозв'язані конфлікти: товари, які нарахували дві і більше зони."""
+    conflicted = (
+        db.query(InventoryCountEntry.product_id)
+        .join(InventoryCountItem, and_(
+            InventoryCountItem.inventory_count_id == InventoryCountEntry.inventory_count_id,
+            InventoryCountItem.product_id == InventoryCountEntry.product_id,
+        ))
+        .filter(
+            InventoryCountEntry.inventory_count_id == count_id,
+            InventoryCountItem.resolved_by.is_(None),
+        )
+        .group_by(InventoryCountEntry.product_id)
+        .having(func.count(InventoryCountEntry.id) > 1)
+        .subquery()
+    )
+    rows = (
+        db.query(InventoryCountItem.product_id, Product.code, Product.name, InventoryCountItem.system_quantity)
+        .join(Product, Product.id == InventoryCountItem.product_id)
+        .filter(
+            InventoryCountItem.inventory_count_id == count_id,
+            InventoryCountItem.product_id.in_(conflicted.select()),
+        )
+        .order_by(Product.code)
+        .all()
+    )
+    if not rows:
+        return []
+    reports = _reports(db, count_id, [row[0] for row in rows])
+    return [
+        {
+            "product_id": product_id,
+            "product_code": code,
+            "product_name": name,
+            "system_quantity": system_quantity,
+            "reports": [
+                {"session_id": session_id, "zone": zone, "counted_by_name": username, "quantity": quantity}
+                for session_id, zone, username, quantity in reports[product_id]
+            ],
+        }
+        for product_id, code, name, system_quantity in rows
+    ]
+
+
+def resolve_conflict(
+    db: Session,
+    count_id: int,
+    product_id: int,
+    user_id: int,
+    quantity: Optional[Decimal] = None,
+    notes: Optional[str] = None,
+) -> None:
+    """Розв'язати конфлікт: вказана кількість або (без неї) сума всіх зон."""
+    item = db.query(InventoryCountItem).filter(
+        InventoryCountItem.inventory_count_id == count_id,
+        InventoryCountItem.product_id == product_id,
+    ).first()
+    if not item:
+        raise HTTPException(status_code=404, detail="Товару немає в акті")
+    zone_reports = _reports(db, count_id, [product_id]).get(product_id, [])
+    if len(zone_reports) < 2 and item.resolved_by is None:
+        raise HTTPException(status_code=400, detail="Для цього товару немає конфлікту зон")
+    if quantity is None:
+        quantity = sum((report[3] for report in zone_reports), Decimal(0))
+    item.actual_quantity = quantity
+    item.difference = quantity - item.system_quantity
+    item.resolved_by = user_id
+    if notes is not None:
+        item.notes = notes
+
+
+def progress(db: Session, count_id: int) -> dict:
+    """Жива зведена картина акту: зони, охоплення позицій, розбіжності, конфлікти."""
+    counted = or_(
+        InventoryCountItem.resolved_by.isnot(None),
+        exists().where(
+            InventoryCountEntry.inventory_count_id == InventoryCountItem.inventory_count_id,
+            InventoryCountEntry.product_id == InventoryCountItem.product_id,
+        ),
+    )
+    items_count, counted_items, discrepancy_count = db.query(
+        func.count(InventoryCountItem.id),
+        func.sum(case((counted, 1), else_=0)),
+        func.sum(case((func.abs(InventoryCountItem.difference) >= Decimal("0.001"), 1), else_=0)),
+    ).filter(InventoryCountItem.inventory_count_id == count_id).one()
+
+    sessions = (
+        db.query(
+            InventoryCountSession,
+            User.username,
+            func.count(InventoryCountEntry.id),
+            func.max(InventoryCountEntry.updated_at),
+        )
+        .outerjoin(User, User.id == InventoryCountSession.counted_by)
+        .outerjoin(InventoryCountEntry, InventoryCountEntry.session_id == InventoryCountSession.id)
+        .filter(InventoryCountSession.inventory_count_id == count_id)
+        .group_by(InventoryCountSession.id, User.username)
+        .order_by(InventoryCountSession.id)
+        .all()
+    )
+    items_count = items_count or 0
+    counted_items = counted_items or 0
+    return {
+        "count_id": count_id,
+        "items_count": items_count,
+        "counted_items": counted_items,
+        "progress_percent": round(counted_items * 100 / items_count, 1) if items_count else 0,
+        "discrepancy_count": discrepancy_count or 0,
+        "sessions": [session_view(session, username, lines, last_entry_at)
+                     for session, username, lines, last_entry_at in sessions],
+        "conflicts": conflicts(db, count_id),
+    }
+
+
+def session_view(session: InventoryCountSession, counted_by_name: Optional[str],
+                 lines: int, last_entry_at=None) -> dict:
+    return {
+        "id": session.id,
+        "zone": session.zone,
+        "counted_by": session.counted_by,
+        "counted_by_name": counted_by_name,
+        "status": session.status,
+        "lines": lines or 0,
+        "created_at": session.created_at,
+        "submitted_at": session.submitted_at,
+        "last_entry_at": last_entry_at,
+    }
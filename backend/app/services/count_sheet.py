@@ -0,0 +1,186 @@
+"""
+Масове внесення фактичних кількостей в акт інвентаризації.
+
+Великий акт (тисячі позицій зі сканера) не можна оновлювати по одній позиції:
+  - index_items — усі позиції акту одним запитом: id, код товару, облікова кількість;
+  - parse_sheet — потоковий розбір відомості CSV або NDJSON (рядок за рядком,
+    файл цілком у пам'ять не читається);
+  - apply_quantities — actual_quantity/difference (і notes) одним bulk UPDATE
+    за первинним ключем (executemany).
+
+Рядок відомості: код товару, фактична кількість, примітка (необов'язково).
+CSV — з заголовком product_code;actual_quantity;notes (роздільник «;», «,» або
+табуляція, десяткова кома допускається), NDJSON — об'єкт JSON на рядок
+з тими самими ключами. Повторний код у відомості — діє останній рядок.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import IO, Iterator, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.models.inventory_count import InventoryCountItem
+from app.models.product import Product
+
+SHEET_FORMATS = ("csv", "ndjson")
+
+# Скільки помилкових рядків повертати у звіті (решта лише рахується)
+MAX_REPORTED_ERRORS = 100
+
+_CODE_KEYS = ("product_code", "code", "код")
+_QUANTITY_KEYS = ("actual_quantity", "quantity", "кількість")
+
+
+@dataclass
+class SheetLine:
+    line: int
+    product_code: str
+    actual_quantity: Decimal
+    notes: Optional[str] = None
+    has_notes: bool = False
+
+
+@dataclass
+class SheetReport:
+    lines: int = 0
+    applied: int = 0
+    unknown_codes: list[str] = field(default_factory=list)
+    errors: list[dict] = field(default_factory=list)
+    error_count: int = 0
+
+    def error(self, line: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+
+@dataclass
+class CountItemRef:
+    id: int
+    product_code: str
+    system_quantity: Decimal
+
+
+def index_items(db: Session, count_id: int) -> dict[int, CountItemRef]:
+    """Позиції акту {id: CountItemRef} одним запитом."""
+    rows = (
+        db.query(InventoryCountItem.id, Product.code, InventoryCountItem.system_quantity)
+        .join(Product, Product.id == InventoryCountItem.product_id)
+        .filter(InventoryCountItem.inventory_count_id == count_id)
+    )
+    return {item_id: CountItemRef(item_id, code, system_quantity) for item_id, code, system_quantity in rows}
+
+
+def apply_quantities(
+    db: Session,
+    refs: dict[int, CountItemRef],
+    updates: dict[int, tuple[Decimal, bool, Optional[str]]],
+) -> int:
+    """
+    Записати фактичні кількості {item_id: (actual_quantity, has_notes, notes)}
+    одним bulk UPDATE; difference рахується від облікової кількості з refs.
+    """
+    params = []
+    for item_id, (actual_quantity, has_notes, notes) in updates.items():
+        row = {
+            "id": item_id,
+            "actual_quantity": actual_quantity,
+            "difference": actual_quantity - refs[item_id].system_quantity,
+        }
+        if has_notes:
+            row["notes"] = notes
+        params.append(row)
+    if params:
+        db.execute(update(InventoryCountItem), params)
+    return len(params)
+
+
+def _pick(record: dict, keys: tuple[str, ...]):
+    for key in keys:
+        if key in record:
+            return record[key]
+    return None
+
+
+def _quantity(value) -> Decimal:
+    if isinstance(value, str):
+        value = value.strip().replace(" ", "").replace(",", ".")
+    quantity = Decimal(str(value))
+    if not quantity.is_finite() or quantity < 0:
+        raise InvalidOperation
+    return quantity
+
+
+def _records(stream: IO[bytes], fmt: str) -> Iterator[tuple[int, dict]]:
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "ndjson":
+        for number, raw in enumerate(text, start=1):
+            if not raw.strip():
+                continue
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                yield number, None
+                continue
+            yield number, record if isinstance(record, dict) else None
+        return
+
+    header = text.readline()
+    try:
+        dialect = csv.Sniffer().sniff(header, delimiters=";,\t")
+    except csv.Error:
+        dialect = csv.excel
+    columns = [c.strip().lower() for c in next(csv.reader([header], dialect))]
+    for number, row in enumerate(csv.reader(text, dialect), start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        yield number, dict(zip(columns, row))
+
+
+def parse_sheet(stream: IO[bytes], fmt: str, report: SheetReport) -> Iterator[SheetLine]:
+    """Рядки відомості по одному; некоректні рядки потрапляють у report.errors."""
+    for number, record in _records(stream, fmt):
+        report.lines += 1
+        if record is None:
+            report.error(number, "Некоректний рядок")
+            continue
+        code = _pick(record, _CODE_KEYS)
+        code = str(code).strip() if code is not None else ""
+        if not code:
+            report.error(number, "Не вказано код товару")
+            continue
+        value = _pick(record, _QUANTITY_KEYS)
+        try:
+            quantity = _quantity(value)
+        except (InvalidOperation, ValueError, TypeError):
+            report.error(number, f"Некоректна кількість: {value!r}")
+            continue
+        has_notes = "notes" in record
+        notes = record.get("notes") if has_notes else None
+        if isinstance(notes, str):
+            notes = notes.strip() or None
+        yield SheetLine(number, code, quantity, notes, has_notes)
+
+
+def apply_sheet(db: Session, count_id: int, stream: IO[bytes], fmt: str) -> SheetReport:
+    """Розібрати відомість і внести її в акт; commit — на стороні виклику."""
+    report = SheetReport()
+    by_code = {ref.product_code: ref for ref in index_items(db, count_id).values()}
+    refs = {ref.id: ref for ref in by_code.values()}
+
+    updates: dict[int, tuple[Decimal, bool, Optional[str]]] = {}
+    unknown: dict[str, None] = {}   # впорядкована множина
+    for line in parse_sheet(stream, fmt, report):
+        ref = by_code.get(line.product_code)
+        if ref is None:
+            unknown[line.product_code] = None
+            continue
+        updates[ref.id] = (line.actual_quantity, line.has_notes, line.notes)
+
+    report.applied = apply_quantities(db, refs, updates)
+    report.unknown_codes = list(unknown)
+    return report
@@ -0,0 +1,35 @@
+"""
+Списки документів (закупівлі, переміщення, списання) у двох проекціях.
+
+view=summary — шапки документів з назвами пов'язаних сутностей (contains_eager
+по join) і кількістю/сумою позицій з корельованих підзапитів — один SQL-запит
+на сторінку списку, без позицій; агрегуються лише позиції документів сторінки
+(пошук по індексу на FK позицій), а не вся таблиця позицій.
+view=full — документи з позиціями і товарами, довантаженими selectinload
+(кілька запитів на сторінку, незалежно від кількості документів).
+"""
+from sqlalchemy import func, select
+from sqlalchemy.orm import Query
+
+DOCUMENT_VIEWS = "^(summary|full)$"
+
+
+def with_item_totals(query: Query, item_model, document_fk, document_id) -> Query:
+    """Додати до запиту документів items_count і total_quantity — корельовані підзапити по позиціях документа."""
+    def per_document(aggregate):
+        return select(aggregate).where(document_fk == document_id).correlate_except(item_model).scalar_subquery()
+
+    return query.add_columns(
+        per_document(func.count(item_model.id)).label("items_count"),
+        per_document(func.coalesce(func.sum(item_model.quantity), 0)).label("total_quantity"),
+    )
+
+
+def summary_rows(query: Query, schema) -> list:
+    """Виконати запит with_item_totals і зібрати рядки schema (зв'язки шапки — з contains_eager)."""
+    result = []
+    for document, items_count, total_quantity in query.all():
+        document.items_count = items_count or 0
+        document.total_quantity = total_quantity or 0
+        result.append(schema.model_validate(document))
+    return result
@@ -0,0 +1,82 @@
+"""
+Обробники подій outbox (див. app.services.outbox).
+
+Виконуються фоновим диспетчером після commit документа, тому не додають
+затримки до запиту. Доставка at-least-once — обробник може бути викликаний
+повторно для тієї ж події.
+"""
+import logging
+
+from sqlalchemy.orm import Session
+
+from app.models.department import Department
+from app.models.outbox import OutboxEvent
+from app.models.product import Product
+from app.models.transfer import Transfer
+from app.models.user import User
+from app.models.writeoff import WriteOff
+from app.services import refcache, transport_costs
+from app.services.notifications import notify_low_stock_entered, notify_writeoff_confirmed
+from app.services.outbox import handler
+
+logger = logging.getLogger(__name__)
+
+
+@handler("writeoff.confirmed")
+def notify_writeoff(db: Session, event: OutboxEvent) -> None:
+    """Telegram: підтверджене списання."""
+    writeoff = db.query(WriteOff).filter(WriteOff.id == event.aggregate_id).first()
+    if writeoff is None:
+        return
+    dept = refcache.lookup(db, "departments", writeoff.department_id)
+    user = db.query(User).filter(User.id == event.payload.get("performed_by")).first()
+    notify_writeoff_confirmed(
+        number=writeoff.number,
+        department=dept.name if dept else "—",
+        items_count=len(writeoff.items),
+        total=float(writeoff.total_cost),
+        date=str(writeoff.date),
+        confirmed_by=user.username if user else "—",
+    )
+
+
+@handler("low_stock.entered")
+def notify_below_minimum(db: Session, event: OutboxEvent) -> None:
+    """Telegram: товар опустився нижче мінімуму (після будь-якого проведення)."""
+    payload = event.payload
+    row = (
+        db.query(Product.name, Department.name)
+        .filter(Product.id == payload["product_id"], Department.id == payload["department_id"])
+        .first()
+    )
+    if row is None:
+        return
+    product_name, department_name = row
+    notify_low_stock_entered(
+        product_name=product_name,
+        department_name=department_name,
+        quantity=float(payload["quantity"]),
+        min_stock_level=float(payload["min_stock_level"]),
+    )
+
+
+@handler("transfer.confirmed")
+def refresh_transport_costs_on_transfer(db: Session, event: OutboxEvent) -> None:
+    """Зведення витрат ТЗ: переміщення в підрозділ транспортного засобу."""
+    department_id = event.payload.get("to_department_id")
+    if department_id is None or not transport_costs.is_transport_department(db, department_id):
+        return
+    transfer = db.query(Transfer.date).filter(Transfer.id == event.aggregate_id).first()
+    if transfer is not None:
+        transport_costs.refresh(db, department_id, transfer.date.strftime("%Y-%m"))
+
+
+@handler("writeoff.confirmed")
+def refresh_transport_costs_on_writeoff(db: Session, event: OutboxEvent) -> None:
+    """Зведення витрат ТЗ: списання з підрозділу транспортного засобу."""
+    department_id = event.payload.get("department_id")
+    if department_id is None or not transport_costs.is_transport_department(db, department_id):
+        return
+    writeoff = db.query(WriteOff.date).filter(WriteOff.id == event.aggregate_id).first()
+    if writeoff is not None:
+        transport_costs.refresh(db, department_id, writeoff.date.strftime("%Y-%m"))
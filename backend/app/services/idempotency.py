@@ -0,0 +1,135 @@
+"""
+Idempotency-Key для створення і проведення документів.
+
+Клієнт на нестабільному зв'язку може повторювати POST з тим самим заголовком
+Idempotency-Key. Перший запит виконується, і його відповідь зберігається в тій
+самій транзакції, що й документ. Повтори отримують збережену відповідь без
+повторного виконання (жодних дублікатів чернеток чи записів журналу).
+
+Ключ унікальний в межах користувача; той самий ключ з іншим тілом або на іншому
+endpoint — 422. Записи старші за IDEMPOTENCY_TTL_HOURS видаляє планувальник.
+"""
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.idempotency import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+
+class IdempotentReplay(Exception):
+    """Запит з цим ключем вже виконано — повернути збережену відповідь."""
+
+    def __init__(self, record: IdempotencyKey):
+        self.status_code = record.status_code
+        self.body = record.response_body
+
+
+class Idempotency:
+    """Ключ поточного запиту. Без заголовка save() нічого не робить."""
+
+    def __init__(self, user_id: int | None = None, key: str | None = None,
+                 endpoint: str | None = None, request_hash: str | None = None):
+        self.user_id = user_id
+        self.key = key
+        self.endpoint = endpoint
+        self.request_hash = request_hash
+
+    def save(self, db: Session, body, status_code: int = status.HTTP_200_OK,
+             schema: type[BaseModel] | None = None) -> None:
+        """
+        Зберегти відповідь у поточній транзакції — викликати перед db.commit().
+
+        body — dict або ORM-об'єкт разом зі schema (response_model endpoint'а).
+        Якщо паралельний запит з тим самим ключем встиг закомітитись першим,
+        поточна транзакція відкочується і повертається його відповідь.
+        """
+        if self.key is None:
+            return
+        if schema is not None:
+            # Серіалізуємо те, що вже записано в БД (server_default, округлення Numeric),
+            # щоб повтор повертав рівно те саме, що й перша відповідь після refresh
+            db.flush()
+            db.expire_all()
+            body = schema.model_validate(body).model_dump(mode="json")
+        db.add(IdempotencyKey(
+            user_id=self.user_id,
+            key=self.key,
+            endpoint=self.endpoint,
+            request_hash=self.request_hash,
+            status_code=status_code,
+            response_body=jsonable_encoder(body),
+        ))
+        try:
+            db.flush()
+        except IntegrityError:
+            db.rollback()
+            record = _find(db, self.user_id, self.key)
+            if record is None:
+                raise
+            _check_same_request(record, self.endpoint, self.request_hash)
+            raise IdempotentReplay(record)
+
+
+def _find(db: Session, user_id: int, key: str) -> IdempotencyKey | None:
+    return db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key,
+    ).first()
+
+
+def _check_same_request(record: IdempotencyKey, endpoint: str, request_hash: str) -> None:
+    if record.endpoint != endpoint or record.request_hash != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key вже використано для іншого запиту"
+        )
+
+
+def _expires_before() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS)
+
+
+def begin_idempotent(db: Session, user_id: int, key: str, endpoint: str, request_hash: str) -> Idempotency:
+    """
+    Перевірити ключ перед виконанням запиту.
+
+    Кидає IdempotentReplay, якщо такий запит вже виконано, або 422, якщо ключ
+    використано з іншим тілом чи на іншому endpoint.
+    """
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{IDEMPOTENCY_HEADER} задовгий (макс. {MAX_KEY_LENGTH} символів)"
+        )
+
+    record = _find(db, user_id, key)
+    if record is not None:
+        created_at = record.created_at
+        if created_at is not None and created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)  # SQLite зберігає UTC без зони
+        if created_at is not None and created_at < _expires_before():
+            # Прострочений ключ ще не прибраний планувальником — звільняємо його
+            db.delete(record)
+            db.flush()
+        else:
+            _check_same_request(record, endpoint, request_hash)
+            raise IdempotentReplay(record)
+
+    return Idempotency(user_id, key, endpoint, request_hash)
+
+
+def purge_expired(db: Session) -> int:
+    """Видалити прострочені ключі (з commit). Повертає кількість видалених."""
+    deleted = db.query(IdempotencyKey).filter(
+        IdempotencyKey.created_at < _expires_before()
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
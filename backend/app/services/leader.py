@@ -0,0 +1,212 @@
+"""
+Вибір лідера планувальника між процесами (uvicorn/gunicorn workers, кілька інстансів).
+
+Планувальник стартує в кожному процесі, але задачі виконує лише лідер — інакше
+кожен worker надсилав би свою копію понеділкового і місячного звітів.
+
+Два механізми (SCHEDULER_LEADER_LOCK):
+  - "advisory" (PostgreSQL, за замовчуванням): pg_try_advisory_lock на окремому
+    з'єднанні. Якщо процес-лідер помирає, з'єднання закривається і PostgreSQL
+    сам знімає блокування — наступний heartbeat іншого процесу його захоплює.
+    Потрібне пряме з'єднання: через pgbouncer у transaction mode (Neon "-pooler")
+    сесійні блокування не працюють — тоді використовуйте "lease".
+  - "lease" (SQLite, за замовчуванням): рядок scheduler_leases з терміном дії
+    SCHEDULER_LEASE_SECONDS. Лідер продовжує його кожен heartbeat; після смерті
+    лідера lease спливає і його захоплює інший процес.
+
+В обох режимах лідер записує себе в scheduler_leases — для /system/jobs.
+"""
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.database import SessionLocal, engine, is_sqlite
+from app.models.scheduler import SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = "scheduler"
+# Ключ pg_advisory_lock (довільне bigint, унікальне для застосунку)
+ADVISORY_LOCK_KEY = 0x4147524F  # "AGRO"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _lock_mode() -> str:
+    mode = settings.SCHEDULER_LEADER_LOCK
+    if mode == "auto":
+        return "lease" if is_sqlite else "advisory"
+    return mode
+
+
+class LeaderElector:
+    """Стан лідерства поточного процесу. heartbeat() викликається періодично."""
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.mode = _lock_mode()
+        self.is_leader = False
+        self._conn = None  # з'єднання з advisory lock
+        self._lock = threading.Lock()
+
+    def heartbeat(self) -> bool:
+        """Захопити або підтвердити лідерство. Повертає True, якщо цей процес — лідер."""
+        with self._lock:
+            try:
+                leader = self._advisory() if self.mode == "advisory" else self._lease()
+            except Exception as e:
+                logger.warning(f"Leader election: помилка heartbeat — {e}")
+                self._drop_connection()
+                leader = False
+            if leader != self.is_leader:
+                logger.info(f"Leader election: {self.worker_id} {'став лідером' if leader else 'втратив лідерство'}")
+            self.is_leader = leader
+            if leader:
+                self._record_lease()
+            return leader
+
+    def release(self) -> None:
+        """Віддати лідерство при зупинці процесу (інші не чекатимуть закінчення lease)."""
+        with self._lock:
+            if not self.is_leader:
+                self._drop_connection()
+                return
+            self.is_leader = False
+            db = SessionLocal()
+            try:
+                db.query(SchedulerLease).filter(
+                    SchedulerLease.name == LEASE_NAME,
+                    SchedulerLease.holder == self.worker_id,
+                ).delete(synchronize_session=False)
+                db.commit()
+            except Exception as e:
+                logger.warning(f"Leader election: не вдалося звільнити lease — {e}")
+            finally:
+                db.close()
+            if self._conn is not None:
+                try:
+                    self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+                    self._conn.commit()
+                except Exception:
+                    pass
+            self._drop_connection()
+
+    # ─── PostgreSQL advisory lock ───────────────────────────────────
+
+    def _advisory(self) -> bool:
+        if self._conn is not None:
+            # Вже тримаємо блокування — перевіряємо, що з'єднання живе
+            self._conn.execute(text("SELECT 1"))
+            self._conn.commit()
+            return True
+        conn = engine.connect()
+        try:
+            acquired = conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY}
+            ).scalar()
+            conn.commit()
+        except Exception:
+            conn.close()
+            raise
+        if acquired:
+            self._conn = conn
+            return True
+        conn.close()
+        return False
+
+    def _drop_connection(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    # ─── Lease-рядок ────────────────────────────────────────────────
+
+    def _expires_at(self) -> datetime:
+        return _now() + timedelta(seconds=settings.SCHEDULER_LEASE_SECONDS)
+
+    def _lease(self) -> bool:
+        db = SessionLocal()
+        try:
+            now = _now()
+            # Продовжити свій lease або забрати прострочений (атомарно, одним UPDATE)
+            updated = db.query(SchedulerLease).filter(
+                SchedulerLease.name == LEASE_NAME,
+                (SchedulerLease.holder == self.worker_id) | (SchedulerLease.expires_at < now),
+            ).update({
+                SchedulerLease.expires_at: self._expires_at(),
+                SchedulerLease.acquired_at: now if not self.is_leader else SchedulerLease.acquired_at,
+                SchedulerLease.holder: self.worker_id,
+            }, synchronize_session=False)
+            if updated:
+                db.commit()
+                return True
+            db.add(SchedulerLease(
+                name=LEASE_NAME,
+                holder=self.worker_id,
+                acquired_at=now,
+                expires_at=self._expires_at(),
+            ))
+            try:
+                db.commit()
+                return True
+            except IntegrityError:
+                db.rollback()  # lease тримає інший живий процес
+                return False
+        finally:
+            db.close()
+
+    def _record_lease(self) -> None:
+        """У режимі advisory — записати лідера в scheduler_leases (інформаційно)."""
+        if self.mode != "advisory":
+            return
+        db = SessionLocal()
+        try:
+            lease = db.get(SchedulerLease, LEASE_NAME)
+            if lease is None:
+                db.add(SchedulerLease(
+                    name=LEASE_NAME, holder=self.worker_id,
+                    acquired_at=_now(), expires_at=self._expires_at(),
+                ))
+            else:
+                if lease.holder != self.worker_id:
+                    lease.holder = self.worker_id
+                    lease.acquired_at = _now()
+                lease.expires_at = self._expires_at()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Leader election: не вдалося записати лідера — {e}")
+        finally:
+            db.close()
+
+
+def current_leader(db) -> dict | None:
+    """Хто зараз лідер (за scheduler_leases) — для /system/jobs."""
+    lease = db.get(SchedulerLease, LEASE_NAME)
+    if lease is None:
+        return None
+    acquired_at, expires_at = (
+        value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value  # SQLite зберігає UTC без зони
+        for value in (lease.acquired_at, lease.expires_at)
+    )
+    return {
+        "holder": lease.holder,
+        "acquired_at": acquired_at,
+        "expires_at": expires_at,
+        "alive": expires_at >= _now(),
+    }
+
+
+elector = LeaderElector()
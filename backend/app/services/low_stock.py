@@ -0,0 +1,173 @@
+"""
+Індекс низьких залишків (таблиця low_stock_items).
+
+Рядок inventory потрапляє в індекс, коли quantity < min_stock_level товару
+(і min_stock_level > 0). Індекс оновлюється інкрементально в транзакції зміни:
+  - StockPosting.flush() — для пар (товар, підрозділ), залишок яких змінився
+  - зміна min_stock_level товару — для всіх його рядків inventory
+
+Вхід і вихід з індексу публікуються в outbox як low_stock.entered / low_stock.exited.
+Endpoints низьких залишків, KPI dashboard і п'ятничний звіт читають індекс замість
+повного join inventory × products. rebuild_low_stock перераховує індекс з нуля
+(при старті і щоночі) — на випадок ручних правок БД.
+"""
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.models.department import Department
+from app.models.inventory import Inventory, LowStockItem
+from app.models.product import Product
+from app.services.outbox import emit_many
+
+Key = tuple[int, int]  # (product_id, department_id)
+
+
+def _is_low(quantity: Decimal, min_stock_level: int | None) -> bool:
+    return bool(min_stock_level) and min_stock_level > 0 and quantity < min_stock_level
+
+
+def _apply(db: Session, current: list, indexed: dict[Key, LowStockItem], events: bool) -> int:
+    """
+    Привести індекс для рядків current (inventory id, key, quantity, min) у відповідність.
+    Нові записи і події вставляються пакетно (по одному executemany). Повертає кількість змін.
+    """
+    changed = 0
+    entered: list[dict] = []
+    events_out: list[tuple] = []
+    for inventory_id, key, quantity, min_level in current:
+        low = _is_low(quantity, min_level)
+        entry = indexed.pop(key, None)
+        payload = {
+            "product_id": key[0],
+            "department_id": key[1],
+            "quantity": str(quantity),
+            "min_stock_level": min_level,
+        }
+        if low and entry is None:
+            entered.append({
+                "product_id": key[0],
+                "department_id": key[1],
+                "quantity": quantity,
+                "min_stock_level": min_level,
+            })
+            events_out.append(("low_stock.entered", "inventory", inventory_id, payload))
+            changed += 1
+        elif low:
+            if entry.quantity != quantity or entry.min_stock_level != min_level:
+                entry.quantity = quantity
+                entry.min_stock_level = min_level
+                changed += 1
+        elif entry is not None:
+            db.delete(entry)
+            events_out.append(("low_stock.exited", "inventory", inventory_id, payload))
+            changed += 1
+
+    # Записи індексу без рядка inventory (рядок видалено вручну)
+    for entry in indexed.values():
+        db.delete(entry)
+        changed += 1
+
+    if entered:
+        # Core-insert: ORM вставляє рядки з server_default по одному
+        db.execute(insert(LowStockItem.__table__), entered)
+    if events:
+        emit_many(db, events_out)
+    return changed
+
+
+def refresh_low_stock(db: Session, keys: Iterable[Key]) -> int:
+    """
+    Оновити індекс для пар (товар, підрозділ) з подіями входу/виходу (без commit).
+
+    Два запити незалежно від кількості пар: поточні залишки з мінімумами і записи індексу.
+    """
+    keys = set(keys)
+    if not keys:
+        return 0
+    product_ids = {p for p, _ in keys}
+    department_ids = {d for _, d in keys}
+
+    rows = (
+        db.query(Inventory.id, Inventory.product_id, Inventory.department_id,
+                 Inventory.quantity, Product.min_stock_level)
+        .join(Product, Inventory.product_id == Product.id)
+        .filter(
+            Inventory.product_id.in_(product_ids),
+            Inventory.department_id.in_(department_ids),
+        )
+        .all()
+    )
+    current = [
+        (inv_id, (p, d), quantity, min_level)
+        for inv_id, p, d, quantity, min_level in rows
+        if (p, d) in keys
+    ]
+    indexed = {
+        (e.product_id, e.department_id): e
+        for e in db.query(LowStockItem).filter(
+            LowStockItem.product_id.in_(product_ids),
+            LowStockItem.department_id.in_(department_ids),
+        ).all()
+        if (e.product_id, e.department_id) in keys
+    }
+    return _apply(db, current, indexed, events=True)
+
+
+def refresh_product(db: Session, product_id: int) -> int:
+    """Оновити індекс після зміни min_stock_level товару (без commit)."""
+    db.flush()
+    department_ids = [
+        d for (d,) in db.query(Inventory.department_id).filter(Inventory.product_id == product_id).all()
+    ]
+    return refresh_low_stock(db, {(product_id, d) for d in department_ids})
+
+
+def rebuild_low_stock(db: Session) -> int:
+    """
+    Перерахувати весь індекс з нуля (з commit), без подій.
+
+    Повертає кількість виправлених записів — ненульове значення означає,
+    що залишки або мінімуми змінювались в обхід StockPosting.
+    """
+    rows = (
+        db.query(Inventory.id, Inventory.product_id, Inventory.department_id,
+                 Inventory.quantity, Product.min_stock_level)
+        .join(Product, Inventory.product_id == Product.id)
+        .all()
+    )
+    current = [(inv_id, (p, d), quantity, min_level) for inv_id, p, d, quantity, min_level in rows]
+    indexed = {(e.product_id, e.department_id): e for e in db.query(LowStockItem).all()}
+    fixed = _apply(db, current, indexed, events=False)
+    db.commit()
+    return fixed
+
+
+def low_stock_rows(db: Session, positive_only: bool = False, site_id: Optional[int] = None) -> list:
+    """
+    (LowStockItem, Product, Department) за зростанням залишку.
+    positive_only — без нульових залишків; site_id — лише підрозділи майданчика.
+    """
+    query = (
+        db.query(LowStockItem, Product, Department)
+        .join(Product, LowStockItem.product_id == Product.id)
+        .join(Department, LowStockItem.department_id == Department.id)
+    )
+    if positive_only:
+        query = query.filter(LowStockItem.quantity > 0)
+    if site_id:
+        query = query.filter(Department.site_id == site_id)
+    return query.order_by(LowStockItem.quantity).all()
+
+
+def count_low_stock(db: Session, positive_only: bool = False, site_id: Optional[int] = None) -> int:
+    query = db.query(func.count(LowStockItem.id))
+    if positive_only:
+        query = query.filter(LowStockItem.quantity > 0)
+    if site_id:
+        query = query.join(Department, LowStockItem.department_id == Department.id).filter(
+            Department.site_id == site_id
+        )
+    return query.scalar() or 0
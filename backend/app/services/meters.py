@@ -0,0 +1,343 @@
+"""
+Часові ряди показників лічильників (логери КТП, млина, пелетного цеху,
+генератора, газу) зі згортками година → доба → місяць.
+
+Сирі показники (meter_readings) — лише (лічильник, час, показник), унікальні
+по (лічильник, час); повторне завантаження того самого часу замінює показник.
+Усі лічильники накопичувальні, тому згортка періоду (meter_rollups) зберігає
+перший і останній показник та кількість показників:
+  - hour  — з сирих показників;
+  - day   — з годинних згорток;
+  - month — з добових згорток.
+Після завантаження перераховуються лише періоди, яких торкнулися нові
+показники, тож час запиту ряду чи місячного зведення не залежить від того,
+скільки років показників накопичено: читаються лише згортки потрібного рівня.
+
+Споживання за період = останній показник періоду − останній показник
+попереднього періоду (або перший показник періоду, якщо попереднього немає).
+
+Файл логера — CSV з заголовком (роздільник «;», «,» або табуляція,
+десяткова кома допускається), у одному з двох виглядів:
+  - довгий:  timestamp;meter;value
+  - широкий: timestamp;ktp_old;ktp_new;mlyn1;... — колонка на лічильник.
+Час — ISO (2026-02-01 13:00) або 01.02.2026 13:00[:00].
+"""
+import calendar
+import csv
+import io
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from typing import IO, Iterator, Optional
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from app.models.meter import MeterReading, MeterRollup
+from app.services.count_sheet import MAX_REPORTED_ERRORS
+
+# Лічильники: ключ → (назва, одиниця показника)
+METERS = {
+    "ktp_old": ("КТП (стара)", "кВт·год"),
+    "ktp_new": ("КТП (нова)", "кВт·год"),
+    "mlyn1":   ("Млин — лічильник 1", "×100 кВт·год"),
+    "mlyn2":   ("Млин — лічильник 2", "кВт·год"),
+    "palet":   ("Пелетний цех", "×1000 кВт·год"),
+    "gen":     ("Генератор 550 кВт", "кВт·год"),
+    "gas":     ("Газ (зерносушки)", "м³"),
+}
+
+PERIODS = ("hour", "day", "month")
+
+# Скільки показників замінювати одним DELETE ... IN (...)
+UPSERT_CHUNK = 500
+
+_TS_KEYS = ("timestamp", "ts", "datetime", "date", "дата", "час")
+_TS_FORMATS = ("%d.%m.%Y %H:%M:%S", "%d.%m.%Y %H:%M", "%d.%m.%Y")
+
+
+@dataclass
+class IngestReport:
+    lines: int = 0
+    readings: int = 0
+    meters: dict[str, int] = field(default_factory=dict)
+    unknown_meters: list[str] = field(default_factory=list)
+    errors: list[dict] = field(default_factory=list)
+    error_count: int = 0
+
+    def error(self, line: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+
+# ─── Періоди ────────────────────────────────────────────────────────
+
+def period_start(ts: datetime, period: str) -> datetime:
+    if period == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    if period == "day":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    return ts.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_period(start: datetime, period: str) -> datetime:
+    if period == "hour":
+        return start + timedelta(hours=1)
+    if period == "day":
+        return start + timedelta(days=1)
+    return start + timedelta(days=calendar.monthrange(start.year, start.month)[1])
+
+
+def month_start(month: str) -> datetime:
+    """«2026-02» → 2026-02-01 00:00."""
+    return datetime(int(month[:4]), int(month[5:7]), 1)
+
+
+# ─── Розбір файлу логера ────────────────────────────────────────────
+
+def _timestamp(value: str) -> datetime:
+    value = value.strip()
+    try:
+        ts = datetime.fromisoformat(value)
+    except ValueError:
+        for fmt in _TS_FORMATS:
+            try:
+                return datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+        raise
+    # Час з поясом — у місцевий час сервера, як решта дат в обліку
+    return ts.astimezone().replace(tzinfo=None) if ts.tzinfo else ts
+
+
+def _value(value: str) -> Decimal:
+    number = Decimal(value.strip().replace(" ", "").replace(",", "."))
+    if not number.is_finite():
+        raise InvalidOperation
+    return number
+
+
+def parse_readings(stream: IO[bytes], report: IngestReport) -> Iterator[tuple[str, datetime, Decimal]]:
+    """Показники (лічильник, час, показник) по одному; помилки — у report."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    header = text.readline()
+    try:
+        dialect = csv.Sniffer().sniff(header, delimiters=";,\t")
+    except csv.Error:
+        dialect = csv.excel
+    columns = [c.strip().lower() for c in next(csv.reader([header], dialect), [])]
+    ts_col = next((i for i, c in enumerate(columns) if c in _TS_KEYS), None)
+    if ts_col is None:
+        report.error(1, "Немає колонки часу (timestamp)")
+        return
+    long_format = "meter" in columns
+    if long_format:
+        meter_col = columns.index("meter")
+        value_col = columns.index("value") if "value" in columns else None
+        if value_col is None:
+            report.error(1, "Немає колонки value")
+            return
+    else:
+        meter_cols = []
+        unknown = []
+        for i, name in enumerate(columns):
+            if i == ts_col or not name:
+                continue
+            (meter_cols if name in METERS else unknown).append((i, name))
+        report.unknown_meters = [name for _, name in unknown]
+        if not meter_cols:
+            report.error(1, "Немає жодної колонки відомого лічильника")
+            return
+
+    unknown_meters: dict[str, None] = dict.fromkeys(report.unknown_meters)   # впорядкована множина
+    for number, row in enumerate(csv.reader(text, dialect), start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        report.lines += 1
+        try:
+            ts = _timestamp(row[ts_col])
+        except (ValueError, IndexError):
+            report.error(number, f"Некоректний час: {row[ts_col] if ts_col < len(row) else ''!r}")
+            continue
+        if long_format:
+            cells = [(row[meter_col].strip().lower() if meter_col < len(row) else "",
+                      row[value_col] if value_col < len(row) else "")]
+        else:
+            cells = [(name, row[i] if i < len(row) else "") for i, name in meter_cols]
+        for meter, raw in cells:
+            if meter not in METERS:
+                unknown_meters[meter] = None
+                continue
+            if not raw.strip():
+                continue   # широкий формат: лічильника в цьому рядку немає
+            try:
+                yield meter, ts, _value(raw)
+            except (InvalidOperation, ValueError):
+                report.error(number, f"Некоректний показник {meter}: {raw!r}")
+    report.unknown_meters = list(unknown_meters)
+
+
+# ─── Запис і згортки ────────────────────────────────────────────────
+
+def _upsert(db: Session, meter: str, readings: dict[datetime, Decimal]) -> None:
+    """Замінити показники лічильника на ці часи: DELETE + INSERT пачками."""
+    stamps = sorted(readings)
+    for i in range(0, len(stamps), UPSERT_CHUNK):
+        chunk = stamps[i:i + UPSERT_CHUNK]
+        db.execute(delete(MeterReading).where(MeterReading.meter == meter, MeterReading.ts.in_(chunk)))
+        db.execute(insert(MeterReading.__table__),
+                   [{"meter": meter, "ts": ts, "value": readings[ts]} for ts in chunk])
+
+
+def _rollup_level(db: Session, meter: str, period: str, lo: datetime, hi: datetime) -> None:
+    """Перерахувати згортки рівня period, що покривають [lo, hi]."""
+    start = period_start(lo, period)
+    end = next_period(period_start(hi, period), period)
+    if period == "hour":
+        source = (
+            db.query(MeterReading.ts, MeterReading.value, MeterReading.ts, MeterReading.value)
+            .filter(MeterReading.meter == meter, MeterReading.ts >= start, MeterReading.ts < end)
+            .order_by(MeterReading.ts)
+        )
+        rows = ((first_ts, first_value, last_ts, last_value, 1)
+                for first_ts, first_value, last_ts, last_value in source)
+    else:
+        lower = PERIODS[PERIODS.index(period) - 1]
+        rows = (
+            db.query(MeterRollup.first_ts, MeterRollup.first_value,
+                     MeterRollup.last_ts, MeterRollup.last_value, MeterRollup.readings)
+            .filter(MeterRollup.meter == meter, MeterRollup.period == lower,
+                    MeterRollup.period_start >= start, MeterRollup.period_start < end)
+            .order_by(MeterRollup.period_start)
+        )
+
+    buckets: dict[datetime, dict] = {}
+    for first_ts, first_value, last_ts, last_value, readings in rows:
+        key = period_start(first_ts, period)
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = {
+                "meter": meter, "period": period, "period_start": key,
+                "first_ts": first_ts, "first_value": first_value,
+                "last_ts": last_ts, "last_value": last_value, "readings": readings,
+            }
+        else:
+            bucket["last_ts"] = last_ts
+            bucket["last_value"] = last_value
+            bucket["readings"] += readings
+
+    db.execute(delete(MeterRollup).where(
+        MeterRollup.meter == meter, MeterRollup.period == period,
+        MeterRollup.period_start >= start, MeterRollup.period_start < end,
+    ))
+    if buckets:
+        db.execute(insert(MeterRollup.__table__), list(buckets.values()))
+
+
+def refresh_rollups(db: Session, meter: str, lo: datetime, hi: datetime) -> None:
+    """Перерахувати години, доби і місяці лічильника, яких торкнувся інтервал [lo, hi]."""
+    for period in PERIODS:
+        _rollup_level(db, meter, period, lo, hi)
+
+
+def ingest(db: Session, stream: IO[bytes]) -> IngestReport:
+    """Завантажити файл логера і оновити згортки; commit — на стороні виклику."""
+    report = IngestReport()
+    by_meter: dict[str, dict[datetime, Decimal]] = defaultdict(dict)
+    for meter, ts, value in parse_readings(stream, report):
+        by_meter[meter][ts] = value   # повторний час у файлі — діє останній рядок
+
+    for meter, readings in by_meter.items():
+        _upsert(db, meter, readings)
+        refresh_rollups(db, meter, min(readings), max(readings))
+        report.meters[meter] = len(readings)
+    report.readings = sum(report.meters.values())
+    return report
+
+
+# ─── Читання ────────────────────────────────────────────────────────
+
+def series(db: Session, meter: str, period: str,
+           date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+           limit: int = 1000) -> list[dict]:
+    """Згортки лічильника рівня period у [date_from, date_to) зі споживанням за період."""
+    query = db.query(MeterRollup).filter(MeterRollup.meter == meter, MeterRollup.period == period)
+    if date_from is not None:
+        query = query.filter(MeterRollup.period_start >= period_start(date_from, period))
+    if date_to is not None:
+        query = query.filter(MeterRollup.period_start < date_to)
+    rollups = query.order_by(MeterRollup.period_start).limit(limit).all()
+    if not rollups:
+        return []
+
+    previous = (
+        db.query(MeterRollup.last_value)
+        .filter(MeterRollup.meter == meter, MeterRollup.period == period,
+                MeterRollup.period_start < rollups[0].period_start)
+        .order_by(MeterRollup.period_start.desc())
+        .limit(1)
+        .scalar()
+    )
+    result = []
+    for rollup in rollups:
+        base = previous if previous is not None else rollup.first_value
+        result.append({
+            "period_start": rollup.period_start,
+            "first_ts": rollup.first_ts,
+            "first_value": rollup.first_value,
+            "last_ts": rollup.last_ts,
+            "last_value": rollup.last_value,
+            "readings": rollup.readings,
+            "consumption": rollup.last_value - base,
+        })
+        previous = rollup.last_value
+    return result
+
+
+def month_readings(db: Session, month: str) -> dict[str, dict]:
+    """
+    Показники лічильників на початок і кінець місяця з місячних згорток:
+    {meter: {start, end, consumption, readings, first_ts, last_ts, has_previous}}.
+    Початок — останній показник попереднього місяця (або перший цього).
+    """
+    start = month_start(month)
+    prev_start = period_start(start - timedelta(days=1), "month")
+    rollups = db.query(MeterRollup).filter(
+        MeterRollup.period == "month",
+        MeterRollup.period_start.in_([prev_start, start]),
+    ).all()
+    current = {r.meter: r for r in rollups if r.period_start == start}
+    previous = {r.meter: r for r in rollups if r.period_start == prev_start}
+
+    result = {}
+    for meter, rollup in current.items():
+        prev = previous.get(meter)
+        begin = prev.last_value if prev else rollup.first_value
+        result[meter] = {
+            "start": begin,
+            "end": rollup.last_value,
+            "consumption": rollup.last_value - begin,
+            "readings": rollup.readings,
+            "first_ts": rollup.first_ts,
+            "last_ts": rollup.last_ts,
+            "has_previous": prev is not None,
+        }
+    return result
+
+
+def electricity_values(readings: dict[str, dict]) -> dict:
+    """
+    Поля ElectricityRecord з показників місяця (лише для лічильників, що мають дані):
+    КТП — спожиті кВт·год, решта — показники на початок і кінець місяця.
+    """
+    values = {}
+    for meter in ("ktp_old", "ktp_new"):
+        if meter in readings:
+            values[meter] = readings[meter]["consumption"]
+    for meter in ("mlyn1", "mlyn2", "palet", "gen"):
+        if meter in readings:
+            values[f"{meter}_start"] = readings[meter]["start"]
+            values[f"{meter}_end"] = readings[meter]["end"]
+    return values
@@ -6,8 +6,24 @@ Telegram сповіщення для ERP системи.
   2. Напиши боту будь-яке повідомлення
   3. Відкрий https://api.telegram.org/bot<TOKEN>/getUpdates -> знайди chat.id
   4. Заповни TELEGRAM_BOT_TOKEN і TELEGRAM_CHAT_ID в .env
+
+Доставка не блокує запити і задачі планувальника: send_telegram() лише ставить
+повідомлення в чергу, а окремий потік надсилає його через один постійний
+httpx.Client. Потік:
+  - об'єднує серії однотипних повідомлень (digest_key) за TELEGRAM_DIGEST_SECONDS
+    в одне — наприклад, десяток підтверджених списань приходить одним дайджестом
+  - тримає темп не більше TELEGRAM_RATE_PER_MINUTE повідомлень (ліміти Bot API)
+  - повторює при 429 (з retry_after від Telegram), 5xx і мережевих помилках
+    з експоненційною затримкою, до TELEGRAM_MAX_RETRIES спроб
+
+Для локальної перевірки: python scripts/fake_telegram_server.py і
+TELEGRAM_API_BASE=http://127.0.0.1:8081.
 """
 import logging
+import queue
+import threading
+import time
+
 import httpx
 from app.config import settings
 
@@ -15,18 +31,11 @@ logger = logging.getLogger(__name__)
 
 
 _TG_LIMIT = 4000
+_STOP = object()
 
 
-def send_telegram(text: str) -> bool:
-    """Надіслати повідомлення через Telegram Bot API. Довгі тексти розбиває на частини."""
-    token = settings.TELEGRAM_BOT_TOKEN
-    chat_id = settings.TELEGRAM_CHAT_ID
-
-    if not token or not chat_id:
-        logger.debug("Telegram не налаштований — пропускаємо сповіщення")
-        return False
-
-    # Розбиваємо по рядках щоб не розрізати слова
+def _split_chunks(text: str) -> list[str]:
+    """Розбиваємо по рядках щоб не розрізати слова"""
     chunks: list[str] = []
     current = ""
     for line in text.splitlines(keepends=True):
@@ -38,20 +47,204 @@ def send_telegram(text: str) -> bool:
             current += line
     if current:
         chunks.append(current)
+    return chunks
 
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    try:
-        with httpx.Client(timeout=10.0) as client:
-            for chunk in chunks:
-                resp = client.post(url, json={
-                    "chat_id": chat_id,
-                    "text": chunk,
-                    "parse_mode": "HTML",
-                })
-                if resp.status_code != 200:
+
+def _is_configured() -> bool:
+    return bool(settings.TELEGRAM_BOT_TOKEN and settings.TELEGRAM_CHAT_ID)
+
+
+class _RateLimiter:
+    """Token bucket: не більше rate_per_minute повідомлень, без сплесків."""
+
+    def __init__(self, rate_per_minute: int, burst: int = 1):
+        self.interval = 60.0 / max(rate_per_minute, 1)
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) / self.interval)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) * self.interval
+            time.sleep(wait)
+
+
+class TelegramNotifier:
+    """Черга сповіщень з фоновим потоком доставки."""
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._client: httpx.Client | None = None
+        self._limiter = _RateLimiter(settings.TELEGRAM_RATE_PER_MINUTE)
+        self._lock = threading.Lock()
+
+    # ─── Життєвий цикл ──────────────────────────────────────────────
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="telegram-notifier", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Дочекатися доставки черги (включно з незакритими дайджестами) і зупинити потік."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        if thread.is_alive():
+            # Потік ще надсилає (ретраї, rate limit) — клієнт лишається йому, процес завершить daemon-потік
+            logger.warning("Telegram: черга не доставлена до зупинки, клієнт не закрито")
+            return
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    # ─── Відправка ──────────────────────────────────────────────────
+
+    def submit(self, text: str, digest_key: str | None = None, digest_title: str | None = None) -> None:
+        self.start()
+        self._queue.put((text, digest_key, digest_title))
+
+    def deliver(self, text: str) -> bool:
+        """Надіслати текст одразу (з ретраями і rate limit) — у потоці викликача."""
+        for chunk in _split_chunks(text):
+            if not self._post(chunk):
+                return False
+        return True
+
+    def _http(self) -> httpx.Client:
+        # Викликається з потоку черги і з потоку send_telegram_now — один клієнт на всіх
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(
+                    base_url=settings.TELEGRAM_API_BASE,
+                    timeout=httpx.Timeout(10.0, connect=5.0),
+                    limits=httpx.Limits(max_keepalive_connections=2, max_connections=4),
+                )
+            return self._client
+
+    def _post(self, chunk: str) -> bool:
+        url = f"/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage"
+        payload = {"chat_id": settings.TELEGRAM_CHAT_ID, "text": chunk, "parse_mode": "HTML"}
+        delay = 1.0
+        for attempt in range(1, settings.TELEGRAM_MAX_RETRIES + 1):
+            self._limiter.acquire()
+            try:
+                resp = self._http().post(url, json=payload)
+            except httpx.HTTPError as e:
+                logger.warning(f"Telegram: мережева помилка (спроба {attempt}) — {e}")
+            else:
+                if resp.status_code == 200:
+                    return True
+                if resp.status_code == 429:
+                    try:
+                        retry_after = float(resp.json().get("parameters", {}).get("retry_after", delay))
+                    except ValueError:
+                        retry_after = delay
+                    logger.warning(f"Telegram: 429, чекаємо {retry_after} с (спроба {attempt})")
+                    time.sleep(retry_after)
+                    continue
+                if resp.status_code < 500:
+                    # 400/403 тощо — повтор не допоможе (неправильний chat_id, розмітка)
                     logger.warning(f"Telegram API помилка {resp.status_code}: {resp.text}")
                     return False
-        return True
+                logger.warning(f"Telegram API помилка {resp.status_code} (спроба {attempt})")
+            if attempt < settings.TELEGRAM_MAX_RETRIES:
+                time.sleep(delay)
+                delay = min(delay * 2, 60.0)
+        logger.warning("Telegram: не вдалося надіслати після всіх спроб")
+        return False
+
+    # ─── Фоновий потік ──────────────────────────────────────────────
+
+    def _run(self) -> None:
+        # digest_key -> {"title", "texts", "deadline"}
+        digests: dict[str, dict] = {}
+        while True:
+            timeout = None
+            if digests:
+                timeout = max(0.0, min(d["deadline"] for d in digests.values()) - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                for key in list(digests):
+                    self._flush_digest(digests.pop(key))
+                return
+
+            if item is not None:
+                text, digest_key, digest_title = item
+                if digest_key is None:
+                    self._safe_deliver(text)
+                else:
+                    digest = digests.setdefault(digest_key, {
+                        "title": digest_title,
+                        "texts": [],
+                        "deadline": time.monotonic() + settings.TELEGRAM_DIGEST_SECONDS,
+                    })
+                    digest["texts"].append(text)
+
+            now = time.monotonic()
+            for key in [k for k, d in digests.items() if d["deadline"] <= now]:
+                self._flush_digest(digests.pop(key))
+
+    def _flush_digest(self, digest: dict) -> None:
+        texts = digest["texts"]
+        if len(texts) == 1:
+            self._safe_deliver(texts[0])
+        else:
+            header = f"<b>{digest['title'] or 'Сповіщення'} — {len(texts)}</b>\n\n"
+            self._safe_deliver(header + "\n\n".join(texts))
+
+    def _safe_deliver(self, text: str) -> None:
+        try:
+            self.deliver(text)
+        except Exception as e:
+            logger.warning(f"Telegram: не вдалося надіслати — {e}")
+
+
+notifier = TelegramNotifier()
+
+
+def send_telegram(text: str, digest_key: str | None = None, digest_title: str | None = None) -> bool:
+    """
+    Поставити повідомлення в чергу на відправку (не блокує).
+
+    Повідомлення з однаковим digest_key, що надійшли протягом
+    TELEGRAM_DIGEST_SECONDS, надсилаються одним дайджестом з заголовком digest_title.
+    Повертає False, якщо Telegram не налаштований.
+    """
+    if not _is_configured():
+        logger.debug("Telegram не налаштований — пропускаємо сповіщення")
+        return False
+    notifier.submit(text, digest_key, digest_title)
+    return True
+
+
+def send_telegram_now(text: str) -> bool:
+    """Надіслати повідомлення синхронно і повернути результат (для ручної перевірки налаштувань)."""
+    if not _is_configured():
+        logger.debug("Telegram не налаштований — пропускаємо сповіщення")
+        return False
+    try:
+        return notifier.deliver(text)
     except Exception as e:
         logger.warning(f"Telegram: не вдалося надіслати — {e}")
         return False
@@ -65,7 +258,7 @@ def notify_writeoff_confirmed(
     date: str,
     confirmed_by: str,
 ) -> None:
-    """Сповіщення про підтверджене списання."""
+    """Сповіщення про підтверджене списання (серії об'єднуються в дайджест)."""
     send_telegram(
         f"🔴 <b>Списання підтверджено</b>\n"
         f"📋 Номер: <code>{number}</code>\n"
@@ -73,13 +266,29 @@ def notify_writeoff_confirmed(
         f"📦 Позицій: {items_count}\n"
         f"💰 Сума: {total:,.2f} ₴\n"
         f"📅 Дата: {date}\n"
-        f"👤 Підтвердив: {confirmed_by}"
+        f"👤 Підтвердив: {confirmed_by}",
+        digest_key="writeoff_confirmed",
+        digest_title="🔴 Підтверджено списань",
+    )
+
+
+def notify_low_stock_entered(
+    product_name: str,
+    department_name: str,
+    quantity: float,
+    min_stock_level: float,
+) -> None:
+    """Товар щойно опустився нижче мінімуму (серії об'єднуються в дайджест)."""
+    send_telegram(
+        f"⚠️ {product_name} ({department_name}): {quantity:.2f} / мін {min_stock_level:.2f}",
+        digest_key="low_stock_entered",
+        digest_title="⚠️ Нижче мінімуму",
     )
 
 
 def notify_low_stock(items: list) -> bool:
     """
-    Сповіщення про низькі залишки.
+    Сповіщення про низькі залишки (серії об'єднуються в дайджест).
     items: список dict з ключами product_name, department_name, quantity, min_stock_level
     """
     if not items:
@@ -94,4 +303,4 @@ def notify_low_stock(items: list) -> bool:
     if len(items) > 15:
         lines.append(f"\n...та ще {len(items) - 15} позицій")
 
-    return send_telegram("\n".join(lines))
+    return send_telegram("\n".join(lines), digest_key="low_stock", digest_title="⚠️ Низькі залишки")
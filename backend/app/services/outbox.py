@@ -0,0 +1,203 @@
+"""
+Transactional outbox для доменних подій.
+
+emit() додає подію в outbox_events у тій самій транзакції, що й зміна документа:
+подія з'являється тоді й лише тоді, коли документ закомічено. Побічні ефекти
+(Telegram, майбутні кеші та зведення) виконують обробники, зареєстровані через
+@handler, — фоновим диспетчером, поза запитом користувача.
+
+Доставка at-least-once: подія позначається processed_at тільки після успішного
+виконання всіх її обробників, тому обробники мають бути ідемпотентними.
+Успіх кожного обробника комітиться окремо (handled): якщо впав другий обробник,
+повтор виконує лише його, і перший (напр. Telegram) не спрацьовує вдруге.
+Після OUTBOX_MAX_ATTEMPTS невдалих спроб подія відкладається (dead letter) з last_error.
+
+Типи подій:
+  purchase.confirmed, purchase.cancelled
+  transfer.confirmed, transfer.cancelled
+  writeoff.confirmed, writeoff.cancelled
+  inventory_count.approved, inventory_count.deleted
+  low_stock.entered, low_stock.exited
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import event as sa_event, func, insert
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.outbox import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 10
+# Скільки пакетів диспетчер обробляє за один запуск (далі — наступний запуск)
+OUTBOX_MAX_BATCHES = 20
+
+_handlers: dict[str, list[Callable]] = defaultdict(list)
+
+
+def handler(event_type: str):
+    """Зареєструвати обробник події: fn(db, event: OutboxEvent)."""
+    def decorator(fn: Callable) -> Callable:
+        _handlers[event_type].append(fn)
+        return fn
+    return decorator
+
+
+def emit(
+    db: Session,
+    event_type: str,
+    aggregate_type: str,
+    aggregate_id: int | None = None,
+    payload: dict | None = None,
+) -> None:
+    """Додати подію в outbox. Не робимо commit — подія комітиться разом зі змінами викликача."""
+    db.add(OutboxEvent(
+        event_type=event_type,
+        aggregate_type=aggregate_type,
+        aggregate_id=aggregate_id,
+        payload=payload or {},
+        attempts=0,
+    ))
+    db.info["outbox_emitted"] = True
+
+
+def emit_many(db: Session, events: list[tuple[str, str, int | None, dict | None]]) -> None:
+    """
+    Додати пакет подій (event_type, aggregate_type, aggregate_id, payload) одним executemany —
+    для масових змін (індекс низьких залишків після інвентаризації). Без commit, як і emit().
+    """
+    if not events:
+        return
+    db.execute(insert(OutboxEvent.__table__), [
+        {
+            "event_type": event_type,
+            "aggregate_type": aggregate_type,
+            "aggregate_id": aggregate_id,
+            "payload": payload or {},
+            "attempts": 0,
+        }
+        for event_type, aggregate_type, aggregate_id, payload in events
+    ])
+    db.info["outbox_emitted"] = True
+
+
+@sa_event.listens_for(SessionLocal, "after_commit")
+def _wake_after_commit(session: Session) -> None:
+    """Після commit з новими подіями — розбудити диспетчер, не чекаючи інтервалу."""
+    if session.info.pop("outbox_emitted", False):
+        from app.services.scheduler import wake_outbox_dispatcher
+        wake_outbox_dispatcher()
+
+
+@sa_event.listens_for(SessionLocal, "after_soft_rollback")
+def _forget_after_rollback(session: Session, previous_transaction) -> None:
+    session.info.pop("outbox_emitted", None)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def dispatch_pending(db: Session, batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+    """
+    Доставити один пакет подій у порядку появи. Повертає кількість успішно доставлених.
+
+    Кожна подія комітиться окремо: збій обробника не відкочує вже доставлені
+    і не блокує наступні події пакета.
+    """
+    events = db.query(OutboxEvent).filter(
+        OutboxEvent.processed_at.is_(None),
+        OutboxEvent.attempts < OUTBOX_MAX_ATTEMPTS,
+    ).order_by(OutboxEvent.id).limit(batch_size).all()
+
+    delivered = 0
+    for event_id in [e.id for e in events]:
+        ev = db.get(OutboxEvent, event_id)
+        try:
+            done = set(ev.handled or [])
+            for fn in _handlers.get(ev.event_type, []):
+                if fn.__name__ in done:
+                    continue
+                fn(db, ev)
+                # Зміни обробника і відмітка про нього — одним commit
+                done.add(fn.__name__)
+                ev.handled = sorted(done)
+                db.commit()
+            ev.processed_at = _now()
+            db.commit()
+            delivered += 1
+        except Exception as e:
+            db.rollback()
+            ev = db.get(OutboxEvent, event_id)
+            ev.attempts += 1
+            ev.last_error = f"{type(e).__name__}: {e}"[:2000]
+            if ev.attempts >= OUTBOX_MAX_ATTEMPTS:
+                ev.processed_at = _now()
+                logger.error(f"Outbox: подія {ev.id} ({ev.event_type}) відкладена після {ev.attempts} спроб: {e}")
+            else:
+                logger.warning(f"Outbox: подія {ev.id} ({ev.event_type}) — спроба {ev.attempts} невдала: {e}")
+            db.commit()
+    return delivered
+
+
+def dispatch_all(db: Session) -> int:
+    """
+    Доставляти пакети, поки вони приносять результат (не більше OUTBOX_MAX_BATCHES).
+
+    Події, закомічені під час доставки, підхоплюються наступним пакетом того ж запуску.
+    """
+    total = 0
+    for _ in range(OUTBOX_MAX_BATCHES):
+        delivered = dispatch_pending(db)
+        total += delivered
+        if not delivered:
+            break
+    return total
+
+
+def has_fresh_events(db: Session) -> bool:
+    """Чи є нові (ще не доставлені й без невдалих спроб) події — дешева перевірка по індексу processed_at."""
+    return db.query(OutboxEvent.id).filter(
+        OutboxEvent.processed_at.is_(None),
+        OutboxEvent.attempts == 0,
+    ).first() is not None
+
+
+def _as_utc(value: datetime | None) -> datetime | None:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)  # SQLite зберігає UTC без зони
+    return value
+
+
+def outbox_stats(db: Session) -> dict:
+    """Метрики черги: скільки подій чекає, вік найстарішої (lag) і відкладені."""
+    pending_filter = (OutboxEvent.processed_at.is_(None),)
+    pending, oldest = db.query(func.count(OutboxEvent.id), func.min(OutboxEvent.created_at)).filter(
+        *pending_filter
+    ).one()
+    by_type = dict(
+        db.query(OutboxEvent.event_type, func.count(OutboxEvent.id))
+        .filter(*pending_filter)
+        .group_by(OutboxEvent.event_type)
+        .all()
+    )
+    dead = db.query(func.count(OutboxEvent.id)).filter(
+        OutboxEvent.processed_at.isnot(None),
+        OutboxEvent.attempts >= OUTBOX_MAX_ATTEMPTS,
+    ).scalar()
+    last_processed = db.query(func.max(OutboxEvent.processed_at)).scalar()
+
+    oldest = _as_utc(oldest)
+    return {
+        "pending": pending,
+        "pending_by_type": by_type,
+        "lag_seconds": round((_now() - oldest).total_seconds(), 1) if oldest else 0.0,
+        "oldest_pending_at": oldest,
+        "last_processed_at": _as_utc(last_processed),
+        "dead_letter": dead,
+    }
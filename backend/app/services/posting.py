@@ -0,0 +1,353 @@
+"""
+Проведення руху товарів по залишках.
+
+StockPosting накопичує зміни залишків та записи журналу (InventoryTransaction)
+для одного або кількох документів і проводить їх фіксованою кількістю запитів:
+  - один запит на всі потрібні рядки inventory (IN по товарах і підрозділах)
+  - один агрегат собівартості по всіх парах (товар, підрозділ)
+  - один executemany для всіх записів журналу
+
+Паралельні проведення: рядки inventory мають version (optimistic locking) —
+UPDATE із застарілою версією дає StaleDataError, і run_with_retry повторює
+операцію з нуля — після короткої паузи з випадковим розкидом, щоб паралельні
+спроби не зіткнулися знову. На PostgreSQL рядки додатково блокуються SELECT ... FOR UPDATE
+у фіксованому порядку (product_id, department_id), щоб уникнути дедлоків.
+Рядок inventory унікальний по (product_id, department_id): якщо два проведення
+одночасно створюють той самий рядок, друге отримує IntegrityError і теж повторюється.
+Статус документа змінюється атомарно через claim_status.
+
+Чернетки переміщень і списань резервують залишок (reserved_quantity) при
+створенні та знімають резерв при скасуванні; проведення — це consume:
+списання залишку разом із резервом.
+
+flush() також оновлює індекс низьких залишків (services/low_stock.py) для пар,
+залишок яких змінився.
+"""
+import random
+import time
+from decimal import Decimal
+from typing import Callable, Iterable
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.models.inventory import Inventory, InventoryTransaction
+from app.services.low_stock import refresh_low_stock
+
+Key = tuple[int, int]  # (product_id, department_id)
+
+RETRY_ATTEMPTS = 5
+# Пауза перед повтором: RETRY_BACKOFF_SECONDS * 2^спроба, ×0.5…1.5 (jitter)
+RETRY_BACKOFF_SECONDS = 0.02
+# serialization_failure, deadlock_detected
+_PG_RETRY_CODES = {"40001", "40P01"}
+# Унікальний рядок inventory (товар, підрозділ), models/inventory.py
+_INVENTORY_UNIQUE = ("uq_inventory_product_department", "UNIQUE constraint failed: inventory.")
+
+_LEDGER_FIELDS = (
+    "transaction_type", "product_id", "from_department_id", "to_department_id",
+    "quantity", "unit_cost", "reference_id", "reference_type", "performed_by", "notes",
+)
+
+
+class StockPosting:
+    """Залишки та журнал руху для набору документів, що проводяться разом."""
+
+    def __init__(self, db: Session, performed_by: int):
+        self.db = db
+        self.performed_by = performed_by
+        self._rows: dict[Key, Inventory | None] = {}
+        self._costs: dict[Key, list] = {}  # key -> [сума unit_cost, кількість записів]
+        self._ledger: list[dict] = []
+        self._changed: set[Key] = set()  # пари, де змінився quantity — для індексу низьких залишків
+
+    # ─── Завантаження ───────────────────────────────────────────────
+
+    def load(self, keys: Iterable[Key], costs: bool = False) -> None:
+        """Завантажити рядки inventory (і за потреби собівартість) одним запитом."""
+        keys = set(keys)
+        missing = keys - self._rows.keys()
+        if missing:
+            query = self.db.query(Inventory).filter(
+                Inventory.product_id.in_({p for p, _ in missing}),
+                Inventory.department_id.in_({d for _, d in missing}),
+            )
+            if self.db.get_bind().dialect.name == "postgresql":
+                # Блокування рядків завжди в одному порядку — без взаємних дедлоків
+                query = query.order_by(Inventory.product_id, Inventory.department_id).with_for_update()
+            for inv in query.all():
+                self._rows.setdefault((inv.product_id, inv.department_id), inv)
+            for key in missing:
+                self._rows.setdefault(key, None)
+        if costs:
+            self._load_costs(keys - self._costs.keys())
+
+    def _load_costs(self, keys: set[Key]) -> None:
+        if not keys:
+            return
+        rows = self.db.query(
+            InventoryTransaction.product_id,
+            InventoryTransaction.to_department_id,
+            func.sum(InventoryTransaction.unit_cost),
+            func.count(InventoryTransaction.unit_cost),
+        ).filter(
+            InventoryTransaction.product_id.in_({p for p, _ in keys}),
+            InventoryTransaction.to_department_id.in_({d for _, d in keys}),
+            InventoryTransaction.unit_cost.isnot(None),
+        ).group_by(
+            InventoryTransaction.product_id, InventoryTransaction.to_department_id
+        ).all()
+        for pid, dept_id, total, count in rows:
+            if (pid, dept_id) in keys:
+                self._costs[(pid, dept_id)] = [Decimal(str(total or 0)), count or 0]
+        for key in keys:
+            self._costs.setdefault(key, [Decimal(0), 0])
+
+    # ─── Залишки ────────────────────────────────────────────────────
+
+    def exists(self, product_id: int, department_id: int) -> bool:
+        """Чи є рядок inventory для товару в підрозділі."""
+        key = (product_id, department_id)
+        if key not in self._rows:
+            self.load({key})
+        return self._rows[key] is not None
+
+    def quantity(self, product_id: int, department_id: int) -> Decimal:
+        """Поточний залишок з урахуванням вже проведених у цьому наборі змін."""
+        key = (product_id, department_id)
+        if key not in self._rows:
+            self.load({key})
+        inv = self._rows[key]
+        return inv.quantity if inv else Decimal(0)
+
+    def avg_cost(self, product_id: int, department_id: int) -> Decimal:
+        """Середня собівартість надходжень товару в підрозділ."""
+        key = (product_id, department_id)
+        if key not in self._costs:
+            self._load_costs({key})
+        total, count = self._costs[key]
+        return total / count if count else Decimal(0)
+
+    def receive(self, product_id: int, department_id: int, quantity: Decimal) -> None:
+        """Збільшити залишок (створює рядок inventory, якщо його ще немає)."""
+        key = (product_id, department_id)
+        if key not in self._rows:
+            self.load({key})
+        inv = self._rows[key]
+        if inv is None:
+            inv = Inventory(
+                product_id=product_id,
+                department_id=department_id,
+                quantity=Decimal(0),
+                reserved_quantity=Decimal(0),
+            )
+            self.db.add(inv)
+            self._rows[key] = inv
+        inv.quantity += quantity
+        self._changed.add(key)
+
+    def set_quantity(self, product_id: int, department_id: int, quantity: Decimal) -> None:
+        """Встановити фактичний залишок (інвентаризація)."""
+        key = (product_id, department_id)
+        if key not in self._rows:
+            self.load({key})
+        current = self._rows[key].quantity if self._rows[key] else Decimal(0)
+        self.receive(product_id, department_id, quantity - current)
+
+    def issue(self, product_id: int, department_id: int, quantity: Decimal) -> None:
+        """Зменшити залишок. Достатність перевіряє викликач через quantity()."""
+        key = (product_id, department_id)
+        if key not in self._rows:
+            self.load({key})
+        self._rows[key].quantity -= quantity
+        self._changed.add(key)
+
+    # ─── Резерви чернеток ───────────────────────────────────────────
+
+    def available(self, product_id: int, department_id: int) -> Decimal:
+        """Вільний залишок: quantity - reserved_quantity."""
+        key = (product_id, department_id)
+        if key not in self._rows:
+            self.load({key})
+        inv = self._rows[key]
+        return inv.quantity - inv.reserved_quantity if inv else Decimal(0)
+
+    def reserve(self, product_id: int, department_id: int, quantity: Decimal) -> None:
+        """Зарезервувати залишок під чернетку. Достатність перевіряє викликач через available()."""
+        key = (product_id, department_id)
+        if key not in self._rows:
+            self.load({key})
+        self._rows[key].reserved_quantity += quantity
+
+    def release(self, product_id: int, department_id: int, quantity: Decimal) -> None:
+        """Зняти резерв (скасування чернетки або проведення)."""
+        key = (product_id, department_id)
+        if key not in self._rows:
+            self.load({key})
+        inv = self._rows[key]
+        if inv is not None:
+            inv.reserved_quantity = max(Decimal(0), inv.reserved_quantity - quantity)
+
+    def consume(self, product_id: int, department_id: int, quantity: Decimal) -> None:
+        """Проведення зарезервованого: списати залишок і зняти резерв."""
+        self.issue(product_id, department_id, quantity)
+        self.release(product_id, department_id, quantity)
+
+    # ─── Журнал ─────────────────────────────────────────────────────
+
+    def add_transaction(self, **fields) -> None:
+        """Додати запис журналу руху (вставляється разом з іншими у flush)."""
+        row = {name: fields.get(name) for name in _LEDGER_FIELDS}
+        if row["performed_by"] is None:
+            row["performed_by"] = self.performed_by
+        self._ledger.append(row)
+
+        # Надходження з вартістю впливає на середню собівартість наступних документів
+        key = (row["product_id"], row["to_department_id"])
+        if row["unit_cost"] is not None and key in self._costs:
+            self._costs[key][0] += Decimal(str(row["unit_cost"]))
+            self._costs[key][1] += 1
+
+    def flush(self) -> None:
+        """Записати зміни залишків і всі записи журналу в БД (без commit).
+
+        Нові рядки inventory вставляються одним пакетним INSERT під час flush,
+        оновлення існуючих — одним executemany, журнал — ще одним.
+        Індекс низьких залишків оновлюється двома запитами на всі змінені пари.
+        """
+        self.db.flush()
+        if self._changed:
+            refresh_low_stock(self.db, self._changed)
+            self._changed = set()
+        if self._ledger:
+            # Core-insert по таблиці: ORM-bulk розбиває рядки з різним набором
+            # непорожніх полів (issue/transfer) на окремі INSERT
+            self.db.execute(insert(InventoryTransaction.__table__), self._ledger)
+            self._ledger = []
+
+
+def claim_status(db: Session, doc, old: str, new: str) -> None:
+    """
+    Атомарно перевести документ зі статусу old у new (UPDATE ... WHERE status = old).
+
+    Якщо документ паралельно вже провів інший користувач — 409 без жодних змін.
+    Викликати після всіх перевірок, але до зміни залишків.
+    """
+    model = type(doc)
+    updated = db.query(model).filter(model.id == doc.id, model.status == old).update(
+        {model.status: new}, synchronize_session=False
+    )
+    if not updated:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Документ вже змінено іншим користувачем"
+        )
+    set_committed_value(doc, "status", new)
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, StaleDataError):
+        return True
+    orig = getattr(exc, "orig", None)
+    if getattr(orig, "pgcode", None) in _PG_RETRY_CODES:
+        return True
+    # Паралельне проведення вже створило рядок залишку — повтор його прочитає
+    if any(marker in str(orig) for marker in _INVENTORY_UNIQUE):
+        return True
+    return "database is locked" in str(orig)
+
+
+def run_with_retry(db: Session, operation: Callable, attempts: int = RETRY_ATTEMPTS):
+    """
+    Виконати operation (завантаження + проведення + commit) з повтором при конфлікті.
+
+    operation має сама завантажувати документи і залишки — після rollback
+    всі об'єкти сесії застарілі, тому кожна спроба починається з чистого читання.
+    """
+    for attempt in range(attempts):
+        try:
+            return operation()
+        except (StaleDataError, DBAPIError) as e:
+            db.rollback()
+            if not _is_retryable(e):
+                raise
+            if attempt == attempts - 1:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Залишки змінено паралельною операцією, спробуйте ще раз"
+                )
+            time.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+def aggregate_items(items) -> dict[int, Decimal]:
+    """Кількість по товарах документа (однаковий товар у кількох позиціях сумується)."""
+    needed: dict[int, Decimal] = {}
+    for item in items:
+        needed[item.product_id] = needed.get(item.product_id, Decimal(0)) + Decimal(str(item.quantity))
+    return needed
+
+
+def load_documents(db: Session, model, ids: list[int], *criteria) -> dict:
+    """
+    Завантажити документи з позиціями двома запитами: {id: документ}.
+    criteria — додаткові умови (майданчик); відсіяні документи run_batch звітує як ненайдені.
+    """
+    docs = db.query(model).options(selectinload(model.items)).filter(model.id.in_(ids), *criteria).all()
+    return {d.id: d for d in docs}
+
+
+def run_batch(
+    db: Session,
+    documents: dict,
+    ids: list[int],
+    mode: str,
+    post: Callable,
+    posting: StockPosting,
+    idem=None,
+) -> dict:
+    """
+    Провести набір документів у одній транзакції.
+
+    post(doc) перевіряє документ і проводить його через posting; при помилці
+    кидає HTTPException ще до будь-яких змін. У режимі all_or_nothing будь-яка
+    помилка відкочує весь набір, у best_effort — проводяться всі коректні документи.
+    idem (Idempotency) зберігає відповідь разом із проведенням; відкочений набір
+    не зберігається — повтор з тим самим ключем виконається заново.
+    """
+    results = []
+    for doc_id in dict.fromkeys(ids):
+        doc = documents.get(doc_id)
+        if doc is None:
+            results.append({"id": doc_id, "number": None, "status": "failed", "detail": "Документ не знайдено"})
+            continue
+        try:
+            post(doc)
+        except HTTPException as e:
+            results.append({"id": doc_id, "number": doc.number, "status": "failed", "detail": str(e.detail)})
+            continue
+        results.append({"id": doc_id, "number": doc.number, "status": "confirmed", "detail": None})
+
+    failed_count = sum(1 for r in results if r["status"] == "failed")
+    rolled_back = failed_count > 0 and mode == "all_or_nothing"
+    if rolled_back:
+        db.rollback()
+        for r in results:
+            if r["status"] == "confirmed":
+                r["status"] = "rolled_back"
+
+    response = {
+        "mode": mode,
+        "confirmed_count": sum(1 for r in results if r["status"] == "confirmed"),
+        "failed_count": failed_count,
+        "results": results,
+    }
+    if not rolled_back:
+        posting.flush()
+        if idem is not None:
+            idem.save(db, response)
+        db.commit()
+    return response
@@ -0,0 +1,124 @@
+"""
+Кеш довідників у пам'яті процесу: підрозділи, одиниці виміру, категорії, ролі, майданчики.
+
+Довідники змінюються рідко, а читаються майже в кожному запиті (перевірка ролі
+в deps, назви підрозділів і одиниць у звітах). Кеш тримає знімок кожного
+довідника — записи з атрибутами колонок (не ORM-об'єкти, їх можна віддавати
+з будь-якої сесії) — і його версію: хеш вмісту, він же ETag для HTTP.
+
+Інвалідація:
+  - автоматично: сесія, що змінила Department/Unit/ProductCategory/Role
+    (будь-який endpoint, включно з автостворенням підрозділу в transport),
+    скидає відповідні довідники після commit;
+  - lookup() за id, якого немає в знімку, перечитує довідник (запис міг
+    створити інший процес);
+  - REFCACHE_TTL_SECONDS — межа застарілості для змін, зроблених іншими процесами
+    (services/cache_sync.py); знімок, прочитаний до інвалідації, не зберігається.
+Версія — хеш вмісту, тож ETag однаковий у всіх процесах з однаковими даними.
+"""
+import hashlib
+import json
+import time
+from types import SimpleNamespace
+
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.department import Department
+from app.models.product import ProductCategory, Unit
+from app.models.site import Site
+from app.models.user import Role
+from app.services.cache_sync import Generation, track_commits
+
+KINDS = {
+    "departments": Department,
+    "units": Unit,
+    "categories": ProductCategory,
+    "roles": Role,
+    "sites": Site,
+}
+_KIND_BY_MODEL = {model: kind for kind, model in KINDS.items()}
+
+_generation = Generation()
+_lock = _generation.lock
+_snapshots: dict[str, dict] = {}  # kind -> {"rows": {id: record}, "etag": str, "expires": float}
+
+
+def _load(db: Session, kind: str) -> dict:
+    model = KINDS[kind]
+    columns = [c.key for c in model.__mapper__.column_attrs]
+    rows = {
+        obj.id: SimpleNamespace(**{c: getattr(obj, c) for c in columns})
+        for obj in db.query(model).order_by(model.id).all()
+    }
+    digest = hashlib.sha1(
+        json.dumps([vars(r) for r in rows.values()], default=str, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()[:16]
+    return {
+        "rows": rows,
+        "etag": f'"{kind}-{digest}"',
+        "expires": time.monotonic() + settings.REFCACHE_TTL_SECONDS,
+    }
+
+
+def _snapshot(db: Session, kind: str, reload: bool = False) -> dict:
+    with _lock:
+        snapshot = _snapshots.get(kind)
+        if snapshot is not None and not reload and snapshot["expires"] > time.monotonic():
+            return snapshot
+        seen = _generation.current()
+    snapshot = _load(db, kind)
+    with _lock:
+        if _generation.is_current(seen):
+            _snapshots[kind] = snapshot
+    return snapshot
+
+
+def get_all(db: Session, kind: str) -> dict[int, SimpleNamespace]:
+    """Усі записи довідника {id: запис}, включно з неактивними."""
+    return _snapshot(db, kind)["rows"]
+
+
+def lookup(db: Session, kind: str, row_id: int | None) -> SimpleNamespace | None:
+    """Запис довідника за id або None. Невідомий id — перечитати довідник один раз."""
+    if row_id is None:
+        return None
+    rows = get_all(db, kind)
+    if row_id not in rows:
+        rows = _snapshot(db, kind, reload=True)["rows"]
+    return rows.get(row_id)
+
+
+def etag(db: Session, kind: str) -> str:
+    return _snapshot(db, kind)["etag"]
+
+
+def invalidate(*kinds: str) -> None:
+    """Скинути знімки (без аргументів — усі)."""
+    with _lock:
+        _generation.bump()
+        for kind in kinds or tuple(_snapshots):
+            _snapshots.pop(kind, None)
+
+
+def not_modified(request: Request, response: Response, db: Session, kind: str,
+                 variant: str | None = None) -> Response | None:
+    """
+    Умовний GET довідника: 304, якщо If-None-Match збігається з версією;
+    інакше ставить ETag на відповідь і повертає None.
+    variant — частина відповіді (напр. підрозділи одного майданчика): власний ETag.
+    """
+    tag = etag(db, kind)
+    if variant:
+        tag = f'{tag[:-1]}-{variant}"'
+    headers = {"ETag": tag, "Cache-Control": "private, no-cache"}  # no-cache: завжди перевіряти ETag
+    if tag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+# ─── Автоінвалідація ────────────────────────────────────────────────
+
+track_commits("refcache", lambda obj: _KIND_BY_MODEL.get(type(obj)), lambda kinds: invalidate(*kinds))
@@ -0,0 +1,63 @@
+"""
+Звірка резервів залишків з відкритими чернетками.
+
+reserved_quantity підтримується інкрементально (створення/скасування/проведення
+чернеток), але після ручних правок БД, збоїв або чернеток, створених до появи
+резервування, лічильник може розійтися. rebuild_reservations перераховує його
+з нуля по всіх чернетках переміщень (підрозділ-джерело) і списань.
+"""
+from decimal import Decimal
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from app.models.inventory import Inventory
+from app.models.transfer import Transfer, TransferItem
+from app.models.writeoff import WriteOff, WriteOffItem
+
+
+def expected_reservations(db: Session) -> dict[tuple[int, int], Decimal]:
+    """Сума кількостей чернеток по (product_id, department_id) — двома агрегатами."""
+    expected: dict[tuple[int, int], Decimal] = {}
+    queries = (
+        db.query(TransferItem.product_id, Transfer.from_department_id, func.sum(TransferItem.quantity))
+        .join(Transfer, TransferItem.transfer_id == Transfer.id)
+        .filter(Transfer.status == "draft")
+        .group_by(TransferItem.product_id, Transfer.from_department_id),
+        db.query(WriteOffItem.product_id, WriteOff.department_id, func.sum(WriteOffItem.quantity))
+        .join(WriteOff, WriteOffItem.writeoff_id == WriteOff.id)
+        .filter(WriteOff.status == "draft")
+        .group_by(WriteOffItem.product_id, WriteOff.department_id),
+    )
+    for query in queries:
+        for product_id, department_id, quantity in query.all():
+            key = (product_id, department_id)
+            expected[key] = expected.get(key, Decimal(0)) + Decimal(str(quantity or 0))
+    return expected
+
+
+def rebuild_reservations(db: Session) -> int:
+    """
+    Привести reserved_quantity у відповідність до відкритих чернеток (з commit).
+
+    Повертає кількість виправлених рядків inventory.
+    """
+    expected = expected_reservations(db)
+
+    # Рядки під чернетки + рядки з резервом, під який вже немає чернеток
+    condition = Inventory.reserved_quantity != 0
+    if expected:
+        condition = or_(condition, and_(
+            Inventory.product_id.in_({p for p, _ in expected}),
+            Inventory.department_id.in_({d for _, d in expected}),
+        ))
+
+    fixed = 0
+    for inv in db.query(Inventory).filter(condition).all():
+        target = expected.get((inv.product_id, inv.department_id), Decimal(0))
+        if inv.reserved_quantity != target:
+            inv.reserved_quantity = target
+            fixed += 1
+
+    db.commit()
+    return fixed
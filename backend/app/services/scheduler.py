@@ -4,12 +4,28 @@
 Розклад:
   - Щопонеділка о 9:00 (Europe/Kiev) — нагадування перевірити залишки
   - Остання п'ятниця місяця о 9:00 — звіт про низькі залишки
+  - Щодня о 3:00 і при старті — звірка резервів з відкритими чернетками
+  - Щодня о 3:10 і при старті — перерахунок індексу низьких залишків
+  - Щогодини — видалення прострочених Idempotency-Key
+  - Кожні OUTBOX_POLL_SECONDS і одразу після commit з подіями — доставка outbox
+    (commit в іншому процесі лідер помічає за OUTBOX_WAKE_POLL_SECONDS)
+  - Щодня о 3:20 — видалення історії запусків старшої за SCHEDULER_HISTORY_DAYS
+  - Щодня о 3:30 — архівація місяців журналу дій старших за AUDIT_ARCHIVE_AFTER_MONTHS
+
+Планувальник працює в кожному процесі, але задачі виконує лише лідер
+(services/leader.py). Кожен запуск задачі лідером записується в
+scheduler_job_runs (статус, тривалість, помилка) — див. /system/jobs.
 """
+import functools
 import logging
-from datetime import date, timedelta
+import time
+from datetime import date, datetime, timedelta, timezone
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -21,36 +37,73 @@ def _get_db():
     return SessionLocal()
 
 
-def build_low_stock_report(db) -> str | None:
-    """Повертає текст про низькі залишки або None якщо таких немає."""
-    from app.models.inventory import Inventory
-    from app.models.product import Product
-    from app.models.department import Department
-
-    rows = (
-        db.query(Inventory, Product, Department)
-        .join(Product, Inventory.product_id == Product.id)
-        .join(Department, Inventory.department_id == Department.id)
-        .filter(
-            Product.min_stock_level > 0,
-            Inventory.quantity < Product.min_stock_level,
-        )
-        .order_by(Inventory.quantity)
-        .all()
-    )
+def _record_run(name: str, worker: str, started_at: datetime, duration_ms: int, error: str | None) -> None:
+    from app.models.scheduler import SchedulerJobRun
+    db = _get_db()
+    try:
+        db.add(SchedulerJobRun(
+            job_id=name,
+            worker=worker,
+            status="error" if error else "success",
+            started_at=started_at,
+            finished_at=datetime.now(timezone.utc),
+            duration_ms=duration_ms,
+            error=error,
+        ))
+        db.commit()
+    except Exception as e:
+        logger.warning(f"Scheduler: не вдалося записати запуск {name} — {e}")
+    finally:
+        db.close()
+
+
+def leader_job(name: str, record_idle: bool = True):
+    """
+    Виконувати задачу лише в процесі-лідері і записувати запуск в історію.
+
+    record_idle=False — не записувати запуски, що повернули 0 (часті опитування без роботи).
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper():
+            from app.services.leader import elector
+            if not elector.is_leader:
+                return None
+            started_at = datetime.now(timezone.utc)
+            t0 = time.monotonic()
+            result, error = None, None
+            try:
+                result = fn()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"[:2000]
+                logger.error(f"Scheduler {name} error: {e}")
+            duration_ms = int((time.monotonic() - t0) * 1000)
+            if error or record_idle or result:
+                _record_run(name, elector.worker_id, started_at, duration_ms, error)
+            return result
+        wrapper.job_name = name
+        return wrapper
+    return decorator
+
 
+def build_low_stock_report(db, site_id: int | None = None) -> str | None:
+    """Повертає текст про низькі залишки (site_id — лише майданчика) або None якщо таких немає (з індексу low_stock_items)."""
+    from app.services.low_stock import low_stock_rows
+
+    rows = low_stock_rows(db, site_id=site_id)
     if not rows:
         return None
 
     lines = [f"<b>Низькі залишки — {len(rows)} поз.:</b>"]
-    for inv, prod, dept in rows:
-        qty = float(inv.quantity)
-        min_qty = float(prod.min_stock_level)
+    for entry, prod, dept in rows:
+        qty = float(entry.quantity)
+        min_qty = float(entry.min_stock_level)
         lines.append(f"  • {prod.name} ({dept.name}): {qty:.2f} / мін {min_qty:.2f} {prod.unit or ''}")
 
     return "\n".join(lines)
 
 
+@leader_job("weekly_stock_report")
 def job_weekly_reminder():
     """Щопонеділкове нагадування перевірити залишки."""
     logger.info("Scheduler: тижневе нагадування про залишки")
@@ -59,6 +112,7 @@ def job_weekly_reminder():
     send_telegram(f"Нагадування: перевір залишки на початок тижня\n{today_str}")
 
 
+@leader_job("monthly_friday_check")
 def job_friday_check():
     """Кожну п'ятницю: якщо остання п'ятниця місяця — надіслати low-stock звіт."""
     today = date.today()
@@ -76,13 +130,175 @@ def job_friday_check():
         else:
             text = f"Кінець місяця — залишки в нормі\n{today_str}"
         send_telegram(text)
-    except Exception as e:
-        logger.error(f"Scheduler friday check error: {e}")
     finally:
         db.close()
 
 
+@leader_job("reconcile_reservations")
+def job_reconcile_reservations():
+    """Перерахувати reserved_quantity з відкритих чернеток переміщень і списань."""
+    db = _get_db()
+    try:
+        from app.services.posting import run_with_retry
+        from app.services.reservations import rebuild_reservations
+        fixed = run_with_retry(db, lambda: rebuild_reservations(db))
+        if fixed:
+            logger.warning(f"Scheduler: виправлено резерви у {fixed} рядках inventory")
+    finally:
+        db.close()
+
+
+@leader_job("rebuild_low_stock")
+def job_rebuild_low_stock():
+    """Перерахувати індекс низьких залишків (виправляє ручні правки БД в обхід проведення)."""
+    db = _get_db()
+    try:
+        from app.services.low_stock import rebuild_low_stock
+        fixed = rebuild_low_stock(db)
+        if fixed:
+            logger.info(f"Scheduler: індекс низьких залишків — виправлено {fixed} записів")
+    finally:
+        db.close()
+
+
+@leader_job("purge_idempotency_keys")
+def job_purge_idempotency_keys():
+    """Видалити збережені відповіді Idempotency-Key старші за IDEMPOTENCY_TTL_HOURS."""
+    db = _get_db()
+    try:
+        from app.services.idempotency import purge_expired
+        deleted = purge_expired(db)
+        if deleted:
+            logger.info(f"Scheduler: видалено {deleted} прострочених Idempotency-Key")
+    finally:
+        db.close()
+
+
+@leader_job("outbox_dispatch", record_idle=False)
+def job_dispatch_outbox():
+    """Доставити накопичені події outbox зареєстрованим обробникам."""
+    db = _get_db()
+    try:
+        from app.services.outbox import dispatch_all
+        import app.services.event_handlers  # noqa: F401 — реєстрація обробників
+        return dispatch_all(db)
+    finally:
+        db.close()
+
+
+@leader_job("outbox_wake", record_idle=False)
+def job_outbox_wake():
+    """
+    Нові події з інших процесів: їхній commit будить лише власний диспетчер, а доставляє
+    лідер — тому лідер часто й дешево перевіряє чергу і будить доставку сам.
+    """
+    db = _get_db()
+    try:
+        from app.services.outbox import has_fresh_events
+        if has_fresh_events(db):
+            wake_outbox_dispatcher()
+    finally:
+        db.close()
+
+
+@leader_job("purge_job_runs")
+def job_purge_job_runs():
+    """Видалити історію запусків задач старшу за SCHEDULER_HISTORY_DAYS."""
+    from app.models.scheduler import SchedulerJobRun
+    db = _get_db()
+    try:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=settings.SCHEDULER_HISTORY_DAYS)
+        deleted = db.query(SchedulerJobRun).filter(
+            SchedulerJobRun.started_at < cutoff
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+
+@leader_job("archive_audit_log")
+def job_archive_audit_log():
+    """Перенести старі місяці журналу дій у стиснений архів."""
+    db = _get_db()
+    try:
+        from app.services.audit import archive_old_months
+        archived = archive_old_months(db)
+        if archived:
+            logger.info(f"Scheduler: архівовано журнал дій — {archived}")
+        return sum(archived.values())
+    finally:
+        db.close()
+
+
+def job_leader_heartbeat():
+    """Захопити/продовжити лідерство (виконується в кожному процесі)."""
+    from app.services.leader import elector
+    elector.heartbeat()
+
+
+def wake_outbox_dispatcher():
+    """Запустити доставку outbox зараз (викликається після commit з новими подіями)."""
+    if not scheduler.running:
+        return
+    job = scheduler.get_job("outbox_dispatch")
+    if job is not None:
+        job.modify(next_run_time=datetime.now(scheduler.timezone))
+
+
+def jobs_overview(db) -> dict:
+    """Лідер, розклад задач цього процесу і останній запуск кожної задачі з історії."""
+    from sqlalchemy import case, func
+    from app.models.scheduler import SchedulerJobRun
+    from app.services.leader import current_leader, elector
+
+    stats = {
+        job_id: {"runs": runs, "errors": errors or 0, "avg_duration_ms": float(avg or 0)}
+        for job_id, runs, errors, avg in db.query(
+            SchedulerJobRun.job_id,
+            func.count(SchedulerJobRun.id),
+            func.sum(case((SchedulerJobRun.status == "error", 1), else_=0)),
+            func.avg(SchedulerJobRun.duration_ms),
+        ).group_by(SchedulerJobRun.job_id).all()
+    }
+    last_ids = db.query(func.max(SchedulerJobRun.id)).group_by(SchedulerJobRun.job_id)
+    last_runs = {
+        run.job_id: run
+        for run in db.query(SchedulerJobRun).filter(SchedulerJobRun.id.in_(last_ids)).all()
+    }
+
+    jobs = []
+    for job in scheduler.get_jobs() if scheduler.running else []:
+        if job.id == "leader_heartbeat":
+            continue
+        history_id = getattr(job.func, "job_name", job.id)
+        jobs.append({
+            "id": job.id,
+            "next_run_time": job.next_run_time,
+            "last_run": last_runs.get(history_id),
+            **stats.get(history_id, {"runs": 0, "errors": 0, "avg_duration_ms": 0.0}),
+        })
+    return {
+        "worker": elector.worker_id,
+        "is_leader": elector.is_leader,
+        "lock_mode": elector.mode,
+        "leader": current_leader(db),
+        "jobs": jobs,
+    }
+
+
 def start_scheduler():
+    from app.services.leader import elector
+    # Вибори до старту — щоб одноразові задачі при старті виконав уже відомий лідер
+    elector.heartbeat()
+    scheduler.add_job(
+        job_leader_heartbeat,
+        IntervalTrigger(seconds=max(settings.SCHEDULER_LEASE_SECONDS // 3, 1)),
+        id="leader_heartbeat",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
     scheduler.add_job(
         job_weekly_reminder,
         CronTrigger(day_of_week="mon", hour=9, minute=0, timezone="Europe/Kiev"),
@@ -97,11 +313,71 @@ def start_scheduler():
         replace_existing=True,
         misfire_grace_time=3600,
     )
+    scheduler.add_job(
+        job_reconcile_reservations,
+        CronTrigger(hour=3, minute=0, timezone="Europe/Kiev"),
+        id="reconcile_reservations",
+        replace_existing=True,
+        misfire_grace_time=3600,
+    )
+    scheduler.add_job(
+        job_rebuild_low_stock,
+        CronTrigger(hour=3, minute=10, timezone="Europe/Kiev"),
+        id="rebuild_low_stock",
+        replace_existing=True,
+        misfire_grace_time=3600,
+    )
+    scheduler.add_job(
+        job_purge_idempotency_keys,
+        CronTrigger(minute=15, timezone="Europe/Kiev"),
+        id="purge_idempotency_keys",
+        replace_existing=True,
+        misfire_grace_time=3600,
+    )
+    scheduler.add_job(
+        job_purge_job_runs,
+        CronTrigger(hour=3, minute=20, timezone="Europe/Kiev"),
+        id="purge_job_runs",
+        replace_existing=True,
+        misfire_grace_time=3600,
+    )
+    scheduler.add_job(
+        job_archive_audit_log,
+        CronTrigger(hour=3, minute=30, timezone="Europe/Kiev"),
+        id="archive_audit_log",
+        replace_existing=True,
+        misfire_grace_time=3600,
+    )
+    scheduler.add_job(
+        job_dispatch_outbox,
+        IntervalTrigger(seconds=settings.OUTBOX_POLL_SECONDS),
+        id="outbox_dispatch",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+    scheduler.add_job(
+        job_outbox_wake,
+        IntervalTrigger(seconds=settings.OUTBOX_WAKE_POLL_SECONDS),
+        id="outbox_wake",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+    # Одноразова звірка при старті (чернетки, створені до появи резервування)
+    scheduler.add_job(job_reconcile_reservations, id="reconcile_reservations_startup", replace_existing=True)
+    # Перше наповнення індексу низьких залишків (і звірка після простою)
+    scheduler.add_job(job_rebuild_low_stock, id="rebuild_low_stock_startup", replace_existing=True)
     scheduler.start()
-    logger.info("Scheduler started: weekly Mon 9:00 + last-Friday monthly 9:00 (Europe/Kiev)")
+    logger.info(
+        "Scheduler started: weekly Mon 9:00 + last-Friday monthly 9:00 + daily reservations 3:00 (Europe/Kiev); "
+        f"worker {elector.worker_id} {'is leader' if elector.is_leader else 'is standby'}"
+    )
 
 
 def stop_scheduler():
+    from app.services.leader import elector
     if scheduler.running:
         scheduler.shutdown(wait=False)
         logger.info("Scheduler stopped")
+    elector.release()
@@ -0,0 +1,479 @@
+"""
+Повнотекстовий пошук з автодоповненням і стійкістю до одруківок.
+
+Індекси (створюються при старті, ensure_search_indexes):
+  - SQLite: FTS5-таблиця <table>_fts з tokenize='trigram' (регістронезалежна для
+    кирилиці) у режимі external content; тригери на INSERT/UPDATE/DELETE тримають
+    її в синхроні з основною таблицею, включно з правками в обхід ORM.
+  - PostgreSQL: pg_trgm і GIN-індекси (gin_trgm_ops) по lower(колонка) —
+    звичайні індекси, синхронні з таблицею автоматично.
+Якщо розширення недоступне — пошук працює через LIKE (повільніше, без одруківок).
+
+Глобальний пошук (global_search) паралельно опитує групи: документи — за
+префіксом номера через їхні унікальні індекси number, постачальників і товари —
+через текстові індекси. Групи, що не вклалися в SEARCH_BUDGET_MS, повертаються
+порожніми з complete=False.
+
+Пошук двоетапний: спочатку точний збіг усіх слів запиту (швидкий і вибірковий),
+і лише якщо результатів замало — нечіткий (будь-які спільні триграми; збіги зі
+схожістю слів нижче FUZZY_MIN_SIMILARITY відкидаються як шум). Кандидати (не
+більше CANDIDATE_LIMIT) ранжуються в Python за схожістю триграм з бонусами за
+збіг префікса коду/назви.
+"""
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session, selectinload
+
+from app.config import settings
+from app.database import SessionLocal, engine, is_sqlite
+from app.models.inventory_count import InventoryCount
+from app.models.product import Product
+from app.models.purchase import Purchase
+from app.models.supplier import Supplier
+from app.models.transfer import Transfer
+from app.models.writeoff import WriteOff
+from app.services.sites import document_scope
+
+logger = logging.getLogger(__name__)
+
+CANDIDATE_LIMIT = 200
+# Мінімальна схожість слів для нечітких збігів (нижче — випадкові спільні триграми)
+FUZZY_MIN_SIMILARITY = 0.3
+
+# Таблиця -> колонки, що індексуються для пошуку
+TEXT_INDEXES: dict[str, tuple[str, ...]] = {
+    "products": ("name", "code"),
+    "suppliers": ("name", "code", "tax_id"),
+}
+
+_backend: str | None = None  # "fts5" | "trgm" | None (LIKE)
+_APOSTROPHES = re.compile(r"[ʼ’`´]")
+
+
+def normalize(value: str | None) -> str:
+    """Нижній регістр, єдиний апостроф, стиснуті пробіли."""
+    return " ".join(_APOSTROPHES.sub("'", value or "").lower().split())
+
+
+def _trigrams(value: str) -> set[str]:
+    grams: set[str] = set()
+    for word in value.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(query: str, value: str) -> float:
+    """Схожість за триграмами (як pg_trgm similarity): 0..1."""
+    a, b = _trigrams(query), _trigrams(value)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def word_similarity(query: str, value: str) -> float:
+    """Середня по словах запиту найкраща схожість з будь-яким словом value — одруківка в одному слові не топить решту."""
+    words, targets = query.split(), value.split()
+    if not words or not targets:
+        return 0.0
+    return sum(max(similarity(w, t) for t in targets) for w in words) / len(words)
+
+
+def rank(query: str, code: str | None, name: str | None) -> float:
+    """Оцінка збігу запиту з кодом і назвою (більше — краще)."""
+    q, code_n, name_n = normalize(query), normalize(code), normalize(name)
+    score = max(word_similarity(q, name_n), word_similarity(q, code_n))
+    if code_n.startswith(q):
+        score += 1.0
+    elif name_n.startswith(q):
+        score += 0.5
+    if all(word in name_n or word in code_n for word in q.split()):
+        score += 0.5
+    return round(score, 4)
+
+
+# ─── Індекси ────────────────────────────────────────────────────────
+
+def _fts_sql(table: str, columns: tuple[str, ...]) -> list[str]:
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    new_values = ", ".join(f"new.{c}" for c in columns)
+    old_values = ", ".join(f"old.{c}" for c in columns)
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values});"
+    insert_new = f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN {delete_old} {insert_new} END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def ensure_search_indexes() -> None:
+    """Створити пошукові індекси, яких ще немає (idempotent)."""
+    global _backend
+    try:
+        if is_sqlite:
+            with engine.begin() as conn:
+                existing = {
+                    name for (name,) in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))
+                }
+                for table, columns in TEXT_INDEXES.items():
+                    if f"{table}_fts" not in existing:
+                        for statement in _fts_sql(table, columns):
+                            conn.execute(text(statement))
+            _backend = "fts5"
+        else:
+            with engine.begin() as conn:
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                for table, columns in TEXT_INDEXES.items():
+                    for column in columns:
+                        conn.execute(text(
+                            f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_trgm "
+                            f"ON {table} USING gin (lower({column}) gin_trgm_ops)"
+                        ))
+            _backend = "trgm"
+    except Exception as e:
+        _backend = None
+        logger.warning(f"Пошукові індекси недоступні, пошук через LIKE: {e}")
+
+
+# ─── Кандидати ──────────────────────────────────────────────────────
+
+def _phrase(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+
+def _like_conditions(words: list[str], columns: tuple[str, ...], params: dict) -> list[str]:
+    """Кожне слово — підрядок хоча б однієї колонки (LIKE, для SQLite ще й з великої літери)."""
+    conditions = []
+    for i, word in enumerate(words):
+        params[f"like{i}"] = f"%{word}%"
+        params[f"cap{i}"] = f"%{word.capitalize()}%"  # SQLite LIKE не знає регістру кирилиці
+        conditions.append("(" + " OR ".join(
+            f"t.{c} LIKE :like{i} OR t.{c} LIKE :cap{i}" for c in columns
+        ) + ")")
+    return conditions
+
+
+def match_ids(
+    db: Session,
+    table: str,
+    query: str,
+    where: list[str] | None = None,
+    params: dict | None = None,
+    fuzzy: bool = False,
+    limit: int = CANDIDATE_LIMIT,
+) -> list[int]:
+    """
+    id рядків table, що відповідають запиту, у порядку релевантності індексу.
+
+    where — додаткові умови по основній таблиці (аліас t), params — їх параметри.
+    fuzzy=False — усі слова запиту мають входити в текст; True — достатньо спільних триграм.
+    """
+    columns = TEXT_INDEXES[table]
+    q = normalize(query)
+    words = q.split()
+    if not words:
+        return []
+    params = dict(params or {}, limit=limit)
+    conditions = list(where or [])
+
+    long_words = [w for w in words if len(w) >= 3]
+    if _backend == "fts5" and long_words:
+        if fuzzy:
+            match = " OR ".join(_phrase(g.strip()) for g in _trigrams(" ".join(long_words)) if len(g.strip()) == 3)
+        else:
+            match = " AND ".join(_phrase(w) for w in long_words)
+        # Слова коротші за триграму індекс не знайде — перевіряємо їх через LIKE
+        conditions += _like_conditions([w for w in words if len(w) < 3], columns, params)
+        fts = f"{table}_fts"
+        sql = (
+            f"SELECT t.id FROM {fts} JOIN {table} t ON t.id = {fts}.rowid "
+            f"WHERE {fts} MATCH :match {''.join(' AND ' + c for c in conditions)} "
+            f"ORDER BY bm25({fts}) LIMIT :limit"
+        )
+        params["match"] = match
+    elif _backend == "trgm":
+        params["q"] = q
+        word_match = []
+        for i, word in enumerate(words):
+            params[f"like{i}"] = f"%{word}%"
+            word_match.append("(" + " OR ".join(f"lower(t.{c}) LIKE :like{i}" for c in columns) + ")")
+        text_match = " AND ".join(word_match)
+        if fuzzy:
+            text_match = " OR ".join([text_match] + [f":q <% lower(t.{c})" for c in columns])
+        conditions.append(f"({text_match})")
+        score = "greatest(" + ", ".join(f"word_similarity(:q, lower(t.{c}))" for c in columns) + ")"
+        sql = f"SELECT t.id FROM {table} t WHERE {' AND '.join(conditions)} ORDER BY {score} DESC LIMIT :limit"
+    else:
+        # Без індексу або лише короткі слова (< 3 символів — менше за триграму)
+        conditions += _like_conditions(words, columns, params)
+        sql = f"SELECT t.id FROM {table} t WHERE {' AND '.join(conditions)} ORDER BY t.id LIMIT :limit"
+
+    return [row_id for (row_id,) in db.execute(text(sql), params)]
+
+
+def _candidates(
+    db: Session, table: str, query: str, where: list[str], params: dict, limit: int,
+) -> tuple[list[int], set[int]]:
+    """Двоетапний відбір: (id кандидатів, id з точного етапу)."""
+    exact = match_ids(db, table, query, where, params)
+    ids = list(exact)
+    if len(ids) < limit:
+        seen = set(ids)
+        ids += [i for i in match_ids(db, table, query, where, params, fuzzy=True) if i not in seen]
+    return ids, set(exact)
+
+
+def _relevant(query: str, exact: bool, *values: str | None) -> bool:
+    """Точний збіг або нечіткий, але не випадковий (схожість слів ≥ FUZZY_MIN_SIMILARITY)."""
+    if exact:
+        return True
+    q = normalize(query)
+    return max(word_similarity(q, normalize(v)) for v in values) >= FUZZY_MIN_SIMILARITY
+
+
+# ─── Товари ─────────────────────────────────────────────────────────
+
+def search_products(
+    db: Session,
+    query: str,
+    limit: int = 20,
+    active_only: bool = True,
+    product_type: str | None = None,
+) -> list[tuple[Product, float]]:
+    """Товари за назвою або кодом: [(product, score)] від найкращого збігу."""
+    where, params = [], {}
+    if active_only:
+        where.append("t.is_active = :active")
+        params["active"] = True
+    if product_type:
+        where.append("t.product_type = :product_type")
+        params["product_type"] = product_type
+
+    ids, exact = _candidates(db, "products", query, where, params, limit)
+    if not ids:
+        return []
+
+    products = (
+        db.query(Product)
+        .options(selectinload(Product.category), selectinload(Product.unit))
+        .filter(Product.id.in_(ids))
+        .all()
+    )
+    ranked = sorted(
+        (
+            (p, rank(query, p.code, p.name)) for p in products
+            if _relevant(query, p.id in exact, p.name, p.code)
+        ),
+        key=lambda pair: (-pair[1], pair[0].name),
+    )
+    return ranked[:limit]
+
+
+# ─── Постачальники ──────────────────────────────────────────────────
+
+def search_suppliers(
+    db: Session,
+    query: str,
+    limit: int = 20,
+    active_only: bool = True,
+) -> list[tuple[Supplier, float]]:
+    """Постачальники за назвою, кодом або ЄДРПОУ: [(supplier, score)] від найкращого збігу."""
+    where, params = [], {}
+    if active_only:
+        where.append("t.is_active = :active")
+        params["active"] = True
+
+    ids, exact = _candidates(db, "suppliers", query, where, params, limit)
+    if not ids:
+        return []
+
+    suppliers = db.query(Supplier).filter(Supplier.id.in_(ids)).all()
+    ranked = sorted(
+        (
+            (s, max(rank(query, s.code, s.name), rank(query, s.tax_id, s.name))) for s in suppliers
+            if _relevant(query, s.id in exact, s.name, s.code, s.tax_id)
+        ),
+        key=lambda pair: (-pair[1], pair[0].name),
+    )
+    return ranked[:limit]
+
+
+# ─── Документи ──────────────────────────────────────────────────────
+
+# Тип -> (модель, префікс номера, назва групи)
+DOCUMENT_TYPES = {
+    "purchase": (Purchase, "PUR", "Закупівлі"),
+    "transfer": (Transfer, "TRF", "Переміщення"),
+    "writeoff": (WriteOff, "WRT", "Списання"),
+    "inventory_count": (InventoryCount, "INV", "Інвентаризації"),
+}
+
+
+def _number_prefix(query: str, code: str) -> str | None:
+    """
+    Префікс номера документа для запиту або None, якщо запит не схожий на номер.
+
+    "TRF-20260214-007", "trf-2026", "TR" — як є; "20260214-007" — з префіксом типу.
+    """
+    q = "".join(query.upper().split())
+    if not q:
+        return None
+    if q.startswith(code) or code.startswith(q):
+        return q
+    if q[0].isdigit():
+        return f"{code}-{q}"
+    return None
+
+
+def search_documents(
+    db: Session, doc_type: str, query: str, limit: int = 20, department_id: int | None = None,
+    site_id: int | None = None,
+) -> list[tuple[object, float]]:
+    """
+    Документи типу doc_type, чий номер починається із запиту, новіші першими.
+    department_id — лише документи підрозділу (обмеження ролі викликача);
+    site_id — лише документи підрозділів майданчика.
+
+    Пошук за префіксом — діапазон number >= p AND number < p' по унікальному індексу
+    (на відміну від LIKE, використовує індекс і в SQLite, і в PostgreSQL).
+    """
+    model, code, _ = DOCUMENT_TYPES[doc_type]
+    prefix = _number_prefix(query, code)
+    if prefix is None:
+        return []
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    documents = (
+        db.query(model)
+        .filter(
+            model.number >= prefix,
+            model.number < upper,
+            # Діапазон задає індекс; LIKE відсікає зайве, якщо колація PostgreSQL ігнорує "-"
+            model.number.like(re.sub(r"([%_\\])", r"\\\1", prefix) + "%", escape="\\"),
+            *document_scope(model, site_id),
+        )
+    )
+    if department_id is not None:
+        documents = documents.filter(model.department_id == department_id)
+    documents = (
+        documents
+        .order_by(model.number.desc())
+        .limit(limit)
+        .all()
+    )
+    return [(doc, round(1.0 + len(prefix) / len(doc.number), 4)) for doc in documents]
+
+
+# ─── Глобальний пошук ───────────────────────────────────────────────
+
+SEARCH_GROUPS = ("purchase", "transfer", "writeoff", "inventory_count", "supplier", "product")
+GROUP_LABELS = {
+    **{doc_type: label for doc_type, (_, _, label) in DOCUMENT_TYPES.items()},
+    "supplier": "Постачальники",
+    "product": "Товари",
+}
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        # Кожна група тримає з'єднання на час запиту — не більше SEARCH_WORKERS одночасно
+        _executor = ThreadPoolExecutor(max_workers=settings.SEARCH_WORKERS, thread_name_prefix="search")
+    return _executor
+
+
+def _hit(group: str, obj, score: float) -> dict:
+    if group == "supplier":
+        subtitle = " · ".join(filter(None, [obj.code, obj.tax_id and f"ЄДРПОУ {obj.tax_id}"]))
+        return {"type": group, "id": obj.id, "title": obj.name, "subtitle": subtitle, "score": score}
+    if group == "product":
+        subtitle = " · ".join(filter(None, [obj.code, obj.unit.short_name if obj.unit else None]))
+        return {"type": group, "id": obj.id, "title": obj.name, "subtitle": subtitle, "score": score}
+    return {
+        "type": group,
+        "id": obj.id,
+        "title": obj.number,
+        "subtitle": f"{obj.date:%d.%m.%Y} · {obj.status}",
+        "score": score,
+        "date": obj.date,
+        "status": obj.status,
+    }
+
+
+def _search_group(group: str, query: str, limit: int, deadline: float, department_id: int | None,
+                  site_id: int | None) -> list[dict]:
+    """Одна група у власній сесії (виконується в пулі потоків)."""
+    if time.monotonic() >= deadline:
+        return []  # бюджет вичерпано ще в черзі — не займаємо з'єднання
+    db = SessionLocal()
+    try:
+        if group == "supplier":
+            found = search_suppliers(db, query, limit=limit)
+        elif group == "product":
+            found = search_products(db, query, limit=limit)
+        else:
+            found = search_documents(db, group, query, limit=limit, department_id=department_id, site_id=site_id)
+        return [_hit(group, obj, score) for obj, score in found]
+    finally:
+        db.close()
+
+
+def global_search(
+    query: str,
+    groups: list[str] | None = None,
+    limit: int = 5,
+    budget_ms: int | None = None,
+    departments: dict[str, int] | None = None,
+    site_id: int | None = None,
+) -> dict:
+    """
+    Пошук по документах, постачальниках і товарах одночасно.
+
+    groups — лише дозволені викликачу групи (права перевіряє endpoint);
+    departments — {група: підрозділ} для груп, обмежених підрозділом користувача;
+    site_id — документи лише цього майданчика (постачальники і товари спільні).
+
+    Групи виконуються паралельно; що не встигло за budget_ms — повертається
+    порожнім з complete=False (запит у потоці доробляє і закриває сесію сам).
+    Групи впорядковані за найкращим збігом.
+    """
+    started = time.monotonic()
+    budget = (budget_ms or settings.SEARCH_BUDGET_MS) / 1000
+    deadline = started + budget
+    executor = _get_executor()
+    futures = {
+        group: executor.submit(_search_group, group, query, limit, deadline, (departments or {}).get(group), site_id)
+        for group in (SEARCH_GROUPS if groups is None else groups)
+    }
+    done, _ = wait(futures.values(), timeout=budget)
+
+    result = []
+    for group, future in futures.items():
+        items, complete = [], future in done
+        if complete:
+            try:
+                items = future.result()
+            except Exception as e:
+                complete = False
+                logger.warning(f"Глобальний пошук: група {group} — {e}")
+        else:
+            future.cancel()
+        if items or not complete:
+            result.append({"type": group, "label": GROUP_LABELS[group], "complete": complete, "items": items})
+
+    result.sort(key=lambda g: -max((item["score"] for item in g["items"]), default=0))
+    return {
+        "query": query,
+        "took_ms": round((time.monotonic() - started) * 1000, 1),
+        "complete": all(g["complete"] for g in result),
+        "groups": result,
+    }
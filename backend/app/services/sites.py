@@ -0,0 +1,156 @@
+"""
+Майданчики (елеватори, млини) в одному розгортанні.
+
+Підрозділ належить майданчику; залишки (inventory) і журнал руху
+(inventory_transactions) несуть site_id свого підрозділу — його ставить
+default колонки при будь-якому INSERT (models/site.py). Запити майданчика
+фільтруються по site_id, а індекси на цих таблицях починаються з site_id,
+тож вартість звіту одного майданчика не залежить від кількості інших.
+
+Маршрутизація: майданчик запиту — заголовок X-Site (код майданчика) або
+майданчик користувача (users.site_id; такий користувач бачить лише його).
+Документи майданчика — документи його підрозділів (document_scope): списки,
+картки і пакетне проведення чужих документів не бачать, а створення і зміна
+документа в підрозділі іншого майданчика — 403 (require_departments).
+Аналітичні звіти по всіх майданчиках користувачу майданчика недоступні.
+
+Переміщення між майданчиками дозволені; рядок журналу несе site_id підрозділу-
+отримувача, тому журнал майданчика — це його site_id або відправник з його
+підрозділів (ledger_scope): таке переміщення видно обом майданчикам.
+
+Великий майданчик можна винести на окреме розгортання зі своєю БД
+(DATABASE_URL, SITE_CODE): у спільній БД для нього заповнюється api_url,
+і запити з X-Site цього майданчика отримують 421 з адресою його API.
+Кеші процесу (довідники, каталог, аналітика) розраховані на одну БД,
+тому одне розгортання обслуговує одну БД, а не перемикає з'єднання.
+"""
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import event as sa_event, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.department import Department
+from app.models.inventory import Inventory, InventoryTransaction
+from app.models.inventory_count import InventoryCount
+from app.models.purchase import Purchase
+from app.models.site import DEFAULT_SITE_ID, Site, forget_department_sites
+from app.models.transfer import Transfer
+from app.models.user import User
+from app.models.writeoff import WriteOff
+from app.services import refcache
+
+SITE_HEADER = "X-Site"
+
+
+def by_code(db: Session, code: str):
+    return next((s for s in refcache.get_all(db, "sites").values() if s.code == code), None)
+
+
+def resolve_scope(db: Session, user: User, code: Optional[str]) -> Optional[int]:
+    """
+    Майданчик запиту (id) або None — усі майданчики.
+    403 — користувач прив'язаний до іншого майданчика;
+    421 — майданчик обслуговується окремим розгортанням.
+    """
+    site = None
+    if code:
+        site = by_code(db, code)
+        if site is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Майданчик '{code}' не знайдено")
+    if user.site_id is not None:
+        if site is not None and site.id != user.site_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Немає доступу до цього майданчика")
+        site = refcache.lookup(db, "sites", user.site_id)
+    if site is None:
+        return None
+    if site.api_url and site.code != settings.SITE_CODE:
+        raise HTTPException(
+            status_code=status.HTTP_421_MISDIRECTED_REQUEST,
+            detail=f"Майданчик '{site.code}' обслуговується окремим розгортанням: {site.api_url}",
+            headers={"Location": site.api_url},
+        )
+    return site.id
+
+
+# Підрозділи документа: документ належить майданчику, якщо хоч один із них — його
+DOCUMENT_DEPARTMENTS = {
+    Purchase: ("department_id",),
+    Transfer: ("from_department_id", "to_department_id"),
+    WriteOff: ("department_id",),
+    InventoryCount: ("department_id",),
+}
+
+
+def site_departments(site_id: int):
+    """Підзапит id підрозділів майданчика (для IN)."""
+    return select(Department.id).where(Department.site_id == site_id)
+
+
+def document_scope(model, site_id: Optional[int]) -> list:
+    """Умови фільтра документів model для майданчика; [] — усі майданчики."""
+    if site_id is None:
+        return []
+    departments = site_departments(site_id)
+    return [or_(*(getattr(model, column).in_(departments) for column in DOCUMENT_DEPARTMENTS[model]))]
+
+
+def ledger_scope(site_id: Optional[int]) -> list:
+    """Умови фільтра журналу руху для майданчика (з переміщеннями, відправленими з нього)."""
+    if site_id is None:
+        return []
+    return [or_(InventoryTransaction.site_id == site_id,
+                InventoryTransaction.from_department_id.in_(site_departments(site_id)))]
+
+
+def require_departments(db: Session, site_id: Optional[int], *department_ids: Optional[int]) -> None:
+    """403, якщо серед підрозділів документа є підрозділ іншого майданчика."""
+    if site_id is None:
+        return
+    for department_id in department_ids:
+        department = refcache.lookup(db, "departments", department_id)
+        if department is not None and (department.site_id or DEFAULT_SITE_ID) != site_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Підрозділ «{department.name}» належить іншому майданчику",
+            )
+
+
+def move_departments(db: Session, site_id: int, department_ids: list[int]) -> dict:
+    """
+    Перенести підрозділи на майданчик разом із залишками і журналом руху
+    (UPDATE по site_id без перебору рядків). Без commit.
+    """
+    departments = db.query(Department).filter(Department.id.in_(department_ids)).all()
+    missing = set(department_ids) - {d.id for d in departments}
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Підрозділи не знайдено: {sorted(missing)}")
+    for dept in departments:
+        dept.site_id = site_id
+    db.flush()
+
+    inventory = db.execute(
+        update(Inventory)
+        .where(Inventory.department_id.in_(department_ids))
+        .values(site_id=site_id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    ledger = db.execute(
+        update(InventoryTransaction)
+        .where(func.coalesce(InventoryTransaction.to_department_id,
+                             InventoryTransaction.from_department_id).in_(department_ids))
+        .values(site_id=site_id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    return {"departments": len(departments), "inventory": inventory, "transactions": ledger}
+
+
+# ─── Кеш майданчиків підрозділів ────────────────────────────────────
+
+@sa_event.listens_for(SessionLocal, "after_flush")
+def _note_departments(session: Session, flush_context) -> None:
+    # Перенесений у цій транзакції підрозділ — наступні INSERT мають бачити новий майданчик
+    if any(isinstance(obj, Department) for obj in (*session.new, *session.dirty, *session.deleted)):
+        forget_department_sites(session.connection())
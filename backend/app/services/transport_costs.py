@@ -0,0 +1,249 @@
+"""
+Витрати на транспорт: зведення місяць × ТЗ × категорія (transport_costs).
+
+Кожен ТЗ має власний підрозділ (api/v1/transport.py), тож витрати на нього —
+це проведені переміщення в цей підрозділ (запчастини, ПММ) і списання з нього.
+Раніше будь-який перегляд витрат по ТЗ перераховував переміщення і списання
+по всіх таких підрозділах; тепер зведення оновлюють обробники outbox
+transfer.confirmed / writeoff.confirmed, а рейтинг парку читає лише його.
+
+Оновлення — перерахунок рядків (підрозділ, місяць) документа з проведених
+переміщень і списань: повторна доставка події дає той самий результат,
+тож обробник ідемпотентний. rebuild() перераховує все зведення (історія до
+появи таблиці або ручна перевірка).
+"""
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, or_
+from sqlalchemy.orm import Session
+
+from app.models.department import Department
+from app.models.product import Product
+from app.models.transfer import Transfer, TransferItem
+from app.models.transport import TransportCost, TransportUnit
+from app.models.writeoff import WriteOff, WriteOffItem
+from app.services import refcache
+
+RANKING_ORDER = ("total", "received", "writeoff")
+
+
+def _month(day: date) -> str:
+    return day.strftime("%Y-%m")
+
+
+def _month_bounds(month: str) -> tuple[date, date]:
+    year, mon = int(month[:4]), int(month[5:7])
+    end = date(year + 1, 1, 1) if mon == 12 else date(year, mon + 1, 1)
+    return date(year, mon, 1), end
+
+
+def is_transport_department(db: Session, department_id: int) -> bool:
+    """Підрозділ ТЗ: тип transport або прив'язаний до одиниці транспорту (старі підрозділи)."""
+    dept = refcache.lookup(db, "departments", department_id)
+    if dept is None:
+        return False
+    if dept.type == "transport":
+        return True
+    return db.query(TransportUnit.id).filter(TransportUnit.department_id == department_id).first() is not None
+
+
+def _received(db: Session, department_ids, start: Optional[date] = None, end: Optional[date] = None):
+    query = (
+        db.query(
+            Transfer.to_department_id,
+            Transfer.date,
+            Product.category_id,
+            func.sum(TransferItem.total_cost),
+            func.count(func.distinct(Transfer.id)),
+        )
+        .join(TransferItem, TransferItem.transfer_id == Transfer.id)
+        .join(Product, Product.id == TransferItem.product_id)
+        .filter(Transfer.status == "confirmed", Transfer.to_department_id.in_(department_ids))
+        .group_by(Transfer.to_department_id, Transfer.date, Product.category_id)
+    )
+    if start is not None:
+        query = query.filter(Transfer.date >= start, Transfer.date < end)
+    return query
+
+
+def _written_off(db: Session, department_ids, start: Optional[date] = None, end: Optional[date] = None):
+    query = (
+        db.query(
+            WriteOff.department_id,
+            WriteOff.date,
+            Product.category_id,
+            func.sum(WriteOffItem.total_cost),
+            func.count(func.distinct(WriteOff.id)),
+        )
+        .join(WriteOffItem, WriteOffItem.writeoff_id == WriteOff.id)
+        .join(Product, Product.id == WriteOffItem.product_id)
+        .filter(WriteOff.status == "confirmed", WriteOff.department_id.in_(department_ids))
+        .group_by(WriteOff.department_id, WriteOff.date, Product.category_id)
+    )
+    if start is not None:
+        query = query.filter(WriteOff.date >= start, WriteOff.date < end)
+    return query
+
+
+def _collect(received, written_off) -> list[dict]:
+    """Рядки зведення з агрегатів по днях (день → місяць)."""
+    rows: dict[tuple, dict] = {}
+
+    def row(department_id, day, category_id) -> dict:
+        key = (_month(day), department_id, category_id)
+        if key not in rows:
+            rows[key] = {
+                "month": key[0], "department_id": department_id, "category_id": category_id,
+                "received_cost": Decimal(0), "received_documents": 0,
+                "writeoff_cost": Decimal(0), "writeoff_documents": 0,
+            }
+        return rows[key]
+
+    # Документ з кількома категоріями рахується в кожній з них
+    for department_id, day, category_id, cost, documents in received:
+        r = row(department_id, day, category_id)
+        r["received_cost"] += Decimal(str(cost or 0))
+        r["received_documents"] += documents
+    for department_id, day, category_id, cost, documents in written_off:
+        r = row(department_id, day, category_id)
+        r["writeoff_cost"] += Decimal(str(cost or 0))
+        r["writeoff_documents"] += documents
+    return list(rows.values())
+
+
+def refresh(db: Session, department_id: int, month: str) -> None:
+    """Перерахувати зведення підрозділу ТЗ за місяць (без commit)."""
+    start, end = _month_bounds(month)
+    rows = _collect(
+        _received(db, [department_id], start, end),
+        _written_off(db, [department_id], start, end),
+    )
+    db.execute(delete(TransportCost).where(
+        TransportCost.department_id == department_id, TransportCost.month == month,
+    ))
+    if rows:
+        db.execute(insert(TransportCost.__table__), rows)
+
+
+def rebuild(db: Session) -> int:
+    """Перерахувати все зведення з проведених документів (без commit). Повертає кількість рядків."""
+    department_ids = [
+        dept_id for (dept_id,) in db.query(Department.id).filter(or_(
+            Department.type == "transport",
+            Department.id.in_(db.query(TransportUnit.department_id).filter(TransportUnit.department_id.isnot(None))),
+        ))
+    ]
+    db.execute(delete(TransportCost))
+    if not department_ids:
+        return 0
+    rows = _collect(_received(db, department_ids), _written_off(db, department_ids))
+    if rows:
+        db.execute(insert(TransportCost.__table__), rows)
+    return len(rows)
+
+
+# ─── Читання ────────────────────────────────────────────────────────
+
+def _period(query, month_from: Optional[str], month_to: Optional[str]):
+    if month_from:
+        query = query.filter(TransportCost.month >= month_from)
+    if month_to:
+        query = query.filter(TransportCost.month <= month_to)
+    return query
+
+
+def ranking(
+    db: Session,
+    month_from: Optional[str] = None,
+    month_to: Optional[str] = None,
+    category_id: Optional[int] = None,
+    order_by: str = "total",
+) -> list[dict]:
+    """Рейтинг ТЗ за витратами за період — лише зі зведення."""
+    received = func.coalesce(func.sum(TransportCost.received_cost), 0)
+    written_off = func.coalesce(func.sum(TransportCost.writeoff_cost), 0)
+    query = db.query(TransportCost.department_id, received, written_off).group_by(TransportCost.department_id)
+    query = _period(query, month_from, month_to)
+    if category_id is not None:
+        query = query.filter(TransportCost.category_id == category_id)
+    totals = {dept_id: (Decimal(str(r)), Decimal(str(w))) for dept_id, r, w in query}
+
+    # Категорія з найбільшими витратами — для підказки в рейтингу
+    top_category: dict[int, tuple[Optional[int], Decimal]] = {}
+    by_category = _period(
+        db.query(TransportCost.department_id, TransportCost.category_id, received + written_off)
+        .group_by(TransportCost.department_id, TransportCost.category_id),
+        month_from, month_to,
+    )
+    for dept_id, cat_id, cost in by_category:
+        cost = Decimal(str(cost))
+        if dept_id not in top_category or cost > top_category[dept_id][1]:
+            top_category[dept_id] = (cat_id, cost)
+
+    units = {
+        unit.department_id: unit
+        for unit in db.query(TransportUnit).filter(TransportUnit.department_id.in_(list(totals)))
+    } if totals else {}
+
+    result = []
+    for dept_id, (received_cost, writeoff_cost) in totals.items():
+        unit = units.get(dept_id)
+        dept = refcache.lookup(db, "departments", dept_id)
+        cat_id = top_category.get(dept_id, (None, 0))[0]
+        category = refcache.lookup(db, "categories", cat_id)
+        result.append({
+            "department_id": dept_id,
+            "department_name": dept.name if dept else "—",
+            "transport_unit_id": unit.id if unit else None,
+            "name": unit.name if unit else (dept.name if dept else "—"),
+            "unit_type": unit.unit_type if unit else None,
+            "plate_number": unit.plate_number if unit else None,
+            "received_cost": received_cost,
+            "writeoff_cost": writeoff_cost,
+            "total_cost": received_cost + writeoff_cost,
+            "top_category_id": cat_id,
+            "top_category_name": category.name if category else None,
+        })
+
+    key = {"total": "total_cost", "received": "received_cost", "writeoff": "writeoff_cost"}[order_by]
+    result.sort(key=lambda r: (-r[key], r["name"]))
+    for rank, row in enumerate(result, start=1):
+        row["rank"] = rank
+    return result
+
+
+def vehicle_costs(
+    db: Session,
+    department_id: int,
+    month_from: Optional[str] = None,
+    month_to: Optional[str] = None,
+) -> list[dict]:
+    """Витрати ТЗ по місяцях з розбивкою на категорії."""
+    query = _period(
+        db.query(TransportCost).filter(TransportCost.department_id == department_id),
+        month_from, month_to,
+    ).order_by(TransportCost.month, TransportCost.category_id)
+
+    months: dict[str, dict] = defaultdict(lambda: {
+        "received_cost": Decimal(0), "writeoff_cost": Decimal(0), "categories": [],
+    })
+    for row in query:
+        month = months[row.month]
+        category = refcache.lookup(db, "categories", row.category_id)
+        month["received_cost"] += row.received_cost
+        month["writeoff_cost"] += row.writeoff_cost
+        month["categories"].append({
+            "category_id": row.category_id,
+            "category_name": category.name if category else None,
+            "received_cost": row.received_cost,
+            "received_documents": row.received_documents,
+            "writeoff_cost": row.writeoff_cost,
+            "writeoff_documents": row.writeoff_documents,
+        })
+    return [
+        {"month": month, **values, "total_cost": values["received_cost"] + values["writeoff_cost"]}
+        for month, values in months.items()
+    ]
@@ -0,0 +1,293 @@
+"""
+Аналітика електроенергії і газу на сервері.
+
+Раніше сторінки аналітики отримували всі місяці і рахували підсумки
+по роках, сезонність і порівняння в браузері. Тут те саме рахується
+один раз по всій історії, по колонках (серія значень на кожен показник):
+  - yearly   — підсумки по роках, частки споживачів, рік до року
+               (на тих самих місяцях попереднього року — неповний рік
+               порівнюється чесно);
+  - seasons  — підсумки по сезонах кожного року (грудень — у зиму свого року);
+  - seasonal — середнє/мін/макс по календарному місяцю за всі роки;
+  - moving_average — ковзні середні за 3 і 12 календарних місяців
+               (пропущені місяці не рахуються як нуль).
+
+Результат кешується в пам'яті процесу до наступного збереження/видалення
+місяця (сесія, що змінила ElectricityRecord/GasRecord, скидає кеш після commit —
+services/cache_sync.py); результат збірки, яку застала інвалідація, не зберігається.
+REFCACHE_TTL_SECONDS — межа застарілості для змін з інших процесів.
+"""
+import time
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.electricity import ElectricityRecord
+from app.models.gas import GasRecord
+from app.services.cache_sync import Generation, track_commits
+
+COEFF_MLYN_1 = 100
+COEFF_MLYN_2 = 1
+COEFF_PALETKA = 1000
+
+MOVING_WINDOWS = (3, 12)
+
+SEASONS = (
+    ("winter", "Зима", (12, 1, 2)),
+    ("spring", "Весна", (3, 4, 5)),
+    ("summer", "Літо", (6, 7, 8)),
+    ("autumn", "Осінь", (9, 10, 11)),
+)
+_SEASON_OF_MONTH = {m: key for key, _, months in SEASONS for m in months}
+
+
+# ─── Розрахунок місяця ─────────────────────────────────────────────
+
+def electricity_row(rec: ElectricityRecord) -> dict:
+    """Показники лічильників і розраховані кВт·год за місяць."""
+    ktp_old   = float(rec.ktp_old or 0)
+    ktp_new   = float(rec.ktp_new or 0)
+    mlyn1_s   = float(rec.mlyn1_start or 0)
+    mlyn1_e   = float(rec.mlyn1_end or 0)
+    mlyn2_s   = float(rec.mlyn2_start or 0)
+    mlyn2_e   = float(rec.mlyn2_end or 0)
+    palet_s   = float(rec.palet_start or 0)
+    palet_e   = float(rec.palet_end or 0)
+    gen_s     = float(rec.gen_start) if rec.gen_start is not None else None
+    gen_e     = float(rec.gen_end) if rec.gen_end is not None else None
+
+    ktp_total  = ktp_old + ktp_new
+    gen_kwh    = (gen_e - gen_s) if (gen_s is not None and gen_e is not None) else 0.0
+    total_kwh  = ktp_total + gen_kwh
+    mlyn1_kwh  = (mlyn1_e - mlyn1_s) * COEFF_MLYN_1
+    mlyn2_kwh  = (mlyn2_e - mlyn2_s) * COEFF_MLYN_2
+    mlyn_total = mlyn1_kwh + mlyn2_kwh
+    palet_kwh  = (palet_e - palet_s) * COEFF_PALETKA
+    elevator   = total_kwh - mlyn_total - palet_kwh
+
+    return {
+        "id": rec.id,
+        "month": rec.month,
+        "ktp_old": ktp_old,
+        "ktp_new": ktp_new,
+        "mlyn1_start": mlyn1_s,
+        "mlyn1_end": mlyn1_e,
+        "mlyn2_start": mlyn2_s,
+        "mlyn2_end": mlyn2_e,
+        "palet_start": palet_s,
+        "palet_end": palet_e,
+        "gen_start": gen_s,
+        "gen_end": gen_e,
+        "ktp_total": ktp_total,
+        "gen_kwh": gen_kwh,
+        "total_kwh": total_kwh,
+        "mlyn1_kwh": mlyn1_kwh,
+        "mlyn2_kwh": mlyn2_kwh,
+        "mlyn_total": mlyn_total,
+        "palet_kwh": palet_kwh,
+        "elevator_kwh": elevator,
+    }
+
+
+def gas_row(rec: GasRecord) -> dict:
+    """Споживання, ВТВ і загальне (якщо є хоч щось) за місяць."""
+    consumption = float(rec.consumption) if rec.consumption is not None else None
+    vtv         = float(rec.vtv)         if rec.vtv         is not None else None
+    if consumption is not None or vtv is not None:
+        total = (consumption or 0) + (vtv or 0)
+    else:
+        total = None
+    return {
+        "id":          rec.id,
+        "month":       rec.month,
+        "consumption": consumption,
+        "vtv":         vtv,
+        "total":       total,
+    }
+
+
+# ─── Згортки по серіях ─────────────────────────────────────────────
+
+class _Series:
+    """Місяці і колонки значень (None — показника за місяць немає)."""
+
+    def __init__(self, rows: list[dict], keys: tuple[str, ...]):
+        self.months = [r["month"] for r in rows]
+        self.years = [int(m[:4]) for m in self.months]
+        self.month_nums = [int(m[5:7]) for m in self.months]
+        self.columns = {key: [r[key] for r in rows] for key in keys}
+
+    def indexes(self, predicate: Callable[[int], bool]) -> list[int]:
+        return [i for i in range(len(self.months)) if predicate(i)]
+
+    def total(self, key: str, idx: list[int]) -> Optional[float]:
+        values = [self.columns[key][i] for i in idx if self.columns[key][i] is not None]
+        return _round(sum(values)) if values else None
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+
+def _delta(current: Optional[float], previous: Optional[float]) -> Optional[dict]:
+    if current is None or previous is None:
+        return None
+    return {
+        "previous": previous,
+        "delta": _round(current - previous),
+        "delta_pct": _round((current - previous) / previous * 100) if previous else None,
+    }
+
+
+def _shares(totals: dict, share_keys: dict[str, str], base_key: str) -> dict:
+    base = totals.get(base_key)
+    if not base:
+        return {}
+    return {name: _round((totals.get(key) or 0) / base * 100) for name, key in share_keys.items()}
+
+
+def _yearly(series: _Series, keys: tuple[str, ...], share_keys: dict[str, str], base_key: str) -> list[dict]:
+    result = []
+    for year in sorted(set(series.years)):
+        idx = series.indexes(lambda i: series.years[i] == year)
+        totals = {key: series.total(key, idx) for key in keys}
+        # Рік до року — на тих самих календарних місяцях попереднього року
+        months = {series.month_nums[i] for i in idx}
+        prev_idx = series.indexes(lambda i: series.years[i] == year - 1 and series.month_nums[i] in months)
+        yoy = {key: _delta(totals[key], series.total(key, prev_idx)) for key in keys} if prev_idx else None
+        result.append({
+            "year": year,
+            "months": len(idx),
+            "totals": totals,
+            "shares": _shares(totals, share_keys, base_key),
+            "yoy": yoy,
+        })
+    return result
+
+
+def _seasons(series: _Series, keys: tuple[str, ...]) -> list[dict]:
+    result = []
+    for year in sorted(set(series.years)):
+        for season, label, _ in SEASONS:
+            idx = series.indexes(
+                lambda i: series.years[i] == year and _SEASON_OF_MONTH[series.month_nums[i]] == season
+            )
+            if idx:
+                result.append({
+                    "year": year,
+                    "season": season,
+                    "label": label,
+                    "months": len(idx),
+                    "totals": {key: series.total(key, idx) for key in keys},
+                })
+    return result
+
+
+def _seasonal(series: _Series, keys: tuple[str, ...]) -> list[dict]:
+    result = []
+    for month in range(1, 13):
+        idx = series.indexes(lambda i: series.month_nums[i] == month)
+        if not idx:
+            continue
+        stats = {}
+        for key in keys:
+            values = [series.columns[key][i] for i in idx if series.columns[key][i] is not None]
+            stats[key] = {
+                "avg": _round(sum(values) / len(values)),
+                "min": _round(min(values)),
+                "max": _round(max(values)),
+            } if values else None
+        result.append({"month": month, "years": len(idx), "stats": stats})
+    return result
+
+
+def _moving_average(series: _Series, key: str) -> list[dict]:
+    ordinals = [y * 12 + m - 1 for y, m in zip(series.years, series.month_nums)]
+    values = series.columns[key]
+    result = []
+    for i, ordinal in enumerate(ordinals):
+        row = {"month": series.months[i], "value": _round(values[i])}
+        for window in MOVING_WINDOWS:
+            window_values = [
+                values[j] for j in range(i + 1)
+                if ordinal - ordinals[j] < window and values[j] is not None
+            ]
+            row[f"avg_{window}m"] = _round(sum(window_values) / len(window_values)) if window_values else None
+        result.append(row)
+    return result
+
+
+def _analytics(rows: list[dict], keys: tuple[str, ...], base_key: str, share_keys: dict[str, str]) -> dict:
+    series = _Series(rows, keys)
+    all_idx = list(range(len(rows)))
+    totals = {key: series.total(key, all_idx) for key in keys}
+    return {
+        "months": len(rows),
+        "first_month": series.months[0] if rows else None,
+        "last_month": series.months[-1] if rows else None,
+        "base_key": base_key,
+        "totals": totals,
+        "shares": _shares(totals, share_keys, base_key),
+        "yearly": _yearly(series, keys, share_keys, base_key),
+        "seasons": _seasons(series, keys),
+        "seasonal": _seasonal(series, keys),
+        "moving_average": _moving_average(series, base_key),
+    }
+
+
+ELECTRICITY_KEYS = ("ktp_total", "gen_kwh", "total_kwh", "mlyn_total", "palet_kwh", "elevator_kwh")
+# Частки від загального споживання (КТП + генератор)
+ELECTRICITY_SHARES = {
+    "ktp": "ktp_total",
+    "generator": "gen_kwh",
+    "mlyn": "mlyn_total",
+    "palet": "palet_kwh",
+    "elevator": "elevator_kwh",
+}
+GAS_KEYS = ("consumption", "vtv", "total")
+GAS_SHARES = {"consumption": "consumption", "vtv": "vtv"}
+
+
+def _build_electricity(db: Session) -> dict:
+    rows = [electricity_row(r) for r in db.query(ElectricityRecord).order_by(ElectricityRecord.month).all()]
+    return _analytics(rows, ELECTRICITY_KEYS, "total_kwh", ELECTRICITY_SHARES)
+
+
+def _build_gas(db: Session) -> dict:
+    rows = [gas_row(r) for r in db.query(GasRecord).order_by(GasRecord.month).all()]
+    return _analytics(rows, GAS_KEYS, "total", GAS_SHARES)
+
+
+_BUILDERS = {"electricity": _build_electricity, "gas": _build_gas}
+_KIND_BY_MODEL = {ElectricityRecord: "electricity", GasRecord: "gas"}
+
+_generation = Generation()
+_lock = _generation.lock
+_cache: dict[str, tuple[float, dict]] = {}  # kind -> (expires, result)
+
+
+def get_analytics(db: Session, kind: str) -> dict:
+    """Аналітика electricity/gas з кешу (будується при першому зверненні після змін)."""
+    with _lock:
+        cached = _cache.get(kind)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        seen = _generation.current()
+    result = _BUILDERS[kind](db)
+    with _lock:
+        if _generation.is_current(seen):
+            _cache[kind] = (time.monotonic() + settings.REFCACHE_TTL_SECONDS, result)
+    return result
+
+
+def invalidate(*kinds: str) -> None:
+    with _lock:
+        _generation.bump()
+        for kind in kinds or tuple(_cache):
+            _cache.pop(kind, None)
+
+
+# ─── Автоінвалідація ────────────────────────────────────────────────
+
+track_commits("utility_analytics", lambda obj: _KIND_BY_MODEL.get(type(obj)), lambda kinds: invalidate(*kinds))
@@ -0,0 +1,96 @@
+"""
+Бенчмарк знімка каталогу (app/services/catalog.py) проти ORM-словника,
+який раніше будував звіт по підрозділах.
+
+Створює тимчасову SQLite-БД з N товарами і міряє для кожного варіанту
+час побудови і пам'ять (tracemalloc, піковий приріст).
+
+Запуск з C:\\elev\\backend:
+    python scripts/bench_catalog.py --products 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+WORDS = ["Підшипник", "Фільтр", "Ремінь", "Болт", "Гайка", "Шланг", "Муфта", "Насос", "Клапан", "Датчик"]
+ADJECTIVES = ["кульковий", "масляний", "паливний", "повітряний", "гідравлічний", "оцинкований", "посилений"]
+
+
+def measure(label: str, build):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {elapsed * 1000:8.0f} ms   утримує {current / 2**20:7.1f} MiB   пік {peak / 2**20:7.1f} MiB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пам'ять і час знімка каталогу товарів")
+    parser.add_argument("--products", type=int, default=100_000)
+    args = parser.parse_args()
+
+    db_path = Path(tempfile.mkdtemp()) / "bench_catalog.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["DEBUG"] = "False"
+    sys.path.append(str(Path(__file__).parent.parent))
+
+    from sqlalchemy import text
+    from app.database import Base, SessionLocal, engine
+    from app.models import Product, ProductCategory, Unit
+    from app.services.catalog import get_catalog
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO units (id, name, short_name) VALUES (1, 'штука', 'шт'), (2, 'кілограм', 'кг')"))
+        conn.execute(text("INSERT INTO product_categories (id, name) VALUES (1, 'Запчастини'), (2, 'Витратні матеріали')"))
+        conn.execute(
+            text(
+                "INSERT INTO products (code, name, category_id, unit_id, product_type, min_stock_level, is_active) "
+                "VALUES (:code, :name, :category_id, :unit_id, :product_type, :min_stock_level, 1)"
+            ),
+            [
+                {
+                    "code": f"PROD-{i:06d}",
+                    "name": f"{random.choice(WORDS)} {random.choice(ADJECTIVES)} {random.randint(100, 9999)}",
+                    "category_id": i % 2 + 1,
+                    "unit_id": i % 2 + 1,
+                    "product_type": "spare_part" if i % 2 else "consumable",
+                    "min_stock_level": i % 10,
+                }
+                for i in range(args.products)
+            ],
+        )
+    print(f"Товарів: {args.products}")
+
+    db = SessionLocal()
+    orm = measure("ORM {id: Product} + довідники", lambda: (
+        {p.id: p for p in db.query(Product).all()},
+        {c.id: c for c in db.query(ProductCategory).all()},
+        {u.id: u for u in db.query(Unit).all()},
+    ))
+    del orm
+    db.close()
+
+    db = SessionLocal()
+    snapshot = measure("Знімок каталогу", lambda: get_catalog(db))
+    db.close()
+
+    started = time.perf_counter()
+    for _ in range(10):
+        for product in snapshot:
+            product.name, product.category_name, product.unit_name
+    print(f"{'Прохід по знімку':<28} {(time.perf_counter() - started) / 10 * 1000:8.1f} ms")
+
+    os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
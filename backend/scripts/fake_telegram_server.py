@@ -0,0 +1,97 @@
+"""
+Локальний фейковий Telegram Bot API для перевірки черги сповіщень.
+
+Приймає POST /bot<TOKEN>/sendMessage, друкує отримані повідомлення і
+за бажанням імітує збої: 429 з retry_after і 5xx.
+
+Запуск з C:\\elev\\backend:
+    python scripts/fake_telegram_server.py --port 8081 --rate-limit-every 5 --fail-rate 0.2
+і в .env:
+    TELEGRAM_API_BASE=http://127.0.0.1:8081
+"""
+import argparse
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeTelegramState:
+    def __init__(self, fail_rate: float = 0.0, rate_limit_every: int = 0, retry_after: int = 1):
+        self.fail_rate = fail_rate
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.requests = 0
+        self.messages: list[dict] = []
+        self.lock = threading.Lock()
+
+
+def make_handler(state: FakeTelegramState):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code: int, body: dict) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.endswith("/sendMessage"):
+                self._reply(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+                return
+
+            with state.lock:
+                state.requests += 1
+                n = state.requests
+            if state.rate_limit_every and n % state.rate_limit_every == 0:
+                self._reply(429, {
+                    "ok": False, "error_code": 429,
+                    "description": f"Too Many Requests: retry after {state.retry_after}",
+                    "parameters": {"retry_after": state.retry_after},
+                })
+                return
+            if random.random() < state.fail_rate:
+                self._reply(502, {"ok": False, "error_code": 502, "description": "Bad Gateway"})
+                return
+
+            with state.lock:
+                state.messages.append(payload)
+                message_id = len(state.messages)
+            print(f"--- #{message_id} chat={payload.get('chat_id')}\n{payload.get('text')}\n", flush=True)
+            self._reply(200, {"ok": True, "result": {"message_id": message_id}})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port: int, state: FakeTelegramState) -> ThreadingHTTPServer:
+    """Створити сервер (для використання з коду — запускати serve_forever в потоці)."""
+    return ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Фейковий Telegram Bot API")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="частка відповідей 502 (0..1)")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="кожен N-й запит — 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after для 429, секунди")
+    args = parser.parse_args()
+
+    state = FakeTelegramState(args.fail_rate, args.rate_limit_every, args.retry_after)
+    server = serve(args.port, state)
+    print(f"Fake Telegram API: http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Спільні фікстури: тимчасова SQLite-БД, початкові довідники (scripts/seed_data.py),
+TestClient застосунку і користувачі з різними ролями.
+
+БД одна на сесію — кожен тест створює власні товари й документи.
+Запуск з C:\\elev\\backend:
+    python -m pytest -q
+"""
+import os
+import sys
+import tempfile
+from decimal import Decimal
+from itertools import count
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+_db_dir = tempfile.mkdtemp(prefix="agro_erp_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_db_dir) / 'test.db'}"
+os.environ["DEBUG"] = "False"
+# Забуте завантаження зв'язку — помилка тесту, а не тихий N+1 (app/database.py)
+os.environ["ORM_STRICT_LOADING"] = "true"
+os.environ["TELEGRAM_BOT_TOKEN"] = ""
+os.environ["TELEGRAM_CHAT_ID"] = ""
+sys.path.insert(0, str(BACKEND))
+sys.path.insert(0, str(BACKEND / "scripts"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.database import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+import seed_data  # noqa: E402
+
+MAIN_WAREHOUSE = 1
+_seq = count(1)
+
+
+def _seed():
+    db = SessionLocal()
+    try:
+        seed_data.create_departments(db)
+        seed_data.create_roles(db)
+        seed_data.create_admin_user(db)
+        seed_data.create_units(db)
+        seed_data.create_product_categories(db)
+    finally:
+        db.close()
+
+
+def unique(prefix: str) -> str:
+    """Унікальне ім'я в межах сесії (БД спільна для всіх тестів)."""
+    return f"{prefix}-{next(_seq)}"
+
+
+@pytest.fixture(scope="session")
+def client():
+    """TestClient без lifespan: планувальник і черга Telegram не стартують —
+    фонова доставка outbox не втручається в тести, що викликають її явно."""
+    _seed()
+    return TestClient(app)
+
+
+def login(client, username: str, password: str) -> dict:
+    response = client.post("/api/v1/auth/login", data={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    return login(client, "admin", "admin")
+
+
+@pytest.fixture(scope="session")
+def user_headers(client, admin_headers):
+    """Фабрика: заголовки нового користувача з роллю role (і підрозділом, майданчиком)."""
+    roles = {r["name"]: r["id"] for r in client.get("/api/v1/users/roles/list", headers=admin_headers).json()}
+
+    def make(role: str, department_id: int = None, site_id: int = None) -> dict:
+        username = unique(role)
+        response = client.post("/api/v1/users/", headers=admin_headers, json={
+            "username": username, "password": "secret", "role_id": roles[role], "department_id": department_id,
+            "site_id": site_id,
+        })
+        assert response.status_code == 201, response.text
+        return login(client, username, "secret")
+    return make
+
+
+@pytest.fixture(scope="session")
+def supplier(client, admin_headers):
+    response = client.post("/api/v1/suppliers/", json={"name": "ТОВ Тест"}, headers=admin_headers)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+@pytest.fixture
+def make_product(client, admin_headers):
+    def make(name: str = None, min_stock_level: int = 0) -> dict:
+        response = client.post("/api/v1/products/", headers=admin_headers, json={
+            "name": name or unique("Товар"), "category_id": 1, "unit_id": 3,
+            "product_type": "spare_part", "min_stock_level": min_stock_level,
+        })
+        assert response.status_code == 201, response.text
+        return response.json()
+    return make
+
+
+@pytest.fixture
+def receive(client, admin_headers, supplier):
+    """Оприбуткувати товар проведеною закупівлею (за замовчуванням — на основний склад)."""
+    def post(product_id: int, quantity, unit_price=10, department_id: int = MAIN_WAREHOUSE) -> dict:
+        response = client.post("/api/v1/purchases/", headers=admin_headers, json={
+            "date": "2026-03-01", "supplier_id": supplier["id"], "department_id": department_id,
+            "items": [{"product_id": product_id, "quantity": str(quantity), "unit_price": str(unit_price)}],
+        })
+        assert response.status_code == 201, response.text
+        purchase = response.json()
+        response = client.post(f"/api/v1/purchases/{purchase['id']}/confirm", headers=admin_headers)
+        assert response.status_code == 200, response.text
+        return purchase
+    return post
+
+
+@pytest.fixture
+def stock(client, admin_headers):
+    """(quantity, reserved_quantity) товару в підрозділі; (0, 0) — рядка немає."""
+    def get(product_id: int, department_id: int = MAIN_WAREHOUSE) -> tuple[Decimal, Decimal]:
+        rows = client.get("/api/v1/inventory/", headers=admin_headers,
+                          params={"product_id": product_id, "department_id": department_id}).json()
+        if not rows:
+            return Decimal(0), Decimal(0)
+        return Decimal(str(rows[0]["quantity"])), Decimal(str(rows[0]["reserved_quantity"]))
+    return get
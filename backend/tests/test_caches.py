@@ -0,0 +1,97 @@
+"""Кеші процесу: скидання після commit і збірки, які застала інвалідація."""
+import pytest
+
+from app.database import SessionLocal
+from app.models.product import Unit
+from app.services import catalog, refcache, utility_analytics
+
+
+@pytest.fixture
+def db(client):  # client — засіяна БД
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def test_commit_invalidates_refcache_and_catalog(db):
+    refcache.get_all(db, "units")
+    catalog.get_catalog(db)
+    unit = db.query(Unit).first()
+    unit.name = f"{unit.name} "
+
+    db.flush()
+    assert "units" in refcache._snapshots  # до commit кеш не чіпається
+    db.commit()
+    assert "units" not in refcache._snapshots
+    assert catalog._full_reload
+
+    unit.name = unit.name.rstrip()
+    db.commit()
+
+
+def test_rolled_back_changes_keep_refcache(db):
+    refcache.get_all(db, "units")
+    unit = db.query(Unit).first()
+    unit.name = f"{unit.name} "
+    db.flush()
+    db.rollback()
+    assert "units" in refcache._snapshots
+
+
+def test_snapshot_built_before_invalidation_is_not_stored(db, monkeypatch):
+    refcache.invalidate("units")
+    real_load = refcache._load
+
+    def load_then_commit_elsewhere(session, kind):
+        snapshot = real_load(session, kind)
+        refcache.invalidate(kind)  # commit іншого запиту під час збірки
+        return snapshot
+    monkeypatch.setattr(refcache, "_load", load_then_commit_elsewhere)
+
+    assert refcache.get_all(db, "units")
+    assert "units" not in refcache._snapshots
+
+
+def test_analytics_built_during_save_month_is_not_cached(db, monkeypatch):
+    utility_analytics.invalidate()
+    real_build = utility_analytics._BUILDERS["gas"]
+
+    def build_then_save_month(session):
+        result = real_build(session)
+        utility_analytics.invalidate("gas")  # save_month закомічено під час збірки
+        return result
+    monkeypatch.setitem(utility_analytics._BUILDERS, "gas", build_then_save_month)
+
+    utility_analytics.get_analytics(db, "gas")
+    assert "gas" not in utility_analytics._cache
+
+    monkeypatch.setitem(utility_analytics._BUILDERS, "gas", real_build)
+    utility_analytics.get_analytics(db, "gas")
+    assert "gas" in utility_analytics._cache
+
+
+def test_catalog_keeps_dirty_ids_until_snapshot_stored(db, make_product, monkeypatch):
+    product = make_product()
+    catalog.get_catalog(db)
+    catalog.invalidate({product["id"]})
+
+    def failing_rows(session, product_ids=None):
+        raise RuntimeError("БД недоступна")
+    monkeypatch.setattr(catalog, "_rows", failing_rows)
+    with pytest.raises(RuntimeError):
+        catalog.get_catalog(db)
+    assert product["id"] in catalog._dirty_ids
+
+    monkeypatch.undo()
+    original_rows = catalog._rows
+
+    def rows_then_commit_elsewhere(session, product_ids=None):
+        yield from original_rows(session, product_ids)
+        catalog.invalidate({product["id"]})  # ще одна зміна товару під час збірки
+    monkeypatch.setattr(catalog, "_rows", rows_then_commit_elsewhere)
+    stale = catalog.get_catalog(db)
+    assert catalog._snapshot is not stale and product["id"] in catalog._dirty_ids
+
+    monkeypatch.undo()
+    fresh = catalog.get_catalog(db)
+    assert catalog._snapshot is fresh and not catalog._dirty_ids
@@ -0,0 +1,62 @@
+"""Списки документів view=summary: підсумки позицій лише документів сторінки."""
+from decimal import Decimal
+
+from sqlalchemy import text
+from sqlalchemy.orm import contains_eager
+
+from app.database import SessionLocal
+from app.models.purchase import Purchase, PurchaseItem
+from app.services.documents import with_item_totals
+
+WORKSHOP = 3
+
+
+def summary(client, headers, url, day):
+    response = client.get(url, headers=headers, params={"date_from": day, "date_to": day, "limit": 500})
+    assert response.status_code == 200, response.text
+    return {doc["id"]: (doc["items_count"], Decimal(doc["total_quantity"])) for doc in response.json()}
+
+
+def test_summary_view_totals(client, admin_headers, supplier, make_product, receive):
+    first, second = make_product(), make_product()
+    receive(first["id"], 20)
+    receive(second["id"], 20)
+    day = "2031-05-17"
+    lines = [{"product_id": first["id"], "quantity": "3"}, {"product_id": second["id"], "quantity": "4.5"}]
+
+    purchase = client.post("/api/v1/purchases/", headers=admin_headers, json={
+        "date": day, "supplier_id": supplier["id"], "department_id": 1,
+        "items": [{**line, "unit_price": "2"} for line in lines],
+    }).json()
+    single_line = client.post("/api/v1/purchases/", headers=admin_headers, json={
+        "date": day, "supplier_id": supplier["id"], "department_id": 1,
+        "items": [{"product_id": first["id"], "quantity": "1", "unit_price": "2"}],
+    }).json()
+    transfer = client.post("/api/v1/transfers/", headers=admin_headers, json={
+        "date": day, "from_department_id": 1, "to_department_id": WORKSHOP, "items": lines,
+    }).json()
+    writeoff = client.post("/api/v1/writeoffs/", headers=admin_headers, json={
+        "date": day, "department_id": 1, "reason": "брак", "items": lines[:1],
+    }).json()
+
+    assert summary(client, admin_headers, "/api/v1/purchases/", day) == {
+        purchase["id"]: (2, Decimal("7.5")), single_line["id"]: (1, Decimal(1)),
+    }
+    assert summary(client, admin_headers, "/api/v1/transfers/", day) == {transfer["id"]: (2, Decimal("7.5"))}
+    assert summary(client, admin_headers, "/api/v1/writeoffs/", day) == {writeoff["id"]: (1, Decimal(3))}
+
+
+def test_summary_totals_search_items_by_document(client):
+    db = SessionLocal()
+    try:
+        query = (
+            db.query(Purchase).outerjoin(Purchase.supplier).outerjoin(Purchase.department)
+            .options(contains_eager(Purchase.supplier), contains_eager(Purchase.department))
+        )
+        query = with_item_totals(query, PurchaseItem, PurchaseItem.purchase_id, Purchase.id).limit(50)
+        compiled = query.statement.compile(db.bind, compile_kwargs={"literal_binds": True})
+        plan = " ".join(row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {compiled}")))
+    finally:
+        db.close()
+    assert "SCAN purchase_items" not in plan and "MATERIALIZE" not in plan
+    assert "SEARCH purchase_items" in plan
@@ -0,0 +1,56 @@
+"""PUT документів не змінює статус: проведення і скасування — лише через /confirm і DELETE."""
+import pytest
+
+WORKSHOP = 3
+
+
+@pytest.mark.parametrize("new_status", ["cancelled", "confirmed"])
+def test_transfer_update_rejects_status(client, admin_headers, make_product, receive, stock, new_status):
+    product = make_product()
+    receive(product["id"], 10)
+    transfer = client.post("/api/v1/transfers/", headers=admin_headers, json={
+        "date": "2026-03-01", "from_department_id": 1, "to_department_id": WORKSHOP,
+        "items": [{"product_id": product["id"], "quantity": "4"}],
+    }).json()
+
+    response = client.put(f"/api/v1/transfers/{transfer['id']}", headers=admin_headers, json={"status": new_status})
+    assert response.status_code == 422
+    assert client.get(f"/api/v1/transfers/{transfer['id']}", headers=admin_headers).json()["status"] == "draft"
+    assert stock(product["id"]) == (10, 4)
+    assert stock(product["id"], WORKSHOP) == (0, 0)
+
+
+def test_purchase_update_rejects_status(client, admin_headers, supplier, make_product, stock):
+    product = make_product()
+    purchase = client.post("/api/v1/purchases/", headers=admin_headers, json={
+        "date": "2026-03-01", "supplier_id": supplier["id"], "department_id": 1,
+        "items": [{"product_id": product["id"], "quantity": "5", "unit_price": "2"}],
+    }).json()
+
+    response = client.put(f"/api/v1/purchases/{purchase['id']}", headers=admin_headers, json={"status": "confirmed"})
+    assert response.status_code == 422
+    assert client.get(f"/api/v1/purchases/{purchase['id']}", headers=admin_headers).json()["status"] == "draft"
+    assert stock(product["id"]) == (0, 0)
+
+
+def test_confirmed_purchase_keeps_department(client, admin_headers, make_product, receive):
+    product = make_product()
+    purchase = receive(product["id"], 5)
+
+    response = client.put(f"/api/v1/purchases/{purchase['id']}", headers=admin_headers, json={"department_id": 2})
+    assert response.status_code == 400
+    response = client.put(f"/api/v1/purchases/{purchase['id']}", headers=admin_headers, json={"notes": "уточнено"})
+    assert response.status_code == 200
+
+
+def test_writeoff_update_rejects_status(client, admin_headers, make_product, receive, stock):
+    product = make_product()
+    receive(product["id"], 10)
+    writeoff = client.post("/api/v1/writeoffs/", headers=admin_headers, json={
+        "date": "2026-03-01", "department_id": 1, "reason": "брак",
+        "items": [{"product_id": product["id"], "quantity": "3"}],
+    }).json()
+
+    response = client.put(f"/api/v1/writeoffs/{writeoff['id']}", headers=admin_headers, json={"status": "cancelled"})
+    assert response.status_code == 422
+    assert stock(product["id"]) == (10, 3)
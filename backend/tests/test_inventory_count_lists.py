@@ -0,0 +1,34 @@
+"""Шапки актів інвентаризації: підсумки позицій рахуються лише по відібраних актах."""
+from sqlalchemy import event
+
+from app.database import engine
+
+
+def test_count_header_reads_only_its_items(client, admin_headers, make_product, receive):
+    first, second = make_product(), make_product()
+    for product in (first, second):
+        receive(product["id"], 10, department_id=4)
+    count_id = client.post("/api/v1/inventory-counts/", headers=admin_headers, json={
+        "department_id": 4, "date": "2026-03-01",
+    }).json()["id"]
+    client.put(f"/api/v1/inventory-counts/{count_id}/items", headers=admin_headers, json={
+        "items": [{"product_code": first["code"], "actual_quantity": "7"}],
+    })
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith("SELECT inventory_counts."):
+            statements.append((statement, parameters))
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        detail = client.get(f"/api/v1/inventory-counts/{count_id}", headers=admin_headers).json()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    assert detail["items_count"] == len(detail["items"]) >= 2
+    assert detail["discrepancy_count"] == 1
+
+    header_sql, params = next((s, p) for s, p in statements if "inventory_count_items" in s)
+    with engine.connect() as conn:
+        plan = " ".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {header_sql}", params))
+    assert "SCAN inventory_count_items" not in plan and "MATERIALIZE" not in plan
@@ -0,0 +1,50 @@
+"""Підтвердження інвентаризації не опускає залишок нижче резерву чернеток."""
+
+
+def count_with_actual(client, admin_headers, product, actual) -> int:
+    count = client.post("/api/v1/inventory-counts/", headers=admin_headers, json={
+        "department_id": 1, "date": "2026-03-01",
+    })
+    assert count.status_code == 200, count.text
+    count_id = count.json()["id"]
+    response = client.put(f"/api/v1/inventory-counts/{count_id}/items", headers=admin_headers, json={
+        "items": [{"product_code": product["code"], "actual_quantity": str(actual)}],
+    })
+    assert response.status_code == 200, response.text
+    return count_id
+
+
+def test_approve_refused_when_actual_below_reservation(client, admin_headers, make_product, receive, stock):
+    product = make_product()
+    receive(product["id"], 10)
+    writeoff = client.post("/api/v1/writeoffs/", headers=admin_headers, json={
+        "date": "2026-03-01", "department_id": 1, "reason": "брак",
+        "items": [{"product_id": product["id"], "quantity": "8"}],
+    }).json()
+    count_id = count_with_actual(client, admin_headers, product, 7)
+
+    response = client.post(f"/api/v1/inventory-counts/{count_id}/approve", headers=admin_headers)
+    assert response.status_code == 400
+    assert product["code"] in response.json()["detail"] and writeoff["number"] in response.json()["detail"]
+    assert stock(product["id"]) == (10, 8)
+    assert client.get(f"/api/v1/inventory-counts/{count_id}", headers=admin_headers).json()["status"] == "in_progress"
+
+    # Після скасування чернетки резерв звільнено — акт проводиться
+    assert client.delete(f"/api/v1/writeoffs/{writeoff['id']}", headers=admin_headers).status_code == 204
+    response = client.post(f"/api/v1/inventory-counts/{count_id}/approve", headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert stock(product["id"]) == (7, 0)
+
+
+def test_approve_allowed_when_actual_covers_reservation(client, admin_headers, make_product, receive, stock):
+    product = make_product()
+    receive(product["id"], 10)
+    client.post("/api/v1/transfers/", headers=admin_headers, json={
+        "date": "2026-03-01", "from_department_id": 1, "to_department_id": 3,
+        "items": [{"product_id": product["id"], "quantity": "6"}],
+    })
+    count_id = count_with_actual(client, admin_headers, product, 6)
+
+    response = client.post(f"/api/v1/inventory-counts/{count_id}/approve", headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert stock(product["id"]) == (6, 6)
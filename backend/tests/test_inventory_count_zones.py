@@ -0,0 +1,33 @@
+"""Акт із зонами: фактичні кількості вносяться лише через рядки зон."""
+
+
+def test_zoned_count_rejects_direct_quantities(client, admin_headers, make_product, receive):
+    product = make_product()
+    receive(product["id"], 10, department_id=3)
+    count_id = client.post("/api/v1/inventory-counts/", headers=admin_headers, json={
+        "department_id": 3, "date": "2026-03-01",
+    }).json()["id"]
+    items_url = f"/api/v1/inventory-counts/{count_id}/items"
+
+    # До зон — пряме внесення дозволене
+    response = client.put(items_url, headers=admin_headers, json={
+        "items": [{"product_code": product["code"], "actual_quantity": "9"}],
+    })
+    assert response.status_code == 200, response.text
+
+    session = client.post(f"/api/v1/inventory-counts/{count_id}/sessions", headers=admin_headers,
+                          json={"zone": "Склад А"}).json()
+    response = client.put(f"/api/v1/inventory-counts/{count_id}/sessions/{session['id']}/entries",
+                          headers=admin_headers, json={"items": [{"product_id": product["id"], "quantity": "8"}]})
+    assert response.status_code == 200, response.text
+
+    response = client.put(items_url, headers=admin_headers, json={
+        "items": [{"product_code": product["code"], "actual_quantity": "3"}],
+    })
+    assert response.status_code == 400
+    response = client.post(f"/api/v1/inventory-counts/{count_id}/sheet", headers=admin_headers,
+                           files={"file": ("sheet.csv", f"{product['code']};3\n".encode(), "text/csv")})
+    assert response.status_code == 400
+
+    items = client.get(f"/api/v1/inventory-counts/{count_id}", headers=admin_headers).json()["items"]
+    assert [float(i["actual_quantity"]) for i in items if i["product_id"] == product["id"]] == [8]
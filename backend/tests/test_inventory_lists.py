@@ -0,0 +1,34 @@
+"""Списки залишків і журналу з вкладеними товаром і підрозділами (у тестах — ORM_STRICT_LOADING)."""
+from app.database import RELATIONSHIP_LAZY
+
+WORKSHOP = 3
+
+
+def test_strict_loading_enabled():
+    assert RELATIONSHIP_LAZY == "raise_on_sql"
+
+
+def test_inventory_and_transactions_include_relations(client, admin_headers, make_product, receive):
+    product = make_product()
+    receive(product["id"], 10)
+    transfer = client.post("/api/v1/transfers/", headers=admin_headers, json={
+        "date": "2026-03-01", "from_department_id": 1, "to_department_id": WORKSHOP,
+        "items": [{"product_id": product["id"], "quantity": "4"}],
+    }).json()
+    assert client.post(f"/api/v1/transfers/{transfer['id']}/confirm", headers=admin_headers).status_code == 200
+
+    response = client.get("/api/v1/inventory/", headers=admin_headers, params={"product_id": product["id"]})
+    assert response.status_code == 200, response.text
+    rows = {row["department_id"]: row for row in response.json()}
+    assert set(rows) == {1, WORKSHOP}
+    assert all(row["product"]["code"] == product["code"] for row in rows.values())
+    assert rows[WORKSHOP]["department"]["id"] == WORKSHOP and rows[WORKSHOP]["quantity"] == "4.000"
+
+    response = client.get("/api/v1/inventory/transactions", headers=admin_headers,
+                          params={"product_id": product["id"]})
+    assert response.status_code == 200, response.text
+    ledger = response.json()
+    assert {t["transaction_type"] for t in ledger} >= {"receipt"}
+    moved = [t for t in ledger if t["to_department_id"] == WORKSHOP]
+    assert moved and moved[0]["from_department"]["id"] == 1 and moved[0]["to_department"]["id"] == WORKSHOP
+    assert all(t["product"]["name"] == product["name"] for t in ledger)
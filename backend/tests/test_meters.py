@@ -0,0 +1,120 @@
+"""Показники логерів: розбір CSV, заміна показників, згортки година → доба → місяць."""
+import io
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from app.database import SessionLocal
+from app.services import meters
+from app.services.meters import IngestReport, parse_readings
+
+
+def parse(text: str) -> tuple[list, IngestReport]:
+    report = IngestReport()
+    return list(parse_readings(io.BytesIO(text.encode("utf-8")), report)), report
+
+
+@pytest.fixture
+def db(client):  # client — створена схема БД
+    session = SessionLocal()
+    yield session
+    session.rollback()
+    session.close()
+
+
+def ingest(db, text: str) -> IngestReport:
+    report = meters.ingest(db, io.BytesIO(text.encode("utf-8")))
+    db.commit()
+    return report
+
+
+def test_long_format_with_decimal_comma():
+    readings, report = parse(
+        "timestamp;meter;value\n"
+        "2026-02-01 13:00;ktp_old;1200,5\n"
+        "01.02.2026 14:00;KTP_OLD;1 201,25\n"
+        "2026-02-01 15:00;boiler;7\n"
+        "вчора;ktp_old;1\n"
+    )
+    assert readings == [
+        ("ktp_old", datetime(2026, 2, 1, 13), Decimal("1200.5")),
+        ("ktp_old", datetime(2026, 2, 1, 14), Decimal("1201.25")),
+    ]
+    assert report.lines == 4 and report.unknown_meters == ["boiler"]
+    assert report.error_count == 1 and report.errors[0]["line"] == 5
+
+
+def test_wide_format_skips_empty_cells():
+    readings, report = parse(
+        "timestamp,ktp_new,mlyn1,note\n"
+        "2026-02-01T13:00,10,\n"
+        "2026-02-01T14:00,11,5.5,x\n"
+    )
+    assert readings == [
+        ("ktp_new", datetime(2026, 2, 1, 13), Decimal(10)),
+        ("ktp_new", datetime(2026, 2, 1, 14), Decimal(11)),
+        ("mlyn1", datetime(2026, 2, 1, 14), Decimal("5.5")),
+    ]
+    assert report.unknown_meters == ["note"] and report.error_count == 0
+
+
+def test_header_without_timestamp_is_rejected():
+    readings, report = parse("meter;value\nktp_old;1\n")
+    assert readings == [] and report.errors == [{"line": 1, "error": "Немає колонки часу (timestamp)"}]
+
+
+def test_reupload_replaces_reading(db):
+    ingest(db, "timestamp;meter;value\n2040-03-10 08:00;gas;100\n2040-03-10 09:00;gas;110\n")
+    report = ingest(db, "timestamp;meter;value\n2040-03-10 09:00;gas;125\n")
+    assert report.readings == 1
+
+    (day,) = meters.series(db, "gas", "day", datetime(2040, 3, 10), datetime(2040, 3, 11))
+    assert (day["first_value"], day["last_value"], day["readings"]) == (100, 125, 2)
+    assert day["consumption"] == 25
+
+
+def test_rollups_across_month_boundary(db):
+    ingest(db, (
+        "timestamp;meter;value\n"
+        "2041-01-31 22:00;gen;1000\n"
+        "2041-01-31 22:30;gen;1004\n"
+        "2041-01-31 23:30;gen;1010\n"
+        "2041-02-01 00:30;gen;1016\n"
+        "2041-02-01 01:00;gen;1020\n"
+    ))
+
+    hours = meters.series(db, "gen", "hour", datetime(2041, 1, 31), datetime(2041, 2, 2))
+    assert [(h["period_start"].hour, h["readings"], h["consumption"]) for h in hours] == [
+        (22, 2, 4), (23, 1, 6), (0, 1, 6), (1, 1, 4),
+    ]
+    days = meters.series(db, "gen", "day", datetime(2041, 1, 1), datetime(2041, 3, 1))
+    assert [(d["period_start"].day, d["first_value"], d["last_value"], d["readings"]) for d in days] == [
+        (31, 1000, 1010, 3), (1, 1016, 1020, 2),
+    ]
+    months = meters.series(db, "gen", "month", datetime(2041, 1, 1), datetime(2041, 3, 1))
+    assert [(m["period_start"].month, m["readings"], m["consumption"]) for m in months] == [(1, 3, 10), (2, 2, 10)]
+
+    # Пізній показник у минулому місяці перераховує лише його згортки
+    ingest(db, "timestamp;meter;value\n2041-01-31 23:45;gen;1012\n")
+    january, february = meters.series(db, "gen", "month", datetime(2041, 1, 1), datetime(2041, 3, 1))
+    assert (january["last_value"], january["readings"]) == (1012, 4)
+    assert february["consumption"] == 8
+
+
+def test_month_readings_start_from_previous_month(db):
+    ingest(db, (
+        "timestamp;mlyn1;mlyn2\n"
+        "2042-04-01 00:00;50;\n"
+        "2042-04-30 23:00;60;7\n"
+        "2042-05-02 08:00;61;8\n"
+        "2042-05-31 20:00;75;20\n"
+    ))
+    april = meters.month_readings(db, "2042-04")
+    assert april["mlyn1"]["start"] == 50 and april["mlyn1"]["has_previous"] is False
+    assert april["mlyn2"]["start"] == 7 and april["mlyn2"]["consumption"] == 0
+
+    may = meters.month_readings(db, "2042-05")
+    assert (may["mlyn1"]["start"], may["mlyn1"]["end"], may["mlyn1"]["consumption"]) == (60, 75, 15)
+    assert may["mlyn2"]["has_previous"] is True and may["mlyn2"]["consumption"] == 13
+    assert meters.electricity_values(may) == {"mlyn1_start": 60, "mlyn1_end": 75, "mlyn2_start": 7, "mlyn2_end": 20}
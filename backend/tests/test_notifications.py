@@ -0,0 +1,123 @@
+"""Черга Telegram проти фейкового Bot API (scripts/fake_telegram_server.py): ретраї, 429, дайджести."""
+import threading
+import time
+
+import pytest
+
+from app.config import settings
+from app.services import notifications
+from app.services.notifications import TelegramNotifier
+from fake_telegram_server import FakeTelegramState, serve
+
+_real_sleep = time.sleep
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    """Фейковий Bot API на вільному порту; налаштування Telegram вказують на нього."""
+    state = FakeTelegramState()
+    server = serve(0, state)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(settings, "TELEGRAM_API_BASE", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(settings, "TELEGRAM_BOT_TOKEN", "test-token")
+    monkeypatch.setattr(settings, "TELEGRAM_CHAT_ID", "42")
+    monkeypatch.setattr(settings, "TELEGRAM_RATE_PER_MINUTE", 60_000)
+    monkeypatch.setattr(settings, "TELEGRAM_MAX_RETRIES", 4)
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Паузи ретраїв записуються, але не чекаються."""
+    recorded = []
+
+    def fake_sleep(seconds):
+        recorded.append(seconds)
+        _real_sleep(min(seconds, 0.001))
+    monkeypatch.setattr(notifications.time, "sleep", fake_sleep)
+    return recorded
+
+
+@pytest.fixture
+def notifier():
+    instance = TelegramNotifier()
+    yield instance
+    instance.stop()
+
+
+def backoff(recorded) -> list:
+    # Rate limiter теж спить — але частки мілісекунди при 60000/хв
+    return [s for s in recorded if s >= 0.5]
+
+
+def test_5xx_retried_with_exponential_backoff(fake_api, sleeps, notifier):
+    fake_api.fail_rate = 1.0
+    assert notifier.deliver("збій") is False
+    assert fake_api.requests == settings.TELEGRAM_MAX_RETRIES
+    assert backoff(sleeps) == [1.0, 2.0, 4.0]
+
+
+def test_429_waits_retry_after(fake_api, sleeps, notifier):
+    fake_api.rate_limit_every = 2
+    fake_api.retry_after = 3
+    assert notifier.deliver("перше") and notifier.deliver("друге")
+    assert [m["text"] for m in fake_api.messages] == ["перше", "друге"]
+    assert fake_api.requests == 3 and backoff(sleeps) == [3.0]
+
+
+def test_series_are_sent_as_one_digest(fake_api, monkeypatch, notifier):
+    monkeypatch.setattr(settings, "TELEGRAM_DIGEST_SECONDS", 60)
+    for number in ("WO-1", "WO-2", "WO-3"):
+        notifier.submit(f"Списання {number}", digest_key="writeoff_confirmed", digest_title="Списання")
+    notifier.submit("Без дайджесту")
+    notifier.submit("Одне в серії", digest_key="low_stock", digest_title="Низькі")
+    notifier.stop()  # закриває незавершені дайджести
+
+    texts = [m["text"] for m in fake_api.messages]
+    assert len(texts) == 3
+    assert "Без дайджесту" in texts and "Одне в серії" in texts
+    digest = next(t for t in texts if t.startswith("<b>Списання — 3</b>"))
+    assert all(f"Списання {n}" in digest for n in ("WO-1", "WO-2", "WO-3"))
+
+
+def test_http_client_created_once_across_threads(fake_api, notifier):
+    clients = []
+    barrier = threading.Barrier(8)
+
+    def grab():
+        barrier.wait()
+        clients.append(notifier._http())
+    threads = [threading.Thread(target=grab) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(c) for c in clients}) == 1
+
+
+def test_stop_keeps_client_while_thread_still_sending(fake_api, monkeypatch):
+    release = threading.Event()
+    instance = TelegramNotifier()
+    monkeypatch.setattr(instance, "_run", lambda: release.wait(5))
+    client = instance._http()
+    instance.start()
+
+    instance.stop(timeout=0.05)
+    assert not client.is_closed and instance._client is client
+
+    release.set()
+    client.close()
+
+
+def test_manual_stock_report_reports_delivery(client, admin_headers, fake_api, sleeps, notifier, monkeypatch):
+    monkeypatch.setattr(notifications, "notifier", notifier)  # rate limiter з налаштувань фікстури
+    response = client.post("/api/v1/notifications/send-stock-report", headers=admin_headers)
+    assert response.json() == {"success": True}
+    assert "ручний запуск" in fake_api.messages[-1]["text"]
+
+    fake_api.fail_rate = 1.0
+    response = client.post("/api/v1/notifications/send-stock-report", headers=admin_headers)
+    assert response.json() == {"success": False}
@@ -0,0 +1,82 @@
+"""Outbox: успіх кожного обробника фіксується окремо; лідер помічає події з інших процесів."""
+import pytest
+from sqlalchemy import insert
+
+from app.database import SessionLocal, engine
+from app.models.outbox import OutboxEvent
+from app.services import outbox, scheduler
+from app.services.leader import elector
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def drained(db):
+    """Порожня черга до тесту (події попередніх тестів не заважають)."""
+    db.query(OutboxEvent).filter(OutboxEvent.processed_at.is_(None)).update(
+        {OutboxEvent.processed_at: outbox._now()}, synchronize_session=False
+    )
+    db.commit()
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    """Тимчасові обробники тестової події."""
+    registry = {}
+    monkeypatch.setattr(outbox, "_handlers", registry)
+    return registry
+
+
+def test_failed_handler_does_not_rerun_succeeded_one(db, drained, handlers):
+    calls = {"notify": 0, "ledger": 0}
+
+    def notify(db, event):
+        calls["notify"] += 1
+
+    def ledger(db, event):
+        calls["ledger"] += 1
+        if calls["ledger"] == 1:
+            raise RuntimeError("тимчасовий збій")
+
+    handlers["test.happened"] = [notify, ledger]
+    outbox.emit(db, "test.happened", "test", 1)
+    db.commit()
+
+    assert outbox.dispatch_pending(db) == 0
+    event = db.query(OutboxEvent).filter(OutboxEvent.event_type == "test.happened").one()
+    assert event.attempts == 1 and event.handled == ["notify"] and event.processed_at is None
+
+    assert outbox.dispatch_pending(db) == 1
+    db.refresh(event)
+    assert calls == {"notify": 1, "ledger": 2}
+    assert event.processed_at is not None and event.handled == ["ledger", "notify"]
+
+
+def test_leader_wakes_dispatch_for_other_process_events(db, drained, monkeypatch):
+    woken = []
+    monkeypatch.setattr(scheduler, "wake_outbox_dispatcher", lambda: woken.append(True))
+    monkeypatch.setattr(elector, "is_leader", True)
+
+    scheduler.job_outbox_wake()
+    assert woken == []
+
+    # Подія, закомічена іншим процесом: без after_commit цієї сесії
+    with engine.begin() as conn:
+        conn.execute(insert(OutboxEvent.__table__), [
+            {"event_type": "test.remote", "aggregate_type": "test", "payload": {}, "attempts": 0},
+        ])
+    scheduler.job_outbox_wake()
+    assert woken == [True]
+
+    # Події з невдалими спробами не будять доставку щоразу — лише інтервал OUTBOX_POLL_SECONDS
+    db.query(OutboxEvent).filter(OutboxEvent.event_type == "test.remote").update(
+        {OutboxEvent.attempts: 1}, synchronize_session=False
+    )
+    db.commit()
+    scheduler.job_outbox_wake()
+    assert woken == [True]
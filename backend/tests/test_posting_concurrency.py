@@ -0,0 +1,80 @@
+"""Паралельне створення і проведення документів: залишок не йде в мінус, документ проводиться один раз."""
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from app.database import SessionLocal
+from app.models.inventory import InventoryTransaction
+
+WORKSHOP = 3
+
+
+def ledger_rows(reference_type: str, reference_id: int) -> int:
+    db = SessionLocal()
+    try:
+        return db.query(InventoryTransaction).filter(
+            InventoryTransaction.reference_type == reference_type,
+            InventoryTransaction.reference_id == reference_id,
+        ).count()
+    finally:
+        db.close()
+
+
+def test_parallel_create_and_confirm_transfers(client, admin_headers, make_product, receive, stock):
+    product = make_product()
+    receive(product["id"], 30)
+
+    def create(_):
+        return client.post("/api/v1/transfers/", headers=admin_headers, json={
+            "date": "2026-03-01", "from_department_id": 1, "to_department_id": WORKSHOP,
+            "items": [{"product_id": product["id"], "quantity": "3"}],
+        })
+
+    # 15 чернеток по 3 шт при залишку 30: резерв не може перевищити залишок
+    with ThreadPoolExecutor(8) as pool:
+        created = list(pool.map(create, range(15)))
+    codes = [r.status_code for r in created]
+    assert set(codes) <= {201, 400, 409}, codes
+    ids = [r.json()["id"] for r in created if r.status_code == 201]
+    assert 1 <= len(ids) <= 10 and codes.count(409) <= 1, codes
+    quantity, reserved = stock(product["id"])
+    assert quantity == 30 and reserved == 3 * len(ids)
+
+    # Кожну чернетку проводять тричі паралельно
+    with ThreadPoolExecutor(8) as pool:
+        confirmed = list(pool.map(
+            lambda i: (i, client.post(f"/api/v1/transfers/{i}/confirm", headers=admin_headers).status_code),
+            ids * 3,
+        ))
+    for transfer_id in ids:
+        outcomes = [code for i, code in confirmed if i == transfer_id]
+        assert outcomes.count(200) == 1, (transfer_id, outcomes)
+        assert ledger_rows("transfer", transfer_id) == 2  # видача + надходження
+
+    quantity, reserved = stock(product["id"])
+    assert quantity == 30 - 3 * len(ids) and quantity >= 0 and reserved == 0
+    assert stock(product["id"], WORKSHOP)[0] == 3 * len(ids)
+
+
+def test_parallel_writeoffs_never_go_negative(client, admin_headers, make_product, receive, stock):
+    product = make_product()
+    receive(product["id"], 10)
+
+    def create_and_confirm(_):
+        response = client.post("/api/v1/writeoffs/", headers=admin_headers, json={
+            "date": "2026-03-01", "department_id": 1, "reason": "брак",
+            "items": [{"product_id": product["id"], "quantity": "4"}],
+        })
+        if response.status_code != 201:
+            return response.status_code, None
+        writeoff_id = response.json()["id"]
+        return client.post(f"/api/v1/writeoffs/{writeoff_id}/confirm", headers=admin_headers).status_code, writeoff_id
+
+    with ThreadPoolExecutor(6) as pool:
+        results = list(pool.map(create_and_confirm, range(6)))
+
+    posted = [writeoff_id for code, writeoff_id in results if code == 200]
+    assert len(posted) == 2, results  # 10 // 4
+    for writeoff_id in posted:
+        assert ledger_rows("writeoff", writeoff_id) == 1
+    quantity, reserved = stock(product["id"])
+    assert quantity == Decimal(2) and reserved == 0
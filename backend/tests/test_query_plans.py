@@ -0,0 +1,22 @@
+"""Гарячі запити звітів і проведення читають композитні індекси (scripts/explain_indexes.py)."""
+import pytest
+from sqlalchemy import create_engine
+
+from app.database import Base
+from explain_indexes import checks, plan, seed
+
+
+@pytest.fixture(scope="module")
+def plans_engine(tmp_path_factory):
+    """Окрема SQLite-БД з даними і ANALYZE: плани не залежать від решти тестів."""
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    Base.metadata.create_all(bind=engine)
+    seed(engine, 1000)
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("title, statement, index", checks(), ids=[index for _, _, index in checks()])
+def test_query_uses_index(plans_engine, title, statement, index):
+    with plans_engine.connect() as conn:
+        assert index in plan(conn, statement), title
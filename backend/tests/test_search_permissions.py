@@ -0,0 +1,83 @@
+"""Глобальний пошук повертає лише те, що роль бачить у відповідних списках."""
+from datetime import datetime
+
+import pytest
+
+from app.config import settings
+
+WORKSHOP = 3
+
+
+@pytest.fixture
+def documents(client, admin_headers, supplier, make_product, receive):
+    """Закупівля, переміщення і списання двох підрозділів, створені сьогодні."""
+    product = make_product()
+    purchase = receive(product["id"], 20)
+    receive(product["id"], 5, department_id=WORKSHOP)
+    transfer = client.post("/api/v1/transfers/", headers=admin_headers, json={
+        "date": "2026-03-01", "from_department_id": 1, "to_department_id": WORKSHOP,
+        "items": [{"product_id": product["id"], "quantity": "1"}],
+    }).json()
+    writeoffs = {
+        dept: client.post("/api/v1/writeoffs/", headers=admin_headers, json={
+            "date": "2026-03-01", "department_id": dept, "reason": "брак",
+            "items": [{"product_id": product["id"], "quantity": "1"}],
+        }).json()
+        for dept in (1, WORKSHOP)
+    }
+    return {"purchase": purchase, "transfer": transfer, "writeoffs": writeoffs}
+
+
+def search(client, headers, **params):
+    # Запит — дата в номері: збігається з усіма сьогоднішніми документами
+    params.setdefault("q", datetime.now().strftime("%Y%m%d"))
+    return client.get("/api/v1/search/", headers=headers, params={"limit": 50, **params})
+
+
+def found(response) -> dict[str, set[int]]:
+    assert response.status_code == 200, response.text
+    return {g["type"]: {item["id"] for item in g["items"]} for g in response.json()["groups"]}
+
+
+@pytest.fixture(autouse=True)
+def generous_budget(monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_BUDGET_MS", 10_000)
+
+
+@pytest.mark.parametrize("role, purchases, transfers", [
+    ("admin", True, True),
+    ("manager", True, True),
+    ("warehouse_manager", False, True),
+    ("department_head", False, False),
+])
+def test_document_groups_follow_list_permissions(client, user_headers, documents, role, purchases, transfers):
+    groups = found(search(client, user_headers(role, department_id=WORKSHOP)))
+
+    assert (documents["purchase"]["id"] in groups.get("purchase", set())) is purchases
+    assert ("purchase" in groups) is purchases
+    assert (documents["transfer"]["id"] in groups.get("transfer", set())) is transfers
+    assert ("transfer" in groups) is transfers
+
+    writeoffs = groups["writeoff"]
+    assert documents["writeoffs"][WORKSHOP]["id"] in writeoffs
+    # department_head — лише списання свого підрозділу
+    assert (documents["writeoffs"][1]["id"] in writeoffs) is (role != "department_head")
+
+
+def test_department_head_without_department_sees_no_writeoffs(client, user_headers, documents):
+    groups = found(search(client, user_headers("department_head")))
+    assert "writeoff" not in groups
+
+
+@pytest.mark.parametrize("role, types", [
+    ("warehouse_manager", ["purchase"]),
+    ("department_head", ["transfer", "product"]),
+])
+def test_explicit_forbidden_types_rejected(client, user_headers, role, types):
+    response = search(client, user_headers(role, department_id=WORKSHOP), types=types)
+    assert response.status_code == 403
+
+
+def test_dictionaries_visible_to_every_role(client, user_headers, supplier):
+    groups = found(search(client, user_headers("department_head", department_id=WORKSHOP), q="ТОВ Тест"))
+    assert supplier["id"] in groups["supplier"]
@@ -0,0 +1,176 @@
+"""Майданчик нових рядків і звіти майданчика після перенесення підрозділу."""
+import pytest
+from sqlalchemy import insert, update
+
+from app.database import engine
+from app.models.department import Department
+from app.models.site import DEFAULT_SITE_ID, department_site
+from conftest import MAIN_WAREHOUSE, unique
+
+
+@pytest.fixture
+def department():
+    """Окремий підрозділ, щоб перенесення не зачіпало інших тестів."""
+    with engine.begin() as conn:
+        return conn.execute(insert(Department.__table__).values(
+            name=unique("Цех"), type="production", is_main_warehouse=False, is_active=True,
+            site_id=DEFAULT_SITE_ID,
+        )).inserted_primary_key[0]
+
+
+@pytest.fixture
+def site(client, admin_headers):
+    response = client.post("/api/v1/sites/", headers=admin_headers,
+                           json={"code": unique("S")[:20], "name": unique("Млин")})
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_other_connection_sees_moved_department(department, site):
+    # "Інший воркер": з'єднання, яке вже закешувало майданчик підрозділу
+    with engine.connect() as worker:
+        with worker.begin():
+            assert department_site(worker, department) == DEFAULT_SITE_ID
+
+        # Перенесення іншим процесом: жодних подій сесії в цьому процесі
+        with engine.begin() as other:
+            other.execute(update(Department.__table__).where(Department.id == department)
+                          .values(site_id=site["id"]))
+
+        with worker.begin():
+            assert department_site(worker, department) == site["id"]
+
+
+def test_new_rows_and_document_reports_follow_site(client, admin_headers, department, site,
+                                                   make_product, receive):
+    client.post(f"/api/v1/sites/{site['id']}/departments", headers=admin_headers,
+                json={"department_ids": [department]})
+    product = make_product()
+    local = receive(product["id"], 5, department_id=department)
+    receive(product["id"], 5)
+    for dept in (department, 1):
+        writeoff = client.post("/api/v1/writeoffs/", headers=admin_headers, json={
+            "date": "2026-03-01", "department_id": dept, "reason": "брак",
+            "items": [{"product_id": product["id"], "quantity": "1"}],
+        }).json()
+        assert client.post(f"/api/v1/writeoffs/{writeoff['id']}/confirm", headers=admin_headers).status_code == 200
+
+    scoped = {**admin_headers, "X-Site": site["code"]}
+    stock = client.get("/api/v1/inventory/", headers=scoped, params={"product_id": product["id"]}).json()
+    assert {row["department_id"] for row in stock} == {department}
+
+    purchases = client.get("/api/v1/reports/purchases", headers=scoped,
+                           params={"product_id": product["id"]}).json()
+    assert {item["purchase_number"] for item in purchases["items"]} == {local["number"]}
+
+    writeoffs = client.get("/api/v1/reports/writeoffs", headers=scoped).json()
+    assert [d["department_id"] for d in writeoffs["departments"]] == [department]
+
+
+@pytest.fixture
+def site_admin(client, admin_headers, department, site, user_headers):
+    """Адміністратор, прив'язаний до майданчика з одним перенесеним підрозділом."""
+    response = client.post(f"/api/v1/sites/{site['id']}/departments", headers=admin_headers,
+                           json={"department_ids": [department]})
+    assert response.status_code == 200, response.text
+    return user_headers("admin", site_id=site["id"])
+
+
+def _draft_purchase(client, headers, supplier, product_id, department_id):
+    return client.post("/api/v1/purchases/", headers=headers, json={
+        "date": "2026-03-01", "supplier_id": supplier["id"], "department_id": department_id,
+        "items": [{"product_id": product_id, "quantity": "1", "unit_price": "10"}],
+    })
+
+
+def test_site_user_sees_only_site_documents(client, admin_headers, site_admin, department, supplier,
+                                            make_product, receive):
+    product = make_product()
+    local = receive(product["id"], 5, department_id=department)
+    foreign = receive(product["id"], 5)
+    foreign_draft = _draft_purchase(client, admin_headers, supplier, product["id"], MAIN_WAREHOUSE).json()
+
+    listed = client.get("/api/v1/purchases/", headers=site_admin, params={"limit": 1000}).json()
+    numbers = {p["number"] for p in listed}
+    assert local["number"] in numbers and foreign["number"] not in numbers
+
+    assert client.get(f"/api/v1/purchases/{local['id']}", headers=site_admin).status_code == 200
+    assert client.get(f"/api/v1/purchases/{foreign['id']}", headers=site_admin).status_code == 404
+    assert client.delete(f"/api/v1/purchases/{foreign_draft['id']}", headers=site_admin).status_code == 404
+
+    batch = client.post("/api/v1/purchases/confirm-batch", headers=site_admin,
+                        json={"ids": [foreign_draft["id"]], "mode": "best_effort"}).json()
+    assert batch["confirmed_count"] == 0
+    assert client.get(f"/api/v1/purchases/{foreign_draft['id']}", headers=admin_headers).json()["status"] == "draft"
+
+    count = client.post("/api/v1/inventory-counts/", headers=admin_headers,
+                        json={"department_id": MAIN_WAREHOUSE, "date": "2026-03-02"}).json()
+    assert client.get(f"/api/v1/inventory-counts/{count['id']}", headers=site_admin).status_code == 404
+    assert count["id"] not in {c["id"] for c in client.get("/api/v1/inventory-counts/", headers=site_admin).json()}
+
+    def found(number):
+        groups = client.get("/api/v1/search/", headers=site_admin,
+                            params={"q": number, "types": ["purchase"]}).json()["groups"]
+        return {item["title"] for group in groups for item in group["items"]}
+    assert found(local["number"]) == {local["number"]}
+    assert found(foreign["number"]) == set()
+
+
+def test_site_user_cannot_write_other_site(client, site_admin, department, supplier, make_product, receive):
+    product = make_product()
+    receive(product["id"], 5)
+    assert _draft_purchase(client, site_admin, supplier, product["id"], MAIN_WAREHOUSE).status_code == 403
+
+    local = _draft_purchase(client, site_admin, supplier, product["id"], department)
+    assert local.status_code == 201
+    moved = client.put(f"/api/v1/purchases/{local.json()['id']}", headers=site_admin,
+                       json={"department_id": MAIN_WAREHOUSE})
+    assert moved.status_code == 403
+
+    writeoff = client.post("/api/v1/writeoffs/", headers=site_admin, json={
+        "date": "2026-03-01", "department_id": MAIN_WAREHOUSE, "reason": "брак",
+        "items": [{"product_id": product["id"], "quantity": "1"}],
+    })
+    assert writeoff.status_code == 403
+    transfer = client.post("/api/v1/transfers/", headers=site_admin, json={
+        "date": "2026-03-01", "from_department_id": MAIN_WAREHOUSE, "to_department_id": department,
+        "items": [{"product_id": product["id"], "quantity": "1"}],
+    })
+    assert transfer.status_code == 403
+    count = client.post("/api/v1/inventory-counts/", headers=site_admin,
+                        json={"department_id": MAIN_WAREHOUSE, "date": "2026-03-02"})
+    assert count.status_code == 403
+
+
+def test_cross_site_transfer_in_both_ledgers(client, admin_headers, site_admin, department, make_product, receive):
+    product = make_product()
+    receive(product["id"], 5, department_id=department)
+    transfer = client.post("/api/v1/transfers/", headers=site_admin, json={
+        "date": "2026-03-01", "from_department_id": department, "to_department_id": MAIN_WAREHOUSE,
+        "items": [{"product_id": product["id"], "quantity": "2"}],
+    })
+    assert transfer.status_code == 201, transfer.text
+    assert client.post(f"/api/v1/transfers/{transfer.json()['id']}/confirm", headers=admin_headers).status_code == 200
+
+    default_code = next(s["code"] for s in client.get("/api/v1/sites/", headers=admin_headers).json()
+                        if s["id"] == DEFAULT_SITE_ID)
+    for headers in (site_admin, {**admin_headers, "X-Site": default_code}):
+        ledger = client.get("/api/v1/inventory/transactions", headers=headers,
+                            params={"product_id": product["id"], "transaction_type": "transfer"}).json()
+        assert [(t["from_department_id"], t["to_department_id"]) for t in ledger] == [(department, MAIN_WAREHOUSE)]
+
+
+def test_site_user_reports_and_low_stock(client, site_admin, department, make_product, receive):
+    for path in ("cost-analysis", "suppliers", "materials", "supplier-monthly", "abc-analysis"):
+        assert client.get(f"/api/v1/reports/{path}", headers=site_admin).status_code == 403, path
+    assert client.get("/api/v1/reports/dashboard", headers=site_admin).status_code == 200
+
+    product = make_product(min_stock_level=100)
+    assert client.get("/api/v1/reports/price-dynamics", headers=site_admin,
+                      params={"product_id": product["id"]}).status_code == 403
+    receive(product["id"], 5, department_id=department)
+    receive(product["id"], 5)
+    low = client.get("/api/v1/notifications/low-stock", headers=site_admin).json()
+    names = {item["department_name"] for item in low["items"] if item["product_name"] == product["name"]}
+    assert len(names) == 1
+    assert client.get(f"/api/v1/inventory/department/{MAIN_WAREHOUSE}/summary", headers=site_admin).status_code == 403
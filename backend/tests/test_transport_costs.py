@@ -0,0 +1,71 @@
+"""Зведення витрат ТЗ оновлюють обробники outbox transfer.confirmed / writeoff.confirmed."""
+from decimal import Decimal
+
+import pytest
+
+from app.database import SessionLocal
+from app.models.outbox import OutboxEvent
+from app.services import outbox
+from conftest import unique
+
+MONTH = "2032-07"
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def fleet_costs(client, headers, department_id):
+    response = client.get("/api/v1/transport/costs", headers=headers,
+                          params={"month_from": MONTH, "month_to": MONTH})
+    assert response.status_code == 200, response.text
+    row = next((r for r in response.json() if r["department_id"] == department_id), None)
+    return row and (Decimal(row["received_cost"]), Decimal(row["writeoff_cost"]))
+
+
+def test_transfer_and_writeoff_update_fleet_costs(client, admin_headers, db, make_product, receive):
+    unit = client.post("/api/v1/transport/", headers=admin_headers, json={
+        "name": unique("МТЗ"), "unit_type": "tractor", "plate_number": unique("ВІ"),
+    }).json()
+    truck = unit["department_id"]
+    product = make_product()
+    receive(product["id"], 10, unit_price=12)
+
+    transfer = client.post("/api/v1/transfers/", headers=admin_headers, json={
+        "date": f"{MONTH}-03", "from_department_id": 1, "to_department_id": truck,
+        "items": [{"product_id": product["id"], "quantity": "5"}],
+    }).json()
+    assert client.post(f"/api/v1/transfers/{transfer['id']}/confirm", headers=admin_headers).status_code == 200
+    writeoff = client.post("/api/v1/writeoffs/", headers=admin_headers, json={
+        "date": f"{MONTH}-20", "department_id": truck, "reason": "ремонт",
+        "items": [{"product_id": product["id"], "quantity": "2"}],
+    }).json()
+    assert client.post(f"/api/v1/writeoffs/{writeoff['id']}/confirm", headers=admin_headers).status_code == 200
+
+    assert fleet_costs(client, admin_headers, truck) is None  # до доставки подій зведення не змінене
+    outbox.dispatch_all(db)
+    assert fleet_costs(client, admin_headers, truck) == (Decimal(60), Decimal(24))
+
+    # Повторна доставка (at-least-once) дає той самий результат
+    db.query(OutboxEvent).filter(
+        OutboxEvent.aggregate_id.in_([transfer["id"], writeoff["id"]]),
+        OutboxEvent.event_type.in_(["transfer.confirmed", "writeoff.confirmed"]),
+    ).update({OutboxEvent.processed_at: None, OutboxEvent.handled: None}, synchronize_session=False)
+    db.commit()
+    outbox.dispatch_all(db)
+    assert fleet_costs(client, admin_headers, truck) == (Decimal(60), Decimal(24))
+
+
+def test_transfer_to_ordinary_department_is_ignored(client, admin_headers, db, make_product, receive):
+    product = make_product()
+    receive(product["id"], 3)
+    transfer = client.post("/api/v1/transfers/", headers=admin_headers, json={
+        "date": f"{MONTH}-05", "from_department_id": 1, "to_department_id": 3,
+        "items": [{"product_id": product["id"], "quantity": "1"}],
+    }).json()
+    client.post(f"/api/v1/transfers/{transfer['id']}/confirm", headers=admin_headers)
+    outbox.dispatch_all(db)
+    assert fleet_costs(client, admin_headers, 3) is None
@@ -15,4 +15,9 @@ export const electricityAPI = {
     const response = await client.get('/electricity/')
     return response.data
   },
+
+  analytics: async () => {
+    const response = await client.get('/electricity/analytics')
+    return response.data
+  },
 }
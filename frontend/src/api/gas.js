@@ -5,4 +5,5 @@ export const gasAPI = {
   getMonth:   (month)      => client.get(`/gas/${month}`).then(r => r.data),
   save:       (data)       => client.post('/gas/save', data).then(r => r.data),
   deleteMonth:(month)      => client.delete(`/gas/${month}`).then(r => r.data),
+  analytics:  ()           => client.get('/gas/analytics').then(r => r.data),
 }
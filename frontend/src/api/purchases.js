@@ -21,6 +21,12 @@ export const purchasesAPI = {
     return response.data
   },
 
+  // mode: 'all_or_nothing' | 'best_effort'
+  confirmBatch: async (ids, mode = 'all_or_nothing') => {
+    const response = await client.post('/purchases/confirm-batch', { ids, mode })
+    return response.data
+  },
+
   update: async (id, data) => {
     const response = await client.put(`/purchases/${id}`, data)
     return response.data
@@ -21,6 +21,12 @@ export const transfersAPI = {
     return response.data
   },
 
+  // mode: 'all_or_nothing' | 'best_effort'
+  confirmBatch: async (ids, mode = 'all_or_nothing') => {
+    const response = await client.post('/transfers/confirm-batch', { ids, mode })
+    return response.data
+  },
+
   cancel: async (id) => {
     const response = await client.delete(`/transfers/${id}`)
     return response.data
@@ -26,6 +26,12 @@ export const writeoffsAPI = {
     return response.data
   },
 
+  // mode: 'all_or_nothing' | 'best_effort'
+  confirmBatch: async (ids, mode = 'all_or_nothing') => {
+    const response = await client.post('/writeoffs/confirm-batch', { ids, mode })
+    return response.data
+  },
+
   cancel: async (id) => {
     const response = await client.delete(`/writeoffs/${id}`)
     return response.data
@@ -46,7 +46,7 @@ const CustomTooltip = ({ active, payload, label }) => {
   )
 }
 
-export default function ElectricityAnalytics({ records }) {
+export default function ElectricityAnalytics({ records, analytics }) {
   const years = useMemo(() => {
     const s = new Set(records.map(r => r.month.slice(0, 4)))
     return [...s].sort().reverse()
@@ -122,22 +122,22 @@ export default function ElectricityAnalytics({ records }) {
 
   const tableYears = Object.keys(tableByYear).sort()
 
-  // Підсумки по роках
+  // Підсумки по роках — з серверної аналітики (GET /electricity/analytics)
   const yearTotals = useMemo(() => {
     const t = {}
-    tableYears.forEach(y => {
-      const rows = tableByYear[y].filter(Boolean)
-      t[y] = {
-        ktp:      rows.reduce((s, r) => s + r.ktp_total, 0),
-        gen:      rows.reduce((s, r) => s + (r.gen_kwh || 0), 0),
-        total:    rows.reduce((s, r) => s + r.total_kwh, 0),
-        mlyn:     rows.reduce((s, r) => s + r.mlyn_total, 0),
-        palet:    rows.reduce((s, r) => s + r.palet_kwh, 0),
-        elevator: rows.reduce((s, r) => s + r.elevator_kwh, 0),
+    for (const { year, totals, yoy } of analytics?.yearly || []) {
+      t[year] = {
+        ktp:      totals.ktp_total || 0,
+        gen:      totals.gen_kwh || 0,
+        total:    totals.total_kwh || 0,
+        mlyn:     totals.mlyn_total || 0,
+        palet:    totals.palet_kwh || 0,
+        elevator: totals.elevator_kwh || 0,
+        yoyPct:   yoy?.total_kwh?.delta_pct ?? null,
       }
-    })
+    }
     return t
-  }, [tableByYear, tableYears])
+  }, [analytics])
 
   // 3.5 Порівняння місяць до місяця
   const momData = useMemo(() => {
@@ -189,7 +189,7 @@ export default function ElectricityAnalytics({ records }) {
         ])
       })
       const t = yearTotals[y]
-      rows.push([`Разом ${y}`, Math.round(t.ktp), Math.round(t.gen), Math.round(t.total), Math.round(t.mlyn), Math.round(t.palet), Math.round(t.elevator)])
+      if (t) rows.push([`Разом ${y}`, Math.round(t.ktp), Math.round(t.gen), Math.round(t.total), Math.round(t.mlyn), Math.round(t.palet), Math.round(t.elevator)])
       rows.push([])
     })
     const ws = XLSX.utils.aoa_to_sheet([headers, ...rows])
@@ -345,8 +345,16 @@ export default function ElectricityAnalytics({ records }) {
                     <TableCell align="right">{fmtNum(Math.round(r.elevator_kwh))}</TableCell>
                   </TableRow>
                 ) : null),
-                <TableRow key={`total-${y}`} sx={{ bgcolor: 'primary.50' }}>
-                  <TableCell><strong>Разом {y}</strong></TableCell>
+                yearTotals[y] && <TableRow key={`total-${y}`} sx={{ bgcolor: 'primary.50' }}>
+                  <TableCell>
+                    <strong>Разом {y}</strong>
+                    {yearTotals[y].yoyPct != null && (
+                      <Typography component="span" variant="caption" sx={{ ml: 1 }}
+                        color={yearTotals[y].yoyPct > 0 ? 'error.main' : 'success.main'}>
+                        {yearTotals[y].yoyPct > 0 ? '▲' : '▼'} {Math.abs(yearTotals[y].yoyPct).toFixed(1)}% р/р
+                      </Typography>
+                    )}
+                  </TableCell>
                   <TableCell align="right"><strong>{fmtNum(Math.round(yearTotals[y].ktp))}</strong></TableCell>
                   {hasGenerator && (
                     <TableCell align="right" sx={{ color: 'warning.dark' }}>
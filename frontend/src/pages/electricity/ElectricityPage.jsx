@@ -46,6 +46,7 @@ export default function ElectricityPage() {
   const [loading, setLoading] = useState(false)
   const [saving, setSaving] = useState(false)
   const [allRecords, setAllRecords] = useState([])
+  const [analytics, setAnalytics] = useState(null)
   const [toast, setToast] = useState({ open: false, message: '', severity: 'success' })
 
   const [ktpOld,    setKtpOld]    = useState('')
@@ -82,8 +83,9 @@ export default function ElectricityPage() {
 
   const loadAllRecords = useCallback(async () => {
     try {
-      const data = await electricityAPI.listMonths()
+      const [data, stats] = await Promise.all([electricityAPI.listMonths(), electricityAPI.analytics()])
       setAllRecords(data)
+      setAnalytics(stats)
     } catch { /* ігноруємо */ }
   }, [])
 
@@ -294,7 +296,7 @@ export default function ElectricityPage() {
       )}
 
       {/* ===== Аналітика (адмін: tab 1, інші: завжди) ===== */}
-      {(!admin || tab === 1) && <ElectricityAnalytics records={allRecords} />}
+      {(!admin || tab === 1) && <ElectricityAnalytics records={allRecords} analytics={analytics} />}
 
       <Snackbar open={toast.open} autoHideDuration={3000}
         onClose={() => setToast(t => ({ ...t, open: false }))}
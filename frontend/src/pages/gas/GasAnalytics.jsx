@@ -26,7 +26,7 @@ const shortLabel = (m) => {
   return `${MONTHS_UK[parseInt(mo) - 1]}'${y.slice(2)}`
 }
 
-export default function GasAnalytics({ records }) {
+export default function GasAnalytics({ records, analytics }) {
   const years = useMemo(() => {
     const s = new Set(records.map(r => r.month.slice(0, 4)))
     return [...s].sort().reverse()
@@ -82,18 +82,18 @@ export default function GasAnalytics({ records }) {
 
   const tableYears = Object.keys(tableByYear).sort()
 
+  // Підсумки по роках, рік до року і сезонність — з серверної аналітики (GET /gas/analytics)
   const yearTotals = useMemo(() => {
     const t = {}
-    tableYears.forEach(y => {
-      const rows = tableByYear[y].filter(Boolean)
-      t[y] = {
-        consumption: rows.reduce((s, r) => s + (r.consumption || 0), 0),
-        vtv:         rows.reduce((s, r) => s + (r.vtv || 0), 0),
-        total:       rows.reduce((s, r) => s + (r.total || 0), 0),
+    for (const { year, totals } of analytics?.yearly || []) {
+      t[year] = {
+        consumption: totals.consumption || 0,
+        vtv:         totals.vtv || 0,
+        total:       totals.total || 0,
       }
-    })
+    }
     return t
-  }, [tableByYear, tableYears])
+  }, [analytics])
 
   // 3. MoM порівняння
   const momData = useMemo(() => {
@@ -110,14 +110,10 @@ export default function GasAnalytics({ records }) {
   }, [records, cmpMonth1, cmpMonth2])
 
   // 4. YoY
-  const yoyTotals = useMemo(() => {
-    const sum = (year) => {
-      const rows = records.filter(r => r.month.startsWith(year))
-      if (!rows.length) return null
-      return rows.reduce((s, r) => s + (r.total ?? r.consumption ?? 0), 0)
-    }
-    return { y1: sum(compareYear1), y2: sum(compareYear2) }
-  }, [records, compareYear1, compareYear2])
+  const yoyTotals = useMemo(() => ({
+    y1: yearTotals[compareYear1]?.total ?? null,
+    y2: yearTotals[compareYear2]?.total ?? null,
+  }), [yearTotals, compareYear1, compareYear2])
 
   const yoyData = useMemo(() =>
     MONTHS_UK.map((mo, i) => {
@@ -136,18 +132,13 @@ export default function GasAnalytics({ records }) {
 
   // Сезонність — середнє споживання по місяцю за всі роки
   const seasonData = useMemo(() =>
-    MONTHS_UK.map((mo, i) => {
-      const moStr = String(i + 1).padStart(2, '0')
-      const vals = records
-        .filter(r => r.month.slice(5) === moStr && r.consumption != null)
-        .map(r => r.consumption)
-      if (!vals.length) return null
-      return {
-        name: mo,
-        'Середнє': Math.round(vals.reduce((s, v) => s + v, 0) / vals.length),
-      }
-    }).filter(Boolean),
-    [records]
+    (analytics?.seasonal || [])
+      .filter(m => m.stats.consumption)
+      .map(m => ({
+        name: MONTHS_UK[m.month - 1],
+        'Середнє': Math.round(m.stats.consumption.avg),
+      })),
+    [analytics]
   )
 
   const handleExport = () => {
@@ -165,7 +156,7 @@ export default function GasAnalytics({ records }) {
         ])
       })
       const t = yearTotals[y]
-      rows.push([`Разом ${y}`, t.consumption || '', t.vtv || '', t.total || ''])
+      if (t) rows.push([`Разом ${y}`, t.consumption || '', t.vtv || '', t.total || ''])
       rows.push([])
     })
     const ws = XLSX.utils.aoa_to_sheet([headers, ...rows])
@@ -238,7 +229,7 @@ export default function GasAnalytics({ records }) {
                     <TableCell align="right" fontWeight={600}>{fmtNum(r.total)}</TableCell>
                   </TableRow>
                 ) : null),
-                <TableRow key={`total-${y}`} sx={{ bgcolor: 'primary.50' }}>
+                yearTotals[y] && <TableRow key={`total-${y}`} sx={{ bgcolor: 'primary.50' }}>
                   <TableCell><strong>Разом {y}</strong></TableCell>
                   <TableCell align="right"><strong>{fmtInt(yearTotals[y].consumption)}</strong></TableCell>
                   {hasVtv && <TableCell align="right" sx={{ color: 'warning.dark' }}>
@@ -33,6 +33,7 @@ export default function GasPage() {
   const [loading, setLoading] = useState(false)
   const [saving, setSaving]   = useState(false)
   const [allRecords, setAllRecords] = useState([])
+  const [analytics, setAnalytics] = useState(null)
   const [toast, setToast]     = useState({ open: false, message: '', severity: 'success' })
 
   const [consumption, setConsumption] = useState('')
@@ -47,8 +48,9 @@ export default function GasPage() {
 
   const loadAllRecords = useCallback(async () => {
     try {
-      const data = await gasAPI.listMonths()
+      const [data, stats] = await Promise.all([gasAPI.listMonths(), gasAPI.analytics()])
       setAllRecords(data)
+      setAnalytics(stats)
     } catch { /* ігноруємо */ }
   }, [])
 
@@ -186,7 +188,7 @@ export default function GasPage() {
       )}
 
       {/* Аналітика */}
-      {(!admin || tab === 1) && <GasAnalytics records={allRecords} />}
+      {(!admin || tab === 1) && <GasAnalytics records={allRecords} analytics={analytics} />}
 
       <Snackbar open={toast.open} autoHideDuration={3000}
         onClose={() => setToast(t => ({ ...t, open: false }))}
@@ -42,6 +42,7 @@ const PurchasesList = () => {
   const [dialogOpen, setDialogOpen] = useState(false)
   const [editPurchase, setEditPurchase] = useState(null)
   const [expandedId, setExpandedId] = useState(null)
+  const [details, setDetails] = useState({})  // повні документи з позиціями, завантажуються при розгортанні
   const [filters, setFilters] = useState({
     status: '',
     supplier_id: '',
@@ -63,6 +64,7 @@ const PurchasesList = () => {
 
       const data = await purchasesAPI.list(params)
       setPurchases(data)
+      setDetails({})
       setError(null)
     } catch (err) {
       setError(err.message || 'Failed to load purchases')
@@ -109,13 +111,28 @@ const PurchasesList = () => {
     }
   }
 
-  const handleEdit = (purchase) => {
-    setEditPurchase(purchase)
-    setDialogOpen(true)
+  const handleEdit = async (purchase) => {
+    try {
+      setEditPurchase(await loadDetails(purchase.id))
+      setDialogOpen(true)
+    } catch (err) {
+      alert('Помилка завантаження закупівлі: ' + (err.response?.data?.detail || err.message))
+    }
+  }
+
+  // Список приходить без позицій (view=summary) — позиції підвантажуємо за потреби
+  const loadDetails = async (id) => {
+    if (details[id]) return details[id]
+    const data = await purchasesAPI.get(id)
+    setDetails((prev) => ({ ...prev, [id]: data }))
+    return data
   }
 
   const toggleExpand = (id) => {
     setExpandedId(expandedId === id ? null : id)
+    if (expandedId !== id) {
+      loadDetails(id).catch((err) => console.error('Failed to load purchase items:', err))
+    }
   }
 
   if (loading && purchases.length === 0) {
@@ -310,7 +327,7 @@ const PurchasesList = () => {
                               </TableRow>
                             </TableHead>
                             <TableBody>
-                              {purchase.items?.map((item) => (
+                              {details[purchase.id]?.items?.map((item) => (
                                 <TableRow key={item.id}>
                                   <TableCell>{item.product?.name || '-'}</TableCell>
                                   <TableCell align="right">{item.quantity}</TableCell>
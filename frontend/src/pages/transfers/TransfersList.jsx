@@ -39,6 +39,7 @@ const TransfersList = () => {
   const [error, setError] = useState(null)
   const [dialogOpen, setDialogOpen] = useState(false)
   const [expandedId, setExpandedId] = useState(null)
+  const [details, setDetails] = useState({})  // повні документи з позиціями, завантажуються при розгортанні
   const [filters, setFilters] = useState({
     status: '',
     from_department_id: '',
@@ -61,6 +62,7 @@ const TransfersList = () => {
 
       const data = await transfersAPI.list(params)
       setTransfers(data)
+      setDetails({})
       setError(null)
     } catch (err) {
       setError(err.message || 'Failed to load transfers')
@@ -91,8 +93,19 @@ const TransfersList = () => {
     }
   }
 
+  // Список приходить без позицій (view=summary) — позиції підвантажуємо за потреби
+  const loadDetails = async (id) => {
+    if (details[id]) return details[id]
+    const data = await transfersAPI.get(id)
+    setDetails((prev) => ({ ...prev, [id]: data }))
+    return data
+  }
+
   const toggleExpand = (id) => {
     setExpandedId(expandedId === id ? null : id)
+    if (expandedId !== id) {
+      loadDetails(id).catch((err) => console.error('Failed to load transfer items:', err))
+    }
   }
 
   if (loading && transfers.length === 0) {
@@ -282,7 +295,7 @@ const TransfersList = () => {
                               </TableRow>
                             </TableHead>
                             <TableBody>
-                              {transfer.items?.map((item) => (
+                              {details[transfer.id]?.items?.map((item) => (
                                 <TableRow key={item.id}>
                                   <TableCell>{item.product?.name || '-'}</TableCell>
                                   <TableCell align="right">{item.quantity}</TableCell>
@@ -40,6 +40,7 @@ export default function WriteOffsList() {
   const [error, setError] = useState('')
   const [dialogOpen, setDialogOpen] = useState(false)
   const [expandedId, setExpandedId] = useState(null)
+  const [details, setDetails] = useState({})  // повні документи з позиціями, завантажуються при розгортанні
   const [filters, setFilters] = useState({
     status: '',
     department_id: '',
@@ -60,6 +61,7 @@ export default function WriteOffsList() {
 
       const data = await writeoffsAPI.getAll(params)
       setWriteoffs(data)
+      setDetails({})
       setError('')
     } catch (err) {
       console.error('Failed to load write-offs:', err)
@@ -132,8 +134,19 @@ export default function WriteOffsList() {
     }
   }
 
+  // Список приходить без позицій (view=summary) — позиції підвантажуємо за потреби
+  const loadDetails = async (id) => {
+    if (details[id]) return details[id]
+    const data = await writeoffsAPI.getById(id)
+    setDetails((prev) => ({ ...prev, [id]: data }))
+    return data
+  }
+
   const toggleExpand = (id) => {
     setExpandedId(expandedId === id ? null : id)
+    if (expandedId !== id) {
+      loadDetails(id).catch((err) => console.error('Failed to load write-off items:', err))
+    }
   }
 
   return (
@@ -286,7 +299,7 @@ export default function WriteOffsList() {
                               </TableRow>
                             </TableHead>
                             <TableBody>
-                              {writeoff.items.map((item) => (
+                              {details[writeoff.id]?.items?.map((item) => (
                                 <TableRow key={item.id}>
                                   <TableCell>{item.product?.name}</TableCell>
                                   <TableCell align="right">{item.quantity}</TableCell>